@@ -0,0 +1,814 @@
+"""
+Analisi statistiche avanzate per le schede fauna
+- Biodiversità: indici di Shannon, Simpson ed evenness per US, area e sito a
+  partire dai conteggi di specie in specie_psi, e curve di rarefazione Monte Carlo.
+- Contingenza: tabelle specie × contesto (contesto, deposizione, tipologia di
+  accumulo) con chi-quadro, residui standardizzati, V di Cramér e p-value per
+  permutazione.
+
+I calcoli sono vettoriali su matrici numpy; le simulazioni Monte Carlo vengono
+distribuite su un pool di processi con seed deterministici (stesso risultato
+indipendentemente dal numero di worker).
+"""
+
+import csv
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from fauna_records import extract_species
+
+
+# Livelli di aggregazione: campi che identificano l'unità
+LIVELLI_AGGREGAZIONE = {
+    'sito': ('sito',),
+    'area': ('sito', 'area'),
+    'us': ('sito', 'area', 'us'),
+}
+
+# Parametri predefiniti della rarefazione
+RAREFAZIONE_ITERAZIONI = 200
+RAREFAZIONE_PASSI = 20
+RAREFAZIONE_SEED = 20251122
+
+
+def _require_numpy():
+    """Verifica che numpy sia disponibile"""
+    if not NUMPY_AVAILABLE:
+        raise ImportError(
+            "numpy non è installato. Installarlo con: pip install numpy"
+        )
+
+
+def build_count_matrix(records: List[Dict], livello: str = 'us') -> Tuple[List[tuple], List[str], 'np.ndarray']:
+    """
+    Costruisce la matrice dei conteggi unità × specie
+
+    Ogni riga di specie_psi conta come un'occorrenza della specie nell'unità.
+    I record senza i campi che identificano l'unità vengono ignorati.
+
+    Args:
+        records: lista di record fauna
+        livello: 'sito', 'area' o 'us'
+
+    Returns:
+        Tupla (chiavi unità ordinate, specie ordinate, matrice int64 unità × specie)
+    """
+    _require_numpy()
+
+    if livello not in LIVELLI_AGGREGAZIONE:
+        raise ValueError(f"Livello di aggregazione non supportato: {livello}")
+
+    campi = LIVELLI_AGGREGAZIONE[livello]
+    unit_index = {}
+    species_index = {}
+    righe = []
+    colonne = []
+
+    # Un solo passaggio sui record: raccoglie le coordinate (unità, specie)
+    for r in records:
+        chiave = tuple(str(r.get(c) or '') for c in campi)
+        if not all(chiave):
+            continue
+        for sp in extract_species(r):
+            if not sp or not sp.strip():
+                continue
+            righe.append(unit_index.setdefault(chiave, len(unit_index)))
+            colonne.append(species_index.setdefault(sp, len(species_index)))
+
+    units = sorted(unit_index)
+    species = sorted(species_index)
+    counts = np.zeros((len(units), len(species)), dtype=np.int64)
+
+    if righe:
+        # Rimappa gli indici di inserimento sull'ordinamento alfabetico
+        unit_map = np.empty(len(units), dtype=np.int64)
+        for pos, chiave in enumerate(units):
+            unit_map[unit_index[chiave]] = pos
+        species_map = np.empty(len(species), dtype=np.int64)
+        for pos, sp in enumerate(species):
+            species_map[species_index[sp]] = pos
+
+        np.add.at(counts, (unit_map[np.asarray(righe)], species_map[np.asarray(colonne)]), 1)
+
+    return units, species, counts
+
+
+def diversity_indices(counts: 'np.ndarray') -> Dict[str, 'np.ndarray']:
+    """
+    Calcola gli indici di diversità per ogni riga della matrice dei conteggi
+
+    Args:
+        counts: matrice unità × specie dei conteggi
+
+    Returns:
+        Dizionario di array (uno per indice, una posizione per unità):
+        n (individui), ricchezza (S), shannon (H'), simpson (1 - Σp²),
+        evenness (Pielou J = H'/ln S, NaN se S < 2)
+    """
+    _require_numpy()
+
+    counts = np.asarray(counts, dtype=np.float64)
+    n = counts.sum(axis=1)
+    ricchezza = (counts > 0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(n[:, None] > 0, counts / n[:, None], 0.0)
+        log_p = np.where(p > 0, np.log(p), 0.0)
+        shannon = -(p * log_p).sum(axis=1)
+        simpson = np.where(n > 0, 1.0 - (p * p).sum(axis=1), np.nan)
+        evenness = np.where(ricchezza > 1, shannon / np.log(np.maximum(ricchezza, 2)), np.nan)
+
+    return {
+        'n': n.astype(np.int64),
+        'ricchezza': ricchezza.astype(np.int64),
+        'shannon': shannon,
+        'simpson': simpson,
+        'evenness': evenness,
+    }
+
+
+def _python_executable() -> Optional[str]:
+    """
+    Interprete Python con cui avviare i worker, o None se non utilizzabile
+
+    Dentro QGIS (o un'altra applicazione che incorpora Python) sys.executable è
+    l'applicazione stessa: avviarla come worker aprirebbe nuove istanze del
+    programma senza mai rispondere al pool. In quel caso si resta seriali.
+    """
+    if 'qgis' in sys.modules:
+        return None
+    if not re.match(r'python(w|\d+(\.\d+)*)?(\.exe)?$', os.path.basename(sys.executable or ''), re.IGNORECASE):
+        return None
+
+    versione = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    for candidato in (os.path.join(sys.exec_prefix, 'bin', versione),
+                      os.path.join(sys.exec_prefix, 'bin', 'python3'),
+                      os.path.join(sys.exec_prefix, 'Scripts', 'python.exe'),
+                      os.path.join(sys.exec_prefix, 'python.exe')):
+        if os.path.isfile(candidato):
+            return candidato
+    return sys.executable
+
+
+def run_parallel(func, tasks: list, max_workers: Optional[int] = None,
+                 progress: Optional[Callable[[int], None]] = None) -> list:
+    """
+    Esegue func su ogni task in un pool di processi, preservando l'ordine
+
+    Ricade sull'esecuzione seriale con un solo worker, in un interprete
+    incorporato (es. QGIS) o se il pool non si avvia o si interrompe. I worker
+    ricevono seed espliciti nei task, quindi il risultato non dipende dal
+    numero di processi. Le eccezioni sollevate da func vengono propagate.
+
+    Args:
+        func: funzione di modulo (serializzabile) da applicare
+        tasks: lista di argomenti, uno per chiamata
+        max_workers: processi da usare (None = numero di CPU, 1 = seriale)
+        progress: funzione chiamata con il numero di task completati (in ordine);
+            riceve 0 se il calcolo riparte in seriale dopo un'interruzione del pool
+
+    Returns:
+        Lista dei risultati nello stesso ordine dei task
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(tasks)))
+
+    def collect(results) -> list:
+        collected = []
+        for result in results:
+            collected.append(result)
+            if progress:
+                progress(len(collected))
+        return collected
+
+    executable = _python_executable() if max_workers > 1 else None
+    if executable:
+        # Contesto spawn esplicito: i worker partono dall'interprete, non dall'applicazione ospite
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(executable)
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+            chunksize = max(1, len(tasks) // (max_workers * 4))
+            results = executor.map(func, tasks, chunksize=chunksize)
+        except (OSError, ImportError, NotImplementedError, BrokenProcessPool) as e:
+            # Ambienti senza processi o semafori utilizzabili
+            print(f"⚠ Pool di processi non disponibile, esecuzione seriale: {e}")
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        else:
+            try:
+                with executor:
+                    return collect(results)
+            except BrokenProcessPool as e:
+                print(f"⚠ Pool di processi interrotto, esecuzione seriale: {e}")
+                if progress:
+                    progress(0)
+
+    return collect(func(task) for task in tasks)
+
+
+def _rarefaction_depths(n_totale: int, passi: int) -> List[int]:
+    """Calcola le profondità di campionamento (da 1 a n) per la curva"""
+    if n_totale <= 0:
+        return []
+    depths = np.unique(np.linspace(1, n_totale, num=min(passi, n_totale)).round().astype(np.int64))
+    return [int(d) for d in depths]
+
+
+def _rarefy_unit(task: tuple) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Worker: curva di rarefazione Monte Carlo per una singola unità
+
+    Per ogni iterazione estrae una permutazione casuale degli individui;
+    la ricchezza osservata alla profondità d è il numero di specie la cui
+    prima occorrenza cade nei primi d individui.
+
+    Args:
+        task: (conteggi per specie, profondità, iterazioni, seed, indice unità)
+
+    Returns:
+        Tupla (media, percentile 2.5, percentile 97.5) per ogni profondità
+    """
+    unit_counts, depths, iterazioni, seed, unit_idx = task
+
+    # Seed derivato dall'indice dell'unità: indipendente dall'ordine dei worker
+    rng = np.random.default_rng(np.random.SeedSequence(entropy=seed, spawn_key=(unit_idx,)))
+
+    counts = np.asarray(unit_counts, dtype=np.int64)
+    individui = np.repeat(np.arange(len(counts)), counts)
+    depths_arr = np.asarray(depths, dtype=np.int64)
+    ricchezze = np.empty((iterazioni, len(depths_arr)), dtype=np.int64)
+
+    for it in range(iterazioni):
+        perm = rng.permutation(individui)
+        _, prime_occorrenze = np.unique(perm, return_index=True)
+        prime_occorrenze.sort()
+        ricchezze[it] = np.searchsorted(prime_occorrenze, depths_arr, side='left')
+
+    media = ricchezze.mean(axis=0)
+    inf, sup = np.percentile(ricchezze, [2.5, 97.5], axis=0)
+    return media.tolist(), inf.tolist(), sup.tolist()
+
+
+def rarefaction_curves(counts: 'np.ndarray', iterazioni: int = RAREFAZIONE_ITERAZIONI,
+                       passi: int = RAREFAZIONE_PASSI, seed: int = RAREFAZIONE_SEED,
+                       max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Calcola le curve di rarefazione Monte Carlo per tutte le unità
+
+    Args:
+        counts: matrice unità × specie dei conteggi
+        iterazioni: numero di permutazioni per unità
+        passi: numero massimo di punti per curva
+        seed: seed radice (a parità di seed il risultato è identico)
+        max_workers: processi da usare (None = numero di CPU, 1 = seriale)
+
+    Returns:
+        Lista (una per unità) di dizionari con depths, media, inf, sup
+    """
+    _require_numpy()
+
+    counts = np.asarray(counts, dtype=np.int64)
+    totali = counts.sum(axis=1)
+
+    # Ogni curva include la dimensione del campione più piccolo, per il confronto tra unità
+    n_min = int(totali[totali > 0].min()) if (totali > 0).any() else 0
+
+    tasks = []
+    for idx, row in enumerate(counts):
+        depths = _rarefaction_depths(int(totali[idx]), passi)
+        if depths and n_min not in depths:
+            depths = sorted(depths + [n_min])
+        tasks.append((row.tolist(), depths, iterazioni, seed, idx))
+
+    results = run_parallel(_rarefy_unit, tasks, max_workers)
+
+    curves = []
+    for task, (media, inf, sup) in zip(tasks, results):
+        curves.append({
+            'depths': task[1],
+            'media': media,
+            'inf': inf,
+            'sup': sup,
+        })
+    return curves
+
+
+def format_unit_label(chiave: tuple, livello: str) -> str:
+    """Restituisce l'etichetta leggibile di un'unità di aggregazione"""
+    if livello == 'sito':
+        return chiave[0]
+    if livello == 'area':
+        return f"{chiave[0]} - Area {chiave[1]}"
+    return f"{chiave[0]} - Area {chiave[1]} - US {chiave[2]}"
+
+
+def compute_biodiversity(records: List[Dict], livello: str = 'us',
+                         rarefazione: bool = True,
+                         iterazioni: int = RAREFAZIONE_ITERAZIONI,
+                         passi: int = RAREFAZIONE_PASSI,
+                         seed: int = RAREFAZIONE_SEED,
+                         max_workers: Optional[int] = None) -> Dict:
+    """
+    Calcola indici di biodiversità e curve di rarefazione per un livello
+
+    Args:
+        records: lista di record fauna
+        livello: 'sito', 'area' o 'us'
+        rarefazione: se False calcola solo gli indici
+        iterazioni, passi, seed, max_workers: parametri della rarefazione
+
+    Returns:
+        Dizionario con livello, specie, unità (indici per unità) e parametri
+    """
+    units, species, counts = build_count_matrix(records, livello)
+    indici = diversity_indices(counts)
+    curves = rarefaction_curves(counts, iterazioni, passi, seed, max_workers) if rarefazione else []
+
+    unita = []
+    for i, chiave in enumerate(units):
+        unita.append({
+            'chiave': chiave,
+            'etichetta': format_unit_label(chiave, livello),
+            'n': int(indici['n'][i]),
+            'ricchezza': int(indici['ricchezza'][i]),
+            'shannon': float(indici['shannon'][i]),
+            'simpson': float(indici['simpson'][i]),
+            'evenness': float(indici['evenness'][i]),
+            'rarefazione': curves[i] if curves else None,
+        })
+
+    return {
+        'livello': livello,
+        'specie': species,
+        'unita': unita,
+        'iterazioni': iterazioni if rarefazione else 0,
+        'seed': seed,
+        'generato_il': datetime.now(),
+    }
+
+
+def _fmt_index(value: float, decimals: int = 3) -> str:
+    """Formatta un indice, con '-' per valori non definiti"""
+    return '-' if value != value else f"{value:.{decimals}f}"
+
+
+def format_biodiversity_report(result: Dict) -> List[str]:
+    """
+    Genera le righe di testo del report di biodiversità
+
+    Args:
+        result: risultato di compute_biodiversity
+
+    Returns:
+        Lista di righe di testo
+    """
+    livello_label = {'sito': 'SITO', 'area': 'AREA', 'us': 'US'}[result['livello']]
+
+    lines = []
+    lines.append("=" * 100)
+    lines.append(f"🌿 INDICI DI BIODIVERSITÀ PER {livello_label}")
+    lines.append("=" * 100)
+    lines.append("")
+
+    if not result['unita']:
+        lines.append("Nessuna unità con specie identificate.")
+        return lines
+
+    lines.append(f"Unità analizzate: {len(result['unita'])}")
+    lines.append(f"Specie totali: {len(result['specie'])}")
+    lines.append("H' = Shannon (ln), D = Simpson (1 - Σp²), J = evenness di Pielou (H'/ln S)")
+    lines.append("")
+
+    lines.append(f"{'Unità':<50} {'N':>6} {'S':>4} {'H':>7} {'D':>7} {'J':>7}")
+    lines.append("-" * 100)
+    for u in result['unita']:
+        lines.append(
+            f"{u['etichetta'][:50]:<50} {u['n']:>6} {u['ricchezza']:>4} "
+            f"{_fmt_index(u['shannon']):>7} {_fmt_index(u['simpson']):>7} {_fmt_index(u['evenness']):>7}"
+        )
+
+    if result['iterazioni']:
+        # Ricchezza rarefatta alla dimensione del campione più piccolo (confronto tra unità)
+        n_min = min(u['n'] for u in result['unita'])
+        lines.append("")
+        lines.append(f"📈 CURVE DI RAREFAZIONE ({result['iterazioni']} iterazioni Monte Carlo, seed {result['seed']})")
+        lines.append("-" * 100)
+        lines.append(f"Ricchezza attesa a n = {n_min} (campione più piccolo), con intervallo al 95%:")
+        for u in result['unita']:
+            curve = u['rarefazione']
+            if not curve or not curve['depths']:
+                continue
+            pos = curve['depths'].index(n_min)
+            lines.append(
+                f"  {u['etichetta'][:60]:<60} S({curve['depths'][pos]}) = {curve['media'][pos]:.2f} "
+                f"[{curve['inf'][pos]:.0f}-{curve['sup'][pos]:.0f}]"
+            )
+
+    lines.append("")
+    lines.append(f"Report generato il: {result['generato_il'].strftime('%d/%m/%Y %H:%M:%S')}")
+    return lines
+
+
+def export_biodiversity_csv(result: Dict, file_path: str):
+    """
+    Esporta indici e curve di rarefazione in CSV
+
+    Args:
+        result: risultato di compute_biodiversity
+        file_path: percorso del file CSV
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+
+        writer.writerow(['INDICI DI BIODIVERSITÀ - EXPORT'])
+        writer.writerow(['Livello', result['livello']])
+        writer.writerow(['Data generazione', result['generato_il'].strftime('%d/%m/%Y %H:%M:%S')])
+        writer.writerow([])
+
+        writer.writerow(['INDICI PER UNITÀ'])
+        writer.writerow(['Unità', 'N', 'Ricchezza (S)', 'Shannon (H)', 'Simpson (D)', 'Evenness (J)'])
+        for u in result['unita']:
+            writer.writerow([
+                u['etichetta'], u['n'], u['ricchezza'],
+                _fmt_index(u['shannon'], 4), _fmt_index(u['simpson'], 4), _fmt_index(u['evenness'], 4)
+            ])
+        writer.writerow([])
+
+        if result['iterazioni']:
+            writer.writerow(['CURVE DI RAREFAZIONE'])
+            writer.writerow(['Iterazioni', result['iterazioni'], 'Seed', result['seed']])
+            writer.writerow(['Unità', 'n campione', 'Ricchezza media', 'IC 2.5%', 'IC 97.5%'])
+            for u in result['unita']:
+                curve = u['rarefazione']
+                if not curve:
+                    continue
+                for d, m, lo, hi in zip(curve['depths'], curve['media'], curve['inf'], curve['sup']):
+                    writer.writerow([u['etichetta'], d, f"{m:.3f}", f"{lo:.0f}", f"{hi:.0f}"])
+
+
+# ========== ANALISI DI CONTINGENZA SPECIE × CONTESTO ==========
+
+# Campi di contesto analizzabili (campo -> etichetta)
+CAMPI_CONTINGENZA = {
+    'contesto': 'Contesto',
+    'deposizione': 'Deposizione',
+    'tipologia_accumulo': 'Tipologia di Accumulo',
+}
+
+# Parametri predefiniti del test per permutazione
+PERMUTAZIONI = 2000
+PERMUTAZIONI_BLOCCO = 250
+PERMUTAZIONI_SEED = 20251123
+
+# Una tabella è considerata sparsa se ha frequenze attese inferiori a questa soglia
+SOGLIA_ATTESI = 5.0
+
+
+def build_contingency_tables(records: List[Dict], campi: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Costruisce le tabelle specie × categoria per più campi in un solo passaggio
+
+    Ogni specie viene contata una volta per record (presenza), incrociata con
+    il valore del campo di contesto del record. Record senza valore del campo
+    sono esclusi dalla tabella di quel campo.
+
+    Args:
+        records: lista di record fauna
+        campi: campi di contesto da incrociare (default: CAMPI_CONTINGENZA)
+
+    Returns:
+        Dizionario campo -> {specie, categorie, osservati (matrice int64)}
+    """
+    _require_numpy()
+
+    if campi is None:
+        campi = list(CAMPI_CONTINGENZA)
+
+    species_index = {}
+    category_index = {campo: {} for campo in campi}
+    coords = {campo: ([], []) for campo in campi}
+
+    for r in records:
+        species = {sp for sp in extract_species(r) if sp and sp.strip()}
+        if not species:
+            continue
+        sp_idx = [species_index.setdefault(sp, len(species_index)) for sp in sorted(species)]
+
+        for campo in campi:
+            valore = r.get(campo)
+            if not valore or not str(valore).strip():
+                continue
+            cat_idx = category_index[campo].setdefault(valore, len(category_index[campo]))
+            righe, colonne = coords[campo]
+            righe.extend(sp_idx)
+            colonne.extend([cat_idx] * len(sp_idx))
+
+    species = sorted(species_index)
+    species_map = np.empty(len(species), dtype=np.int64)
+    for pos, sp in enumerate(species):
+        species_map[species_index[sp]] = pos
+
+    tables = {}
+    for campo in campi:
+        categories = sorted(category_index[campo])
+        category_map = np.empty(len(categories), dtype=np.int64)
+        for pos, cat in enumerate(categories):
+            category_map[category_index[campo][cat]] = pos
+
+        osservati = np.zeros((len(species), len(categories)), dtype=np.int64)
+        righe, colonne = coords[campo]
+        if righe:
+            np.add.at(osservati, (species_map[np.asarray(righe)], category_map[np.asarray(colonne)]), 1)
+
+        # Rimuove specie senza osservazioni per questo campo
+        presenti = osservati.sum(axis=1) > 0
+        tables[campo] = {
+            'specie': [sp for sp, keep in zip(species, presenti) if keep],
+            'categorie': categories,
+            'osservati': osservati[presenti],
+        }
+
+    return tables
+
+
+def _chi2_statistic(osservati: 'np.ndarray') -> 'np.ndarray':
+    """
+    Statistica chi-quadro di Pearson, vettoriale su uno stack di tabelle
+
+    Args:
+        osservati: array (..., righe, colonne)
+
+    Returns:
+        Array (...) delle statistiche chi-quadro
+    """
+    osservati = np.asarray(osservati, dtype=np.float64)
+    n = osservati.sum(axis=(-2, -1), keepdims=True)
+    attesi = osservati.sum(axis=-1, keepdims=True) * osservati.sum(axis=-2, keepdims=True) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        termini = np.where(attesi > 0, (osservati - attesi) ** 2 / attesi, 0.0)
+    return termini.sum(axis=(-2, -1))
+
+
+def _chi2_sf(x: float, gdl: int) -> float:
+    """
+    Probabilità P(X² >= x) per una chi-quadro con gdl gradi di libertà
+
+    Usa la funzione gamma incompleta regolarizzata Q(gdl/2, x/2), con serie
+    per x piccoli e frazione continua (Lentz) altrimenti.
+    """
+    import math
+
+    if gdl <= 0 or x != x:
+        return float('nan')
+    if x <= 0:
+        return 1.0
+
+    a = gdl / 2.0
+    z = x / 2.0
+    log_prefactor = a * math.log(z) - z - math.lgamma(a)
+
+    if z < a + 1.0:
+        # Serie per P(a, z)
+        term = 1.0 / a
+        total = term
+        ap = a
+        for _ in range(1000):
+            ap += 1.0
+            term *= z / ap
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefactor))
+
+    # Frazione continua per Q(a, z)
+    tiny = 1e-300
+    b = z + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return min(1.0, math.exp(log_prefactor) * h)
+
+
+def _permuted_tables(righe: 'np.ndarray', colonne: 'np.ndarray', forma: tuple,
+                     n_perm: int, rng: 'np.random.Generator') -> 'np.ndarray':
+    """
+    Tabelle ottenute rimescolando le categorie delle osservazioni
+
+    Ogni permutazione rimescola le colonne delle singole osservazioni
+    (specie, categoria), preservando i totali marginali, e viene contata con
+    un bincount di dimensione N: la memoria resta O(N + n_perm × celle) e non
+    O(n_perm × N).
+
+    Returns:
+        Array (n_perm, righe, colonne) delle tabelle permutate
+    """
+    n_righe, n_colonne = forma
+    base = righe * n_colonne
+    tabelle = np.empty((n_perm, n_righe * n_colonne), dtype=np.int64)
+    for i in range(n_perm):
+        tabelle[i] = np.bincount(base + rng.permutation(colonne), minlength=n_righe * n_colonne)
+    return tabelle.reshape(n_perm, n_righe, n_colonne)
+
+
+def _permutation_block(task: tuple) -> int:
+    """
+    Worker: conta le permutazioni con chi-quadro >= osservato per un blocco
+
+    Args:
+        task: (indici riga, indici colonna, forma tabella, chi2 osservato,
+               numero permutazioni, seed, indice blocco)
+
+    Returns:
+        Numero di permutazioni con statistica >= osservata
+    """
+    righe, colonne, forma, chi2_oss, n_perm, seed, block_idx = task
+
+    rng = np.random.default_rng(np.random.SeedSequence(entropy=seed, spawn_key=(block_idx,)))
+    tabelle = _permuted_tables(np.asarray(righe, dtype=np.int64), np.asarray(colonne, dtype=np.int64),
+                               forma, n_perm, rng)
+
+    # Tolleranza relativa per non perdere i pareggi per errori di arrotondamento
+    return int((_chi2_statistic(tabelle) >= chi2_oss * (1 - 1e-12)).sum())
+
+
+def chi_square_test(osservati: 'np.ndarray', permutazioni: int = PERMUTAZIONI,
+                    seed: int = PERMUTAZIONI_SEED, solo_sparse: bool = True,
+                    max_workers: Optional[int] = None) -> Dict:
+    """
+    Test chi-quadro di indipendenza su una tabella di contingenza
+
+    Args:
+        osservati: matrice righe × colonne delle frequenze osservate
+        permutazioni: numero di permutazioni per il p-value esatto (0 = nessuna)
+        seed: seed radice delle permutazioni
+        solo_sparse: se True esegue le permutazioni solo per tabelle sparse
+        max_workers: processi da usare (None = numero di CPU, 1 = seriale)
+
+    Returns:
+        Dizionario con attesi, residui standardizzati, chi2, gdl, p_value,
+        p_permutazione (None se non calcolato), cramer_v, sparsa
+    """
+    _require_numpy()
+
+    osservati = np.asarray(osservati, dtype=np.int64)
+    n_righe, n_colonne = osservati.shape
+    n = int(osservati.sum())
+
+    vuoto = {
+        'attesi': np.zeros(osservati.shape), 'residui': np.zeros(osservati.shape),
+        'n': n, 'chi2': float('nan'), 'gdl': 0, 'p_value': float('nan'),
+        'p_permutazione': None, 'cramer_v': float('nan'), 'sparsa': False,
+    }
+    if n == 0 or n_righe < 2 or n_colonne < 2:
+        return vuoto
+
+    tot_righe = osservati.sum(axis=1, keepdims=True).astype(np.float64)
+    tot_colonne = osservati.sum(axis=0, keepdims=True).astype(np.float64)
+    attesi = tot_righe * tot_colonne / n
+
+    # Residui standardizzati corretti (Haberman)
+    varianza = attesi * (1 - tot_righe / n) * (1 - tot_colonne / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residui = np.where(varianza > 0, (osservati - attesi) / np.sqrt(varianza), 0.0)
+
+    chi2 = float(_chi2_statistic(osservati))
+    gdl = (n_righe - 1) * (n_colonne - 1)
+    cramer_v = (chi2 / (n * (min(n_righe, n_colonne) - 1))) ** 0.5
+    sparsa = bool((attesi < SOGLIA_ATTESI).any())
+
+    p_permutazione = None
+    if permutazioni > 0 and (sparsa or not solo_sparse):
+        # Espande la tabella nelle singole osservazioni (riga, colonna)
+        righe = np.repeat(np.arange(n_righe), osservati.sum(axis=1))
+        colonne = np.concatenate([np.repeat(np.arange(n_colonne), row) for row in osservati])
+
+        tasks = []
+        for block_idx, start in enumerate(range(0, permutazioni, PERMUTAZIONI_BLOCCO)):
+            size = min(PERMUTAZIONI_BLOCCO, permutazioni - start)
+            tasks.append((righe.tolist(), colonne.tolist(), (n_righe, n_colonne), chi2, size, seed, block_idx))
+
+        estremi = sum(run_parallel(_permutation_block, tasks, max_workers))
+        p_permutazione = (estremi + 1) / (permutazioni + 1)
+
+    return {
+        'attesi': attesi,
+        'residui': residui,
+        'n': n,
+        'chi2': chi2,
+        'gdl': gdl,
+        'p_value': _chi2_sf(chi2, gdl),
+        'p_permutazione': p_permutazione,
+        'cramer_v': cramer_v,
+        'sparsa': sparsa,
+    }
+
+
+def compute_contingency(records: List[Dict], campi: Optional[List[str]] = None,
+                        permutazioni: int = PERMUTAZIONI, seed: int = PERMUTAZIONI_SEED,
+                        max_workers: Optional[int] = None) -> Dict:
+    """
+    Calcola l'analisi di contingenza specie × contesto per più campi
+
+    Args:
+        records: lista di record fauna
+        campi: campi di contesto (default: CAMPI_CONTINGENZA)
+        permutazioni, seed, max_workers: parametri del test per permutazione
+            (eseguito solo per le tabelle sparse)
+
+    Returns:
+        Dizionario con 'tabelle' (campo -> tabella e risultati del test),
+        'permutazioni', 'seed', 'generato_il'
+    """
+    tables = build_contingency_tables(records, campi)
+
+    for campo, table in tables.items():
+        table['campo'] = campo
+        table['etichetta'] = CAMPI_CONTINGENZA.get(campo, campo)
+        table.update(chi_square_test(table['osservati'], permutazioni, seed, True, max_workers))
+
+    return {
+        'tabelle': tables,
+        'permutazioni': permutazioni,
+        'seed': seed,
+        'generato_il': datetime.now(),
+    }
+
+
+def format_contingency_summary(table: Dict) -> str:
+    """Restituisce una riga di sintesi del test (chi2, gdl, p, V)"""
+    if table['gdl'] == 0:
+        return f"{table['etichetta']}: dati insufficienti (servono almeno 2 specie e 2 categorie)"
+
+    summary = (
+        f"{table['etichetta']}: χ² = {table['chi2']:.2f}, gdl = {table['gdl']}, "
+        f"p = {table['p_value']:.4g}, V di Cramér = {table['cramer_v']:.3f}, N = {table['n']}"
+    )
+    if table['p_permutazione'] is not None:
+        summary += f" | tabella sparsa: p (permutazione) = {table['p_permutazione']:.4g}"
+    return summary
+
+
+def export_contingency_csv(result: Dict, file_path: str):
+    """
+    Esporta le tabelle di contingenza (osservati, attesi, residui) in CSV
+
+    Args:
+        result: risultato di compute_contingency
+        file_path: percorso del file CSV
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+
+        writer.writerow(['ANALISI DI CONTINGENZA SPECIE × CONTESTO - EXPORT'])
+        writer.writerow(['Data generazione', result['generato_il'].strftime('%d/%m/%Y %H:%M:%S')])
+        writer.writerow(['Permutazioni (tabelle sparse)', result['permutazioni'], 'Seed', result['seed']])
+        writer.writerow([])
+
+        for table in result['tabelle'].values():
+            writer.writerow([f"SPECIE × {table['etichetta'].upper()}"])
+            writer.writerow(['Chi-quadro', f"{table['chi2']:.4f}"])
+            writer.writerow(['Gradi di libertà', table['gdl']])
+            writer.writerow(['p-value (asintotico)', f"{table['p_value']:.6g}"])
+            writer.writerow(['p-value (permutazione)',
+                             f"{table['p_permutazione']:.6g}" if table['p_permutazione'] is not None else ''])
+            writer.writerow(["V di Cramér", f"{table['cramer_v']:.4f}"])
+            writer.writerow(['N', table['n']])
+            writer.writerow([])
+
+            for titolo, matrice, fmt in [
+                ('Frequenze osservate', table['osservati'], '{:d}'),
+                ('Frequenze attese', table['attesi'], '{:.2f}'),
+                ('Residui standardizzati', table['residui'], '{:.2f}'),
+            ]:
+                writer.writerow([titolo])
+                writer.writerow(['Specie'] + table['categorie'])
+                for sp, row in zip(table['specie'], matrice):
+                    writer.writerow([sp] + [fmt.format(v.item()) for v in row])
+                writer.writerow([])
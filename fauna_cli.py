@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Interfaccia a riga di comando (senza Qt) per interrogazioni, esportazioni e statistiche
+Pensata per i job notturni sul server: apre il database con create_fauna_db e la
+configurazione di DBConfigManager, e carica i moduli pesanti (pyarrow, openpyxl,
+reportlab, numpy) solo dentro il sottocomando che li usa, così l'avvio resta di
+poche decine di millisecondi.
+Ogni comando scrive su stdout un oggetto JSON; i messaggi dei moduli vanno su stderr.
+
+    ./fauna stats --sito "Sito A"
+    ./fauna stats --report statistiche.pdf
+    ./fauna export parquet cartella_output
+    ./fauna export pdf catalogo.zip --modulo
+    ./fauna import schede.xlsx --dry-run
+    ./fauna search "Bos taurus" --limite 20
+    ./fauna --config /etc/pyarchinit/fauna_db_config.json vacuum
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from typing import Dict, List
+
+
+# Filtri comuni ai sottocomandi (come fauna_export.CAMPI_FILTRO, ripetuti qui per
+# non importare fauna_export, e con esso pyarrow e openpyxl, all'avvio)
+CAMPI_FILTRO = ['sito', 'area', 'saggio', 'us', 'contesto', 'specie']
+
+
+def _filters(args) -> Dict:
+    return {campo: getattr(args, campo) for campo in CAMPI_FILTRO if getattr(args, campo, None)}
+
+
+# ========== SOTTOCOMANDI ==========
+
+def cmd_stats(db, args) -> Dict:
+    """Statistiche complete (dalla cache se i dati non sono cambiati), opzionalmente in PDF"""
+    filters = _filters(args)
+    if filters:
+        from fauna_statistics import compute_statistics
+        result = compute_statistics(db.get_all_fauna_records(filters), args.processi)
+    else:
+        from fauna_statistics import StatisticsCache
+        result = StatisticsCache().get(db, force=args.forza, max_workers=args.processi)
+
+    if result is None:
+        return {'totale': 0}
+    if args.report:
+        from fauna_report import export_report
+        export_report(result, args.report, max_workers=args.processi)
+    if args.testo:
+        from fauna_statistics import render_text
+        return {'testo': render_text(result)}
+    data = result.to_dict()
+    if args.report:
+        data['report'] = args.report
+    return data
+
+
+def cmd_export(db, args) -> Dict:
+    """Esportazione CSV, XLSX, Parquet o PDF (vedi fauna_export.run_export)"""
+    from fauna_export import EXPORT_BATCH, run_export
+    esito = run_export(db, args.formato, args.output, _filters(args), flatten=args.esplodi,
+                       with_statistics=args.statistiche, modulo=args.modulo,
+                       batch_size=args.blocco or EXPORT_BATCH)
+    return dict(formato=args.formato, output=args.output, **esito)
+
+
+def cmd_import(db, args) -> Dict:
+    """Importazione in blocco da XLSX o CSV (vedi fauna_import.import_file)"""
+    from dataclasses import asdict
+    from fauna_import import IMPORT_BATCH, import_file
+    report = import_file(db, args.file, args.foglio, args.dry_run, args.valori_liberi,
+                         args.blocco or IMPORT_BATCH, args.processi)
+    data = asdict(report)
+    data['righe_con_errori'] = report.righe_con_errori
+    return data
+
+
+def cmd_search(db, args) -> Dict:
+    """Ricerca testuale nelle schede"""
+    fields = [c.strip() for c in args.campi.split(',') if c.strip()] if args.campi else None
+    records = db.search_fauna_records(args.termine, fields)
+    return {'termine': args.termine, 'totale': len(records), 'schede': [dict(r) for r in records[:args.limite]]}
+
+
+def cmd_vacuum(db, args) -> Dict:
+    """Compatta il database e aggiorna le statistiche del pianificatore"""
+    return db.vacuum()
+
+
+COMANDI = {
+    'stats': cmd_stats,
+    'export': cmd_export,
+    'import': cmd_import,
+    'search': cmd_search,
+    'vacuum': cmd_vacuum,
+}
+
+
+# ========== RIGA DI COMANDO ==========
+
+def _add_filters(parser: argparse.ArgumentParser):
+    for campo in CAMPI_FILTRO:
+        parser.add_argument(f"--{campo}", help=f"filtra per {campo}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='fauna', description="Gestione delle schede fauna da riga di comando")
+    parser.add_argument('--db', help="database SQLite (predefinito: ultima configurazione salvata)")
+    parser.add_argument('--config', help="file di configurazione JSON di DBConfigManager (SQLite o PostgreSQL)")
+    parser.add_argument('--compatto', action='store_true', help="JSON su una sola riga")
+    sub = parser.add_subparsers(dest='comando', metavar='comando', required=True)
+
+    # --compatto accettato anche dopo il sottocomando, senza sovrascrivere quello globale
+    comuni = argparse.ArgumentParser(add_help=False)
+    comuni.add_argument('--compatto', action='store_true', default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+
+    p = sub.add_parser('stats', parents=[comuni], help="statistiche in JSON o testo, con report PDF opzionale")
+    _add_filters(p)
+    p.add_argument('--forza', action='store_true', help="ignora la cache e ricalcola")
+    p.add_argument('--testo', action='store_true', help="report testuale invece dei dati completi")
+    p.add_argument('--report', metavar='FILE.pdf', help="salva anche il report PDF con i grafici")
+    p.add_argument('--processi', type=int, default=None, help="processi per il calcolo")
+
+    p = sub.add_parser('export', parents=[comuni], help="esportazione CSV, XLSX, Parquet o PDF")
+    p.add_argument('formato', choices=['csv', 'xlsx', 'parquet', 'pdf'])
+    p.add_argument('output', help="file CSV/XLSX, cartella Parquet oppure, per il PDF, "
+                                  "catalogo .pdf/.zip o cartella da aggiornare in modo incrementale")
+    _add_filters(p)
+    p.add_argument('--esplodi', action='store_true', help="CSV: colonne esplose per specie_psi e misure_ossa")
+    p.add_argument('--statistiche', action='store_true', help="XLSX: aggiunge i fogli delle statistiche")
+    p.add_argument('--modulo', action='store_true', help="PDF: impagina sul modulo ufficiale SCHEDA FR")
+    p.add_argument('--blocco', type=int, default=None, help="record letti per blocco")
+
+    p = sub.add_parser('import', parents=[comuni], help="importazione in blocco da XLSX o CSV")
+    p.add_argument('file', help="file .xlsx o .csv con una scheda per riga")
+    p.add_argument('--foglio', help="foglio XLSX da leggere")
+    p.add_argument('--dry-run', action='store_true', help="valida senza inserire")
+    p.add_argument('--valori-liberi', action='store_true', help="accetta valori fuori vocabolario")
+    p.add_argument('--blocco', type=int, default=None, help="record per transazione")
+    p.add_argument('--processi', type=int, default=None, help="processi per la validazione")
+
+    p = sub.add_parser('search', parents=[comuni], help="ricerca testuale nelle schede")
+    p.add_argument('termine', help="testo da cercare")
+    p.add_argument('--campi', help="campi in cui cercare, separati da virgola (predefinito: campi testo)")
+    p.add_argument('--limite', type=int, default=None, help="numero massimo di schede restituite")
+
+    sub.add_parser('vacuum', parents=[comuni], help="compatta il database e aggiorna le statistiche del pianificatore")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    inizio = time.perf_counter()
+
+    # I moduli del database e dell'esportazione stampano messaggi di stato:
+    # vanno su stderr perché stdout contenga solo il JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            from fauna_db_wrapper import open_saved_fauna_db
+            db = open_saved_fauna_db(args.db, args.config)
+            try:
+                esito = COMANDI[args.comando](db, args)
+            finally:
+                db.close()
+            codice = 1 if esito.get('errori') else 0
+        except Exception as e:
+            esito, codice = {'errore': str(e)}, 1
+
+    esito['secondi'] = round(time.perf_counter() - inizio, 3)
+    print(json.dumps(esito, ensure_ascii=False, default=str, indent=None if args.compatto else 2))
+    return codice
+
+
+if __name__ == '__main__':
+    sys.exit(main())
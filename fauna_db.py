@@ -5,9 +5,62 @@ Gestisce la connessione e le operazioni CRUD per fauna_table
 
 import sqlite3
 import os
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from datetime import datetime
 
+from fauna_records import FaunaRow, fauna_rows
+from fauna_schema import ensure_schema, print_progress
+
+
+# Campi testo in cui cerca search_fauna_records se non ne sono indicati altri
+CAMPI_RICERCA = [
+    'sito', 'area', 'us', 'saggio', 'responsabile_scheda',
+    'contesto', 'specie', 'descrizione_contesto', 'osservazioni',
+    'interpretazione'
+]
+
+# Colonne delle righe di riepilogo usate per elenchi e navigazione: i campi di
+# testo libero e JSON si leggono con get_fauna_record solo per la scheda visualizzata
+COLONNE_RIEPILOGO = [
+    'id_fauna', 'sito', 'area', 'saggio', 'us', 'specie', 'contesto',
+    'numero_minimo_individui', 'data_compilazione', 'responsabile_scheda'
+]
+
+# Colonne dell'ordinamento standard (indice idx_fauna_ordine), usate dalla paginazione per chiave
+CHIAVI_ORDINAMENTO = ['sito', 'area', 'us', 'id_fauna']
+
+# Id per singola query di get_fauna_rows (sotto il limite di variabili di SQLite)
+_IDS_PER_QUERY = 500
+
+
+def select_columns(columns: List[str] = None) -> str:
+    """Lista della SELECT: tutte le colonne se columns è None, altrimenti id_fauna più quelle indicate"""
+    if columns is None:
+        return "*"
+    return ", ".join(['id_fauna'] + [c for c in columns if c != 'id_fauna'])
+
+
+def keyset_condition(keys: List[str], values: list, placeholder: str = '?') -> Tuple[str, list]:
+    """
+    Condizione WHERE per le righe che seguono values nell'ordinamento per keys
+
+    Ordinamento ascendente con i NULL in fondo (come PostgreSQL); l'ultima
+    chiave deve essere univoca e non nulla (id_fauna). I NULL sono trattati
+    esplicitamente, perché il confronto di riga (a, b) > (x, y) li escluderebbe.
+
+    Returns:
+        Tupla (condizione SQL, parametri)
+    """
+    sql = f"{keys[-1]} > {placeholder}"
+    params = [values[-1]]
+    for key, value in zip(reversed(keys[:-1]), reversed(values[:-1])):
+        if value is None:
+            sql = f"({key} IS NULL AND {sql})"
+        else:
+            sql = f"({key} > {placeholder} OR {key} IS NULL OR ({key} = {placeholder} AND {sql}))"
+            params = [value, value] + params
+    return sql, params
+
 
 class FaunaDB:
     """Classe per gestire le operazioni sul database fauna"""
@@ -38,62 +91,14 @@ class FaunaDB:
             raise Exception(f"Errore nella connessione al database: {e}")
 
     def ensure_tables_exist(self):
-        """Verifica che le tabelle fauna esistano, altrimenti le crea"""
-        cursor = self.conn.cursor()
+        """
+        Porta le tabelle fauna all'ultima versione dello schema
 
+        Con lo schema aggiornato è una sola lettura di fauna_schema_version;
+        altrimenti crea le tabelle o applica le migrazioni mancanti (vedi fauna_schema).
+        """
         try:
-            # Verifica se fauna_table esiste
-            cursor.execute("""
-                SELECT name FROM sqlite_master
-                WHERE type='table' AND name='fauna_table'
-            """)
-
-            fauna_exists = cursor.fetchone() is not None
-
-            # Verifica se fauna_voc esiste
-            cursor.execute("""
-                SELECT name FROM sqlite_master
-                WHERE type='table' AND name='fauna_voc'
-            """)
-
-            voc_exists = cursor.fetchone() is not None
-
-            if not fauna_exists or not voc_exists:
-                print("⚠ Tabelle fauna non trovate nel database")
-                print("📦 Creazione tabelle in corso...")
-
-                # Crea le tabelle eseguendo gli script SQL
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                sql_dir = os.path.join(script_dir, "sql")
-
-                # Crea fauna_voc prima
-                if not voc_exists:
-                    voc_sql_path = os.path.join(sql_dir, "create_fauna_voc.sql")
-                    if os.path.exists(voc_sql_path):
-                        print("  → Creazione tabella fauna_voc...")
-                        with open(voc_sql_path, 'r', encoding='utf-8') as f:
-                            cursor.executescript(f.read())
-                        print("  ✓ Tabella fauna_voc creata")
-                    else:
-                        print(f"  ✗ File SQL non trovato: {voc_sql_path}")
-
-                # Crea fauna_table
-                if not fauna_exists:
-                    table_sql_path = os.path.join(sql_dir, "create_fauna_table.sql")
-                    if os.path.exists(table_sql_path):
-                        print("  → Creazione tabella fauna_table...")
-                        with open(table_sql_path, 'r', encoding='utf-8') as f:
-                            cursor.executescript(f.read())
-                        print("  ✓ Tabella fauna_table creata")
-                    else:
-                        print(f"  ✗ File SQL non trovato: {table_sql_path}")
-
-                self.conn.commit()
-                print("✅ Tabelle fauna create con successo!")
-
-            else:
-                print("✓ Tabelle fauna già presenti nel database")
-
+            ensure_schema(self.conn, 'sqlite', progress=print_progress)
         except Exception as e:
             print(f"❌ Errore nella verifica/creazione tabelle: {e}")
             import traceback
@@ -169,35 +174,126 @@ class FaunaDB:
 
         return [row[0] for row in cursor.fetchall()]
 
-    def get_all_fauna_records(self, filters: Dict = None) -> List[Dict]:
+    def get_all_fauna_records(self, filters: Dict = None, columns: List[str] = None) -> List[FaunaRow]:
         """
         Recupera tutti i record fauna, con filtri opzionali
 
         Args:
             filters: dizionario con filtri (es. {'sito': 'Pompei', 'contesto': 'FUNERARIO'})
+            columns: colonne da leggere (es. COLONNE_RIEPILOGO); None per il record completo
 
         Returns:
-            Lista di dizionari con i record
+            Lista di FaunaRow (si leggono come dizionari)
+        """
+        cursor = self._tuple_cursor()
+        query, params = self._fauna_query(filters, select_columns(columns))
+
+        cursor.execute(query, params)
+        return fauna_rows(cursor.description, cursor.fetchall())
+
+    def iter_fauna_records(self, filters: Dict = None, batch_size: int = 1000,
+                           order_by: str = None, columns: List[str] = None) -> Iterator[List[FaunaRow]]:
+        """
+        Legge i record fauna a blocchi, senza caricarli tutti in memoria
+
+        Args:
+            filters: dizionario con filtri (come get_all_fauna_records)
+            batch_size: record per blocco
+            order_by: colonne di ordinamento (predefinito: sito, area, us, id_fauna)
+            columns: colonne da leggere (come get_all_fauna_records)
+
+        Yields:
+            Liste di FaunaRow, nell'ordine di get_all_fauna_records o di order_by
+        """
+        # Cursore dedicato: le altre query sulla connessione non interrompono la lettura
+        cursor = self._tuple_cursor()
+        query, params = self._fauna_query(filters, select_columns(columns), order_by)
+
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield fauna_rows(cursor.description, rows)
+        finally:
+            cursor.close()
+
+    def iter_fauna_pages(self, filters: Dict = None, batch_size: int = 1000,
+                         columns: List[str] = None) -> Iterator[List[FaunaRow]]:
+        """
+        Pagine di record per gli elenchi dell'interfaccia, nell'ordinamento standard
+
+        In SQLite coincide con iter_fauna_records: il cursore restituisce le
+        righe man mano (vedi FaunaDBPostgres.iter_fauna_pages).
+        """
+        return self.iter_fauna_records(filters, batch_size, columns=columns)
+
+    def get_fauna_ids(self, filters: Dict = None, order_by: str = None,
+                      search_term: str = None, search_fields: List[str] = None) -> List[int]:
+        """
+        Id dei record che soddisfano filtri e ricerca, nell'ordine richiesto
+
+        Pensato per gli elenchi a pagine: la lista degli id è piccola anche con
+        centinaia di migliaia di record, e le righe si leggono poi con get_fauna_rows.
+
+        Args:
+            filters: dizionario con filtri (come get_all_fauna_records)
+            order_by: colonne di ordinamento (predefinito: sito, area, us, id_fauna)
+            search_term: testo cercato (LIKE) in search_fields
+            search_fields: campi della ricerca (predefinito: CAMPI_RICERCA)
         """
         cursor = self.conn.cursor()
+        query, params = self._fauna_query(filters, "id_fauna", order_by, search_term, search_fields)
+        cursor.execute(query, params)
+        return [row[0] for row in cursor.fetchall()]
 
-        query = "SELECT * FROM fauna_table"
+    def get_fauna_rows(self, ids: List[int], columns: List[str]) -> List[FaunaRow]:
+        """
+        Legge solo le colonne indicate dei record con gli id dati
+
+        Returns:
+            Lista di FaunaRow nello stesso ordine di ids (gli id non più presenti sono saltati)
+        """
+        cursor = self._tuple_cursor()
+        select = select_columns(columns)
+        by_id = {}
+        for start in range(0, len(ids), _IDS_PER_QUERY):
+            chunk = ids[start:start + _IDS_PER_QUERY]
+            cursor.execute(f"SELECT {select} FROM fauna_table WHERE id_fauna IN ({', '.join('?' * len(chunk))})",
+                           chunk)
+            by_id.update((row['id_fauna'], row) for row in fauna_rows(cursor.description, cursor.fetchall()))
+        return [by_id[i] for i in ids if i in by_id]
+
+    def _tuple_cursor(self) -> sqlite3.Cursor:
+        """Cursore senza sqlite3.Row per le letture in blocco (le tuple diventano FaunaRow)"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def _fauna_query(self, filters: Dict = None, columns: str = "*", order_by: str = None,
+                     search_term: str = None, search_fields: List[str] = None) -> Tuple[str, list]:
+        """Costruisce la SELECT su fauna_table con filtri, ricerca testuale e ordinamento standard"""
+        query = f"SELECT {columns} FROM fauna_table"
         params = []
+        where_clauses = []
 
         if filters:
-            where_clauses = []
             for field, value in filters.items():
                 if value:
                     where_clauses.append(f"{field} = ?")
                     params.append(value)
 
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
+        if search_term:
+            fields = search_fields or CAMPI_RICERCA
+            where_clauses.append("(" + " OR ".join(f"{field} LIKE ?" for field in fields) + ")")
+            params.extend(f"%{search_term}%" for _ in fields)
 
-        query += " ORDER BY sito, area, us, id_fauna"
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
 
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        query += f" ORDER BY {order_by or 'sito, area, us, id_fauna'}"
+        return query, params
 
     def get_fauna_record(self, id_fauna: int) -> Optional[Dict]:
         """
@@ -244,27 +340,71 @@ class FaunaDB:
 
         return cursor.lastrowid
 
-    def update_fauna_record(self, id_fauna: int, data: Dict) -> bool:
+    def insert_fauna_records(self, records: List[Dict], batch_size: int = 1000) -> int:
+        """
+        Inserisce molti record fauna con una transazione per blocco
+
+        Tutti i record devono avere gli stessi campi. Se un blocco fallisce,
+        il blocco viene annullato e i blocchi precedenti restano inseriti.
+
+        Args:
+            records: lista di dizionari con i dati dei record
+            batch_size: record per transazione
+
+        Returns:
+            Numero di record inseriti
+        """
+        if not records:
+            return 0
+
+        fields = [f for f in records[0] if f != 'id_fauna']
+        query = f"""
+            INSERT INTO fauna_table ({', '.join(fields)})
+            VALUES ({', '.join('?' for _ in fields)})
+        """
+
+        cursor = self.conn.cursor()
+        inserted = 0
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            try:
+                cursor.executemany(query, [[r[f] for f in fields] for r in batch])
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            inserted += len(batch)
+
+        return inserted
+
+    def update_fauna_record(self, id_fauna: int, data: Dict, row_version: int = None) -> bool:
         """
-        Aggiorna un record fauna esistente
+        Aggiorna un record fauna esistente e ne incrementa row_version
 
         Args:
             id_fauna: ID del record da aggiornare
-            data: dizionario con i nuovi dati
+            data: dizionario con i nuovi dati (solo le colonne da modificare)
+            row_version: versione letta con la scheda; se indicata l'aggiornamento
+                avviene solo se nel frattempo nessun altro l'ha modificata
 
         Returns:
-            True se l'aggiornamento ha successo
+            True se l'aggiornamento ha successo, False se la scheda non esiste
+            o (con row_version) è stata modificata da altri
         """
-        # Rimuovi id_fauna dai dati da aggiornare
+        # Rimuovi id_fauna e row_version dai dati da aggiornare
         data = data.copy()
         data.pop('id_fauna', None)
+        data.pop('row_version', None)
 
         fields = list(data.keys())
-        set_clause = ', '.join([f"{f} = ?" for f in fields])
+        set_clause = ', '.join([f"{f} = ?" for f in fields] + ["row_version = row_version + 1"])
         values = [data[f] for f in fields]
         values.append(id_fauna)
 
         query = f"UPDATE fauna_table SET {set_clause} WHERE id_fauna = ?"
+        if row_version is not None:
+            query += " AND row_version = ?"
+            values.append(row_version)
 
         cursor = self.conn.cursor()
         cursor.execute(query, values)
@@ -310,41 +450,28 @@ class FaunaDB:
 
         return cursor.rowcount
 
-    def search_fauna_records(self, search_term: str, fields: List[str] = None) -> List[Dict]:
+    def search_fauna_records(self, search_term: str, fields: List[str] = None,
+                             columns: List[str] = None) -> List[FaunaRow]:
         """
         Cerca record fauna in base a un termine di ricerca
 
         Args:
             search_term: termine da cercare
-            fields: lista di campi in cui cercare. Se None, cerca in tutti i campi testo
+            fields: lista di campi in cui cercare. Se None, cerca in CAMPI_RICERCA
+            columns: colonne da leggere (come get_all_fauna_records)
 
         Returns:
-            Lista di record trovati
+            Lista di FaunaRow dei record trovati
         """
         if not search_term:
-            return self.get_all_fauna_records()
+            return self.get_all_fauna_records(columns=columns)
 
-        if fields is None:
-            fields = [
-                'sito', 'area', 'us', 'saggio', 'responsabile_scheda',
-                'contesto', 'specie', 'descrizione_contesto', 'osservazioni',
-                'interpretazione'
-            ]
-
-        cursor = self.conn.cursor()
-
-        where_clauses = [f"{field} LIKE ?" for field in fields]
-        query = f"""
-            SELECT * FROM fauna_table
-            WHERE {' OR '.join(where_clauses)}
-            ORDER BY sito, area, us, id_fauna
-        """
-
-        search_pattern = f"%{search_term}%"
-        params = [search_pattern for _ in fields]
+        cursor = self._tuple_cursor()
+        query, params = self._fauna_query(columns=select_columns(columns), search_term=search_term,
+                                          search_fields=fields)
 
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return fauna_rows(cursor.description, cursor.fetchall())
 
     def get_siti_list(self) -> List[str]:
         """Recupera la lista dei siti"""
@@ -437,6 +564,53 @@ class FaunaDB:
         cursor.execute(query, params)
         return [row[0] for row in cursor.fetchall()]
 
+    def get_data_version(self) -> str:
+        """
+        Restituisce un'impronta economica dello stato di fauna_table
+
+        Cambia a ogni inserimento, modifica o cancellazione. Per i database su
+        file usa il contatore di modifiche nell'header SQLite e lo stato del
+        file WAL, che restano validi tra sessioni diverse (PRAGMA data_version
+        riparte a ogni connessione ed è usato solo per i database in memoria).
+
+        Returns:
+            Stringa da confrontare per uguaglianza
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(id_fauna) FROM fauna_table")
+        count, max_id = cursor.fetchone()
+
+        try:
+            with open(self.db_path, 'rb') as f:
+                f.seek(24)
+                change_counter = int.from_bytes(f.read(4), 'big')
+            stat = os.stat(self.db_path)
+            parts = [change_counter, stat.st_size, stat.st_mtime_ns]
+            wal_path = self.db_path + '-wal'
+            if os.path.exists(wal_path):
+                wal_stat = os.stat(wal_path)
+                parts += [wal_stat.st_size, wal_stat.st_mtime_ns]
+        except OSError:
+            cursor.execute("PRAGMA data_version")
+            parts = ['mem', cursor.fetchone()[0], self.conn.total_changes]
+
+        return ':'.join(str(p) for p in ['sqlite', count, max_id] + parts)
+
+    def vacuum(self) -> Dict:
+        """
+        Compatta il file del database e aggiorna le statistiche del pianificatore
+
+        Returns:
+            Dizionario con le dimensioni in byte prima e dopo ('prima', 'dopo')
+        """
+        prima = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        self.conn.commit()
+        cursor = self.conn.cursor()
+        cursor.execute("VACUUM")
+        cursor.execute("ANALYZE")
+        dopo = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {'prima': prima, 'dopo': dopo}
+
     def close(self):
         """Chiude la connessione al database"""
         if self.conn:
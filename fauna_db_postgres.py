@@ -3,10 +3,14 @@ Implementazione PostgreSQL per FaunaDB
 Estende FaunaDB con supporto PostgreSQL
 """
 
-import os
-from typing import List, Dict, Optional
+import uuid
+from typing import List, Dict, Iterator, Optional, Tuple
 from datetime import datetime
 
+from fauna_db import CAMPI_RICERCA, CHIAVI_ORDINAMENTO, keyset_condition, select_columns
+from fauna_records import FaunaRow, fauna_rows
+from fauna_schema import ensure_schema, print_progress
+
 
 class FaunaDBPostgres:
     """Classe per gestire le operazioni sul database fauna con PostgreSQL"""
@@ -39,17 +43,21 @@ class FaunaDBPostgres:
         if self.conn:
             self.ensure_tables_exist()
 
+    def _new_connection(self):
+        """Nuova connessione con i parametri di db_config"""
+        return self.psycopg2.connect(
+            host=self.db_config.get('host', 'localhost'),
+            port=self.db_config.get('port', 5432),
+            database=self.db_config.get('database', 'pyarchinit'),
+            user=self.db_config.get('user', 'postgres'),
+            password=self.db_config.get('password', ''),
+            cursor_factory=self.RealDictCursor
+        )
+
     def connect(self):
         """Stabilisce la connessione al database PostgreSQL"""
         try:
-            self.conn = self.psycopg2.connect(
-                host=self.db_config.get('host', 'localhost'),
-                port=self.db_config.get('port', 5432),
-                database=self.db_config.get('database', 'pyarchinit'),
-                user=self.db_config.get('user', 'postgres'),
-                password=self.db_config.get('password', ''),
-                cursor_factory=self.RealDictCursor
-            )
+            self.conn = self._new_connection()
             # IMPORTANTE: Usa autocommit=True per operazioni DDL (CREATE TABLE, CREATE INDEX)
             # Le operazioni DDL in PostgreSQL devono essere committate immediatamente
             self.conn.autocommit = True
@@ -79,284 +87,22 @@ class FaunaDBPostgres:
             print(f"    ⚠ Errore eliminazione {table_name}: {e}")
 
     def ensure_tables_exist(self):
-        """Verifica che le tabelle fauna esistano, altrimenti le crea"""
+        """
+        Porta le tabelle fauna all'ultima versione dello schema
+
+        Con lo schema aggiornato è una sola lettura di fauna_schema_version;
+        altrimenti crea le tabelle con gli script di sql/postgres/ o applica le
+        migrazioni mancanti, ciascuna in una transazione (vedi fauna_schema).
+        """
         if not self.conn:
             return
 
-        cursor = self.conn.cursor()
-
         try:
-            # Verifica se fauna_table esiste
-            fauna_exists = self.verify_table_exists('fauna_table')
-
-            # Verifica se fauna_voc esiste
-            voc_exists = self.verify_table_exists('fauna_voc')
-
-            if not fauna_exists or not voc_exists:
-                print("⚠ Tabelle fauna non trovate nel database PostgreSQL")
-                print("📦 Creazione tabelle in corso...")
-
-                # Cleanup: elimina eventuali tabelle parzialmente create
-                if not voc_exists:
-                    self.drop_table_if_exists('fauna_voc')
-                if not fauna_exists:
-                    self.drop_table_if_exists('fauna_table')
-
-                # Crea le tabelle eseguendo gli script SQL
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                sql_dir = os.path.join(script_dir, "sql")
-
-                # Crea fauna_voc prima
-                if not voc_exists:
-                    voc_sql_path = os.path.join(sql_dir, "create_fauna_voc.sql")
-                    if os.path.exists(voc_sql_path):
-                        print("  → Creazione tabella fauna_voc...")
-                        with open(voc_sql_path, 'r', encoding='utf-8') as f:
-                            sql = f.read()
-
-                            # PRIMA: Rimuovi i commenti SQL (linee che iniziano con --)
-                            # Mantieni solo le linee che non sono commenti puri
-                            lines = sql.split('\n')
-                            clean_lines = []
-                            for line in lines:
-                                stripped = line.strip()
-                                # Salta linee vuote o linee che sono solo commenti
-                                if stripped and not stripped.startswith('--'):
-                                    # Rimuovi commenti in-line (es: "campo TEXT, -- commento")
-                                    # Ma attenzione a non rimuovere -- dentro stringhe!
-                                    # Per ora rimuoviamo semplicemente tutto dopo --
-                                    line_without_comment = line.split('--')[0]
-                                    clean_lines.append(line_without_comment)
-
-                            sql = '\n'.join(clean_lines)
-
-                            # POI: Adatta sintassi per PostgreSQL
-                            sql = sql.replace('AUTOINCREMENT', 'GENERATED ALWAYS AS IDENTITY')
-                            sql = sql.replace('CREATE TABLE IF NOT EXISTS', 'CREATE TABLE')
-                            sql = sql.replace('INSERT OR IGNORE INTO', 'INSERT INTO')
-                            # PostgreSQL richiede TRUE/FALSE per BOOLEAN, non 1/0
-                            sql = sql.replace('BOOLEAN DEFAULT 1', 'BOOLEAN DEFAULT TRUE')
-                            sql = sql.replace('BOOLEAN DEFAULT 0', 'BOOLEAN DEFAULT FALSE')
-
-                            # Aggiungi ON CONFLICT DO NOTHING prima di ogni punto e virgola che segue un INSERT
-                            import re
-                            sql = re.sub(
-                                r'(\bINSERT INTO fauna_voc\b[^;]+);',
-                                r'\1 ON CONFLICT (campo, valore) DO NOTHING;',
-                                sql
-                            )
-
-                            # Separa in 3 categorie: CREATE TABLE, INSERT, CREATE INDEX
-                            create_table_statements = []
-                            insert_statements = []
-                            create_index_statements = []
-
-                            statements = sql.split(';')
-                            print(f"    📋 Trovati {len(statements)} statement totali")
-
-                            # Debug: stampa il primo statement completo
-                            if len(statements) > 0:
-                                first_stmt = statements[0].strip()
-                                print(f"    🔍 Primo statement (primi 500 char):\n{first_stmt[:500]}\n")
-
-                            for i, statement in enumerate(statements):
-                                statement = statement.strip()
-                                if not statement:
-                                    print(f"    ⏭ Statement {i}: vuoto, skip")
-                                    continue
-
-                                # Debug: mostra primi 100 caratteri di ogni statement
-                                preview = statement[:100].replace('\n', ' ')
-                                print(f"    🔍 Statement {i}: {preview}...")
-
-                                if 'CREATE TABLE' in statement:
-                                    create_table_statements.append(statement)
-                                    print(f"    ➕ Aggiunto CREATE TABLE (lunghezza: {len(statement)})")
-                                elif 'CREATE INDEX' in statement:
-                                    create_index_statements.append(statement)
-                                    print(f"    ➕ Aggiunto CREATE INDEX")
-                                elif 'INSERT INTO' in statement:
-                                    insert_statements.append(statement)
-                                    print(f"    ➕ Aggiunto INSERT INTO")
-                                else:
-                                    print(f"    ❓ Statement {i} non riconosciuto")
-
-                            print(f"    📊 Totali: {len(create_table_statements)} CREATE TABLE, {len(insert_statements)} INSERT, {len(create_index_statements)} CREATE INDEX")
-
-                            # 1. Prima esegui CREATE TABLE
-                            for statement in create_table_statements:
-                                try:
-                                    # Debug: mostra i primi 200 caratteri dello statement
-                                    print(f"    🔧 Esecuzione CREATE TABLE: {statement[:200]}...")
-                                    cursor.execute(statement)
-                                    print(f"    ✓ CREATE TABLE eseguito senza errori")
-                                except Exception as e:
-                                    print(f"    ❌ ERRORE durante CREATE TABLE: {e}")
-                                    print(f"    📝 Statement completo:\n{statement}")
-                                    if 'already exists' not in str(e).lower():
-                                        raise
-
-                            # Con autocommit=True non serve commit esplicito
-                            print("    ✓ Tabella creata (autocommit)")
-
-                            # VERIFICA IMMEDIATA che la tabella esista davvero
-                            print("    🔍 Verifica esistenza tabella fauna_voc...")
-
-                            # Debug: verifica manualmente con un cursore fresco
-                            verify_cursor = self.conn.cursor()
-                            verify_cursor.execute("""
-                                SELECT COUNT(*) as count
-                                FROM pg_catalog.pg_tables
-                                WHERE schemaname = 'public' AND tablename = 'fauna_voc'
-                            """)
-                            count_result = verify_cursor.fetchone()
-                            print(f"    📊 Query pg_tables restituisce: {count_result}")
-
-                            if self.verify_table_exists('fauna_voc'):
-                                print("    ✓✓ Tabella fauna_voc verificata nel database")
-                            else:
-                                print("    ✗✗ ERRORE: Tabella fauna_voc NON TROVATA dopo commit!")
-
-                                # Debug aggiuntivo: proviamo a fare SELECT sulla tabella
-                                try:
-                                    test_cursor = self.conn.cursor()
-                                    test_cursor.execute("SELECT COUNT(*) FROM fauna_voc")
-                                    print(f"    🤔 Ma SELECT COUNT(*) sulla tabella funziona! Risultato: {test_cursor.fetchone()}")
-                                except Exception as e:
-                                    print(f"    ❌ SELECT sulla tabella fallisce: {e}")
-
-                                raise Exception("Tabella fauna_voc non creata correttamente")
-
-                            # Nuovo cursore dopo commit
-                            cursor = self.conn.cursor()
-
-                            # 2. Poi esegui INSERT
-                            for statement in insert_statements:
-                                try:
-                                    cursor.execute(statement)
-                                except Exception as e:
-                                    if 'duplicate' not in str(e).lower() and 'already exists' not in str(e).lower():
-                                        print(f"    Attenzione INSERT: {e}")
-
-                            # Con autocommit=True non serve commit esplicito
-                            print("    ✓ Dati inseriti (autocommit)")
-
-                            # Nuovo cursore
-                            cursor = self.conn.cursor()
-
-                            # 3. Infine crea gli indici (ognuno in una transazione separata)
-                            # Ma solo se la tabella esiste davvero
-                            if self.verify_table_exists('fauna_voc'):
-                                for statement in create_index_statements:
-                                    try:
-                                        cursor.execute(statement)
-                                        # Con autocommit=True ogni statement è già committato
-                                    except Exception as e:
-                                        if 'already exists' not in str(e).lower():
-                                            print(f"    Attenzione INDEX: {e}")
-
-                                print("    ✓ Indici creati (autocommit)")
-                            else:
-                                print("    ⚠ Indici non creati (tabella non verificata)")
-
-                        print("  ✓ Tabella fauna_voc creata")
-                    else:
-                        print(f"  ✗ File SQL non trovato: {voc_sql_path}")
-
-                # Crea fauna_table
-                if not fauna_exists:
-                    table_sql_path = os.path.join(sql_dir, "create_fauna_table.sql")
-                    if os.path.exists(table_sql_path):
-                        print("  → Creazione tabella fauna_table...")
-                        with open(table_sql_path, 'r', encoding='utf-8') as f:
-                            sql = f.read()
-
-                            # PRIMA: Rimuovi i commenti SQL
-                            lines = sql.split('\n')
-                            clean_lines = []
-                            for line in lines:
-                                stripped = line.strip()
-                                if stripped and not stripped.startswith('--'):
-                                    line_without_comment = line.split('--')[0]
-                                    clean_lines.append(line_without_comment)
-
-                            sql = '\n'.join(clean_lines)
-
-                            # POI: Adatta sintassi per PostgreSQL
-                            sql = sql.replace('AUTOINCREMENT', 'GENERATED ALWAYS AS IDENTITY')
-                            sql = sql.replace('CREATE TABLE IF NOT EXISTS', 'CREATE TABLE')
-                            sql = sql.replace('NUMERIC (6, 2)', 'NUMERIC(6, 2)')
-                            # PostgreSQL richiede TRUE/FALSE per BOOLEAN, non 1/0
-                            sql = sql.replace('BOOLEAN DEFAULT 1', 'BOOLEAN DEFAULT TRUE')
-                            sql = sql.replace('BOOLEAN DEFAULT 0', 'BOOLEAN DEFAULT FALSE')
-
-                            # Separa in 3 categorie come per fauna_voc
-                            create_table_statements = []
-                            create_index_statements = []
-
-                            statements = sql.split(';')
-                            for statement in statements:
-                                statement = statement.strip()
-                                if not statement or statement.startswith('--'):
-                                    continue
-
-                                if 'CREATE TABLE' in statement:
-                                    create_table_statements.append(statement)
-                                elif 'CREATE INDEX' in statement:
-                                    create_index_statements.append(statement)
-
-                            # 1. Prima esegui CREATE TABLE
-                            for statement in create_table_statements:
-                                try:
-                                    cursor.execute(statement)
-                                except Exception as e:
-                                    if 'already exists' not in str(e).lower():
-                                        print(f"    Errore CREATE TABLE: {e}")
-                                        raise
-
-                            # Con autocommit=True non serve commit esplicito
-                            print("    ✓ Tabella creata (autocommit)")
-
-                            # VERIFICA IMMEDIATA che la tabella esista davvero
-                            if self.verify_table_exists('fauna_table'):
-                                print("    ✓✓ Tabella fauna_table verificata nel database")
-                            else:
-                                print("    ✗✗ ERRORE: Tabella fauna_table NON TROVATA dopo autocommit!")
-                                raise Exception("Tabella fauna_table non creata correttamente")
-
-                            # Nuovo cursore
-                            cursor = self.conn.cursor()
-
-                            # 2. Crea gli indici
-                            # Ma solo se la tabella esiste davvero
-                            if self.verify_table_exists('fauna_table'):
-                                for statement in create_index_statements:
-                                    try:
-                                        cursor.execute(statement)
-                                        # Con autocommit=True ogni statement è già committato
-                                    except Exception as e:
-                                        if 'already exists' not in str(e).lower():
-                                            print(f"    Attenzione INDEX: {e}")
-
-                                print("    ✓ Indici creati (autocommit)")
-                            else:
-                                print("    ⚠ Indici non creati (tabella non verificata)")
-
-                        print("  ✓ Tabella fauna_table creata")
-                    else:
-                        print(f"  ✗ File SQL non trovato: {table_sql_path}")
-
-                print("✅ Tabelle fauna create con successo nel database PostgreSQL!")
-
-            else:
-                print("✓ Tabelle fauna già presenti nel database PostgreSQL")
-
+            ensure_schema(self.conn, 'postgres', progress=print_progress)
         except Exception as e:
-            # Con autocommit=True non serve rollback
-            print(f"❌ Errore nella verifica/creazione tabelle PostgreSQL: {e}")
+            print(f"❌ Errore nella verifica/creazione tabelle: {e}")
             import traceback
             traceback.print_exc()
-            # Non sollevare eccezione per permettere all'app di continuare
 
     def get_us_list(self, sito: str = None) -> List[Dict]:
         """Recupera la lista delle US dal database"""
@@ -402,27 +148,150 @@ class FaunaDBPostgres:
 
         return [row['valore'] for row in cursor.fetchall()]
 
-    def get_all_fauna_records(self, filters: Dict = None) -> List[Dict]:
-        """Recupera tutti i record fauna"""
+    def get_all_fauna_records(self, filters: Dict = None, columns: List[str] = None) -> List[FaunaRow]:
+        """Recupera tutti i record fauna (FaunaRow), o solo le colonne indicate (es. COLONNE_RIEPILOGO)"""
+        cursor = self._tuple_cursor()
+        query, params = self._fauna_query(filters, select_columns(columns))
+
+        cursor.execute(query, params)
+        return fauna_rows(cursor.description, cursor.fetchall())
+
+    def iter_fauna_records(self, filters: Dict = None, batch_size: int = 1000,
+                           order_by: str = None, columns: List[str] = None) -> Iterator[List[FaunaRow]]:
+        """
+        Legge i record fauna a blocchi con un cursore lato server
+
+        La lettura avviene su una connessione dedicata, in una transazione di sola
+        lettura: il cursore non è WITH HOLD, quindi il server produce le righe man
+        mano invece di materializzare l'intero risultato al commit (come accadrebbe
+        in autocommit). Pensato per le esportazioni; per gli elenchi
+        dell'interfaccia vedi iter_fauna_pages.
+
+        Yields:
+            Liste di FaunaRow, nell'ordine di get_all_fauna_records o di order_by
+        """
+        query, params = self._fauna_query(filters, select_columns(columns), order_by)
+        conn = self._new_connection()
+
+        try:
+            conn.set_session(readonly=True, autocommit=False)
+            cursor = conn.cursor(name=f"fauna_iter_{uuid.uuid4().hex}",
+                                 cursor_factory=self.psycopg2.extensions.cursor)
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield fauna_rows(cursor.description, rows)
+            cursor.close()
+        finally:
+            # Chiudere la connessione annulla la transazione di lettura
+            conn.close()
+
+    def iter_fauna_pages(self, filters: Dict = None, batch_size: int = 1000,
+                         columns: List[str] = None) -> Iterator[List[FaunaRow]]:
+        """
+        Pagine di record per gli elenchi dell'interfaccia, nell'ordinamento standard
+
+        Paginazione per chiave su (sito, area, us, id_fauna): ogni pagina è una
+        query con LIMIT che riparte dall'ultima riga letta, quindi la prima
+        pagina arriva subito e tra una pagina e l'altra non resta aperto alcun
+        cursore sul server.
+
+        Yields:
+            Liste di FaunaRow, nell'ordine di get_all_fauna_records
+        """
+        if columns is not None:
+            columns = list(columns) + [c for c in CHIAVI_ORDINAMENTO if c not in columns]
+        dopo = None
+
+        while True:
+            query, params = self._fauna_query(filters, select_columns(columns), condition=dopo)
+            cursor = self._tuple_cursor()
+            try:
+                cursor.execute(query + " LIMIT %s", params + [batch_size])
+                rows = fauna_rows(cursor.description, cursor.fetchall())
+            finally:
+                cursor.close()
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            dopo = keyset_condition(CHIAVI_ORDINAMENTO, [rows[-1][c] for c in CHIAVI_ORDINAMENTO], '%s')
+
+    def copy_fauna_records_csv(self, file, columns: List[str], filters: Dict = None):
+        """
+        Scrive i record fauna in CSV (con intestazione) tramite COPY ... TO STDOUT
+
+        Il server produce direttamente il CSV, che viene trasferito a blocchi
+        nel file senza passare da righe Python.
+
+        Args:
+            file: file aperto in scrittura (testo)
+            columns: colonne da esportare, nell'ordine
+            filters: filtri sui record (come get_all_fauna_records)
+        """
+        query, params = self._fauna_query(filters, ", ".join(columns))
         cursor = self.conn.cursor()
+        try:
+            encoding = self.psycopg2.extensions.encodings[self.conn.encoding]
+            select = cursor.mogrify(query, params).decode(encoding)
+            cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)", file)
+        finally:
+            cursor.close()
+
+    def get_fauna_ids(self, filters: Dict = None, order_by: str = None,
+                      search_term: str = None, search_fields: List[str] = None) -> List[int]:
+        """Id dei record che soddisfano filtri e ricerca, nell'ordine richiesto (vedi FaunaDB)"""
+        cursor = self.conn.cursor()
+        query, params = self._fauna_query(filters, "id_fauna", order_by, search_term, search_fields)
+        cursor.execute(query, params)
+        return [row['id_fauna'] for row in cursor.fetchall()]
+
+    def get_fauna_rows(self, ids: List[int], columns: List[str]) -> List[FaunaRow]:
+        """Legge solo le colonne indicate dei record con gli id dati, nell'ordine di ids"""
+        cursor = self._tuple_cursor()
+        cursor.execute(f"SELECT {select_columns(columns)} FROM fauna_table WHERE id_fauna = ANY(%s)", (list(ids),))
+        by_id = {row['id_fauna']: row for row in fauna_rows(cursor.description, cursor.fetchall())}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def _tuple_cursor(self, **kwargs):
+        """Cursore a tuple, invece del RealDictCursor della connessione, per le letture in blocco"""
+        return self.conn.cursor(cursor_factory=self.psycopg2.extensions.cursor, **kwargs)
+
+    def _fauna_query(self, filters: Dict = None, columns: str = "*", order_by: str = None,
+                     search_term: str = None, search_fields: List[str] = None,
+                     condition: Tuple[str, list] = None) -> Tuple[str, list]:
+        """
+        Costruisce la SELECT su fauna_table con filtri, ricerca testuale e ordinamento standard
 
-        query = "SELECT * FROM fauna_table"
+        condition è una condizione aggiuntiva (SQL, parametri), es. keyset_condition.
+        """
+        query = f"SELECT {columns} FROM fauna_table"
         params = []
+        where_clauses = []
 
         if filters:
-            where_clauses = []
             for field, value in filters.items():
                 if value:
                     where_clauses.append(f"{field} = %s")
                     params.append(value)
 
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
+        if search_term:
+            fields = search_fields or CAMPI_RICERCA
+            where_clauses.append("(" + " OR ".join(f"{field}::text ILIKE %s" for field in fields) + ")")
+            params.extend(f"%{search_term}%" for _ in fields)
 
-        query += " ORDER BY sito, area, us, id_fauna"
+        if condition:
+            where_clauses.append(condition[0])
+            params.extend(condition[1])
 
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+
+        query += f" ORDER BY {order_by or ', '.join(CHIAVI_ORDINAMENTO)}"
+        return query, params
 
     def get_fauna_record(self, id_fauna: int) -> Optional[Dict]:
         """Recupera un singolo record fauna"""
@@ -454,17 +323,61 @@ class FaunaDBPostgres:
 
         return new_id
 
-    def update_fauna_record(self, id_fauna: int, data: Dict) -> bool:
-        """Aggiorna un record fauna esistente"""
+    def insert_fauna_records(self, records: List[Dict], batch_size: int = 1000) -> int:
+        """
+        Inserisce molti record fauna con una transazione per blocco
+
+        Usa execute_values (un solo INSERT multi-riga per pagina). Tutti i
+        record devono avere gli stessi campi; se un blocco fallisce viene
+        annullato e i blocchi precedenti restano inseriti.
+
+        Returns:
+            Numero di record inseriti
+        """
+        from psycopg2.extras import execute_values
+
+        if not records:
+            return 0
+
+        fields = [f for f in records[0] if f != 'id_fauna']
+        query = f"INSERT INTO fauna_table ({', '.join(fields)}) VALUES %s"
+
+        cursor = self.conn.cursor()
+        inserted = 0
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            # La connessione è in autocommit: la transazione del blocco è esplicita
+            cursor.execute("BEGIN")
+            try:
+                execute_values(cursor, query, [[r[f] for f in fields] for r in batch], page_size=batch_size)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            inserted += len(batch)
+
+        return inserted
+
+    def update_fauna_record(self, id_fauna: int, data: Dict, row_version: int = None) -> bool:
+        """
+        Aggiorna un record fauna esistente nelle sole colonne presenti in data
+
+        Con row_version l'UPDATE è condizionato alla versione letta: False se
+        nel frattempo un altro utente ha salvato la scheda (vedi FaunaDB).
+        """
         data = data.copy()
         data.pop('id_fauna', None)
+        data.pop('row_version', None)
 
         fields = list(data.keys())
-        set_clause = ', '.join([f"{f} = %s" for f in fields])
+        set_clause = ', '.join([f"{f} = %s" for f in fields] + ["row_version = row_version + 1"])
         values = [data[f] for f in fields]
         values.append(id_fauna)
 
         query = f"UPDATE fauna_table SET {set_clause} WHERE id_fauna = %s"
+        if row_version is not None:
+            query += " AND row_version = %s"
+            values.append(row_version)
 
         cursor = self.conn.cursor()
         cursor.execute(query, values)
@@ -494,32 +407,18 @@ class FaunaDBPostgres:
 
         return cursor.rowcount
 
-    def search_fauna_records(self, search_term: str, fields: List[str] = None) -> List[Dict]:
+    def search_fauna_records(self, search_term: str, fields: List[str] = None,
+                             columns: List[str] = None) -> List[FaunaRow]:
         """Cerca record fauna"""
         if not search_term:
-            return self.get_all_fauna_records()
-
-        if fields is None:
-            fields = [
-                'sito', 'area', 'us', 'saggio', 'responsabile_scheda',
-                'contesto', 'specie', 'descrizione_contesto', 'osservazioni',
-                'interpretazione'
-            ]
-
-        cursor = self.conn.cursor()
-
-        where_clauses = [f"{field}::text ILIKE %s" for field in fields]
-        query = f"""
-            SELECT * FROM fauna_table
-            WHERE {' OR '.join(where_clauses)}
-            ORDER BY sito, area, us, id_fauna
-        """
+            return self.get_all_fauna_records(columns=columns)
 
-        search_pattern = f"%{search_term}%"
-        params = [search_pattern for _ in fields]
+        cursor = self._tuple_cursor()
+        query, params = self._fauna_query(columns=select_columns(columns), search_term=search_term,
+                                          search_fields=fields)
 
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return fauna_rows(cursor.description, cursor.fetchall())
 
     def get_siti_list(self) -> List[str]:
         """Recupera la lista dei siti"""
@@ -617,6 +516,46 @@ class FaunaDBPostgres:
         cursor.execute(query, params)
         return [row['us'] for row in cursor.fetchall()]
 
+    def get_data_version(self) -> str:
+        """
+        Restituisce un'impronta economica dello stato di fauna_table
+
+        Combina conteggio e id massimo con i contatori cumulativi di
+        pg_stat_all_tables (righe inserite, aggiornate, cancellate), che
+        persistono tra sessioni. Le statistiche possono arrivare con un
+        ritardo di circa un secondo rispetto al commit.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) AS n, MAX(id_fauna) AS max_id FROM fauna_table")
+        row = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT n_tup_ins, n_tup_upd, n_tup_del
+            FROM pg_stat_all_tables
+            WHERE relid = 'fauna_table'::regclass
+        """)
+        stat = cursor.fetchone() or {}
+
+        parts = ['postgres', row['n'], row['max_id'],
+                 stat.get('n_tup_ins'), stat.get('n_tup_upd'), stat.get('n_tup_del')]
+        return ':'.join(str(p) for p in parts)
+
+    def vacuum(self) -> Dict:
+        """
+        Esegue VACUUM ANALYZE su fauna_table e fauna_voc (richiede autocommit)
+
+        Returns:
+            Dizionario con le dimensioni in byte di fauna_table prima e dopo ('prima', 'dopo')
+        """
+        cursor = self.conn.cursor()
+        size_query = "SELECT pg_total_relation_size('fauna_table') AS n"
+        cursor.execute(size_query)
+        prima = cursor.fetchone()['n']
+        cursor.execute("VACUUM ANALYZE fauna_table")
+        cursor.execute("VACUUM ANALYZE fauna_voc")
+        cursor.execute(size_query)
+        return {'prima': prima, 'dopo': cursor.fetchone()['n']}
+
     def close(self):
         """Chiude la connessione al database"""
         if self.conn:
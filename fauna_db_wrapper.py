@@ -45,3 +45,23 @@ def create_fauna_db(db_path: str = None, db_config: Dict = None):
         return FaunaDBPostgres(db_config)
     else:
         raise ValueError(f"Tipo database non supportato: {db_config['type']}")
+
+
+def open_saved_fauna_db(db_path: str = None, config_file: str = None):
+    """
+    Apre il database per script e riga di comando
+
+    Args:
+        db_path: database SQLite da aprire; se None usa l'ultima configurazione
+            salvata da DBConfigManager (o quella predefinita)
+        config_file: file di configurazione JSON al posto di quello di DBConfigManager
+
+    Returns:
+        Istanza di FaunaDB o FaunaDBPostgres
+    """
+    if db_path:
+        return create_fauna_db(db_path=db_path)
+
+    from db_config_manager import DBConfigManager
+    manager = DBConfigManager(config_file)
+    return create_fauna_db(db_config=manager.load_config() or manager.get_default_config())
@@ -0,0 +1,596 @@
+"""
+Esportazione dei dati fauna in formati tabellari per l'analisi (CSV, XLSX, Parquet)
+I record sono letti dal database a blocchi e scritti in streaming, quindi la
+memoria usata non dipende dalla dimensione della tabella.
+Non dipende da Qt; si può usare anche da riga di comando:
+
+    python fauna_export.py csv schede.csv --sito "Sito A" --esplodi
+    python fauna_export.py xlsx schede.xlsx --statistiche
+    python fauna_export.py parquet cartella_output
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fauna_records import extract_specie_psi_pairs, safe_float
+
+
+# Record letti dal database per blocco
+EXPORT_BATCH = 5000
+
+# Colonne di fauna_table nell'ordine della scheda (esclusi i campi JSON, esplosi a parte)
+COLONNE_SCHEDA = [
+    'id_fauna', 'id_us', 'sito', 'area', 'saggio', 'us', 'datazione_us',
+    'responsabile_scheda', 'data_compilazione', 'documentazione_fotografica',
+    'metodologia_recupero', 'contesto', 'descrizione_contesto',
+    'resti_connessione_anatomica', 'tipologia_accumulo', 'deposizione',
+    'numero_stimato_resti', 'numero_minimo_individui', 'specie', 'parti_scheletriche',
+    'stato_frammentazione', 'tracce_combustione', 'combustione_altri_materiali_us',
+    'tipo_combustione', 'segni_tafonomici_evidenti', 'caratterizzazione_segni_tafonomici',
+    'stato_conservazione', 'alterazioni_morfologiche', 'note_terreno_giacitura',
+    'campionature_effettuate', 'affidabilita_stratigrafica', 'classi_reperti_associazione',
+    'osservazioni', 'interpretazione',
+]
+
+# Colonne con pochi valori ricorrenti (vocabolari e identificativi di scavo)
+COLONNE_DIZIONARIO = {
+    'sito', 'area', 'saggio', 'us', 'datazione_us', 'responsabile_scheda',
+    'metodologia_recupero', 'contesto', 'resti_connessione_anatomica', 'tipologia_accumulo',
+    'deposizione', 'numero_stimato_resti', 'specie', 'parti_scheletriche',
+    'stato_frammentazione', 'tracce_combustione', 'tipo_combustione',
+    'segni_tafonomici_evidenti', 'caratterizzazione_segni_tafonomici', 'stato_conservazione',
+}
+
+COLONNE_INTERE = {'id_fauna', 'id_us', 'numero_minimo_individui'}
+COLONNE_BOOLEANE = {'combustione_altri_materiali_us'}
+
+# Tipi di misura nell'ordine delle colonne di misure_ossa
+TIPI_MISURA = ['GL', 'GB', 'Bp', 'Bd']
+
+# Campi JSON esportati così come sono nel CSV non esploso
+COLONNE_JSON = ['specie_psi', 'misure_ossa']
+
+# Colonne che sostituiscono i campi JSON nel CSV esploso
+COLONNE_SPECIE_PSI = ['specie_psi_specie', 'specie_psi_psi']
+COLONNE_MISURE = ['misure_elemento', 'misure_specie'] + [f"misure_{tipo}" for tipo in TIPI_MISURA]
+
+# Separatore dei valori multipli nelle colonne esplose
+SEPARATORE_VALORI = ' | '
+
+# Colonne del foglio schede XLSX: ordine ed etichette della Scheda FR (Scheda FR_faune.xlsx);
+# le misure ossa vanno nel foglio dedicato
+SCHEDA_FR = [
+    ('id_fauna', 'ID'),
+    ('sito', 'SITO'),
+    ('area', 'AREA'),
+    ('saggio', 'SAGGIO'),
+    ('us', 'US'),
+    ('datazione_us', 'DATAZIONE US'),
+    ('responsabile_scheda', 'RESPONSABILE DELLA SCHEDA'),
+    ('data_compilazione', 'DATA DI COMPILAZIONE'),
+    ('documentazione_fotografica', 'DOCUMENTAZIONE FOTOGRAFICA'),
+    ('metodologia_recupero', 'METODOLOGIA DI RECUPERO'),
+    ('contesto', 'CONTESTO'),
+    ('descrizione_contesto', 'DESCRIZIONE DEL CONTESTO DI RINVENIMENTO'),
+    ('resti_connessione_anatomica', 'RESTI IN CONNESSIONE ANATOMICA'),
+    ('tipologia_accumulo', 'TIPOLOGIA DI ACCUMULO'),
+    ('deposizione', 'DEPOSIZIONE'),
+    ('numero_stimato_resti', 'NUMERO STIMATO RESTI OSTEOLOGICI'),
+    ('numero_minimo_individui', 'NUMERO MINIMO DI INDIVIDUI'),
+    ('specie', 'SPECIE'),
+    ('parti_scheletriche', 'PARTI SCHELETRICHE PRESENTI'),
+    ('stato_frammentazione', 'STATO DI FRAMMENTAZIONE'),
+    ('tracce_combustione', 'TRACCE DI COMBUSTIONE'),
+    ('combustione_altri_materiali_us', 'COMBUSTIONE SU ALTRI MATERIALI DELLA US'),
+    ('tipo_combustione', 'TIPO DI COMBUSTIONE'),
+    ('segni_tafonomici_evidenti', 'SEGNI TAFONOMICI EVIDENTI'),
+    ('caratterizzazione_segni_tafonomici', 'CARATTERIZZAZIONE SEGNI TAFONOMICI'),
+    ('stato_conservazione', 'STATO DI CONSERVAZIONE'),
+    ('alterazioni_morfologiche', 'ALTERAZIONI MORFOLOGICHE O PATOLOGICHE'),
+    ('note_terreno_giacitura', 'NOTE SUL TERRENO DI GIACITURA'),
+    ('campionature_effettuate', 'CAMPIONATURE EFFETTUATE'),
+    ('affidabilita_stratigrafica', 'AFFIDABILITÀ STRATIGRAFICA'),
+    ('classi_reperti_associazione', 'CLASSI DI REPERTI IN ASSOCIAZIONE'),
+    ('osservazioni', 'OSSERVAZIONI'),
+    ('interpretazione', 'INTERPRETAZIONE'),
+]
+
+# Campi ammessi come filtro (come il dialog di ricerca)
+CAMPI_FILTRO = ['sito', 'area', 'saggio', 'us', 'contesto', 'specie']
+
+
+# pyarrow e openpyxl sono importati solo dalle esportazioni che li usano:
+# CSV e importazione non ne pagano il caricamento
+
+def _require_openpyxl():
+    """Solleva ImportError se openpyxl non è disponibile"""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "Il modulo openpyxl è richiesto per l'esportazione Excel.\n"
+            "Installare con: pip install openpyxl"
+        ) from None
+
+
+def _require_pyarrow():
+    """Solleva ImportError se pyarrow non è disponibile"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "Il modulo pyarrow è richiesto per l'esportazione Parquet.\n"
+            "Installare con: pip install pyarrow"
+        ) from None
+
+
+# ========== ESPLOSIONE DEI CAMPI JSON ==========
+
+def explode_specie_psi(record: Dict) -> List[Dict]:
+    """Righe specie/PSI di un record: [{id_fauna, riga, specie, psi}, ...]"""
+    return [
+        {'id_fauna': record.get('id_fauna'), 'riga': i + 1, 'specie': specie or None, 'psi': psi or None}
+        for i, (specie, psi) in enumerate(extract_specie_psi_pairs(record))
+    ]
+
+
+def explode_misure(record: Dict) -> List[Dict]:
+    """
+    Righe di misura di un record: [{id_fauna, riga, elemento, specie, GL, GB, Bp, Bd}, ...]
+
+    Le misure mancanti o non valide sono None (non 0), così restano nulle
+    nelle colonne numeriche.
+    """
+    misure_json = record.get('misure_ossa', '')
+    if not misure_json or not str(misure_json).strip():
+        return []
+    try:
+        misure_data = json.loads(misure_json)
+    except (ValueError, TypeError):
+        return []
+    if not isinstance(misure_data, list):
+        return []
+
+    rows = []
+    for row in misure_data:
+        if not isinstance(row, list) or len(row) < 6:
+            continue
+        valori = [safe_float(v) or None for v in row[2:6]]
+        if not (row[0] or row[1] or any(valori)):
+            continue
+        misura = {'id_fauna': record.get('id_fauna'), 'riga': len(rows) + 1,
+                  'elemento': row[0] or None, 'specie': row[1] or None}
+        misura.update(zip(TIPI_MISURA, valori))
+        rows.append(misura)
+    return rows
+
+
+# ========== CSV ==========
+
+def _join(values) -> str:
+    return SEPARATORE_VALORI.join('' if v is None else str(v) for v in values)
+
+
+def flatten_record(record: Dict) -> Dict:
+    """
+    Colonne esplose di specie_psi e misure_ossa per una riga CSV
+
+    Ogni colonna contiene i valori delle righe JSON separati da
+    SEPARATORE_VALORI, allineati per posizione tra le colonne dello stesso
+    gruppo (l'i-esima specie corrisponde all'i-esimo PSI, e così per le misure).
+    """
+    specie_psi = explode_specie_psi(record)
+    misure = explode_misure(record)
+    flat = {
+        'specie_psi_specie': _join(r['specie'] for r in specie_psi),
+        'specie_psi_psi': _join(r['psi'] for r in specie_psi),
+        'misure_elemento': _join(r['elemento'] for r in misure),
+        'misure_specie': _join(r['specie'] for r in misure),
+    }
+    for tipo in TIPI_MISURA:
+        flat[f"misure_{tipo}"] = _join(r[tipo] for r in misure)
+    return flat
+
+
+def export_records_csv(db, file_path: str, filters: Dict = None, flatten: bool = False,
+                       batch_size: int = EXPORT_BATCH,
+                       progress: Callable[[int], None] = None) -> Optional[int]:
+    """
+    Esporta le schede fauna in CSV in streaming
+
+    Su PostgreSQL, senza esplosione, il CSV è prodotto dal server con COPY;
+    negli altri casi i record sono letti a blocchi (fetchmany) e scritti riga
+    per riga. Il file viene scritto con un nome temporaneo e rinominato solo a
+    esportazione completata.
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        file_path: percorso del file CSV
+        filters: filtri sui record (come get_all_fauna_records)
+        flatten: sostituisce specie_psi e misure_ossa con colonne esplose
+        batch_size: record letti per blocco
+        progress: funzione chiamata con il numero di schede esportate dopo ogni blocco
+
+    Returns:
+        Numero di schede esportate (None con COPY, che non riporta il conteggio)
+    """
+    colonne = COLONNE_SCHEDA + (COLONNE_SPECIE_PSI + COLONNE_MISURE if flatten else COLONNE_JSON)
+    tmp_path = file_path + '.tmp'
+    count = None
+
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            if not flatten and hasattr(db, 'copy_fauna_records_csv'):
+                db.copy_fauna_records_csv(f, colonne, filters)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(colonne)
+                count = 0
+                for records in db.iter_fauna_records(filters, batch_size):
+                    for record in records:
+                        if flatten:
+                            record = {**record, **flatten_record(record)}
+                        writer.writerow([record.get(col) for col in colonne])
+                    count += len(records)
+                    if progress:
+                        progress(count)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, file_path)
+    return count
+
+
+# ========== XLSX ==========
+
+def _to_date(value):
+    """Data di compilazione come data Excel (il testo non riconosciuto resta invariato)"""
+    if not value or not isinstance(value, str):
+        return value
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return value
+
+
+def _scheda_row(record: Dict) -> list:
+    """Valori di una riga del foglio schede, con interi, date e booleani tipizzati"""
+    row = []
+    for col, _ in SCHEDA_FR:
+        value = record.get(col)
+        if col in COLONNE_INTERE:
+            value = _to_int(value)
+        elif col in COLONNE_BOOLEANE:
+            value = _to_bool(value)
+        elif col == 'data_compilazione':
+            value = _to_date(value)
+        row.append(value)
+    return row
+
+
+def _xlsx_sheet(workbook, title: str, header: List[str]):
+    """Foglio write-only con intestazione in grassetto e bloccata"""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    ws = workbook.create_sheet(title)
+    ws.freeze_panes = 'A2'
+    cells = []
+    for text in header:
+        cell = WriteOnlyCell(ws, value=text)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    ws.append(cells)
+    return ws
+
+
+def export_xlsx(db, file_path: str, filters: Dict = None, statistics=None,
+                batch_size: int = EXPORT_BATCH,
+                progress: Callable[[int], None] = None) -> Dict[str, int]:
+    """
+    Esporta le schede fauna in una cartella Excel in modalità write-only
+
+    Le righe vengono scritte su disco man mano che i blocchi sono letti dal
+    database, quindi la cartella non è mai tenuta intera in memoria. Fogli:
+    'Schede' (colonne della Scheda FR), 'Specie PSI' e 'Misure' (collegati
+    tramite ID) e, se indicato un risultato delle statistiche, un foglio per
+    ogni sezione delle statistiche.
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        file_path: percorso del file .xlsx
+        filters: filtri sui record (come get_all_fauna_records)
+        statistics: StatisticsResult da aggiungere alla cartella (opzionale)
+        batch_size: record letti per blocco
+        progress: funzione chiamata con il numero di schede esportate dopo ogni blocco
+
+    Returns:
+        Dizionario {nome foglio: righe scritte} per i fogli dei record
+    """
+    _require_openpyxl()
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    schede = _xlsx_sheet(workbook, 'Schede', [label for _, label in SCHEDA_FR])
+    specie_psi = _xlsx_sheet(workbook, 'Specie PSI', ['ID', 'Riga', 'Specie', 'PSI'])
+    misure = _xlsx_sheet(workbook, 'Misure', ['ID', 'Riga', 'Elemento', 'Specie']
+                         + [f"{tipo} (mm)" for tipo in TIPI_MISURA])
+    counts = {'Schede': 0, 'Specie PSI': 0, 'Misure': 0}
+
+    for records in db.iter_fauna_records(filters, batch_size):
+        for record in records:
+            schede.append(_scheda_row(record))
+            for row in explode_specie_psi(record):
+                specie_psi.append([row['id_fauna'], row['riga'], row['specie'], row['psi']])
+                counts['Specie PSI'] += 1
+            for row in explode_misure(record):
+                misure.append([row['id_fauna'], row['riga'], row['elemento'], row['specie']]
+                              + [row[tipo] for tipo in TIPI_MISURA])
+                counts['Misure'] += 1
+        counts['Schede'] += len(records)
+        if progress:
+            progress(counts['Schede'])
+
+    if statistics is not None:
+        from fauna_statistics import add_xlsx_sheets
+        add_xlsx_sheets(workbook, statistics)
+
+    tmp_path = file_path + '.tmp'
+    try:
+        workbook.save(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, file_path)
+    return counts
+
+
+# ========== PARQUET ==========
+
+def _scheda_schema() -> 'pa.Schema':
+    """Schema Arrow delle schede: interi, booleani, testo e testo a dizionario"""
+    import pyarrow as pa
+
+    dizionario = pa.dictionary(pa.int32(), pa.string())
+    fields = []
+    for col in COLONNE_SCHEDA:
+        if col in COLONNE_INTERE:
+            fields.append(pa.field(col, pa.int64()))
+        elif col in COLONNE_BOOLEANE:
+            fields.append(pa.field(col, pa.bool_()))
+        elif col in COLONNE_DIZIONARIO:
+            fields.append(pa.field(col, dizionario))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def _specie_psi_schema() -> 'pa.Schema':
+    import pyarrow as pa
+
+    dizionario = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        pa.field('id_fauna', pa.int64()), pa.field('riga', pa.int32()),
+        pa.field('specie', dizionario), pa.field('psi', dizionario),
+    ])
+
+
+def _misure_schema() -> 'pa.Schema':
+    import pyarrow as pa
+
+    dizionario = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [pa.field('id_fauna', pa.int64()), pa.field('riga', pa.int32()),
+         pa.field('elemento', dizionario), pa.field('specie', dizionario)]
+        + [pa.field(tipo, pa.float64()) for tipo in TIPI_MISURA]
+    )
+
+
+def _to_int(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _to_bool(value) -> Optional[bool]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'si', 'sì')
+    return bool(value)
+
+
+def _to_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _schede_columns(records: List[Dict]) -> Dict[str, list]:
+    """Converte un blocco di record in colonne tipizzate"""
+    columns = {}
+    for col in COLONNE_SCHEDA:
+        values = [r.get(col) for r in records]
+        if col in COLONNE_INTERE:
+            columns[col] = [_to_int(v) for v in values]
+        elif col in COLONNE_BOOLEANE:
+            columns[col] = [_to_bool(v) for v in values]
+        else:
+            columns[col] = [_to_text(v) for v in values]
+    return columns
+
+
+def _rows_to_table(rows: List[Dict], schema: 'pa.Schema') -> 'pa.Table':
+    import pyarrow as pa
+
+    return pa.Table.from_pydict({name: [r.get(name) for r in rows] for name in schema.names}, schema=schema)
+
+
+def export_parquet(db, output_dir: str, filters: Dict = None, batch_size: int = EXPORT_BATCH,
+                   compression: str = 'zstd', prefix: str = 'fauna',
+                   progress: Callable[[int], None] = None) -> Dict[str, int]:
+    """
+    Esporta fauna_table in tre file Parquet: schede, coppie specie/PSI e misure
+
+    I file figli sono collegati alle schede tramite id_fauna. Ogni blocco
+    letto dal database diventa un row group; i file vengono scritti con un
+    nome temporaneo e rinominati solo a esportazione completata.
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        output_dir: cartella di destinazione
+        filters: filtri sui record (come get_all_fauna_records)
+        batch_size: record letti e scritti per blocco
+        compression: codec Parquet ('zstd', 'snappy', 'gzip', 'none')
+        prefix: prefisso dei nomi dei file
+        progress: funzione chiamata con il numero di schede esportate dopo ogni blocco
+
+    Returns:
+        Dizionario {percorso file: righe scritte}
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    outputs = [
+        (os.path.join(output_dir, f"{prefix}_schede.parquet"), _scheda_schema()),
+        (os.path.join(output_dir, f"{prefix}_specie_psi.parquet"), _specie_psi_schema()),
+        (os.path.join(output_dir, f"{prefix}_misure.parquet"), _misure_schema()),
+    ]
+    writers = [pq.ParquetWriter(path + '.tmp', schema, compression=compression) for path, schema in outputs]
+    counts = [0, 0, 0]
+
+    try:
+        for records in db.iter_fauna_records(filters, batch_size):
+            schede = pa.Table.from_pydict(_schede_columns(records), schema=outputs[0][1])
+            specie_psi = [row for r in records for row in explode_specie_psi(r)]
+            misure = [row for r in records for row in explode_misure(r)]
+
+            writers[0].write_table(schede)
+            if specie_psi:
+                writers[1].write_table(_rows_to_table(specie_psi, outputs[1][1]))
+            if misure:
+                writers[2].write_table(_rows_to_table(misure, outputs[2][1]))
+
+            counts[0] += len(records)
+            counts[1] += len(specie_psi)
+            counts[2] += len(misure)
+            if progress:
+                progress(counts[0])
+    except BaseException:
+        for writer, (path, _) in zip(writers, outputs):
+            writer.close()
+            os.remove(path + '.tmp')
+        raise
+
+    for writer, (path, _) in zip(writers, outputs):
+        writer.close()
+        os.replace(path + '.tmp', path)
+
+    return {path: n for (path, _), n in zip(outputs, counts)}
+
+
+# ========== RIGA DI COMANDO ==========
+
+def run_export(db, formato: str, output: str, filters: Dict = None, flatten: bool = False,
+               with_statistics: bool = False, modulo: bool = False,
+               batch_size: int = EXPORT_BATCH) -> Dict:
+    """
+    Esegue un'esportazione nel formato richiesto (usata da main e da fauna_cli)
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        formato: 'csv', 'xlsx', 'parquet' o 'pdf'
+        output: file o cartella di destinazione; per il PDF un .pdf/.zip produce
+            il catalogo, una cartella viene aggiornata in modo incrementale
+        filters: filtri sui campi di CAMPI_FILTRO
+        flatten: CSV con le colonne esplose
+        with_statistics: XLSX con i fogli delle statistiche dei record filtrati
+        modulo: PDF impaginato sul modulo ufficiale SCHEDA FR
+        batch_size: record letti per blocco
+
+    Returns:
+        Esito: {'schede': n} per CSV e catalogo PDF, {'fogli': {...}} per XLSX,
+        {'file': {...}} per Parquet, i conteggi di sync_pdf_directory per la cartella PDF
+    """
+    if formato == 'csv':
+        return {'schede': export_records_csv(db, output, filters, flatten=flatten, batch_size=batch_size)}
+    if formato == 'xlsx':
+        statistics = None
+        if with_statistics:
+            from fauna_statistics import compute_statistics
+            statistics = compute_statistics(db.get_all_fauna_records(filters or None))
+        return {'fogli': export_xlsx(db, output, filters, statistics, batch_size=batch_size)}
+    if formato == 'parquet':
+        return {'file': export_parquet(db, output, filters, batch_size=batch_size)}
+    if formato != 'pdf':
+        raise ValueError(f"Formato di esportazione non supportato: {formato}")
+    if output.lower().endswith(('.pdf', '.zip')):
+        from fauna_pdf import export_catalogue
+        return {'schede': export_catalogue(db, output, filters, modulo=modulo)}
+    from fauna_pdf import sync_pdf_directory
+    return sync_pdf_directory(db, output, filters, modulo=modulo)
+
+
+def main(argv: List[str] = None) -> int:
+    from fauna_db_wrapper import open_saved_fauna_db
+
+    parser = argparse.ArgumentParser(description="Esportazione delle schede fauna")
+    parser.add_argument('formato', choices=['csv', 'xlsx', 'parquet', 'pdf'], help="formato di esportazione")
+    parser.add_argument('output', help="file CSV/XLSX, cartella di destinazione Parquet oppure, per il PDF, "
+                             "catalogo .pdf/.zip o cartella da aggiornare in modo incrementale")
+    parser.add_argument('--db', help="database SQLite (predefinito: ultima configurazione salvata)")
+    parser.add_argument('--esplodi', action='store_true',
+                        help="CSV: sostituisce specie_psi e misure_ossa con colonne esplose")
+    parser.add_argument('--statistiche', action='store_true',
+                        help="XLSX: aggiunge i fogli delle statistiche (calcolate sui record filtrati)")
+    parser.add_argument('--modulo', action='store_true',
+                        help="PDF: impagina sul modulo ufficiale SCHEDA FR (più rapido)")
+    parser.add_argument('--blocco', type=int, default=EXPORT_BATCH, help="record letti per blocco")
+    for campo in CAMPI_FILTRO:
+        parser.add_argument(f"--{campo}", help=f"filtra per {campo}")
+    args = parser.parse_args(argv)
+
+    filters = {campo: getattr(args, campo) for campo in CAMPI_FILTRO if getattr(args, campo)}
+    db = open_saved_fauna_db(args.db)
+    try:
+        esito = run_export(db, args.formato, args.output, filters, flatten=args.esplodi,
+                           with_statistics=args.statistiche, modulo=args.modulo, batch_size=args.blocco)
+    except ImportError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    if 'fogli' in esito:
+        for foglio, n in esito['fogli'].items():
+            print(f"✓ {foglio}: {n} righe")
+        print(f"✓ Cartella salvata in: {args.output}")
+    elif 'file' in esito:
+        for path, n in esito['file'].items():
+            print(f"✓ {path}: {n} righe")
+    elif 'generate' in esito:
+        print(f"✓ Cartella {args.output}: {esito['generate']} schede generate, "
+              f"{esito['invariate']} invariate, {esito['eliminate']} PDF eliminati")
+    elif args.formato == 'pdf':
+        print(f"✓ Catalogo di {esito['schede']} schede salvato in: {args.output}")
+    else:
+        esportate = f"{esito['schede']} schede" if esito['schede'] is not None else "schede"
+        print(f"✓ Esportate {esportate} in: {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
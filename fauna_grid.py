@@ -0,0 +1,254 @@
+"""
+Elenco delle schede fauna in tabella
+Il modello legge dal database solo la lista ordinata degli id e poi, man mano
+che la tabella scorre, le righe di una pagina alla volta (fetchMore) con le sole
+colonne visualizzate. Ordinamento e filtro sono eseguiti dal database.
+"""
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
+    QTableView, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+from typing import Dict, List, Optional
+
+
+# Colonne dell'elenco: (campo, intestazione)
+COLONNE_ELENCO = [
+    ('id_fauna', "ID"),
+    ('sito', "Sito"),
+    ('area', "Area"),
+    ('saggio', "Saggio"),
+    ('us', "US"),
+    ('specie', "Specie"),
+    ('contesto', "Contesto"),
+    ('numero_minimo_individui', "NMI"),
+    ('data_compilazione', "Data"),
+    ('responsabile_scheda', "Responsabile"),
+]
+
+# Righe lette per ogni fetchMore
+PAGINA_ELENCO = 200
+
+# Attesa dopo l'ultima battitura prima di rieseguire il filtro (ms)
+RITARDO_FILTRO = 300
+
+
+class FaunaTableModel(QAbstractTableModel):
+    """Modello a pagine delle schede fauna, con ordinamento e filtro lato database"""
+
+    def __init__(self, db, columns: List[tuple] = None, page_size: int = PAGINA_ELENCO, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.columns = columns or COLONNE_ELENCO
+        self.page_size = page_size
+        self.filters = None
+        self.search_term = ''
+        self.order_by = None
+        self._ids = []
+        self._rows = []
+
+    # ----- interrogazione -----
+
+    def set_query(self, filters: Dict = None, search_term: str = None):
+        """Imposta filtri e testo cercato e rilegge gli id"""
+        self.filters = filters
+        if search_term is not None:
+            self.search_term = search_term
+        self.refresh()
+
+    def refresh(self):
+        """Rilegge la lista degli id (dopo salvataggi o eliminazioni) e scarta le righe lette"""
+        self.beginResetModel()
+        self._ids = self.db.get_fauna_ids(self.filters, self.order_by, self.search_term or None,
+                                          self._search_fields())
+        self._rows = []
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def _search_fields(self) -> List[str]:
+        return [campo for campo, _ in self.columns if campo != 'id_fauna']
+
+    def total(self) -> int:
+        """Numero di schede che soddisfano filtri e ricerca"""
+        return len(self._ids)
+
+    def id_at(self, row: int) -> Optional[int]:
+        return self._rows[row][0] if 0 <= row < len(self._rows) else None
+
+    def row_of(self, id_fauna: int) -> int:
+        """Riga già caricata della scheda indicata, -1 se non c'è"""
+        for row, values in enumerate(self._rows):
+            if values[0] == id_fauna:
+                return row
+        return -1
+
+    def update_record(self, id_fauna: int):
+        """
+        Riallinea una sola scheda dopo un salvataggio: rilegge la riga se è già
+        caricata, oppure aggiunge in fondo l'id di una scheda nuova
+        """
+        row = self.row_of(id_fauna)
+        if row >= 0:
+            campi = [campo for campo, _ in self.columns]
+            rows = self.db.get_fauna_rows([id_fauna], campi)
+            if not rows:
+                self.remove_record(id_fauna)
+                return
+            self._rows[row] = tuple(rows[0].get(c) for c in campi)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+        elif id_fauna not in self._ids:
+            self._ids.append(id_fauna)
+            if self.canFetchMore(QModelIndex()) and len(self._ids) - len(self._rows) == 1:
+                self.fetchMore(QModelIndex())
+
+    def remove_record(self, id_fauna: int):
+        """Toglie una scheda eliminata senza rileggere l'elenco"""
+        row = self.row_of(id_fauna)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self._ids.remove(id_fauna)
+            self.endRemoveRows()
+        elif id_fauna in self._ids:
+            self._ids.remove(id_fauna)
+
+    # ----- QAbstractTableModel -----
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        value = self._rows[index.row()][index.column()]
+        return '' if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][1]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and len(self._rows) < len(self._ids)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Legge la pagina successiva con le sole colonne visualizzate"""
+        start = len(self._rows)
+        ids = self._ids[start:start + self.page_size]
+        campi = [campo for campo, _ in self.columns]
+        rows = [tuple(r.get(c) for c in campi) for r in self.db.get_fauna_rows(ids, campi)]
+        # Schede eliminate nel frattempo: restano fuori senza spostare le pagine successive
+        if len(rows) < len(ids):
+            presenti = {r[0] for r in rows}
+            self._ids[start:start + len(ids)] = [i for i in ids if i in presenti]
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        if column < 0:
+            # Nessuna colonna scelta: ordinamento standard del database
+            if self.order_by is None:
+                return
+            self.order_by = None
+        else:
+            direzione = 'DESC' if order == Qt.DescendingOrder else 'ASC'
+            campo = self.columns[column][0]
+            self.order_by = f"{campo} {direzione}" + ("" if campo == 'id_fauna' else f", id_fauna {direzione}")
+        self.refresh()
+
+
+class FaunaGridWidget(QWidget):
+    """Tabella delle schede con campo di filtro; il clic apre la scheda nel form"""
+
+    record_selected = pyqtSignal(int)   # clic su una riga: id_fauna
+    record_activated = pyqtSignal(int)  # doppio clic o Invio: id_fauna
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.model = FaunaTableModel(db, parent=self)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(RITARDO_FILTRO)
+        self._filter_timer.timeout.connect(self.apply_filter)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Filtra:"))
+        self.txt_filter = QLineEdit()
+        self.txt_filter.setPlaceholderText("Testo in sito, area, US, specie, contesto...")
+        self.txt_filter.setClearButtonEnabled(True)
+        self.txt_filter.textChanged.connect(lambda _: self._filter_timer.start())
+        self.txt_filter.returnPressed.connect(self.apply_filter)
+        filter_layout.addWidget(self.txt_filter)
+        self.btn_refresh = QPushButton("🔄 Aggiorna")
+        self.btn_refresh.clicked.connect(self.refresh)
+        filter_layout.addWidget(self.btn_refresh)
+        layout.addLayout(filter_layout)
+
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setAlternatingRowColors(True)
+        self.view.setWordWrap(False)
+        # Altezza fissa delle righe: lo scorrimento non misura il contenuto
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(self.view.fontMetrics().height() + 8)
+        self.view.verticalHeader().hide()
+        header = self.view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setStretchLastSection(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.view.setSortingEnabled(True)
+        self.view.clicked.connect(lambda index: self._emit(self.record_selected, index))
+        self.view.activated.connect(lambda index: self._emit(self.record_activated, index))
+        layout.addWidget(self.view)
+
+        self.lbl_status = QLabel()
+        layout.addWidget(self.lbl_status)
+        self.model.modelReset.connect(self.update_status)
+        self.model.rowsInserted.connect(self.update_status)
+        self.model.rowsRemoved.connect(self.update_status)
+
+    def _emit(self, signal, index):
+        id_fauna = self.model.id_at(index.row())
+        if id_fauna is not None:
+            signal.emit(id_fauna)
+
+    def apply_filter(self):
+        self._filter_timer.stop()
+        self.model.set_query(self.model.filters, self.txt_filter.text().strip())
+
+    def set_filters(self, filters: Dict = None):
+        """Applica i filtri della ricerca avanzata (in aggiunta al testo del filtro)"""
+        self.model.set_query(filters, self.txt_filter.text().strip())
+
+    def refresh(self):
+        self.model.refresh()
+
+    def select_record(self, id_fauna: int):
+        """Evidenzia la scheda se è tra le righe già caricate"""
+        row = self.model.row_of(id_fauna)
+        if row >= 0:
+            self.view.selectRow(row)
+            self.view.scrollTo(self.model.index(row, 0))
+
+    def update_status(self, *args):
+        totale = self.model.total()
+        caricate = self.model.rowCount()
+        testo = f"{totale} schede"
+        if caricate < totale:
+            testo += f" (caricate {caricate})"
+        self.lbl_status.setText(testo)
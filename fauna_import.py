@@ -0,0 +1,538 @@
+"""
+Importazione in blocco delle schede fauna da fogli XLSX e file CSV
+Le colonne vengono riconosciute dalle etichette della Scheda FR
+(Scheda FR_faune.xlsx) o dai nomi dei campi di fauna_table; le righe sono
+validate (US, vocabolari, tipi) e quelle valide inserite a blocchi.
+Non dipende da Qt; si può usare anche da riga di comando:
+
+    python fauna_import.py schede_campo.xlsx --dry-run
+    python fauna_import.py schede_campo.csv --db /percorso/pyarchinit_db.sqlite
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from fauna_export import (
+    COLONNE_SCHEDA, COLONNE_JSON, COLONNE_SPECIE_PSI, COLONNE_MISURE, SCHEDA_FR, TIPI_MISURA,
+    SEPARATORE_VALORI
+)
+
+
+# Record inseriti per transazione
+IMPORT_BATCH = 1000
+
+# Righe validate da ciascun task del pool
+BLOCCO_VALIDAZIONE = 1000
+
+# Sotto questa soglia la validazione è seriale (l'avvio del pool costa più del lavoro)
+PARALLELO_MIN_RIGHE = 5000
+
+# Campi inseriti, nell'ordine di fauna_table (id_fauna è generato dal database)
+CAMPI_IMPORT = [c for c in COLONNE_SCHEDA if c != 'id_fauna'] + COLONNE_JSON
+
+# Campi a vocabolario controllato (stesso nome in fauna_table e in fauna_voc)
+CAMPI_VOCABOLARIO = [
+    'metodologia_recupero', 'contesto', 'resti_connessione_anatomica', 'tipologia_accumulo',
+    'deposizione', 'numero_stimato_resti', 'specie', 'parti_scheletriche', 'stato_frammentazione',
+    'tracce_combustione', 'tipo_combustione', 'segni_tafonomici_evidenti',
+    'caratterizzazione_segni_tafonomici', 'stato_conservazione',
+]
+
+# Campi di fauna_voc caricati per la validazione (compresi quelli delle righe JSON)
+CAMPI_VOC = CAMPI_VOCABOLARIO + ['elemento_anatomico']
+
+# Campi convertiti a parte (tipi, US e JSON); gli altri sono testo
+_CAMPI_CONVERTITI = {'id_us', 'numero_minimo_individui', 'data_compilazione',
+                     'combustione_altri_materiali_us'} | set(COLONNE_JSON)
+
+VALORI_VERO = {'1', 'SI', 'SÌ', 'S', 'TRUE', 'VERO', 'X'}
+VALORI_FALSO = {'0', 'NO', 'N', 'FALSE', 'FALSO'}
+
+
+def _require_openpyxl():
+    """Solleva ImportError se openpyxl non è disponibile (importato solo per i file Excel)"""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "Il modulo openpyxl è richiesto per importare file Excel.\n"
+            "Installare con: pip install openpyxl"
+        ) from None
+
+
+def _norm(value) -> str:
+    """Forma di confronto: maiuscolo, spazi compattati, trattini tipografici uniformati"""
+    text = str(value).replace('\xa0', ' ').replace('–', '-').replace('—', '-')
+    return re.sub(r'\s+', ' ', text).strip().upper()
+
+
+@dataclass
+class ImportReport:
+    """Esito di un'importazione (o di una prova con dry_run)"""
+    file: str
+    righe_lette: int = 0
+    valide: int = 0
+    inserite: int = 0
+    errori: List[Tuple[int, str]] = field(default_factory=list)
+    avvisi: List[Tuple[int, str]] = field(default_factory=list)
+    colonne_ignorate: List[str] = field(default_factory=list)
+    dry_run: bool = False
+    secondi: float = 0.0
+
+    @property
+    def righe_con_errori(self) -> int:
+        return len({riga for riga, _ in self.errori})
+
+
+# ========== LETTURA ==========
+
+# Intestazioni riconosciute: etichette della Scheda FR e nomi dei campi
+_INTESTAZIONI = {_norm(label): campo for campo, label in SCHEDA_FR}
+_INTESTAZIONI.update({_norm(campo): campo for campo in CAMPI_IMPORT + COLONNE_SPECIE_PSI + COLONNE_MISURE})
+_INTESTAZIONI.update({_norm(alias): campo for alias, campo in (
+    ('MISURE DI OSSA DI CUI DI PREVEDE LA DISGREGAZIONE DOPO LA RIMOZIONE', 'misure_ossa'),
+    ('MISURE DI OSSA', 'misure_ossa'),
+    ('MISURE OSSA', 'misure_ossa'),
+    ('SPECIE E PSI', 'specie_psi'),
+    ('SPECIE PSI', 'specie_psi'),
+    ('id_fauna', 'id_fauna'),
+)})
+
+
+def map_header(header: list) -> Tuple[List[Optional[str]], List[str]]:
+    """
+    Associa le colonne di un'intestazione ai campi di fauna_table
+
+    Returns:
+        (campo o None per ogni colonna, intestazioni non riconosciute)
+    """
+    campi, ignorate = [], []
+    for cell in header:
+        campo = _INTESTAZIONI.get(_norm(cell)) if cell not in (None, '') else None
+        if campo == 'id_fauna':
+            campo = None  # i nuovi record ricevono un nuovo ID
+        elif campo is None and cell not in (None, ''):
+            ignorate.append(str(cell).strip())
+        campi.append(campo)
+    return campi, ignorate
+
+
+def _iter_xlsx(file_path: str, sheet: str = None):
+    _require_openpyxl()
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if sheet:
+            ws = workbook[sheet]
+        elif 'Schede' in workbook.sheetnames:
+            ws = workbook['Schede']
+        else:
+            ws = workbook.worksheets[0]
+        for values in ws.iter_rows(values_only=True):
+            yield list(values)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(file_path: str):
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        campione = f.read(8192)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(campione, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def read_rows(file_path: str, sheet: str = None) -> Tuple[List[Tuple[int, Dict]], List[str]]:
+    """
+    Legge un file XLSX (in streaming, sola lettura) o CSV
+
+    La prima riga non vuota è l'intestazione; le righe vuote sono saltate.
+    Da un export XLSX viene letto il foglio 'Schede'.
+
+    Args:
+        file_path: percorso del file .xlsx o .csv
+        sheet: foglio XLSX da leggere (predefinito: 'Schede' o il primo)
+
+    Returns:
+        ([(numero di riga nel file, {campo: valore})], intestazioni ignorate)
+
+    Raises:
+        ValueError: se nessuna colonna dell'intestazione è riconosciuta
+    """
+    righe = _iter_xlsx(file_path, sheet) if file_path.lower().endswith(('.xlsx', '.xlsm')) else _iter_csv(file_path)
+
+    campi, ignorate, rows = None, [], []
+    for numero, values in enumerate(righe, start=1):
+        if not any(v not in (None, '') for v in values):
+            continue
+        if campi is None:
+            campi, ignorate = map_header(values)
+            if not any(campi):
+                raise ValueError(
+                    f"Intestazione non riconosciuta alla riga {numero}: usare le etichette "
+                    f"della Scheda FR o i nomi dei campi di fauna_table"
+                )
+            continue
+        rows.append((numero, {c: v for c, v in zip(campi, values) if c and v not in (None, '')}))
+
+    return rows, ignorate
+
+
+# ========== VALIDAZIONE ==========
+
+def load_vocabulary(db) -> Dict[str, Dict[str, str]]:
+    """Vocabolari di fauna_voc come {campo: {forma normalizzata: valore}}"""
+    return {campo: {_norm(v): v for v in db.get_voc_values(campo)} for campo in CAMPI_VOC}
+
+
+def build_us_lookup(db) -> Dict:
+    """
+    Tabella di ricerca delle US di us_table
+
+    Chiavi: id_us, (sito, area, us) e (sito, None, us), quest'ultima solo se
+    la US è unica nel sito (altrimenti None, per segnalare l'ambiguità).
+    """
+    lookup = {}
+    for us in db.get_us_list():
+        dati = {k: us.get(k) for k in ('id_us', 'sito', 'area', 'us', 'saggio', 'datazione')}
+        lookup[us['id_us']] = dati
+        sito, area, numero = _norm(us.get('sito') or ''), _norm(us.get('area') or ''), _norm(us.get('us') or '')
+        lookup[(sito, area, numero)] = dati
+        chiave = (sito, None, numero)
+        lookup[chiave] = None if chiave in lookup else dati
+    return lookup
+
+
+def _text(value) -> str:
+    """Testo di una cella (i numeri interi di Excel perdono il '.0')"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return str(value).strip()
+
+
+def _number(value) -> Optional[str]:
+    """Misura come testo numerico ('' se vuota, None se non valida); accetta la virgola decimale"""
+    text = _text(value).replace(',', '.')
+    if not text:
+        return ''
+    try:
+        float(text)
+    except ValueError:
+        return None
+    return text
+
+
+def _parse_date(value) -> Optional[str]:
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    text = _text(value)
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(text[:10], fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _json_rows(value, campo: str, errori: List[str]) -> list:
+    """Righe di un campo JSON (lista di liste); errore se il contenuto non è valido"""
+    if isinstance(value, list):
+        return value
+    try:
+        data = json.loads(value)
+    except (ValueError, TypeError):
+        data = None
+    if not isinstance(data, list) or not all(isinstance(r, list) for r in data):
+        errori.append(f"{campo}: JSON non valido (atteso [[...], ...])")
+        return []
+    return data
+
+
+def _split_flat(row: Dict, colonne: List[str]) -> list:
+    """Ricompone righe JSON dalle colonne esplose (valori separati da SEPARATORE_VALORI)"""
+    parti = [_text(row.get(c, '')).split(SEPARATORE_VALORI.strip()) for c in colonne]
+    n = max(len(p) for p in parti)
+    return [[(p[i].strip() if i < len(p) else '') for p in parti] for i in range(n)
+            if any(i < len(p) and p[i].strip() for p in parti)]
+
+
+def validate_row(row: Dict, vocabolario: Dict[str, Dict[str, str]], us_lookup: Dict,
+                 valori_liberi: bool = False) -> Tuple[Optional[Dict], List[str], List[str]]:
+    """
+    Valida una riga letta dal file e la converte in record di fauna_table
+
+    I valori a vocabolario sono ricondotti alla grafia di fauna_voc (senza
+    distinzione tra maiuscole e minuscole); sito, area, saggio e datazione
+    mancanti sono presi dalla US di us_table.
+
+    Args:
+        row: {campo: valore} come prodotto da read_rows
+        vocabolario: risultato di load_vocabulary
+        us_lookup: risultato di build_us_lookup
+        valori_liberi: i valori fuori vocabolario sono avvisi invece che errori
+
+    Returns:
+        (record con tutti i CAMPI_IMPORT o None se ci sono errori, errori, avvisi)
+    """
+    errori, avvisi = [], []
+    record = {campo: '' for campo in CAMPI_IMPORT}
+    record['numero_minimo_individui'] = 0
+    record['combustione_altri_materiali_us'] = False
+
+    for campo in CAMPI_IMPORT:
+        if campo in row and campo not in _CAMPI_CONVERTITI:
+            record[campo] = _text(row[campo])
+
+    def voc(campo_voc: str, value: str, etichetta: str) -> str:
+        if not value:
+            return value
+        valori = vocabolario.get(campo_voc)
+        if not valori:
+            return value  # campo senza vocabolario definito
+        canonico = valori.get(_norm(value))
+        if canonico is not None:
+            return canonico
+        messaggio = f"{etichetta}: '{value}' non presente nel vocabolario"
+        (avvisi if valori_liberi else errori).append(messaggio)
+        return value
+
+    # US: per id_us oppure per sito/area/us
+    us = None
+    if row.get('id_us') not in (None, ''):
+        try:
+            us = us_lookup.get(int(float(row['id_us'])))
+        except (ValueError, TypeError):
+            pass
+        if us is None:
+            errori.append(f"id_us: '{_text(row['id_us'])}' non trovato in us_table")
+    elif not record['sito'] or not record['us']:
+        errori.append("sito e us obbligatori (oppure id_us)")
+    else:
+        sito, numero = _norm(record['sito']), _norm(record['us'])
+        chiave = (sito, _norm(record['area']) if record['area'] else None, numero)
+        us = us_lookup.get(chiave)
+        if us is None:
+            motivo = "ambigua, indicare l'area" if chiave in us_lookup else "non trovata in us_table"
+            errori.append(f"US {record['sito']} / {record['area'] or '-'} / {record['us']}: {motivo}")
+    if us is not None:
+        # Identificativi con la grafia di us_table; saggio e datazione solo se mancanti
+        record['id_us'] = us['id_us']
+        record['sito'], record['area'], record['us'] = us['sito'] or '', us['area'] or '', us['us'] or ''
+        for campo, campo_us in (('saggio', 'saggio'), ('datazione_us', 'datazione')):
+            if not record[campo]:
+                record[campo] = us.get(campo_us) or ''
+    else:
+        record['id_us'] = None
+
+    # Tipi
+    if row.get('numero_minimo_individui') not in (None, ''):
+        try:
+            nmi = float(_text(row['numero_minimo_individui']).replace(',', '.'))
+            if nmi < 0 or not nmi.is_integer():
+                raise ValueError
+            record['numero_minimo_individui'] = int(nmi)
+        except ValueError:
+            errori.append(f"numero_minimo_individui: '{_text(row['numero_minimo_individui'])}' non è un intero >= 0")
+
+    if row.get('data_compilazione') not in (None, ''):
+        data = _parse_date(row['data_compilazione'])
+        if data is None:
+            errori.append(f"data_compilazione: '{_text(row['data_compilazione'])}' non è una data valida")
+        record['data_compilazione'] = data
+    else:
+        record['data_compilazione'] = None
+
+    value = row.get('combustione_altri_materiali_us')
+    if value not in (None, ''):
+        if isinstance(value, bool):
+            record['combustione_altri_materiali_us'] = value
+        elif _norm(_text(value)) in VALORI_VERO:
+            record['combustione_altri_materiali_us'] = True
+        elif _norm(_text(value)) not in VALORI_FALSO:
+            errori.append(f"combustione_altri_materiali_us: '{_text(value)}' non è SI/NO")
+
+    # Vocabolari (lo stato di conservazione accetta anche la forma '3 - Discreto' del form)
+    record['stato_conservazione'] = record['stato_conservazione'].split(' -')[0].strip()
+    for campo in CAMPI_VOCABOLARIO:
+        if campo == 'numero_stimato_resti' and record[campo].isdigit():
+            continue  # la scheda ammette anche il numero esatto
+        record[campo] = voc(campo, record[campo], campo)
+
+    # Specie e PSI: JSON, colonne esplose o coppia specie / parti scheletriche
+    if row.get('specie_psi') not in (None, ''):
+        coppie = _json_rows(row['specie_psi'], 'specie_psi', errori)
+    elif any(c in row for c in COLONNE_SPECIE_PSI):
+        coppie = _split_flat(row, COLONNE_SPECIE_PSI)
+    elif record['specie'] or record['parti_scheletriche']:
+        coppie = [[record['specie'], record['parti_scheletriche']]]
+    else:
+        coppie = []
+    coppie = [[voc('specie', _text(c[0]) if len(c) > 0 else '', 'specie_psi (specie)'),
+               voc('parti_scheletriche', _text(c[1]) if len(c) > 1 else '', 'specie_psi (PSI)')]
+              for c in coppie]
+    coppie = [c for c in coppie if c[0] or c[1]]
+    record['specie_psi'] = json.dumps(coppie, ensure_ascii=False) if coppie else ''
+    if coppie:
+        record['specie'], record['parti_scheletriche'] = coppie[0]
+
+    # Misure: JSON o colonne esplose, valori numerici (anche con la virgola)
+    if row.get('misure_ossa') not in (None, ''):
+        misure = _json_rows(row['misure_ossa'], 'misure_ossa', errori)
+    elif any(c in row for c in COLONNE_MISURE):
+        misure = _split_flat(row, COLONNE_MISURE)
+    else:
+        misure = []
+    righe_misure = []
+    for i, m in enumerate(misure, start=1):
+        m = list(m) + [''] * (6 - len(m))
+        valori = [_number(v) for v in m[2:6]]
+        for tipo, v, originale in zip(TIPI_MISURA, valori, m[2:6]):
+            if v is None:
+                errori.append(f"misure_ossa riga {i}: {tipo} '{_text(originale)}' non è un numero")
+        riga = [voc('elemento_anatomico', _text(m[0]), f"misure_ossa riga {i} (elemento)"),
+                voc('specie', _text(m[1]), f"misure_ossa riga {i} (specie)")] + [v or '' for v in valori]
+        if any(riga):
+            righe_misure.append(riga)
+    record['misure_ossa'] = json.dumps(righe_misure, ensure_ascii=False) if righe_misure else ''
+
+    return (None if errori else record), errori, avvisi
+
+
+def _validate_chunk(task: tuple) -> List[Tuple[int, Optional[Dict], List[str], List[str]]]:
+    """Worker: valida un blocco di righe [(numero riga, row)]"""
+    rows, vocabolario, us_lookup, valori_liberi = task
+    return [(numero,) + validate_row(row, vocabolario, us_lookup, valori_liberi) for numero, row in rows]
+
+
+def validate_rows(rows: List[Tuple[int, Dict]], vocabolario: Dict, us_lookup: Dict,
+                  valori_liberi: bool = False, max_workers: Optional[int] = None) -> list:
+    """
+    Valida le righe, in un pool di processi se sono almeno PARALLELO_MIN_RIGHE
+
+    Returns:
+        [(numero riga, record o None, errori, avvisi)] nell'ordine del file
+    """
+    from fauna_analytics import run_parallel
+
+    if len(rows) < PARALLELO_MIN_RIGHE:
+        max_workers = 1
+    tasks = [(rows[i:i + BLOCCO_VALIDAZIONE], vocabolario, us_lookup, valori_liberi)
+             for i in range(0, len(rows), BLOCCO_VALIDAZIONE)]
+    return [r for chunk in run_parallel(_validate_chunk, tasks, max_workers) for r in chunk]
+
+
+# ========== IMPORTAZIONE ==========
+
+def import_file(db, file_path: str, sheet: str = None, dry_run: bool = False,
+                valori_liberi: bool = False, batch_size: int = IMPORT_BATCH,
+                max_workers: Optional[int] = None) -> ImportReport:
+    """
+    Importa le schede di un file XLSX o CSV in fauna_table
+
+    Le righe con errori sono saltate e riportate nel report; le altre sono
+    inserite con una transazione ogni batch_size record.
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        file_path: file .xlsx o .csv
+        sheet: foglio XLSX da leggere
+        dry_run: valida senza inserire nulla
+        valori_liberi: accetta valori fuori vocabolario (riportati come avvisi)
+        batch_size: record per transazione
+        max_workers: processi per la validazione (None = numero di CPU, 1 = seriale)
+
+    Returns:
+        ImportReport con conteggi, errori e avvisi per riga
+    """
+    inizio = time.perf_counter()
+    report = ImportReport(file=file_path, dry_run=dry_run)
+
+    rows, report.colonne_ignorate = read_rows(file_path, sheet)
+    report.righe_lette = len(rows)
+
+    risultati = validate_rows(rows, load_vocabulary(db), build_us_lookup(db), valori_liberi, max_workers)
+    validi = []
+    for numero, record, errori, avvisi in risultati:
+        report.errori.extend((numero, e) for e in errori)
+        report.avvisi.extend((numero, a) for a in avvisi)
+        if record is not None:
+            validi.append(record)
+    report.valide = len(validi)
+
+    if not dry_run:
+        report.inserite = db.insert_fauna_records(validi, batch_size)
+
+    report.secondi = time.perf_counter() - inizio
+    return report
+
+
+def format_report(report: ImportReport, max_righe: Optional[int] = None) -> List[str]:
+    """Righe di testo del report di importazione, con gli errori riga per riga"""
+    lines = [
+        f"Importazione {'(prova, nessun record inserito) ' if report.dry_run else ''}da: {report.file}",
+        f"Righe lette: {report.righe_lette}",
+        f"Righe valide: {report.valide}",
+        f"Righe con errori: {report.righe_con_errori}",
+    ]
+    if not report.dry_run:
+        lines.append(f"Schede inserite: {report.inserite}")
+    lines.append(f"Tempo: {report.secondi:.2f} s")
+    if report.colonne_ignorate:
+        lines.append(f"Colonne ignorate: {', '.join(report.colonne_ignorate)}")
+
+    for titolo, voci in (("ERRORI", report.errori), ("AVVISI", report.avvisi)):
+        if voci:
+            lines.append("")
+            lines.append(f"{titolo}:")
+            for numero, messaggio in voci[:max_righe]:
+                lines.append(f"  Riga {numero}: {messaggio}")
+            if max_righe is not None and len(voci) > max_righe:
+                lines.append(f"  ... altri {len(voci) - max_righe}")
+    return lines
+
+
+# ========== RIGA DI COMANDO ==========
+
+def main(argv: List[str] = None) -> int:
+    from fauna_db_wrapper import open_saved_fauna_db
+
+    parser = argparse.ArgumentParser(description="Importazione in blocco delle schede fauna da XLSX o CSV")
+    parser.add_argument('file', help="file .xlsx o .csv con una scheda per riga")
+    parser.add_argument('--db', help="database SQLite (predefinito: ultima configurazione salvata)")
+    parser.add_argument('--foglio', help="foglio XLSX da leggere (predefinito: 'Schede' o il primo)")
+    parser.add_argument('--dry-run', action='store_true', help="valida senza inserire")
+    parser.add_argument('--valori-liberi', action='store_true',
+                        help="accetta valori fuori vocabolario (come avvisi)")
+    parser.add_argument('--blocco', type=int, default=IMPORT_BATCH, help="record per transazione")
+    parser.add_argument('--processi', type=int, default=None, help="processi per la validazione")
+    args = parser.parse_args(argv)
+
+    db = open_saved_fauna_db(args.db)
+    try:
+        report = import_file(db, args.file, args.foglio, args.dry_run, args.valori_liberi,
+                             args.blocco, args.processi)
+    except (ImportError, ValueError, KeyError, OSError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    print("\n".join(format_report(report)))
+    return 1 if report.errori else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,14 +10,105 @@ from PyQt5.QtWidgets import (
     QDialog, QFormLayout, QDialogButtonBox, QHeaderView, QAction,
     QGroupBox, QGridLayout, QSplitter, QSizePolicy
 )
-from PyQt5.QtCore import Qt, QDate, pyqtSignal
+from PyQt5.QtCore import Qt, QDate, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 from typing import Dict, List, Optional
 from datetime import datetime
 import os
+import time
 
+from fauna_db import COLONNE_RIEPILOGO
 from fauna_db_wrapper import create_fauna_db
-from database_selector import DatabaseSelectorDialog
+from fauna_records import (
+    safe_float, extract_species, extract_measurements, extract_psi,
+    extract_specie_psi_pairs, extract_detailed_measurements
+)
+
+
+# Righe di riepilogo (COLONNE_RIEPILOGO) lette per pagina: la prima è visualizzata
+# subito, le altre sono caricate quando l'interfaccia è libera
+PAGINA_RECORD = 500
+
+# Tab del form: (chiave, titolo); sono costruiti alla prima apertura
+TAB_MODULO = [
+    ('identificativi', "Dati Identificativi"),
+    ('archeozoologici', "Dati Archeozoologici"),
+    ('tafonomici', "Dati Tafonomici"),
+    ('contestuali', "Dati Contestuali"),
+]
+
+# Tab che non fanno parte del form, anch'essi costruiti alla prima apertura
+TAB_ALTRI = [
+    ('elenco', "📋 Elenco"),
+    ('statistiche', "📊 Statistiche"),
+]
+
+# Combo dei vocabolari per tab: (attributo, campo di fauna_voc)
+COMBO_VOCABOLARIO = {
+    'identificativi': [
+        ('combo_metodologia', 'metodologia_recupero'),
+        ('combo_contesto', 'contesto'),
+    ],
+    'archeozoologici': [
+        ('combo_connessione', 'resti_connessione_anatomica'),
+        ('combo_tipologia_accumulo', 'tipologia_accumulo'),
+        ('combo_deposizione', 'deposizione'),
+        ('combo_num_stimato', 'numero_stimato_resti'),
+    ],
+    'tafonomici': [
+        ('combo_frammentazione', 'stato_frammentazione'),
+        ('combo_tracce_combustione', 'tracce_combustione'),
+        ('combo_tipo_combustione', 'tipo_combustione'),
+        ('combo_segni_tafonomici', 'segni_tafonomici_evidenti'),
+        ('combo_caratterizzazione_tafonomici', 'caratterizzazione_segni_tafonomici'),
+    ],
+}
+
+# Campi dei tab non ancora costruiti, con il valore che avrebbe il widget vuoto:
+# finché il tab non è aperto il salvataggio riporta i valori del record corrente
+CAMPI_TAB = {
+    'archeozoologici': {
+        'resti_connessione_anatomica': '', 'tipologia_accumulo': '', 'deposizione': '',
+        'numero_stimato_resti': '', 'numero_minimo_individui': 0, 'specie_psi': '',
+        'specie': '', 'parti_scheletriche': '', 'misure_ossa': '',
+    },
+    'tafonomici': {
+        'stato_frammentazione': '', 'tracce_combustione': '', 'combustione_altri_materiali_us': 0,
+        'tipo_combustione': '', 'segni_tafonomici_evidenti': '',
+        'caratterizzazione_segni_tafonomici': '', 'stato_conservazione': '',
+        'alterazioni_morfologiche': '',
+    },
+    'contestuali': {
+        'note_terreno_giacitura': '', 'campionature_effettuate': '', 'affidabilita_stratigrafica': '',
+        'classi_reperti_associazione': '', 'osservazioni': '', 'interpretazione': '',
+    },
+}
+
+
+class StartupProfile:
+    """Tempi delle fasi di avvio, stampati con l'opzione --profile-startup"""
+
+    def __init__(self, inizio: float = None):
+        """
+        Args:
+            inizio: istante di partenza (time.perf_counter); predefinito: ora
+        """
+        self.inizio = time.perf_counter() if inizio is None else inizio
+        self.fasi = []
+
+    def mark(self, fase: str, istante: float = None):
+        """Registra la fine di una fase"""
+        self.fasi.append((fase, time.perf_counter() if istante is None else istante))
+
+    def report(self) -> List[str]:
+        """Righe con la durata di ogni fase e il tempo cumulato dall'avvio"""
+        lines = ["⏱ Tempi di avvio"]
+        precedente = self.inizio
+        for fase, istante in self.fasi:
+            lines.append(f"  {fase:<36} {(istante - precedente) * 1000:8.1f} ms"
+                         f"   (cumulato {(istante - self.inizio) * 1000:8.1f} ms)")
+            precedente = istante
+        return lines
 
 
 class FaunaSearchDialog(QDialog):
@@ -187,15 +278,51 @@ class FaunaManager(QWidget):
 
     record_changed = pyqtSignal(int)  # Emesso quando cambia il record corrente
 
-    def __init__(self, db_path: str = None, db_config: Dict = None, parent=None):
+    def __init__(self, db_path: str = None, db_config: Dict = None, parent=None,
+                 profile: StartupProfile = None, max_workers: Optional[int] = 1):
         super().__init__(parent)
+        self.profile = profile
+        # Processi per calcoli ed esportazioni: seriale salvo richiesta esplicita, perché
+        # dentro QGIS i worker avvierebbero l'applicazione invece dell'interprete
+        self.max_workers = max_workers
         self.db = create_fauna_db(db_path, db_config)
+        self._mark("connessione database")
         self.current_record_id = None
         self.records = []
         self.current_index = -1
+        self.current_filters = None
+
+        # Record visualizzato, usato dai tab costruiti dopo e per i campi dei tab mai aperti
+        self._form_record = {}
+        # Valori del form subito dopo display_record: il salvataggio invia solo quelli cambiati
+        self._form_baseline = {}
+        self._built_tabs = set()
+        self._voc_cache = {}
+
+        # Pagine di record ancora da leggere (generatore di iter_fauna_pages)
+        self._record_pages = None
+        # Schede nuove già aggiunte a self.records, da saltare nelle pagine successive
+        self._added_ids = set()
+        self._page_timer = QTimer(self)
+        self._page_timer.setSingleShot(True)
+        self._page_timer.timeout.connect(self._load_next_page)
+
+        # Statistiche: calcolate solo su richiesta dal tab Statistiche
+        self.current_stats = None
+        self.current_stats_text = []
+        self.stats_cache = None
+        self.current_biodiversity = None
+        self.current_contingency = None
+        self.current_sketch = None
 
+        # Il tab iniziale popola già vocabolari e US: qui basta leggere i record
         self.setup_ui()
-        self.load_records()
+        self._mark("interfaccia (tab iniziale)")
+        self._show_pages(self.db.iter_fauna_pages(None, PAGINA_RECORD, columns=COLONNE_RIEPILOGO))
+
+    def _mark(self, fase: str):
+        if self.profile is not None:
+            self.profile.mark(fase)
 
     def setup_ui(self):
         """Configura l'interfaccia utente"""
@@ -217,31 +344,39 @@ class FaunaManager(QWidget):
         info_layout.addStretch()
         main_layout.addLayout(info_layout)
 
-        # Tab widget per organizzare i campi
+        # Tab widget per organizzare i campi: ogni tab è una pagina vuota
+        # riempita dal suo create_tab_* alla prima apertura
         self.tab_widget = QTabWidget()
-
-        # Tab 1: Dati Identificativi e Deposizionali
-        self.tab_identificativi = self.create_tab_identificativi()
-        self.tab_widget.addTab(self.tab_identificativi, "Dati Identificativi")
-
-        # Tab 2: Dati Archeozoologici
-        self.tab_archeozoologici = self.create_tab_archeozoologici()
-        self.tab_widget.addTab(self.tab_archeozoologici, "Dati Archeozoologici")
-
-        # Tab 3: Dati Tafonomici
-        self.tab_tafonomici = self.create_tab_tafonomici()
-        self.tab_widget.addTab(self.tab_tafonomici, "Dati Tafonomici")
-
-        # Tab 4: Dati Contestuali
-        self.tab_contestuali = self.create_tab_contestuali()
-        self.tab_widget.addTab(self.tab_contestuali, "Dati Contestuali")
-
-        # Tab 5: Statistiche
-        self.tab_statistiche = self.create_tab_statistiche()
-        self.tab_widget.addTab(self.tab_statistiche, "📊 Statistiche")
+        self._tab_pages = {}
+        for chiave, titolo in TAB_MODULO + TAB_ALTRI:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tab_widget.addTab(page, titolo)
+            self._tab_pages[chiave] = page
+            setattr(self, f"tab_{chiave}", page)
+
+        self.ensure_tab('identificativi')
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
 
         main_layout.addWidget(self.tab_widget)
 
+    def ensure_tab(self, chiave: str):
+        """Costruisce il tab alla prima richiesta e lo allinea al record visualizzato"""
+        if chiave in self._built_tabs:
+            return
+        page = self._tab_pages[chiave]
+        page.layout().addWidget(getattr(self, f"create_tab_{chiave}")())
+        self._built_tabs.add(chiave)
+
+        if chiave in dict(TAB_MODULO):
+            self._populate_tab_combos(chiave)
+            getattr(self, f"_display_{chiave}")(self._form_record)
+            if chiave in CAMPI_TAB and self._form_baseline:
+                # Da ora i campi del tab si leggono dai widget: il riferimento deve fare lo stesso
+                getattr(self, f"_read_{chiave}")(self._form_baseline)
+        self._mark(f"tab {chiave}")
+
     def create_toolbars(self):
         """Crea le toolbars separate per navigazione e azioni"""
 
@@ -306,11 +441,32 @@ class FaunaManager(QWidget):
 
         self.action_toolbar.addSeparator()
 
+        # Importazione
+        self.act_import = QAction("📥 Importa Schede", self)
+        self.act_import.triggered.connect(self.import_records)
+        self.action_toolbar.addAction(self.act_import)
+
         # Esportazione
         self.act_export_pdf = QAction("📄 Esporta PDF", self)
         self.act_export_pdf.triggered.connect(self.export_pdf)
         self.action_toolbar.addAction(self.act_export_pdf)
 
+        self.act_export_catalogue = QAction("📚 Esporta Catalogo PDF", self)
+        self.act_export_catalogue.triggered.connect(self.export_catalogue)
+        self.action_toolbar.addAction(self.act_export_catalogue)
+
+        self.act_sync_pdf = QAction("🗂 Aggiorna Cartella PDF", self)
+        self.act_sync_pdf.triggered.connect(self.sync_pdf_directory)
+        self.action_toolbar.addAction(self.act_sync_pdf)
+
+        self.act_export_csv = QAction("📑 Esporta CSV", self)
+        self.act_export_csv.triggered.connect(self.export_records_csv)
+        self.action_toolbar.addAction(self.act_export_csv)
+
+        self.act_export_parquet = QAction("📦 Esporta Parquet", self)
+        self.act_export_parquet.triggered.connect(self.export_parquet)
+        self.action_toolbar.addAction(self.act_export_parquet)
+
     def create_tab_identificativi(self) -> QWidget:
         """Crea il tab dei dati identificativi e deposizionali"""
         widget = QWidget()
@@ -622,6 +778,38 @@ class FaunaManager(QWidget):
 
         return widget
 
+    def create_tab_elenco(self) -> QWidget:
+        """Crea il tab con l'elenco delle schede in tabella, letto a pagine durante lo scorrimento"""
+        from fauna_grid import FaunaGridWidget
+        self.grid = FaunaGridWidget(self.db)
+        self.grid.record_selected.connect(self.open_record)
+        self.grid.record_activated.connect(lambda id_fauna: self.open_record(id_fauna, show_form=True))
+        self.grid.set_filters(self.current_filters)
+        return self.grid
+
+    def open_record(self, id_fauna: int, show_form: bool = False):
+        """
+        Visualizza nel form la scheda scelta nell'elenco
+
+        Args:
+            id_fauna: scheda da aprire
+            show_form: passa anche al primo tab del form
+        """
+        record = self.db.get_fauna_record(id_fauna)
+        if not record:
+            return
+        index = self._index_of(id_fauna)
+        if index < 0 and self._record_pages is not None:
+            self._finish_loading()
+            index = self._index_of(id_fauna)
+        if index >= 0:
+            self.current_index = index
+        self.display_record(record)
+        self.update_navigation_buttons()
+        self.update_record_info()
+        if show_form:
+            self.tab_widget.setCurrentWidget(self.tab_identificativi)
+
     def create_tab_statistiche(self) -> QWidget:
         """Crea il tab delle statistiche riepilogative"""
         widget = QWidget()
@@ -645,1038 +833,218 @@ class FaunaManager(QWidget):
         toolbar_layout.addStretch()
         layout.addLayout(toolbar_layout)
 
+        # Toolbar biodiversità (indici e rarefazione per unità di aggregazione)
+        bio_layout = QHBoxLayout()
+
+        bio_layout.addWidget(QLabel("Biodiversità per:"))
+        self.combo_livello_biodiversita = QComboBox()
+        self.combo_livello_biodiversita.addItem("US", 'us')
+        self.combo_livello_biodiversita.addItem("Area", 'area')
+        self.combo_livello_biodiversita.addItem("Sito", 'sito')
+        bio_layout.addWidget(self.combo_livello_biodiversita)
+
+        btn_biodiversita = QPushButton("🌿 Calcola Biodiversità")
+        btn_biodiversita.clicked.connect(self.update_biodiversity)
+        bio_layout.addWidget(btn_biodiversita)
+
+        btn_export_biodiversita = QPushButton("📊 Esporta Biodiversità")
+        btn_export_biodiversita.clicked.connect(self.export_biodiversity)
+        bio_layout.addWidget(btn_export_biodiversita)
+
+        bio_layout.addStretch()
+        layout.addLayout(bio_layout)
+
+        # Toolbar contingenza (associazioni specie × contesto)
+        cont_layout = QHBoxLayout()
+
+        cont_layout.addWidget(QLabel("Specie ×"))
+        self.combo_campo_contingenza = QComboBox()
+        self.combo_campo_contingenza.addItem("Contesto", 'contesto')
+        self.combo_campo_contingenza.addItem("Deposizione", 'deposizione')
+        self.combo_campo_contingenza.addItem("Tipologia Accumulo", 'tipologia_accumulo')
+        self.combo_campo_contingenza.currentIndexChanged.connect(self.display_contingency_table)
+        cont_layout.addWidget(self.combo_campo_contingenza)
+
+        btn_contingenza = QPushButton("🔗 Calcola Contingenza")
+        btn_contingenza.clicked.connect(self.update_contingency)
+        cont_layout.addWidget(btn_contingenza)
+
+        btn_export_contingenza = QPushButton("📊 Esporta Contingenza")
+        btn_export_contingenza.clicked.connect(self.export_contingency)
+        cont_layout.addWidget(btn_export_contingenza)
+
+        cont_layout.addStretch()
+        layout.addLayout(cont_layout)
+
+        # Toolbar stima approssimata (sketch fondibili per database molto grandi)
+        approx_layout = QHBoxLayout()
+
+        approx_layout.addWidget(QLabel("Stima approssimata:"))
+
+        btn_approssimata = QPushButton("⚡ Calcola Stima")
+        btn_approssimata.clicked.connect(self.update_approximate_statistics)
+        approx_layout.addWidget(btn_approssimata)
+
+        btn_salva_sketch = QPushButton("💾 Salva Sketch")
+        btn_salva_sketch.clicked.connect(self.save_statistics_sketch)
+        approx_layout.addWidget(btn_salva_sketch)
+
+        btn_unisci_sketch = QPushButton("➕ Unisci Sketch")
+        btn_unisci_sketch.clicked.connect(self.merge_statistics_sketch)
+        approx_layout.addWidget(btn_unisci_sketch)
+
+        approx_layout.addStretch()
+        layout.addLayout(approx_layout)
+
+        splitter = QSplitter(Qt.Vertical)
+
         # Area di testo per le statistiche
         self.txt_statistiche = QTextEdit()
         self.txt_statistiche.setReadOnly(True)
         self.txt_statistiche.setFont(QFont("Courier", 9))
-        layout.addWidget(self.txt_statistiche)
-
-        # Variabile per memorizzare le statistiche correnti
-        self.current_stats_text = []
-        self.current_stats_data = {}
+        splitter.addWidget(self.txt_statistiche)
+
+        # Tabella di contingenza a mappa di calore (nascosta finché non calcolata)
+        self.widget_contingenza = QWidget()
+        cont_box = QVBoxLayout(self.widget_contingenza)
+        cont_box.setContentsMargins(0, 0, 0, 0)
+        self.lbl_contingenza = QLabel()
+        self.lbl_contingenza.setWordWrap(True)
+        cont_box.addWidget(self.lbl_contingenza)
+        self.table_contingenza = QTableWidget()
+        self.table_contingenza.setEditTriggers(QTableWidget.NoEditTriggers)
+        cont_box.addWidget(self.table_contingenza)
+        self.widget_contingenza.setVisible(False)
+        splitter.addWidget(self.widget_contingenza)
+
+        layout.addWidget(splitter)
 
         return widget
 
     def update_statistics(self):
         """Calcola e visualizza le statistiche riepilogative estese"""
         try:
-            records = self.db.get_all_fauna_records()
+            # Ricalcola solo se i dati sono cambiati dall'ultimo calcolo
+            result = self._get_statistics()
 
-            if not records:
+            if not result:
+                self.current_stats = None
+                self.current_stats_text = []
                 self.txt_statistiche.setText("Nessun record presente nel database.")
                 return
 
-            stats_text = []
-            stats_text.append("=" * 100)
-            stats_text.append("STATISTICHE RIEPILOGATIVE - SCHEDE FAUNA")
-            stats_text.append("=" * 100)
-            stats_text.append("")
-
-            # === STATISTICHE GENERALI ===
-            stats_text.append("📋 STATISTICHE GENERALI")
-            stats_text.append("-" * 100)
-            stats_text.append(f"Numero totale record: {len(records)}")
-
-            siti = set(r.get('sito', '') for r in records if r.get('sito'))
-            aree = set(r.get('area', '') for r in records if r.get('area'))
-            saggi = set(r.get('saggio', '') for r in records if r.get('saggio'))
-            us_list = set(r.get('us', '') for r in records if r.get('us'))
-
-            stats_text.append(f"Numero siti univoci: {len(siti)}")
-            if siti:
-                stats_text.append(f"  Siti: {', '.join(sorted(siti))}")
-            stats_text.append(f"Numero aree univoche: {len(aree)}")
-            stats_text.append(f"Numero saggi univoci: {len(saggi)}")
-            stats_text.append(f"Numero US univoche: {len(us_list)}")
-
-            # Combinazioni Area+Saggio+US univoche
-            combinazioni = set()
-            for r in records:
-                sito = r.get('sito', '')
-                area = r.get('area', '')
-                saggio = r.get('saggio', '')
-                us = r.get('us', '')
-                if sito and area and saggio and us:
-                    combinazioni.add((sito, area, saggio, us))
-            stats_text.append(f"Numero combinazioni Sito+Area+Saggio+US univoche: {len(combinazioni)}")
-            stats_text.append("")
-
-            # === STATISTICHE NUMERICHE GENERALI ===
-            stats_text.append("🔢 STATISTICHE NUMERICHE - RIEPILOGO GENERALE")
-            stats_text.append("-" * 100)
-
-            nmi_values = [int(r['numero_minimo_individui']) for r in records
-                         if r.get('numero_minimo_individui') not in (None, '', 0)]
-            if nmi_values:
-                stats_text.append(f"Numero Minimo Individui (NMI):")
-                stats_text.append(f"  Totale record con NMI: {len(nmi_values)}")
-                stats_text.append(f"  Media: {sum(nmi_values)/len(nmi_values):.1f}")
-                stats_text.append(f"  Minimo: {min(nmi_values)}")
-                stats_text.append(f"  Massimo: {max(nmi_values)}")
-                stats_text.append(f"  Somma totale: {sum(nmi_values)}")
-
-            # Parti Scheletriche (PSI) - distribuzione generale
-            all_psi = {}
-            for r in records:
-                psi_list = self._extract_psi_from_record(r)
-                for psi in psi_list:
-                    if psi:
-                        all_psi[psi] = all_psi.get(psi, 0) + 1
-
-            if all_psi:
-                stats_text.append(f"\nParti Scheletriche (PSI) - Distribuzione:")
-                stats_text.append(f"  Totale parti identificate: {sum(all_psi.values())}")
-                stats_text.append(f"  Tipi di parti univoche: {len(all_psi)}")
-                sorted_psi = sorted(all_psi.items(), key=lambda x: x[1], reverse=True)[:10]
-                for psi, cnt in sorted_psi:
-                    pct = (cnt / sum(all_psi.values())) * 100
-                    stats_text.append(f"  - {psi}: {cnt} ({pct:.1f}%)")
-
-            # Associazioni Specie-PSI
-            specie_psi_assoc = {}
-            for r in records:
-                pairs = self._extract_specie_psi_pairs_from_record(r)
-                for specie, psi in pairs:
-                    if specie and psi:
-                        key = f"{specie} → {psi}"
-                        specie_psi_assoc[key] = specie_psi_assoc.get(key, 0) + 1
-
-            if specie_psi_assoc:
-                stats_text.append(f"\nAssociazioni Specie-PSI più frequenti:")
-                sorted_assoc = sorted(specie_psi_assoc.items(), key=lambda x: x[1], reverse=True)[:10]
-                for assoc, cnt in sorted_assoc:
-                    stats_text.append(f"  - {assoc}: {cnt}")
-
-            # Misure Ossa (supporta JSON) - statistiche generali
-            misure_values = []
-            for r in records:
-                measurements = self._extract_measurements_from_record(r)
-                misure_values.extend(measurements)
-
-            if misure_values:
-                stats_text.append(f"\nMisure Ossa (mm) - Riepilogo:")
-                stats_text.append(f"  Totale misurazioni: {len(misure_values)}")
-                stats_text.append(f"  Media: {sum(misure_values)/len(misure_values):.2f} mm")
-                stats_text.append(f"  Minimo: {min(misure_values):.2f} mm")
-                stats_text.append(f"  Massimo: {max(misure_values):.2f} mm")
-
-            # Misure dettagliate per tipo (GL, GB, Bp, Bd)
-            all_detailed_measures = []
-            for r in records:
-                detailed = self._extract_detailed_measurements_from_record(r)
-                all_detailed_measures.extend(detailed)
-
-            if all_detailed_measures:
-                stats_text.append(f"\nMisure dettagliate per tipo:")
-                gl_vals = [m['GL'] for m in all_detailed_measures if m['GL'] > 0]
-                gb_vals = [m['GB'] for m in all_detailed_measures if m['GB'] > 0]
-                bp_vals = [m['Bp'] for m in all_detailed_measures if m['Bp'] > 0]
-                bd_vals = [m['Bd'] for m in all_detailed_measures if m['Bd'] > 0]
-
-                if gl_vals:
-                    stats_text.append(f"  GL (Greatest Length): n={len(gl_vals)}, media={sum(gl_vals)/len(gl_vals):.2f}, min={min(gl_vals):.2f}, max={max(gl_vals):.2f}")
-                if gb_vals:
-                    stats_text.append(f"  GB (Greatest Breadth): n={len(gb_vals)}, media={sum(gb_vals)/len(gb_vals):.2f}, min={min(gb_vals):.2f}, max={max(gb_vals):.2f}")
-                if bp_vals:
-                    stats_text.append(f"  Bp (Proximal Breadth): n={len(bp_vals)}, media={sum(bp_vals)/len(bp_vals):.2f}, min={min(bp_vals):.2f}, max={max(bp_vals):.2f}")
-                if bd_vals:
-                    stats_text.append(f"  Bd (Distal Breadth): n={len(bd_vals)}, media={sum(bd_vals)/len(bd_vals):.2f}, min={min(bd_vals):.2f}, max={max(bd_vals):.2f}")
-
-                # Misure per elemento anatomico
-                elementi_count = {}
-                for m in all_detailed_measures:
-                    if m['elemento']:
-                        elementi_count[m['elemento']] = elementi_count.get(m['elemento'], 0) + 1
-
-                if elementi_count:
-                    stats_text.append(f"\nMisure per Elemento Anatomico:")
-                    sorted_elementi = sorted(elementi_count.items(), key=lambda x: x[1], reverse=True)
-                    for el, cnt in sorted_elementi:
-                        stats_text.append(f"  - {el}: {cnt} misurazioni")
-
-            stats_text.append("")
-
-            # === STATISTICHE PER SITO ===
-            if siti and len(siti) > 0:
-                stats_text.append("🏛 STATISTICHE PER SITO")
-                stats_text.append("=" * 100)
-
-                for sito in sorted(siti):
-                    sito_records = [r for r in records if r.get('sito') == sito]
-                    sito_pct = (len(sito_records) / len(records)) * 100
-
-                    stats_text.append(f"\n{'#' * 100}")
-                    stats_text.append(f"SITO: {sito}")
-                    stats_text.append(f"{'#' * 100}")
-                    stats_text.append(f"Totale record: {len(sito_records)} ({sito_pct:.1f}% del totale generale)")
-
-                    # Aree, saggi, US nel sito
-                    sito_aree = set(r.get('area', '') for r in sito_records if r.get('area'))
-                    sito_saggi = set(r.get('saggio', '') for r in sito_records if r.get('saggio'))
-                    sito_us = set(r.get('us', '') for r in sito_records if r.get('us'))
-
-                    stats_text.append(f"Numero aree: {len(sito_aree)}")
-                    stats_text.append(f"Numero saggi: {len(sito_saggi)}")
-                    stats_text.append(f"Numero US: {len(sito_us)}")
-
-                    # Specie principali nel sito
-                    sito_species = {}
-                    for r in sito_records:
-                        species_list = self._extract_species_from_record(r)
-                        for sp in species_list:
-                            if sp:
-                                sito_species[sp] = sito_species.get(sp, 0) + 1
-
-                    if sito_species:
-                        top_species = sorted(sito_species.items(), key=lambda x: x[1], reverse=True)[:5]
-                        stats_text.append(f"\nSpecie principali:")
-                        for sp, cnt in top_species:
-                            sp_pct = (cnt / len(sito_records)) * 100
-                            stats_text.append(f"  - {sp}: {cnt} record ({sp_pct:.1f}%)")
-
-                    # NMI totale del sito
-                    sito_nmi = [int(r['numero_minimo_individui']) for r in sito_records
-                               if r.get('numero_minimo_individui') not in (None, '', 0)]
-                    if sito_nmi:
-                        stats_text.append(f"\nNMI totale sito: {sum(sito_nmi)}")
-                        stats_text.append(f"NMI medio: {sum(sito_nmi)/len(sito_nmi):.1f}")
-                        stats_text.append(f"NMI min: {min(sito_nmi)}, max: {max(sito_nmi)}")
-
-                    # PSI per sito
-                    sito_psi = {}
-                    for r in sito_records:
-                        psi_list = self._extract_psi_from_record(r)
-                        for psi in psi_list:
-                            if psi:
-                                sito_psi[psi] = sito_psi.get(psi, 0) + 1
-                    if sito_psi:
-                        top_psi = sorted(sito_psi.items(), key=lambda x: x[1], reverse=True)[:5]
-                        stats_text.append(f"\nParti scheletriche principali:")
-                        for psi, cnt in top_psi:
-                            stats_text.append(f"  - {psi}: {cnt}")
-
-                    # Misure per sito
-                    sito_measures = []
-                    for r in sito_records:
-                        sito_measures.extend(self._extract_detailed_measurements_from_record(r))
-                    if sito_measures:
-                        stats_text.append(f"\nMisure ossee: {len(sito_measures)} totali")
-                        elem_count = {}
-                        for m in sito_measures:
-                            if m['elemento']:
-                                elem_count[m['elemento']] = elem_count.get(m['elemento'], 0) + 1
-                        if elem_count:
-                            top_elem = sorted(elem_count.items(), key=lambda x: x[1], reverse=True)[:3]
-                            stats_text.append(f"  Elementi misurati: {', '.join([f'{e} ({c})' for e, c in top_elem])}")
-
-                    # === STATISTICHE PER AREA (all'interno del sito) ===
-                    if sito_aree and len(sito_aree) > 0:
-                        stats_text.append(f"\n{'-' * 100}")
-                        stats_text.append(f"📍 STATISTICHE PER AREA (Sito: {sito})")
-                        stats_text.append(f"{'-' * 100}")
-
-                        for area in sorted(sito_aree):
-                            area_records = [r for r in sito_records if r.get('area') == area]
-                            area_pct_sito = (len(area_records) / len(sito_records)) * 100
-                            area_pct_totale = (len(area_records) / len(records)) * 100
-
-                            stats_text.append(f"\n  Area: {area}")
-                            stats_text.append(f"    Record: {len(area_records)} ({area_pct_sito:.1f}% del sito, {area_pct_totale:.1f}% del totale)")
-
-                            # Specie per area
-                            area_species = {}
-                            for r in area_records:
-                                species_list = self._extract_species_from_record(r)
-                                for sp in species_list:
-                                    if sp:
-                                        area_species[sp] = area_species.get(sp, 0) + 1
-
-                            if area_species:
-                                top_species = sorted(area_species.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    Specie principali: {', '.join([f'{sp} ({cnt})' for sp, cnt in top_species])}")
-
-                            # NMI per area
-                            area_nmi = [int(r['numero_minimo_individui']) for r in area_records
-                                       if r.get('numero_minimo_individui') not in (None, '', 0)]
-                            if area_nmi:
-                                stats_text.append(f"    NMI totale: {sum(area_nmi)}, Media: {sum(area_nmi)/len(area_nmi):.1f}")
-
-                            # PSI per area
-                            area_psi = {}
-                            for r in area_records:
-                                for psi in self._extract_psi_from_record(r):
-                                    if psi:
-                                        area_psi[psi] = area_psi.get(psi, 0) + 1
-                            if area_psi:
-                                top_psi = sorted(area_psi.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    PSI: {', '.join([f'{p} ({c})' for p, c in top_psi])}")
-
-                            # Misure per area
-                            area_measures = []
-                            for r in area_records:
-                                area_measures.extend(self._extract_detailed_measurements_from_record(r))
-                            if area_measures:
-                                stats_text.append(f"    Misure: {len(area_measures)} totali")
-
-                    # === STATISTICHE PER SAGGIO (all'interno del sito) ===
-                    if sito_saggi and len(sito_saggi) > 0:
-                        stats_text.append(f"\n{'-' * 100}")
-                        stats_text.append(f"🔬 STATISTICHE PER SAGGIO (Sito: {sito})")
-                        stats_text.append(f"{'-' * 100}")
-
-                        for saggio in sorted(sito_saggi):
-                            saggio_records = [r for r in sito_records if r.get('saggio') == saggio]
-                            saggio_pct_sito = (len(saggio_records) / len(sito_records)) * 100
-                            saggio_pct_totale = (len(saggio_records) / len(records)) * 100
-
-                            stats_text.append(f"\n  Saggio: {saggio}")
-                            stats_text.append(f"    Record: {len(saggio_records)} ({saggio_pct_sito:.1f}% del sito, {saggio_pct_totale:.1f}% del totale)")
-
-                            # Specie per saggio
-                            saggio_species = {}
-                            for r in saggio_records:
-                                species_list = self._extract_species_from_record(r)
-                                for sp in species_list:
-                                    if sp:
-                                        saggio_species[sp] = saggio_species.get(sp, 0) + 1
-
-                            if saggio_species:
-                                top_species = sorted(saggio_species.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    Specie principali: {', '.join([f'{sp} ({cnt})' for sp, cnt in top_species])}")
-
-                            # NMI per saggio
-                            saggio_nmi = [int(r['numero_minimo_individui']) for r in saggio_records
-                                         if r.get('numero_minimo_individui') not in (None, '', 0)]
-                            if saggio_nmi:
-                                stats_text.append(f"    NMI totale: {sum(saggio_nmi)}, Media: {sum(saggio_nmi)/len(saggio_nmi):.1f}")
-
-                            # PSI per saggio
-                            saggio_psi = {}
-                            for r in saggio_records:
-                                for psi in self._extract_psi_from_record(r):
-                                    if psi:
-                                        saggio_psi[psi] = saggio_psi.get(psi, 0) + 1
-                            if saggio_psi:
-                                top_psi = sorted(saggio_psi.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    PSI: {', '.join([f'{p} ({c})' for p, c in top_psi])}")
-
-                            # Misure per saggio
-                            saggio_measures = []
-                            for r in saggio_records:
-                                saggio_measures.extend(self._extract_detailed_measurements_from_record(r))
-                            if saggio_measures:
-                                stats_text.append(f"    Misure: {len(saggio_measures)} totali")
-
-                    # === STATISTICHE PER US (all'interno del sito) ===
-                    if sito_us and len(sito_us) > 0:
-                        stats_text.append(f"\n{'-' * 100}")
-                        stats_text.append(f"🏛 STATISTICHE PER US (Sito: {sito}, Top 10)")
-                        stats_text.append(f"{'-' * 100}")
-
-                        # Conta record per US
-                        us_counts = {}
-                        for r in sito_records:
-                            us = r.get('us', '')
-                            if us:
-                                if us not in us_counts:
-                                    us_counts[us] = []
-                                us_counts[us].append(r)
-
-                        # Ordina e prendi top 10
-                        sorted_us = sorted(us_counts.items(), key=lambda x: len(x[1]), reverse=True)[:10]
-
-                        for us, us_records in sorted_us:
-                            us_pct_sito = (len(us_records) / len(sito_records)) * 100
-                            us_pct_totale = (len(us_records) / len(records)) * 100
-
-                            stats_text.append(f"\n  US: {us}")
-                            stats_text.append(f"    Record: {len(us_records)} ({us_pct_sito:.1f}% del sito, {us_pct_totale:.1f}% del totale)")
-
-                            # Specie per US
-                            us_species = {}
-                            for r in us_records:
-                                species_list = self._extract_species_from_record(r)
-                                for sp in species_list:
-                                    if sp:
-                                        us_species[sp] = us_species.get(sp, 0) + 1
-
-                            if us_species:
-                                top_species = sorted(us_species.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    Specie principali: {', '.join([f'{sp} ({cnt})' for sp, cnt in top_species])}")
-
-                            # NMI per US
-                            us_nmi = [int(r['numero_minimo_individui']) for r in us_records
-                                     if r.get('numero_minimo_individui') not in (None, '', 0)]
-                            if us_nmi:
-                                stats_text.append(f"    NMI totale: {sum(us_nmi)}, Media: {sum(us_nmi)/len(us_nmi):.1f}")
-
-                            # PSI per US
-                            us_psi = {}
-                            for r in us_records:
-                                for psi in self._extract_psi_from_record(r):
-                                    if psi:
-                                        us_psi[psi] = us_psi.get(psi, 0) + 1
-                            if us_psi:
-                                top_psi = sorted(us_psi.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    PSI: {', '.join([f'{p} ({c})' for p, c in top_psi])}")
-
-                            # Misure per US
-                            us_measures = []
-                            for r in us_records:
-                                us_measures.extend(self._extract_detailed_measurements_from_record(r))
-                            if us_measures:
-                                stats_text.append(f"    Misure: {len(us_measures)} totali")
-
-                    # === STATISTICHE DETTAGLIATE PER COMBINAZIONE AREA+SAGGIO+US ===
-                    stats_text.append(f"\n{'-' * 100}")
-                    stats_text.append(f"🔍 COMBINAZIONI AREA + SAGGIO + US (Sito: {sito})")
-                    stats_text.append(f"{'-' * 100}")
-
-                    # Raggruppa per combinazione
-                    combinazioni_sito = {}
-                    for r in sito_records:
-                        area = r.get('area', '')
-                        saggio = r.get('saggio', '')
-                        us = r.get('us', '')
-                        if area and saggio and us:
-                            key = (area, saggio, us)
-                            if key not in combinazioni_sito:
-                                combinazioni_sito[key] = []
-                            combinazioni_sito[key].append(r)
-
-                    if combinazioni_sito:
-                        # Ordina per numero di record
-                        sorted_comb = sorted(combinazioni_sito.items(), key=lambda x: len(x[1]), reverse=True)
-
-                        for (area, saggio, us), comb_records in sorted_comb:
-                            comb_pct_sito = (len(comb_records) / len(sito_records)) * 100
-                            comb_pct_totale = (len(comb_records) / len(records)) * 100
-
-                            stats_text.append(f"\n  Area {area} - Saggio {saggio} - US {us}: {len(comb_records)} record")
-                            stats_text.append(f"    {comb_pct_sito:.1f}% del sito | {comb_pct_totale:.1f}% del totale generale")
-
-                            # Specie per combinazione
-                            comb_species = {}
-                            for r in comb_records:
-                                species_list = self._extract_species_from_record(r)
-                                for sp in species_list:
-                                    if sp:
-                                        comb_species[sp] = comb_species.get(sp, 0) + 1
-
-                            if comb_species:
-                                top_species = sorted(comb_species.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    Specie: {', '.join([f'{sp} ({cnt})' for sp, cnt in top_species])}")
-
-                            # NMI per combinazione
-                            comb_nmi = [int(r['numero_minimo_individui']) for r in comb_records
-                                       if r.get('numero_minimo_individui') not in (None, '', 0)]
-                            if comb_nmi:
-                                stats_text.append(f"    NMI totale: {sum(comb_nmi)}, Media: {sum(comb_nmi)/len(comb_nmi):.1f}")
-
-                            # PSI per combinazione
-                            comb_psi = {}
-                            for r in comb_records:
-                                for psi in self._extract_psi_from_record(r):
-                                    if psi:
-                                        comb_psi[psi] = comb_psi.get(psi, 0) + 1
-                            if comb_psi:
-                                top_psi = sorted(comb_psi.items(), key=lambda x: x[1], reverse=True)[:3]
-                                stats_text.append(f"    PSI: {', '.join([f'{p} ({c})' for p, c in top_psi])}")
-
-                            # Misure per combinazione
-                            comb_measures = []
-                            for r in comb_records:
-                                comb_measures.extend(self._extract_detailed_measurements_from_record(r))
-                            if comb_measures:
-                                stats_text.append(f"    Misure: {len(comb_measures)} totali")
-
-                stats_text.append(f"\n{'=' * 100}\n")
-
-            # === DISTRIBUZIONE PER CATEGORIE ===
-            stats_text.append("📊 DISTRIBUZIONE PER CATEGORIE - RIEPILOGO GENERALE")
-            stats_text.append("-" * 100)
-
-            def count_values(field_name, label, top_n=10):
-                values_count = {}
-                for r in records:
-                    val = r.get(field_name, '')
-                    if val and val.strip():
-                        values_count[val] = values_count.get(val, 0) + 1
-
-                if values_count:
-                    stats_text.append(f"\n{label}:")
-                    sorted_items = sorted(values_count.items(), key=lambda x: x[1], reverse=True)
-                    for val, count in sorted_items[:top_n]:
-                        percentage = (count / len(records)) * 100
-                        stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
-                else:
-                    stats_text.append(f"\n{label}: Nessun dato")
-
-            # Specie - usa estrazione JSON-aware
-            all_species = {}
-            for r in records:
-                species_list = self._extract_species_from_record(r)
-                for sp in species_list:
-                    if sp and sp.strip():
-                        all_species[sp] = all_species.get(sp, 0) + 1
-            if all_species:
-                stats_text.append(f"\nSpecie (Top 10):")
-                sorted_species = sorted(all_species.items(), key=lambda x: x[1], reverse=True)
-                for val, count in sorted_species[:10]:
-                    percentage = (count / len(records)) * 100
-                    stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
-            else:
-                stats_text.append(f"\nSpecie (Top 10): Nessun dato")
-
-            # PSI - usa estrazione JSON-aware
-            all_psi_cat = {}
-            for r in records:
-                psi_list = self._extract_psi_from_record(r)
-                for psi in psi_list:
-                    if psi and psi.strip():
-                        all_psi_cat[psi] = all_psi_cat.get(psi, 0) + 1
-            if all_psi_cat:
-                stats_text.append(f"\nParti Scheletriche - PSI (Top 10):")
-                sorted_psi = sorted(all_psi_cat.items(), key=lambda x: x[1], reverse=True)
-                for val, count in sorted_psi[:10]:
-                    percentage = (count / sum(all_psi_cat.values())) * 100
-                    stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
-            else:
-                stats_text.append(f"\nParti Scheletriche - PSI (Top 10): Nessun dato")
-
-            # Elementi Anatomici misurati
-            all_elementi = {}
-            for r in records:
-                detailed = self._extract_detailed_measurements_from_record(r)
-                for m in detailed:
-                    if m['elemento']:
-                        all_elementi[m['elemento']] = all_elementi.get(m['elemento'], 0) + 1
-            if all_elementi:
-                stats_text.append(f"\nElementi Anatomici Misurati:")
-                sorted_elem = sorted(all_elementi.items(), key=lambda x: x[1], reverse=True)
-                for val, count in sorted_elem:
-                    percentage = (count / sum(all_elementi.values())) * 100
-                    stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
-            else:
-                stats_text.append(f"\nElementi Anatomici Misurati: Nessun dato")
-
-            count_values('contesto', 'Contesto')
-            count_values('metodologia_recupero', 'Metodologia di Recupero')
-            count_values('stato_conservazione', 'Stato di Conservazione')
-            count_values('resti_connessione_anatomica', 'Resti in Connessione Anatomica')
-            count_values('tipologia_accumulo', 'Tipologia di Accumulo')
-            count_values('tracce_combustione', 'Tracce di Combustione')
-            count_values('stato_frammentazione', 'Stato di Frammentazione')
+            self._show_statistics(result)
 
-            stats_text.append("")
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nel calcolo delle statistiche:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
 
-            # === SOMMARIO DESCRITTIVO ===
-            stats_text.append("=" * 100)
-            stats_text.append("📝 SOMMARIO DESCRITTIVO")
-            stats_text.append("=" * 100)
-            stats_text.append("")
+    def _get_statistics(self, compute: bool = True):
+        """Restituisce le statistiche dalla cache, ricalcolandole se il database è cambiato"""
+        from fauna_statistics import StatisticsCache
 
-            summary = self._generate_descriptive_summary(records, nmi_values, misure_values,
-                                                        siti, aree, saggi, us_list)
-            stats_text.extend(summary)
+        if self.stats_cache is None:
+            self.stats_cache = StatisticsCache()
+        return self.stats_cache.get(self.db, compute=compute, max_workers=self.max_workers)
 
-            stats_text.append("")
-            stats_text.append("=" * 100)
-            stats_text.append(f"Report generato il: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-            stats_text.append("=" * 100)
+    def _show_statistics(self, result):
+        """Genera il report testuale (se il risultato è nuovo) e lo visualizza"""
+        from fauna_statistics import render_text
 
+        if result is not self.current_stats:
             # Salva per esportazione
-            self.current_stats_text = stats_text
-            self.current_stats_data = {
-                'records': records,
-                'total': len(records),
-                'siti': siti,
-                'aree': aree,
-                'saggi': saggi,
-                'us': us_list,
-                'nmi_values': nmi_values,
-                'misure_values': misure_values
-            }
-
-            # Visualizza
-            self.txt_statistiche.setText("\n".join(stats_text))
-
+            self.current_stats = result
+            self.current_stats_text = render_text(result)
+
+        # Visualizza
+        self.txt_statistiche.setText("\n".join(self.current_stats_text))
+
+    def _invalidate_statistics(self):
+        """Scarta le statistiche in cache dopo una modifica ai dati"""
+        if self.stats_cache is not None:
+            self.stats_cache.invalidate(self.db)
+
+    def on_tab_changed(self, index: int):
+        """
+        Costruisce il tab alla prima apertura; per il tab statistiche mostra
+        subito il risultato in cache, se valido, senza ricalcolarlo
+        """
+        page = self.tab_widget.widget(index)
+        for chiave, tab_page in self._tab_pages.items():
+            if tab_page is page:
+                self.ensure_tab(chiave)
+        if page is not self.tab_statistiche:
+            return
+        try:
+            result = self._get_statistics(compute=False)
+            if result:
+                self._show_statistics(result)
         except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Errore nel calcolo delle statistiche:\n{str(e)}")
-            import traceback
-            traceback.print_exc()
+            print(f"⚠ Cache statistiche non disponibile: {e}")
 
     def _extract_species_from_record(self, record: Dict) -> list:
         """Estrae tutte le specie da un record (supporta sia JSON che campo singolo)"""
-        import json
-        species = []
-
-        # Prova prima con il nuovo formato JSON
-        specie_psi_json = record.get('specie_psi', '')
-        if specie_psi_json and specie_psi_json.strip():
-            try:
-                specie_psi_data = json.loads(specie_psi_json)
-                for row in specie_psi_data:
-                    if len(row) > 0 and row[0]:
-                        species.append(row[0])
-            except:
-                pass
-
-        # Fallback: usa il campo specie vecchio
-        if not species:
-            sp = record.get('specie', '')
-            if sp:
-                species.append(sp)
-
-        return species
+        return extract_species(record)
 
     def _extract_measurements_from_record(self, record: Dict) -> list:
         """Estrae tutte le misure da un record (supporta sia JSON che campo singolo)"""
-        import json
-        measurements = []
-
-        # Prova prima con il nuovo formato JSON
-        misure_json = record.get('misure_ossa', '')
-        if misure_json and misure_json.strip():
-            try:
-                misure_data = json.loads(misure_json)
-                for row in misure_data:
-                    # Row format: [Elemento Anatomico, Specie, GL, GB, Bp, Bd]
-                    if len(row) >= 6:
-                        # Estrai GL, GB, Bp, Bd (colonne 2-5)
-                        for i in range(2, 6):
-                            try:
-                                val = float(row[i]) if row[i] else 0
-                                if val > 0:
-                                    measurements.append(val)
-                            except (ValueError, TypeError):
-                                pass
-            except:
-                pass
-
-        # Fallback: usa il campo misure_ossa vecchio (numerico)
-        if not measurements:
-            try:
-                val = float(record.get('misure_ossa', 0))
-                if val > 0:
-                    measurements.append(val)
-            except (ValueError, TypeError):
-                pass
-
-        return measurements
+        return extract_measurements(record)
 
     def _extract_psi_from_record(self, record: Dict) -> list:
         """Estrae tutte le parti scheletriche (PSI) da un record"""
-        import json
-        psi_list = []
-
-        # Prova prima con il nuovo formato JSON
-        specie_psi_json = record.get('specie_psi', '')
-        if specie_psi_json and specie_psi_json.strip():
-            try:
-                specie_psi_data = json.loads(specie_psi_json)
-                for row in specie_psi_data:
-                    if len(row) > 1 and row[1]:
-                        psi_list.append(row[1])
-            except:
-                pass
-
-        # Fallback: usa il campo parti_scheletriche vecchio
-        if not psi_list:
-            psi = record.get('parti_scheletriche', '')
-            if psi:
-                psi_list.append(psi)
-
-        return psi_list
+        return extract_psi(record)
 
     def _extract_specie_psi_pairs_from_record(self, record: Dict) -> list:
         """Estrae coppie (specie, psi) da un record"""
-        import json
-        pairs = []
-
-        specie_psi_json = record.get('specie_psi', '')
-        if specie_psi_json and specie_psi_json.strip():
-            try:
-                specie_psi_data = json.loads(specie_psi_json)
-                for row in specie_psi_data:
-                    if len(row) >= 2:
-                        specie = row[0] if row[0] else ''
-                        psi = row[1] if row[1] else ''
-                        if specie or psi:
-                            pairs.append((specie, psi))
-            except:
-                pass
-
-        # Fallback
-        if not pairs:
-            specie = record.get('specie', '')
-            psi = record.get('parti_scheletriche', '')
-            if specie or psi:
-                pairs.append((specie, psi))
-
-        return pairs
+        return extract_specie_psi_pairs(record)
 
     def _extract_detailed_measurements_from_record(self, record: Dict) -> list:
         """Estrae misure dettagliate da un record: [(elemento, specie, GL, GB, Bp, Bd), ...]"""
-        import json
-        detailed = []
-
-        misure_json = record.get('misure_ossa', '')
-        if misure_json and misure_json.strip():
-            try:
-                misure_data = json.loads(misure_json)
-                for row in misure_data:
-                    if len(row) >= 6:
-                        elemento = row[0] if row[0] else ''
-                        specie = row[1] if row[1] else ''
-                        gl = self._safe_float(row[2])
-                        gb = self._safe_float(row[3])
-                        bp = self._safe_float(row[4])
-                        bd = self._safe_float(row[5])
-                        if elemento or specie or gl or gb or bp or bd:
-                            detailed.append({
-                                'elemento': elemento,
-                                'specie': specie,
-                                'GL': gl,
-                                'GB': gb,
-                                'Bp': bp,
-                                'Bd': bd
-                            })
-            except:
-                pass
-
-        return detailed
+        return extract_detailed_measurements(record)
 
     def _safe_float(self, value) -> float:
         """Converte un valore in float in modo sicuro"""
-        try:
-            return float(value) if value else 0.0
-        except (ValueError, TypeError):
-            return 0.0
-
-    def _generate_descriptive_summary(self, records, nmi_values, misure_values, siti, aree, saggi, us_list):
-        """Genera un sommario descrittivo discorsivo delle statistiche"""
-        summary = []
-
-        # Introduzione
-        summary.append(f"L'analisi del dataset faunistico comprende {len(records)} record archeologici ")
-        summary.append(f"distribuiti su {len(siti)} siti, {len(aree)} aree, {len(saggi)} saggi e {len(us_list)} unità stratigrafiche.")
-        summary.append("")
-
-        # Analisi per sito
-        if len(siti) > 0:
-            summary.append("DISTRIBUZIONE PER SITO:")
-            site_records = {}
-            for r in records:
-                site = r.get('sito', '')
-                if site:
-                    if site not in site_records:
-                        site_records[site] = []
-                    site_records[site].append(r)
-
-            # Sito dominante
-            sorted_sites = sorted(site_records.items(), key=lambda x: len(x[1]), reverse=True)
-            dominant_site = sorted_sites[0]
-            pct = (len(dominant_site[1]) / len(records)) * 100
-
-            summary.append(f"Il sito più rappresentato è '{dominant_site[0]}' con {len(dominant_site[1])} record ({pct:.1f}% del totale). ")
-
-            if len(siti) > 1:
-                summary.append(f"Gli altri {len(siti) - 1} siti contribuiscono con il restante {100 - pct:.1f}% dei dati, ")
-                summary.append("permettendo un'analisi comparativa tra diverse località archeologiche. ")
-
-                # Specie dominanti per il sito principale
-                site_species = {}
-                for r in dominant_site[1]:
-                    species_list = self._extract_species_from_record(r)
-                    for sp in species_list:
-                        if sp:
-                            site_species[sp] = site_species.get(sp, 0) + 1
-
-                if site_species:
-                    top_sp = max(site_species.items(), key=lambda x: x[1])
-                    summary.append(f"Nel sito '{dominant_site[0]}', la specie predominante è {top_sp[0]} ")
-                    summary.append(f"con {top_sp[1]} occorrenze.")
-
-            summary.append("")
-            summary.append("Le statistiche sono state organizzate gerarchicamente per sito, consentendo di analizzare ")
-            summary.append("la distribuzione spaziale dei resti faunistici a livello di aree, saggi e unità stratigrafiche ")
-            summary.append("all'interno di ciascun sito, oltre alle combinazioni specifiche Area+Saggio+US.")
-            summary.append("")
-
-        # Analisi specie
-        species_count = {}
-        for r in records:
-            species_list = self._extract_species_from_record(r)
-            for sp in species_list:
-                if sp:
-                    species_count[sp] = species_count.get(sp, 0) + 1
-
-        if species_count:
-            top_3_species = sorted(species_count.items(), key=lambda x: x[1], reverse=True)[:3]
-            summary.append("ANALISI DELLE SPECIE:")
-            summary.append(f"Sono state identificate {len(species_count)} specie diverse. Le specie predominanti sono:")
-
-            for sp, count in top_3_species:
-                pct = (count / len(records)) * 100
-                summary.append(f"  - {sp}: presente in {count} record ({pct:.1f}% del totale)")
-
-            summary.append("")
-
-        # Analisi NMI
-        if nmi_values:
-            total_nmi = sum(nmi_values)
-            avg_nmi = total_nmi / len(nmi_values)
-            summary.append("NUMERO MINIMO DI INDIVIDUI (NMI):")
-            summary.append(f"Il numero minimo totale di individui è {total_nmi}, con una media di {avg_nmi:.1f} individui ")
-            summary.append(f"per record. Il valore minimo registrato è {min(nmi_values)}, mentre il massimo è {max(nmi_values)}.")
-            summary.append("")
-
-        # Analisi contesti
-        context_count = {}
-        for r in records:
-            ctx = r.get('contesto', '')
-            if ctx:
-                context_count[ctx] = context_count.get(ctx, 0) + 1
-
-        if context_count:
-            dominant_context = max(context_count.items(), key=lambda x: x[1])
-            pct = (dominant_context[1] / len(records)) * 100
-            summary.append("CONTESTI ARCHEOLOGICI:")
-            summary.append(f"Il contesto prevalente è '{dominant_context[0]}' con {dominant_context[1]} occorrenze ")
-            summary.append(f"({pct:.1f}% del totale). ")
-
-            if len(context_count) > 1:
-                summary.append(f"Sono stati identificati {len(context_count)} diversi tipi di contesto, indicando ")
-                summary.append("una varietà di situazioni deposizionali.")
-
-            summary.append("")
-
-        # Analisi stato di conservazione
-        conservation_count = {}
-        for r in records:
-            cons = r.get('stato_conservazione', '')
-            if cons:
-                conservation_count[cons] = conservation_count.get(cons, 0) + 1
-
-        if conservation_count:
-            summary.append("STATO DI CONSERVAZIONE:")
-
-            # Calcola media stato conservazione (considerando valori 0-5)
-            try:
-                numeric_conservation = [int(k) for k in conservation_count.keys() if k.isdigit()]
-                if numeric_conservation:
-                    weighted_sum = sum(int(k) * conservation_count[k] for k in conservation_count.keys() if k.isdigit())
-                    total_with_conservation = sum(conservation_count[k] for k in conservation_count.keys() if k.isdigit())
-                    avg_conservation = weighted_sum / total_with_conservation if total_with_conservation > 0 else 0
-
-                    if avg_conservation < 2:
-                        quality_desc = "generalmente scarso"
-                    elif avg_conservation < 3.5:
-                        quality_desc = "mediocre"
-                    else:
-                        quality_desc = "buono"
-
-                    summary.append(f"Lo stato di conservazione dei reperti è {quality_desc}, con un valore medio di {avg_conservation:.1f} ")
-                    summary.append("sulla scala 0-5 (dove 0=pessimo, 5=ottimo).")
-            except:
-                pass
-
-            summary.append("")
-
-        # Analisi tafonomica
-        combustion_count = {}
-        for r in records:
-            comb = r.get('tracce_combustione', '')
-            if comb:
-                combustion_count[comb] = combustion_count.get(comb, 0) + 1
-
-        if combustion_count:
-            records_with_combustion = sum(v for k, v in combustion_count.items() if k.lower() not in ['assente', 'no'])
-            pct_combustion = (records_with_combustion / len(records)) * 100
-
-            summary.append("ANALISI TAFONOMICA:")
-            summary.append(f"Tracce di combustione sono presenti in {records_with_combustion} record ({pct_combustion:.1f}% del totale), ")
-
-            if pct_combustion > 50:
-                summary.append("suggerendo una significativa esposizione al fuoco dei resti faunistici.")
-            elif pct_combustion > 20:
-                summary.append("indicando una presenza moderata di fenomeni di combustione.")
-            else:
-                summary.append("indicando un'esposizione limitata al fuoco.")
-
-            summary.append("")
-
-        # Connessione anatomica
-        connection_count = {}
-        for r in records:
-            conn = r.get('resti_connessione_anatomica', '')
-            if conn:
-                connection_count[conn] = connection_count.get(conn, 0) + 1
-
-        if connection_count:
-            connected = connection_count.get('Si', 0) + connection_count.get('Parziale', 0)
-            pct_connected = (connected / len(records)) * 100
-
-            summary.append("CONNESSIONE ANATOMICA:")
-            summary.append(f"Resti in connessione anatomica (totale o parziale) sono stati riscontrati in {connected} record ")
-            summary.append(f"({pct_connected:.1f}% del totale), ")
-
-            if pct_connected > 40:
-                summary.append("suggerendo deposizioni primarie o una buona preservazione del contesto originale.")
-            elif pct_connected > 15:
-                summary.append("indicando una preservazione moderata del contesto deposizionale.")
-            else:
-                summary.append("suggerendo prevalentemente deposizioni secondarie o rimaneggiate.")
-
-            summary.append("")
-
-        # Conclusione
-        summary.append("CONCLUSIONI:")
-        summary.append("Il dataset rappresenta un campione significativo per l'analisi archeozoologica del sito. ")
-        summary.append("I dati raccolti permettono di ricostruire aspetti legati all'economia, all'alimentazione e ")
-        summary.append("alle pratiche cultuali delle popolazioni antiche che hanno abitato l'area.")
-
-        return summary
+        return safe_float(value)
 
     def export_statistics_excel(self):
-        """Esporta le statistiche in formato Excel (CSV)"""
-        if not self.current_stats_text:
+        """Esporta schede e statistiche in una cartella Excel (XLSX), oppure le statistiche in CSV"""
+        if not self.current_stats:
             QMessageBox.warning(self, "Attenzione", "Genera prima le statistiche con 'Aggiorna Statistiche'")
             return
 
         try:
             from PyQt5.QtWidgets import QFileDialog
-            import csv
+            from fauna_statistics import export_csv
+            from fauna_export import export_xlsx
+
+            # Allinea al database (immediato se i dati non sono cambiati)
+            self.update_statistics()
+            if not self.current_stats:
+                return
 
             # Dialog per scegliere dove salvare
-            default_name = f"statistiche_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            file_path, _ = QFileDialog.getSaveFileName(
+            default_name = f"statistiche_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self,
                 "Salva statistiche Excel",
                 default_name,
-                "File CSV (*.csv);;Tutti i file (*)"
+                "Cartella Excel (*.xlsx);;File CSV (*.csv);;Tutti i file (*)"
             )
 
             if not file_path:
                 return
 
-            # Crea CSV con dati strutturati
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-
-                # Intestazione
-                writer.writerow(['STATISTICHE FAUNA - EXPORT'])
-                writer.writerow(['Data generazione', datetime.now().strftime('%d/%m/%Y %H:%M:%S')])
-                writer.writerow([])
-
-                # Statistiche generali
-                writer.writerow(['STATISTICHE GENERALI'])
-                writer.writerow(['Totale record', self.current_stats_data.get('total', 0)])
-                writer.writerow(['Numero siti', len(self.current_stats_data.get('siti', []))])
-                writer.writerow(['Numero aree', len(self.current_stats_data.get('aree', []))])
-                writer.writerow(['Numero saggi', len(self.current_stats_data.get('saggi', []))])
-                writer.writerow(['Numero US', len(self.current_stats_data.get('us', []))])
-                writer.writerow([])
-
-                # NMI
-                nmi_vals = self.current_stats_data.get('nmi_values', [])
-                if nmi_vals:
-                    writer.writerow(['NUMERO MINIMO INDIVIDUI (NMI)'])
-                    writer.writerow(['Totale record con NMI', len(nmi_vals)])
-                    writer.writerow(['Media', f"{sum(nmi_vals)/len(nmi_vals):.1f}"])
-                    writer.writerow(['Minimo', min(nmi_vals)])
-                    writer.writerow(['Massimo', max(nmi_vals)])
-                    writer.writerow(['Somma totale', sum(nmi_vals)])
-                    writer.writerow([])
-
-                # Misure
-                mis_vals = self.current_stats_data.get('misure_values', [])
-                if mis_vals:
-                    writer.writerow(['MISURE OSSA (mm)'])
-                    writer.writerow(['Totale misurazioni', len(mis_vals)])
-                    writer.writerow(['Media', f"{sum(mis_vals)/len(mis_vals):.2f}"])
-                    writer.writerow(['Minimo', f"{min(mis_vals):.2f}"])
-                    writer.writerow(['Massimo', f"{max(mis_vals):.2f}"])
-                    writer.writerow([])
-
-                # Distribuzione specie
-                records = self.current_stats_data.get('records', [])
-                if records:
-                    species_count = {}
-                    for r in records:
-                        species_list = self._extract_species_from_record(r)
-                        for sp in species_list:
-                            if sp:
-                                species_count[sp] = species_count.get(sp, 0) + 1
-
-                    if species_count:
-                        writer.writerow(['DISTRIBUZIONE SPECIE'])
-                        writer.writerow(['Specie', 'Conteggio', 'Percentuale'])
-                        sorted_species = sorted(species_count.items(), key=lambda x: x[1], reverse=True)
-                        for sp, count in sorted_species:
-                            pct = (count / len(records)) * 100
-                            writer.writerow([sp, count, f"{pct:.1f}%"])
-                        writer.writerow([])
-
-                    # Distribuzione PSI
-                    psi_count = {}
-                    for r in records:
-                        psi_list = self._extract_psi_from_record(r)
-                        for psi in psi_list:
-                            if psi:
-                                psi_count[psi] = psi_count.get(psi, 0) + 1
-
-                    if psi_count:
-                        writer.writerow(['DISTRIBUZIONE PARTI SCHELETRICHE (PSI)'])
-                        writer.writerow(['Parte Scheletrica', 'Conteggio', 'Percentuale'])
-                        sorted_psi = sorted(psi_count.items(), key=lambda x: x[1], reverse=True)
-                        for psi, count in sorted_psi:
-                            pct = (count / sum(psi_count.values())) * 100
-                            writer.writerow([psi, count, f"{pct:.1f}%"])
-                        writer.writerow([])
-
-                    # Distribuzione Elementi Anatomici misurati
-                    elem_count = {}
-                    all_measures = []
-                    for r in records:
-                        detailed = self._extract_detailed_measurements_from_record(r)
-                        all_measures.extend(detailed)
-                        for m in detailed:
-                            if m['elemento']:
-                                elem_count[m['elemento']] = elem_count.get(m['elemento'], 0) + 1
-
-                    if elem_count:
-                        writer.writerow(['ELEMENTI ANATOMICI MISURATI'])
-                        writer.writerow(['Elemento', 'Conteggio', 'Percentuale'])
-                        sorted_elem = sorted(elem_count.items(), key=lambda x: x[1], reverse=True)
-                        for el, count in sorted_elem:
-                            pct = (count / sum(elem_count.values())) * 100
-                            writer.writerow([el, count, f"{pct:.1f}%"])
-                        writer.writerow([])
-
-                    # Misure dettagliate
-                    if all_measures:
-                        writer.writerow(['MISURE DETTAGLIATE'])
-                        writer.writerow(['Elemento', 'Specie', 'GL (mm)', 'GB (mm)', 'Bp (mm)', 'Bd (mm)'])
-                        for m in all_measures:
-                            writer.writerow([
-                                m['elemento'],
-                                m['specie'],
-                                f"{m['GL']:.2f}" if m['GL'] > 0 else '',
-                                f"{m['GB']:.2f}" if m['GB'] > 0 else '',
-                                f"{m['Bp']:.2f}" if m['Bp'] > 0 else '',
-                                f"{m['Bd']:.2f}" if m['Bd'] > 0 else ''
-                            ])
-                        writer.writerow([])
-
-                # Report testuale completo
-                writer.writerow(['REPORT COMPLETO'])
-                for line in self.current_stats_text:
-                    writer.writerow([line])
+            if file_path.lower().endswith('.csv') or selected_filter.startswith('File CSV'):
+                export_csv(self.current_stats, file_path, self.current_stats_text)
+            else:
+                # Le statistiche riguardano tutte le schede: anche i fogli dei record
+                export_xlsx(self.db, file_path, statistics=self.current_stats)
 
             QMessageBox.information(self, "Successo", f"Statistiche esportate in:\n{file_path}")
 
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
         except Exception as e:
             QMessageBox.critical(self, "Errore", f"Errore nell'esportazione Excel:\n{str(e)}")
             import traceback
@@ -1684,12 +1052,18 @@ class FaunaManager(QWidget):
 
     def export_statistics_pdf(self):
         """Esporta le statistiche in formato PDF"""
-        if not self.current_stats_text:
+        if not self.current_stats:
             QMessageBox.warning(self, "Attenzione", "Genera prima le statistiche con 'Aggiorna Statistiche'")
             return
 
         try:
             from PyQt5.QtWidgets import QFileDialog
+            from fauna_report import export_report
+
+            # Allinea al database (immediato se i dati non sono cambiati)
+            self.update_statistics()
+            if not self.current_stats:
+                return
 
             # Dialog per scegliere dove salvare
             default_name = f"statistiche_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
@@ -1703,69 +1077,9 @@ class FaunaManager(QWidget):
             if not file_path:
                 return
 
-            # Prova ad usare ReportLab
+            # Report con grafici, costruito dal risultato in cache
             try:
-                from reportlab.lib.pagesizes import A4
-                from reportlab.lib import colors
-                from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-                from reportlab.lib.units import cm
-                from reportlab.pdfbase import pdfmetrics
-                from reportlab.pdfbase.ttfonts import TTFont
-
-                # Crea PDF
-                doc = SimpleDocTemplate(file_path, pagesize=A4,
-                                       leftMargin=1.5*cm, rightMargin=1.5*cm,
-                                       topMargin=2*cm, bottomMargin=2*cm)
-
-                styles = getSampleStyleSheet()
-                story = []
-
-                # Titolo
-                title_style = ParagraphStyle(
-                    'CustomTitle',
-                    parent=styles['Heading1'],
-                    fontSize=16,
-                    textColor=colors.HexColor('#2c3e50'),
-                    spaceAfter=30,
-                    alignment=1  # Center
-                )
-
-                story.append(Paragraph("STATISTICHE RIEPILOGATIVE - SCHEDE FAUNA", title_style))
-                story.append(Spacer(1, 0.5*cm))
-
-                # Data generazione
-                date_style = ParagraphStyle(
-                    'DateStyle',
-                    parent=styles['Normal'],
-                    fontSize=10,
-                    textColor=colors.grey,
-                    alignment=1
-                )
-                story.append(Paragraph(f"Report generato il: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", date_style))
-                story.append(Spacer(1, 1*cm))
-
-                # Contenuto
-                mono_style = ParagraphStyle(
-                    'MonoStyle',
-                    parent=styles['Normal'],
-                    fontSize=8,
-                    fontName='Courier',
-                    leading=10
-                )
-
-                for line in self.current_stats_text:
-                    if line.strip():
-                        # Converti caratteri speciali
-                        line_clean = line.replace('📋', '[*]').replace('🔢', '[#]').replace('📊', '[%]')
-                        line_clean = line_clean.replace('📍', '[A]').replace('🔬', '[S]').replace('🏛', '[U]')
-                        line_clean = line_clean.replace('📝', '[T]')
-
-                        story.append(Paragraph(line_clean, mono_style))
-                    else:
-                        story.append(Spacer(1, 0.2*cm))
-
-                doc.build(story)
+                export_report(self.current_stats, file_path, max_workers=self.max_workers)
 
                 QMessageBox.information(self, "Successo", f"Statistiche esportate in:\n{file_path}")
 
@@ -1787,79 +1101,263 @@ class FaunaManager(QWidget):
             import traceback
             traceback.print_exc()
 
-    def populate_combos(self):
-        """Popola le combo box con i valori del vocabolario"""
-        # Metodologia recupero
-        self.combo_metodologia.clear()
-        self.combo_metodologia.addItem("")
-        self.combo_metodologia.addItems(self.db.get_voc_values('metodologia_recupero'))
-
-        # Contesto
-        self.combo_contesto.clear()
-        self.combo_contesto.addItem("")
-        self.combo_contesto.addItems(self.db.get_voc_values('contesto'))
-
-        # Connessione anatomica
-        self.combo_connessione.clear()
-        self.combo_connessione.addItem("")
-        self.combo_connessione.addItems(self.db.get_voc_values('resti_connessione_anatomica'))
-
-        # Tipologia accumulo
-        self.combo_tipologia_accumulo.clear()
-        self.combo_tipologia_accumulo.addItem("")
-        self.combo_tipologia_accumulo.addItems(self.db.get_voc_values('tipologia_accumulo'))
+    def update_biodiversity(self):
+        """Calcola e visualizza indici di biodiversità e curve di rarefazione"""
+        try:
+            from fauna_analytics import compute_biodiversity, format_biodiversity_report
 
-        # Deposizione
-        self.combo_deposizione.clear()
-        self.combo_deposizione.addItem("")
-        self.combo_deposizione.addItems(self.db.get_voc_values('deposizione'))
+            records = self.db.get_all_fauna_records()
+            if not records:
+                self.txt_statistiche.setText("Nessun record presente nel database.")
+                return
+
+            livello = self.combo_livello_biodiversita.currentData()
+            self.current_biodiversity = compute_biodiversity(records, livello, max_workers=self.max_workers)
+
+            self.txt_statistiche.setText("\n".join(format_biodiversity_report(self.current_biodiversity)))
 
-        # Numero stimato resti
-        self.combo_num_stimato.clear()
-        self.combo_num_stimato.addItem("")
-        self.combo_num_stimato.addItems(self.db.get_voc_values('numero_stimato_resti'))
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nel calcolo della biodiversità:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
 
-        # Note: Specie e Parti Scheletriche ora sono nelle table widgets
+    def export_biodiversity(self):
+        """Esporta indici di biodiversità e curve di rarefazione in CSV"""
+        if not self.current_biodiversity:
+            QMessageBox.warning(self, "Attenzione", "Calcola prima la biodiversità con 'Calcola Biodiversità'")
+            return
+
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_analytics import export_biodiversity_csv
+
+            default_name = f"biodiversita_{self.current_biodiversity['livello']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Salva indici di biodiversità",
+                default_name,
+                "File CSV (*.csv);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            export_biodiversity_csv(self.current_biodiversity, file_path)
+            QMessageBox.information(self, "Successo", f"Biodiversità esportata in:\n{file_path}")
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'esportazione biodiversità:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def update_contingency(self):
+        """Calcola l'analisi di contingenza specie × contesto per tutti i campi"""
+        try:
+            from fauna_analytics import compute_contingency
+
+            records = self.db.get_all_fauna_records()
+            if not records:
+                self.txt_statistiche.setText("Nessun record presente nel database.")
+                return
+
+            self.current_contingency = compute_contingency(records, max_workers=self.max_workers)
+            self.display_contingency_table()
+
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'analisi di contingenza:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def display_contingency_table(self):
+        """Mostra la tabella di contingenza del campo selezionato come mappa di calore"""
+        if not self.current_contingency:
+            return
+
+        from PyQt5.QtGui import QColor
+        from fauna_analytics import format_contingency_summary
+
+        campo = self.combo_campo_contingenza.currentData()
+        table = self.current_contingency['tabelle'][campo]
+
+        self.lbl_contingenza.setText(
+            format_contingency_summary(table) +
+            "\nCelle: frequenza osservata (residuo standardizzato); "
+            "rosso = più del previsto, blu = meno del previsto"
+        )
+
+        self.table_contingenza.clear()
+        self.table_contingenza.setRowCount(len(table['specie']))
+        self.table_contingenza.setColumnCount(len(table['categorie']))
+        self.table_contingenza.setHorizontalHeaderLabels(table['categorie'])
+        self.table_contingenza.setVerticalHeaderLabels(table['specie'])
+
+        for i in range(len(table['specie'])):
+            for j in range(len(table['categorie'])):
+                residuo = float(table['residui'][i, j])
+                item = QTableWidgetItem(f"{int(table['osservati'][i, j])} ({residuo:+.1f})")
+                item.setTextAlignment(Qt.AlignCenter)
+                item.setToolTip(
+                    f"Osservati: {int(table['osservati'][i, j])}\n"
+                    f"Attesi: {float(table['attesi'][i, j]):.2f}\n"
+                    f"Residuo standardizzato: {residuo:+.2f}"
+                )
+
+                # Intensità proporzionale al residuo (saturazione a |r| = 4)
+                intensita = int(min(abs(residuo), 4.0) / 4.0 * 200)
+                if residuo > 0:
+                    item.setBackground(QColor(255, 255 - intensita, 255 - intensita))
+                else:
+                    item.setBackground(QColor(255 - intensita, 255 - intensita, 255))
+                self.table_contingenza.setItem(i, j, item)
+
+        self.table_contingenza.resizeColumnsToContents()
+        self.widget_contingenza.setVisible(True)
+
+    def export_contingency(self):
+        """Esporta le tabelle di contingenza in CSV"""
+        if not self.current_contingency:
+            QMessageBox.warning(self, "Attenzione", "Calcola prima la contingenza con 'Calcola Contingenza'")
+            return
+
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_analytics import export_contingency_csv
+
+            default_name = f"contingenza_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Salva tabelle di contingenza",
+                default_name,
+                "File CSV (*.csv);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            export_contingency_csv(self.current_contingency, file_path)
+            QMessageBox.information(self, "Successo", f"Contingenza esportata in:\n{file_path}")
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'esportazione contingenza:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def update_approximate_statistics(self):
+        """Calcola e visualizza le statistiche approssimate (sketch con margini di errore)"""
+        try:
+            from fauna_statistics import compute_approximate_statistics, render_approximate_text
+
+            records = self.db.get_all_fauna_records()
+            if not records:
+                self.txt_statistiche.setText("Nessun record presente nel database.")
+                return
+
+            self.current_sketch = compute_approximate_statistics(records, self.max_workers)
+            del records
+            self.txt_statistiche.setText("\n".join(render_approximate_text(self.current_sketch)))
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nel calcolo della stima:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def save_statistics_sketch(self):
+        """Salva lo sketch corrente per fonderlo in seguito con altri database o sessioni"""
+        if not self.current_sketch:
+            QMessageBox.warning(self, "Attenzione", "Calcola prima la stima con 'Calcola Stima'")
+            return
+
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+
+            default_name = f"sketch_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Salva sketch statistiche",
+                default_name,
+                "Sketch JSON (*.json);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            self.current_sketch.save(file_path)
+            QMessageBox.information(self, "Successo", f"Sketch salvato in:\n{file_path}")
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nel salvataggio dello sketch:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def merge_statistics_sketch(self):
+        """Fonde uno sketch salvato con quello corrente e mostra la stima combinata"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_statistics import StatisticsSketch, render_approximate_text
+
+            file_path, _ = QFileDialog.getOpenFileName(
+                self,
+                "Unisci sketch statistiche",
+                "",
+                "Sketch JSON (*.json);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            sketch = StatisticsSketch.load(file_path)
+            if self.current_sketch:
+                self.current_sketch.merge(sketch)
+            else:
+                self.current_sketch = sketch
+
+            self.txt_statistiche.setText("\n".join(render_approximate_text(self.current_sketch)))
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'unione dello sketch:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def _voc_values(self, campo: str) -> List[str]:
+        """Valori di vocabolario, letti dal database alla prima richiesta"""
+        if campo not in self._voc_cache:
+            self._voc_cache[campo] = self.db.get_voc_values(campo)
+        return self._voc_cache[campo]
+
+    def populate_combos(self):
+        """Ricarica i vocabolari e popola le combo box dei tab già costruiti"""
+        self._voc_cache = {}
+        for chiave in self._built_tabs & set(dict(TAB_MODULO)):
+            self._populate_tab_combos(chiave)
+
+    def _populate_tab_combos(self, chiave: str):
+        """Popola le combo box di un tab con i valori del vocabolario"""
+        for attributo, campo in COMBO_VOCABOLARIO.get(chiave, []):
+            combo = getattr(self, attributo)
+            combo.clear()
+            combo.addItem("")
+            combo.addItems(self._voc_values(campo))
+
+        # Note: Specie e Parti Scheletriche sono nelle table widgets
         # e vengono popolate dinamicamente quando si aggiungono righe
 
-        # Frammentazione
-        self.combo_frammentazione.clear()
-        self.combo_frammentazione.addItem("")
-        self.combo_frammentazione.addItems(self.db.get_voc_values('stato_frammentazione'))
-
-        # Tracce combustione
-        self.combo_tracce_combustione.clear()
-        self.combo_tracce_combustione.addItem("")
-        self.combo_tracce_combustione.addItems(self.db.get_voc_values('tracce_combustione'))
-
-        # Tipo combustione
-        self.combo_tipo_combustione.clear()
-        self.combo_tipo_combustione.addItem("")
-        self.combo_tipo_combustione.addItems(self.db.get_voc_values('tipo_combustione'))
-
-        # Segni tafonomici
-        self.combo_segni_tafonomici.clear()
-        self.combo_segni_tafonomici.addItem("")
-        self.combo_segni_tafonomici.addItems(self.db.get_voc_values('segni_tafonomici_evidenti'))
-
-        # Caratterizzazione tafonomici
-        self.combo_caratterizzazione_tafonomici.clear()
-        self.combo_caratterizzazione_tafonomici.addItem("")
-        self.combo_caratterizzazione_tafonomici.addItems(self.db.get_voc_values('caratterizzazione_segni_tafonomici'))
-
-        # Stato conservazione
-        self.combo_stato_conservazione.clear()
-        self.combo_stato_conservazione.addItem("")
-        for val in self.db.get_voc_values('stato_conservazione'):
-            # Recupera anche la descrizione
+        if chiave == 'tafonomici':
+            # Stato conservazione, con la descrizione del valore
+            self.combo_stato_conservazione.clear()
+            self.combo_stato_conservazione.addItem("")
             desc_map = {
                 '0': '0 - Pessimo', '1': '1 - Molto cattivo', '2': '2 - Cattivo',
                 '3': '3 - Discreto', '4': '4 - Buono', '5': '5 - Ottimo'
             }
-            self.combo_stato_conservazione.addItem(desc_map.get(val, val), val)
+            for val in self._voc_values('stato_conservazione'):
+                self.combo_stato_conservazione.addItem(desc_map.get(val, val), val)
 
-        # Popola combo US
-        self.populate_us_combo()
+        if chiave == 'identificativi':
+            self.populate_us_combo()
 
     def populate_us_combo(self):
         """Popola la combo box con le US"""
@@ -1891,19 +1389,97 @@ class FaunaManager(QWidget):
             self.txt_datazione_us.clear()
 
     def load_records(self, filters: Dict = None):
-        """Carica i record dal database"""
-        self.records = self.db.get_all_fauna_records(filters)
+        """Carica i record dal database, visualizzando il primo appena arriva la sua pagina"""
+        self.current_filters = filters
         self.populate_combos()
+        self._mark("vocabolari e US")
+        self._show_pages(self.db.iter_fauna_pages(filters, PAGINA_RECORD, columns=COLONNE_RIEPILOGO))
+        self._refresh_grid()
+
+    def _refresh_grid(self):
+        """Riallinea l'elenco (se già aperto) ai filtri correnti"""
+        if 'elenco' in self._built_tabs:
+            self.grid.model.db = self.db
+            self.grid.set_filters(self.current_filters)
+
+    def _show_pages(self, pages) -> bool:
+        """
+        Legge la prima pagina di righe di riepilogo e visualizza il primo record;
+        le pagine successive sono aggiunte a self.records quando l'interfaccia è libera
+
+        Returns:
+            True se c'è almeno un record
+        """
+        self._stop_loading()
+        self.records = list(next(pages, []))
+        self._record_pages = pages
+        self._added_ids = set()
+        self._mark("prima pagina di record")
 
         if self.records:
-            self.current_index = 0
-            self.display_record(self.records[0])
+            self._show_record(0)
         else:
             self.current_index = -1
             self.clear_form()
+        self._mark("primo record visualizzato")
 
         self.update_navigation_buttons()
         self.update_record_info()
+        self._page_timer.start(0)
+        return bool(self.records)
+
+    def _show_record(self, index: int):
+        """Visualizza il record di self.records in posizione index, letto completo dal database"""
+        self.current_index = index
+        record = self.db.get_fauna_record(self.records[index]['id_fauna'])
+        if record:
+            self.display_record(record)
+        else:
+            # Eliminato da un'altra sessione dopo la lettura dell'elenco
+            self.clear_form()
+
+    def _load_next_page(self):
+        """Aggiunge la pagina successiva di record e riprogramma la lettura"""
+        if self._record_pages is None:
+            return
+        page = next(self._record_pages, None)
+        if page is None:
+            self._record_pages = None
+            self._mark(f"tutti i record ({len(self.records)})")
+            self._print_startup_profile()
+        else:
+            if self._added_ids:
+                page = [r for r in page if r['id_fauna'] not in self._added_ids]
+            self.records.extend(page)
+            self._page_timer.start(0)
+        self.update_navigation_buttons()
+        self.update_record_info()
+
+    def _finish_loading(self):
+        """Legge subito le pagine rimanenti (es. per andare all'ultimo record)"""
+        while self._record_pages is not None:
+            self._load_next_page()
+        self._page_timer.stop()
+
+    def _stop_loading(self):
+        """Interrompe la lettura delle pagine (nuova ricerca, cambio database, chiusura)"""
+        self._page_timer.stop()
+        if self._record_pages is not None:
+            self._record_pages.close()
+            self._record_pages = None
+
+    def _print_startup_profile(self):
+        """Stampa i tempi di avvio quando la finestra è visibile e i record sono caricati"""
+        if self.profile is None or self._record_pages is not None or not self.isVisible():
+            return
+        print("\n".join(self.profile.report()))
+        self.profile = None
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.profile is not None and not any(f == "finestra visibile" for f, _ in self.profile.fasi):
+            self._mark("finestra visibile")
+            self._print_startup_profile()
 
     # ========== GESTIONE TABELLE SPECIE/PSI E MISURE ==========
 
@@ -1916,14 +1492,14 @@ class FaunaManager(QWidget):
         combo_specie = QComboBox()
         combo_specie.setEditable(True)
         combo_specie.addItem("")
-        combo_specie.addItems(self.db.get_voc_values('specie'))
+        combo_specie.addItems(self._voc_values('specie'))
         self.table_specie_psi.setCellWidget(row_position, 0, combo_specie)
 
         # Combo PSI
         combo_psi = QComboBox()
         combo_psi.setEditable(True)
         combo_psi.addItem("")
-        combo_psi.addItems(self.db.get_voc_values('parti_scheletriche'))
+        combo_psi.addItems(self._voc_values('parti_scheletriche'))
         self.table_specie_psi.setCellWidget(row_position, 1, combo_psi)
 
     def remove_specie_psi_row(self):
@@ -1961,7 +1537,7 @@ class FaunaManager(QWidget):
                 combo_specie = QComboBox()
                 combo_specie.setEditable(True)
                 combo_specie.addItem("")
-                combo_specie.addItems(self.db.get_voc_values('specie'))
+                combo_specie.addItems(self._voc_values('specie'))
                 combo_specie.setCurrentText(row_data[0])
                 self.table_specie_psi.setCellWidget(row_position, 0, combo_specie)
 
@@ -1969,7 +1545,7 @@ class FaunaManager(QWidget):
                 combo_psi = QComboBox()
                 combo_psi.setEditable(True)
                 combo_psi.addItem("")
-                combo_psi.addItems(self.db.get_voc_values('parti_scheletriche'))
+                combo_psi.addItems(self._voc_values('parti_scheletriche'))
                 combo_psi.setCurrentText(row_data[1])
                 self.table_specie_psi.setCellWidget(row_position, 1, combo_psi)
 
@@ -1982,14 +1558,14 @@ class FaunaManager(QWidget):
         combo_elemento = QComboBox()
         combo_elemento.setEditable(True)
         combo_elemento.addItem("")
-        combo_elemento.addItems(self.db.get_voc_values('elemento_anatomico'))
+        combo_elemento.addItems(self._voc_values('elemento_anatomico'))
         self.table_misure.setCellWidget(row_position, 0, combo_elemento)
 
         # Combo Specie
         combo_specie = QComboBox()
         combo_specie.setEditable(True)
         combo_specie.addItem("")
-        combo_specie.addItems(self.db.get_voc_values('specie'))
+        combo_specie.addItems(self._voc_values('specie'))
         self.table_misure.setCellWidget(row_position, 1, combo_specie)
 
         # Line edit per misure (GL, GB, Bp, Bd)
@@ -2043,7 +1619,7 @@ class FaunaManager(QWidget):
                 combo_elemento = QComboBox()
                 combo_elemento.setEditable(True)
                 combo_elemento.addItem("")
-                combo_elemento.addItems(self.db.get_voc_values('elemento_anatomico'))
+                combo_elemento.addItems(self._voc_values('elemento_anatomico'))
                 combo_elemento.setCurrentText(row_data[0])
                 self.table_misure.setCellWidget(row_position, 0, combo_elemento)
 
@@ -2051,7 +1627,7 @@ class FaunaManager(QWidget):
                 combo_specie = QComboBox()
                 combo_specie.setEditable(True)
                 combo_specie.addItem("")
-                combo_specie.addItems(self.db.get_voc_values('specie'))
+                combo_specie.addItems(self._voc_values('specie'))
                 combo_specie.setCurrentText(row_data[1])
                 self.table_misure.setCellWidget(row_position, 1, combo_specie)
 
@@ -2068,8 +1644,19 @@ class FaunaManager(QWidget):
             return
 
         self.current_record_id = record.get('id_fauna')
+        self._form_record = record
+
+        # Solo i tab già costruiti; gli altri leggono self._form_record alla prima apertura
+        for chiave, _ in TAB_MODULO:
+            if chiave in self._built_tabs:
+                getattr(self, f"_display_{chiave}")(record)
+        self._form_baseline = self.get_form_data()
+
+    def _display_identificativi(self, record: Dict):
+        """Dati identificativi e deposizionali"""
+        if not record:
+            return
 
-        # Dati identificativi
         self.txt_id_fauna.setText(str(record.get('id_fauna', '')))
 
         # Trova e seleziona la US corretta
@@ -2101,7 +1688,8 @@ class FaunaManager(QWidget):
         self.set_combo_value(self.combo_contesto, record.get('contesto', ''))
         self.txt_desc_contesto.setPlainText(record.get('descrizione_contesto', ''))
 
-        # Dati archeozoologici
+    def _display_archeozoologici(self, record: Dict):
+        """Dati archeozoologici, tabelle specie/PSI e misure"""
         self.set_combo_value(self.combo_connessione, record.get('resti_connessione_anatomica', ''))
         self.set_combo_value(self.combo_tipologia_accumulo, record.get('tipologia_accumulo', ''))
         self.set_combo_value(self.combo_deposizione, record.get('deposizione', ''))
@@ -2139,7 +1727,8 @@ class FaunaManager(QWidget):
         except:
             self.set_misure_data([])
 
-        # Dati tafonomici
+    def _display_tafonomici(self, record: Dict):
+        """Dati tafonomici"""
         self.set_combo_value(self.combo_frammentazione, record.get('stato_frammentazione', ''))
         self.set_combo_value(self.combo_tracce_combustione, record.get('tracce_combustione', ''))
         self.check_combustione_altri.setChecked(bool(record.get('combustione_altri_materiali_us', False)))
@@ -2149,7 +1738,8 @@ class FaunaManager(QWidget):
         self.set_combo_value(self.combo_stato_conservazione, record.get('stato_conservazione', ''))
         self.txt_alterazioni.setText(record.get('alterazioni_morfologiche', ''))
 
-        # Dati contestuali
+    def _display_contestuali(self, record: Dict):
+        """Dati contestuali"""
         self.txt_note_terreno.setPlainText(record.get('note_terreno_giacitura', ''))
         self.txt_campionature.setPlainText(record.get('campionature_effettuate', ''))
         self.txt_affidabilita.setPlainText(record.get('affidabilita_stratigrafica', ''))
@@ -2199,7 +1789,39 @@ class FaunaManager(QWidget):
         data['contesto'] = self.combo_contesto.currentText()
         data['descrizione_contesto'] = self.txt_desc_contesto.toPlainText()
 
-        # Dati archeozoologici
+        # Tab mai aperti: valori invariati del record corrente
+        for chiave, campi in CAMPI_TAB.items():
+            if chiave not in self._built_tabs:
+                for campo, vuoto in campi.items():
+                    valore = self._form_record.get(campo)
+                    data[campo] = vuoto if valore is None else valore
+
+        if 'archeozoologici' in self._built_tabs:
+            self._read_archeozoologici(data)
+        if 'tafonomici' in self._built_tabs:
+            self._read_tafonomici(data)
+        if 'contestuali' in self._built_tabs:
+            self._read_contestuali(data)
+
+        return data
+
+    def get_changed_data(self, data: Dict = None) -> Dict:
+        """
+        Campi del form modificati dall'ultima display_record
+
+        Args:
+            data: dati del form già letti (predefinito: get_form_data())
+
+        Returns:
+            Dizionario con le sole colonne cambiate (vuoto se non è cambiato nulla)
+        """
+        if data is None:
+            data = self.get_form_data()
+        return {campo: valore for campo, valore in data.items()
+                if campo not in self._form_baseline or self._form_baseline[campo] != valore}
+
+    def _read_archeozoologici(self, data: Dict):
+        """Dati archeozoologici dal form"""
         data['resti_connessione_anatomica'] = self.combo_connessione.currentText()
         data['tipologia_accumulo'] = self.combo_tipologia_accumulo.currentText()
         data['deposizione'] = self.combo_deposizione.currentText()
@@ -2223,7 +1845,8 @@ class FaunaManager(QWidget):
         misure_data = self.get_misure_data()
         data['misure_ossa'] = json.dumps(misure_data, ensure_ascii=False) if misure_data else ''
 
-        # Dati tafonomici
+    def _read_tafonomici(self, data: Dict):
+        """Dati tafonomici dal form"""
         data['stato_frammentazione'] = self.combo_frammentazione.currentText()
         data['tracce_combustione'] = self.combo_tracce_combustione.currentText()
         data['combustione_altri_materiali_us'] = 1 if self.check_combustione_altri.isChecked() else 0
@@ -2239,7 +1862,8 @@ class FaunaManager(QWidget):
 
         data['alterazioni_morfologiche'] = self.txt_alterazioni.text()
 
-        # Dati contestuali
+    def _read_contestuali(self, data: Dict):
+        """Dati contestuali dal form"""
         data['note_terreno_giacitura'] = self.txt_note_terreno.toPlainText()
         data['campionature_effettuate'] = self.txt_campionature.toPlainText()
         data['affidabilita_stratigrafica'] = self.txt_affidabilita.toPlainText()
@@ -2247,38 +1871,24 @@ class FaunaManager(QWidget):
         data['osservazioni'] = self.txt_osservazioni.toPlainText()
         data['interpretazione'] = self.txt_interpretazione.toPlainText()
 
-        return data
-
     def clear_form(self):
         """Pulisce il form"""
         self.current_record_id = None
+        self._form_record = {}
+        self._form_baseline = {}
         self.txt_id_fauna.clear()
         self.combo_us.setCurrentIndex(0)
         self.txt_responsabile.clear()
         self.date_compilazione.setDate(QDate.currentDate())
         self.txt_doc_fotografica.clear()
         self.txt_desc_contesto.clear()
-        self.spin_nmi.setValue(0)
-        self.txt_alterazioni.clear()
-        self.txt_note_terreno.clear()
-        self.txt_campionature.clear()
-        self.txt_affidabilita.clear()
-        self.txt_classi_reperti.clear()
-        self.txt_osservazioni.clear()
-        self.txt_interpretazione.clear()
-        self.check_combustione_altri.setChecked(False)
-
-        # Clear tables
-        self.table_specie_psi.setRowCount(0)
-        self.table_misure.setRowCount(0)
+        self.combo_metodologia.setCurrentIndex(0)
+        self.combo_contesto.setCurrentIndex(0)
 
-        # Reset combo boxes
-        for combo in [self.combo_metodologia, self.combo_contesto, self.combo_connessione,
-                      self.combo_tipologia_accumulo, self.combo_deposizione, self.combo_num_stimato,
-                      self.combo_frammentazione, self.combo_tracce_combustione, self.combo_tipo_combustione,
-                      self.combo_segni_tafonomici, self.combo_caratterizzazione_tafonomici,
-                      self.combo_stato_conservazione]:
-            combo.setCurrentIndex(0)
+        # Gli altri tab costruiti mostrano un record vuoto
+        for chiave, _ in TAB_MODULO[1:]:
+            if chiave in self._built_tabs:
+                getattr(self, f"_display_{chiave}")({})
 
     def new_record(self):
         """Crea un nuovo record"""
@@ -2299,17 +1909,29 @@ class FaunaManager(QWidget):
 
         try:
             if self.current_record_id:
-                # Aggiorna record esistente
-                success = self.db.update_fauna_record(self.current_record_id, data)
+                # Aggiorna record esistente, solo nelle colonne modificate
+                changes = self.get_changed_data(data)
+                if not changes:
+                    QMessageBox.information(self, "Salvataggio", "Nessuna modifica da salvare")
+                    return
+                success = self._update_record(self.current_record_id, changes)
                 if success:
+                    self._invalidate_statistics()
+                    self._record_saved(self.current_record_id)
                     QMessageBox.information(self, "Successo", "Record aggiornato con successo!")
-                    self.load_records()  # Ricarica per aggiornare la lista
+                elif success is None:
+                    # Nessuna modifica locale scelta nel confronto: mostra la versione attuale
+                    self._record_saved(self.current_record_id)
+                    QMessageBox.information(self, "Salvataggio",
+                                            "Nessuna modifica salvata: la scheda mostra la versione "
+                                            "attuale nel database.")
             else:
                 # Inserisci nuovo record
                 new_id = self.db.insert_fauna_record(data)
                 self.current_record_id = new_id
+                self._invalidate_statistics()
+                self._record_saved(new_id, nuovo=True)
                 QMessageBox.information(self, "Successo", f"Nuovo record creato con ID: {new_id}")
-                self.load_records()  # Ricarica per aggiornare la lista
 
         except Exception as e:
             QMessageBox.critical(self, "Errore", f"Errore nel salvataggio: {str(e)}")
@@ -2329,42 +1951,120 @@ class FaunaManager(QWidget):
 
         if reply == QMessageBox.Yes:
             try:
-                success = self.db.delete_fauna_record(self.current_record_id)
+                deleted_id = self.current_record_id
+                success = self.db.delete_fauna_record(deleted_id)
                 if success:
+                    self._invalidate_statistics()
+                    self._record_deleted(deleted_id)
                     QMessageBox.information(self, "Successo", "Record eliminato con successo!")
-                    self.load_records()
             except Exception as e:
                 QMessageBox.critical(self, "Errore", f"Errore nell'eliminazione: {str(e)}")
 
+    def _update_record(self, id_fauna: int, changes: Dict) -> Optional[bool]:
+        """
+        Salva le modifiche solo se la scheda è ancora alla row_version letta (un solo
+        UPDATE). Se un altro utente l'ha salvata nel frattempo, propone il confronto
+        campo per campo e riprova sopra la versione attuale.
+
+        Returns:
+            True se la scheda è stata salvata, None se nel confronto l'utente non ha
+            scelto alcuna modifica (resta la versione attuale), False se annullato
+        """
+        letto = self._form_record
+        while not self.db.update_fauna_record(id_fauna, changes, letto.get('row_version')):
+            attuale = self.db.get_fauna_record(id_fauna)
+            if attuale is None:
+                QMessageBox.warning(self, "Attenzione", "La scheda è stata eliminata da un altro utente.")
+                self._invalidate_statistics()
+                self._record_deleted(id_fauna)
+                return False
+
+            from fauna_merge import FaunaMergeDialog
+            dialog = FaunaMergeDialog(letto, attuale, changes, self)
+            if dialog.exec_() != QDialog.Accepted:
+                return False
+            changes = dialog.get_changes()
+            letto = attuale
+            if not changes:
+                return None
+        return True
+
+    def _record_saved(self, id_fauna: int, nuovo: bool = False):
+        """
+        Aggiorna in self.records la sola riga della scheda salvata, senza rileggere
+        l'elenco: una scheda modificata resta al suo posto, una nuova è aggiunta
+        in fondo ai record letti. In entrambi i casi diventa il record corrente.
+
+        Args:
+            id_fauna: ID della scheda salvata
+            nuovo: True per una scheda appena inserita, che non può essere già
+                nell'elenco (evita la ricerca lineare in self.records)
+        """
+        summary = self.db.get_fauna_rows([id_fauna], COLONNE_RIEPILOGO)
+        if summary:
+            index = -1 if nuovo else self._index_of(id_fauna)
+            if index < 0:
+                self.records.append(summary[0])
+                self._added_ids.add(id_fauna)
+                index = len(self.records) - 1
+            else:
+                self.records[index] = summary[0]
+            self._show_record(index)
+        if 'elenco' in self._built_tabs:
+            self.grid.model.update_record(id_fauna)
+            self.grid.update_status()
+        self.update_navigation_buttons()
+        self.update_record_info()
+
+    def _record_deleted(self, id_fauna: int):
+        """Toglie la scheda eliminata da self.records e visualizza quella che ne prende il posto"""
+        index = self._index_of(id_fauna)
+        if index >= 0:
+            del self.records[index]
+        else:
+            index = self.current_index
+        if self.records:
+            self._show_record(min(max(index, 0), len(self.records) - 1))
+        else:
+            self.current_index = -1
+            self.clear_form()
+        if 'elenco' in self._built_tabs:
+            self.grid.model.remove_record(id_fauna)
+        self.update_navigation_buttons()
+        self.update_record_info()
+
+    def _index_of(self, id_fauna: int) -> int:
+        """Posizione in self.records della scheda indicata (prima quella corrente), -1 se assente"""
+        if 0 <= self.current_index < len(self.records) and self.records[self.current_index]['id_fauna'] == id_fauna:
+            return self.current_index
+        return next((i for i, r in enumerate(self.records) if r['id_fauna'] == id_fauna), -1)
+
     def first_record(self):
         """Va al primo record"""
         if self.records:
-            self.current_index = 0
-            self.display_record(self.records[0])
+            self._show_record(0)
             self.update_navigation_buttons()
             self.update_record_info()
 
     def previous_record(self):
         """Va al record precedente"""
         if self.records and self.current_index > 0:
-            self.current_index -= 1
-            self.display_record(self.records[self.current_index])
+            self._show_record(self.current_index - 1)
             self.update_navigation_buttons()
             self.update_record_info()
 
     def next_record(self):
         """Va al record successivo"""
         if self.records and self.current_index < len(self.records) - 1:
-            self.current_index += 1
-            self.display_record(self.records[self.current_index])
+            self._show_record(self.current_index + 1)
             self.update_navigation_buttons()
             self.update_record_info()
 
     def last_record(self):
         """Va all'ultimo record"""
+        self._finish_loading()
         if self.records:
-            self.current_index = len(self.records) - 1
-            self.display_record(self.records[-1])
+            self._show_record(len(self.records) - 1)
             self.update_navigation_buttons()
             self.update_record_info()
 
@@ -2377,21 +2077,17 @@ class FaunaManager(QWidget):
             filters = dialog.get_filters()
 
             if search_term:
-                self.records = self.db.search_fauna_records(search_term)
+                pages = iter([self.db.search_fauna_records(search_term, columns=COLONNE_RIEPILOGO)])
+                self.current_filters = None
             else:
-                self.records = self.db.get_all_fauna_records(filters)
+                pages = self.db.iter_fauna_pages(filters, PAGINA_RECORD, columns=COLONNE_RIEPILOGO)
+                self.current_filters = filters or None
 
-            if self.records:
-                self.current_index = 0
-                self.display_record(self.records[0])
-            else:
-                self.current_index = -1
-                self.clear_form()
+            found = self._show_pages(pages)
+            self._refresh_grid()
+            if not found:
                 QMessageBox.information(self, "Ricerca", "Nessun record trovato")
 
-            self.update_navigation_buttons()
-            self.update_record_info()
-
     def manage_vocabulary(self):
         """Apre l'interfaccia di gestione del vocabolario"""
         try:
@@ -2414,6 +2110,8 @@ class FaunaManager(QWidget):
     def change_database(self):
         """Cambia il database connesso"""
         try:
+            from database_selector import DatabaseSelectorDialog
+
             # Mostra dialog di selezione database
             dialog = DatabaseSelectorDialog(self)
 
@@ -2432,6 +2130,7 @@ class FaunaManager(QWidget):
 
                 if reply == QMessageBox.Yes:
                     # Chiudi la connessione corrente
+                    self._stop_loading()
                     if self.db:
                         self.db.close()
 
@@ -2495,6 +2194,213 @@ class FaunaManager(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Errore", f"Errore nell'esportazione PDF: {str(e)}")
 
+    def _ask_pdf_layout(self) -> bool:
+        """Chiede se impaginare sul modulo ufficiale SCHEDA FR invece della scheda a sezioni"""
+        reply = QMessageBox.question(
+            self, "Impaginazione PDF",
+            "Impaginare le schede sul modulo ufficiale SCHEDA FR?\n\n"
+            "Sì: modulo ufficiale (più rapido)\nNo: scheda a sezioni",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+
+    def export_catalogue(self):
+        """Esporta in un catalogo PDF (o ZIP di PDF) le schede dell'ultima ricerca per filtri"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog, QProgressDialog, QApplication
+            from fauna_pdf import export_catalogue
+
+            default_name = f"Catalogo_FR_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            file_path, selected = QFileDialog.getSaveFileName(
+                self,
+                "Salva catalogo schede",
+                default_name,
+                "PDF unico (*.pdf);;Archivio ZIP di PDF (*.zip)"
+            )
+
+            if not file_path:
+                return
+            if not file_path.lower().endswith(('.pdf', '.zip')):
+                file_path += '.zip' if selected.startswith('Archivio') else '.pdf'
+
+            modulo = self._ask_pdf_layout()
+
+            dialog = QProgressDialog("Impaginazione schede...", None, 0, 0, self)
+            dialog.setWindowTitle("Esporta Catalogo PDF")
+            dialog.setWindowModality(Qt.WindowModal)
+            dialog.setMinimumDuration(0)
+
+            def on_progress(fatte: int, totale: int):
+                dialog.setMaximum(totale)
+                dialog.setValue(fatte)
+                QApplication.processEvents()
+
+            try:
+                count = export_catalogue(self.db, file_path, self.current_filters, modulo=modulo,
+                                         max_workers=self.max_workers, progress=on_progress)
+            finally:
+                dialog.close()
+
+            QMessageBox.information(self, "Successo", f"{count} schede esportate in:\n{file_path}")
+
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'esportazione del catalogo:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def sync_pdf_directory(self):
+        """Aggiorna una cartella di PDF rigenerando solo le schede nuove o modificate"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog, QProgressDialog, QApplication
+            from fauna_pdf import sync_pdf_directory
+
+            output_dir = QFileDialog.getExistingDirectory(self, "Cartella dei PDF delle schede")
+            if not output_dir:
+                return
+
+            modulo = self._ask_pdf_layout()
+
+            dialog = QProgressDialog("Impaginazione schede modificate...", None, 0, 0, self)
+            dialog.setWindowTitle("Aggiorna Cartella PDF")
+            dialog.setWindowModality(Qt.WindowModal)
+            dialog.setMinimumDuration(0)
+
+            def on_progress(fatte: int, totale: int):
+                dialog.setMaximum(totale)
+                dialog.setValue(fatte)
+                QApplication.processEvents()
+
+            try:
+                counts = sync_pdf_directory(self.db, output_dir, self.current_filters, modulo=modulo,
+                                            max_workers=self.max_workers, progress=on_progress)
+            finally:
+                dialog.close()
+
+            QMessageBox.information(
+                self, "Successo",
+                f"Cartella aggiornata: {output_dir}\n\n"
+                f"Schede generate: {counts['generate']}\n"
+                f"Schede invariate: {counts['invariate']}\n"
+                f"PDF eliminati: {counts['eliminate']}"
+            )
+
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'aggiornamento della cartella PDF:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def import_records(self):
+        """Importa schede da un file XLSX o CSV (prima valida, poi chiede conferma)"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_import import import_file, format_report
+
+            file_path, _ = QFileDialog.getOpenFileName(
+                self,
+                "Importa schede",
+                "",
+                "File Excel o CSV (*.xlsx *.csv);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            # Prova: valida tutte le righe senza inserire
+            report = import_file(self.db, file_path, dry_run=True, max_workers=self.max_workers)
+
+            msg = QMessageBox(self)
+            msg.setWindowTitle("Importa Schede")
+            msg.setDetailedText("\n".join(format_report(report)))
+            riepilogo = (f"Righe lette: {report.righe_lette}\n"
+                         f"Righe valide: {report.valide}\n"
+                         f"Righe con errori (saranno saltate): {report.righe_con_errori}")
+            if report.valide == 0:
+                msg.setIcon(QMessageBox.Warning)
+                msg.setText(f"{riepilogo}\n\nNessuna scheda da importare.")
+                msg.exec_()
+                return
+
+            msg.setIcon(QMessageBox.Question)
+            msg.setText(f"{riepilogo}\n\nImportare {report.valide} schede?")
+            msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+            if msg.exec_() != QMessageBox.Yes:
+                return
+
+            report = import_file(self.db, file_path, max_workers=self.max_workers)
+            self._invalidate_statistics()
+            self.load_records(self.current_filters)
+
+            QMessageBox.information(self, "Successo", f"{report.inserite} schede importate da:\n{file_path}")
+
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'importazione:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def export_records_csv(self):
+        """Esporta in CSV le schede dell'ultima ricerca per filtri (o tutte)"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_export import export_records_csv
+
+            default_name = f"schede_fauna_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                "Salva schede in CSV",
+                default_name,
+                "File CSV (*.csv);;Tutti i file (*)"
+            )
+
+            if not file_path:
+                return
+
+            reply = QMessageBox.question(
+                self, "Esporta CSV",
+                "Esplodere specie/PSI e misure in colonne separate?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+
+            count = export_records_csv(self.db, file_path, self.current_filters,
+                                       flatten=reply == QMessageBox.Yes)
+            esportate = f"{count} schede" if count is not None else "Schede"
+            filtri = ", ".join(f"{k} = {v}" for k, v in self.current_filters.items()) if self.current_filters else "nessuno"
+            QMessageBox.information(
+                self, "Successo", f"{esportate} esportate in:\n{file_path}\n\nFiltri: {filtri}"
+            )
+
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'esportazione CSV:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def export_parquet(self):
+        """Esporta le schede in file Parquet (schede, specie/PSI, misure) per l'analisi"""
+        try:
+            from PyQt5.QtWidgets import QFileDialog
+            from fauna_export import export_parquet
+
+            output_dir = QFileDialog.getExistingDirectory(self, "Cartella di destinazione Parquet")
+            if not output_dir:
+                return
+
+            written = export_parquet(self.db, output_dir, self.current_filters)
+
+            files = "\n".join(f"{os.path.basename(path)}: {n} righe" for path, n in written.items())
+            QMessageBox.information(self, "Successo", f"Esportazione Parquet in:\n{output_dir}\n\n{files}")
+
+        except ImportError as e:
+            QMessageBox.warning(self, "Modulo non disponibile", str(e))
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nell'esportazione Parquet:\n{str(e)}")
+            import traceback
+            traceback.print_exc()
+
     def update_navigation_buttons(self):
         """Aggiorna lo stato dei bottoni di navigazione"""
         has_records = len(self.records) > 0
@@ -2515,12 +2421,15 @@ class FaunaManager(QWidget):
             info = f"Record {self.current_index + 1} di {len(self.records)}"
             if self.current_record_id:
                 info += f" (ID: {self.current_record_id})"
+            if self._record_pages is not None:
+                info += " - caricamento record..."
             self.lbl_record_info.setText(info)
         else:
             self.lbl_record_info.setText("Nessun record" if not self.records else "Nuovo record")
 
     def closeEvent(self, event):
         """Gestisce la chiusura del widget"""
+        self._stop_loading()
         self.db.close()
         event.accept()
 
@@ -2529,7 +2438,11 @@ if __name__ == '__main__':
     import sys
     from PyQt5.QtWidgets import QApplication
 
+    # --profile-startup: stampa i tempi delle fasi di avvio
+    profile = StartupProfile() if '--profile-startup' in sys.argv else None
     app = QApplication(sys.argv)
-    window = FaunaManager()
+    if profile:
+        profile.mark("QApplication")
+    window = FaunaManager(profile=profile)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
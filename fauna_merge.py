@@ -0,0 +1,131 @@
+"""
+Risoluzione dei conflitti di salvataggio tra più utenti
+Il salvataggio aggiorna la scheda solo se row_version è ancora quello letto
+all'apertura; se un altro utente l'ha salvata nel frattempo, questo dialog
+confronta campo per campo la versione letta, quella attuale nel database e le
+modifiche del form, e lascia scegliere quali modifiche salvare sopra quella attuale.
+"""
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
+    QDialogButtonBox
+)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+# Colonne tecniche escluse dal confronto
+CAMPI_ESCLUSI = ('id_fauna', 'row_version')
+
+# Testo massimo di una cella (il valore completo è nel tooltip)
+LUNGHEZZA_CELLA = 80
+
+
+@dataclass
+class FieldDiff:
+    """Un campo cambiato dall'apertura della scheda, nel database o nel form"""
+    campo: str
+    letto: object            # valore all'apertura della scheda
+    attuale: object          # valore ora nel database
+    locale: object           # valore nel form (None se non modificato localmente)
+    modificato_localmente: bool
+    modificato_da_altri: bool
+
+    @property
+    def conflitto(self) -> bool:
+        """Modificato sia localmente sia da altri, con valori diversi"""
+        return self.modificato_localmente and self.modificato_da_altri and not _uguali(self.locale, self.attuale)
+
+
+def _testo(valore) -> str:
+    return '' if valore is None else str(valore)
+
+
+def _uguali(a, b) -> bool:
+    # I valori del form sono testi o numeri, quelli del database possono essere NULL
+    return _testo(a) == _testo(b)
+
+
+def diff_records(letto: Dict, attuale: Dict, modifiche: Dict) -> List[FieldDiff]:
+    """
+    Campi cambiati dall'altro utente o nel form, nell'ordine delle colonne
+
+    Args:
+        letto: scheda come letta all'apertura
+        attuale: scheda come è ora nel database
+        modifiche: campi modificati nel form (get_changed_data)
+    """
+    campi = list(attuale) + [c for c in list(letto) + list(modifiche) if c not in attuale]
+    diffs = []
+    for campo in dict.fromkeys(campi):
+        if campo in CAMPI_ESCLUSI:
+            continue
+        da_altri = not _uguali(letto.get(campo), attuale.get(campo))
+        locale = campo in modifiche
+        if da_altri or locale:
+            diffs.append(FieldDiff(campo, letto.get(campo), attuale.get(campo), modifiche.get(campo),
+                                   locale, da_altri))
+    return diffs
+
+
+class FaunaMergeDialog(QDialog):
+    """Confronto tra la scheda letta, quella salvata da altri e le modifiche locali"""
+
+    COLONNE = ["Campo", "Letto all'apertura", "Attuale nel database", "Modifica locale"]
+
+    def __init__(self, letto: Dict, attuale: Dict, modifiche: Dict, parent=None):
+        super().__init__(parent)
+        self.modifiche = modifiche
+        self.diffs = diff_records(letto, attuale, modifiche)
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Scheda modificata da un altro utente")
+        self.setMinimumSize(800, 400)
+        layout = QVBoxLayout(self)
+
+        conflitti = sum(1 for d in self.diffs if d.conflitto)
+        testo = ("La scheda è stata salvata da un altro utente dopo che l'hai aperta.\n"
+                 "Seleziona le modifiche locali da salvare; gli altri campi restano come nel database.")
+        if conflitti:
+            testo += f"\nCampi modificati da entrambi (evidenziati): {conflitti}"
+        layout.addWidget(QLabel(testo))
+
+        self.table = QTableWidget(len(self.diffs), len(self.COLONNE))
+        self.table.setHorizontalHeaderLabels(self.COLONNE)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+
+        for row, diff in enumerate(self.diffs):
+            campo = QTableWidgetItem(diff.campo)
+            if diff.modificato_localmente:
+                # La casella sul nome del campo sceglie se salvare la modifica locale
+                campo.setFlags(campo.flags() | Qt.ItemIsUserCheckable)
+                campo.setCheckState(Qt.Checked)
+            self.table.setItem(row, 0, campo)
+            valori = [diff.letto, diff.attuale, diff.locale if diff.modificato_localmente else None]
+            for col, valore in enumerate(valori, start=1):
+                testo = _testo(valore)
+                item = QTableWidgetItem(testo if len(testo) <= LUNGHEZZA_CELLA else testo[:LUNGHEZZA_CELLA] + "…")
+                item.setToolTip(testo)
+                self.table.setItem(row, col, item)
+            if diff.conflitto:
+                for col in range(len(self.COLONNE)):
+                    self.table.item(row, col).setBackground(QColor(255, 220, 220))
+        layout.addWidget(self.table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("Salva selezionate")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def get_changes(self) -> Dict:
+        """Modifiche locali selezionate, da salvare sopra la versione attuale"""
+        return {diff.campo: self.modifiche[diff.campo] for row, diff in enumerate(self.diffs)
+                if diff.modificato_localmente and self.table.item(row, 0).checkState() == Qt.Checked}
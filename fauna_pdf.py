@@ -1,11 +1,21 @@
 """
 Modulo per l'esportazione delle schede fauna in formato PDF
-Genera PDF conformi al formato SCHEDA FR standard
+Genera PDF conformi al formato SCHEDA FR standard, per singola scheda o per
+cataloghi di molte schede (in un unico PDF o in un archivio ZIP), come scheda
+a sezioni (FaunaPDFExporter) o sul modulo ufficiale (SchedaFRCanvas)
 """
 
+import hashlib
+import json
+import math
 import os
+import re
+import shutil
+import tempfile
+import zipfile
 from datetime import datetime
-from typing import Dict
+from typing import Callable, Dict, List, Optional
+from xml.sax.saxutils import escape
 
 try:
     from reportlab.lib.pagesizes import A4
@@ -18,10 +28,41 @@ try:
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
     from reportlab.pdfgen import canvas
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.lib.utils import simpleSplit
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+try:
+    from pypdf import PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+from fauna_analytics import run_parallel
+from fauna_records import extract_specie_psi_pairs, extract_detailed_measurements
+
+
+# Ordinamenti disponibili per i cataloghi (nome, colonne ORDER BY)
+ORDINAMENTI = {
+    'sito': 'sito, area, us, id_fauna',
+    'us': 'us, sito, area, id_fauna',
+    'specie': 'specie, sito, area, us, id_fauna',
+    'data': 'data_compilazione, sito, area, us, id_fauna',
+    'id': 'id_fauna',
+}
+
+# Schede massime per task di rendering del catalogo
+CATALOGO_BLOCCO = 50
+
+# Versione dell'impaginazione: incrementarla quando cambia il layout delle
+# schede, così le cartelle sincronizzate rigenerano tutti i PDF
+VERSIONE_SCHEDA = 1
+
+# Manifest delle cartelle sincronizzate (id_fauna -> impronta e nome file)
+MANIFEST = 'manifest_schede.json'
+
 
 class FaunaPDFExporter:
     """Classe per esportare schede fauna in PDF"""
@@ -68,6 +109,14 @@ class FaunaPDFExporter:
             leading=12
         )
 
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=self.styles['Normal'],
+            fontSize=8,
+            textColor=colors.gray,
+            alignment=TA_CENTER
+        )
+
     def export_record(self, record: Dict, filename: str = None) -> str:
         """
         Esporta un record in PDF
@@ -88,7 +137,13 @@ class FaunaPDFExporter:
 
         pdf_path = os.path.join(self.output_dir, filename)
 
-        # Crea il documento PDF
+        # Genera il PDF
+        self._build(pdf_path, self.record_story(record))
+
+        return pdf_path
+
+    def _build(self, pdf_path: str, story: list):
+        """Impagina una story in un documento A4 con i margini della scheda"""
         doc = SimpleDocTemplate(
             pdf_path,
             pagesize=A4,
@@ -97,7 +152,18 @@ class FaunaPDFExporter:
             topMargin=20*mm,
             bottomMargin=20*mm
         )
+        doc.build(story)
+
+    def record_story(self, record: Dict) -> list:
+        """
+        Flowable di una scheda FR completa
 
+        Args:
+            record: dizionario con i dati del record
+
+        Returns:
+            Lista di flowable ReportLab
+        """
         # Contenuto del documento
         story = []
 
@@ -129,7 +195,7 @@ class FaunaPDFExporter:
         if record.get('descrizione_contesto'):
             story.append(Spacer(1, 0.2*cm))
             story.append(Paragraph("Descrizione del Contesto:", self.normal_style))
-            story.append(Paragraph(record.get('descrizione_contesto', ''), self.normal_style))
+            story.append(Paragraph(escape(str(record.get('descrizione_contesto'))), self.normal_style))
 
         story.append(Spacer(1, 0.3*cm))
 
@@ -180,28 +246,18 @@ class FaunaPDFExporter:
             value = record.get(field, '')
             if value:
                 story.append(Paragraph(f"<b>{label}:</b>", self.normal_style))
-                story.append(Paragraph(value, self.normal_style))
+                story.append(Paragraph(escape(str(value)), self.normal_style))
                 story.append(Spacer(1, 0.2*cm))
 
         # Footer
         story.append(Spacer(1, 1*cm))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            textColor=colors.gray,
-            alignment=TA_CENTER
-        )
         timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
         story.append(Paragraph(
             f"Scheda generata automaticamente il {timestamp} - pyArchInit Fauna Manager",
-            footer_style
+            self.footer_style
         ))
 
-        # Genera il PDF
-        doc.build(story)
-
-        return pdf_path
+        return story
 
     def _create_section_table(self, data: list) -> Table:
         """
@@ -217,7 +273,7 @@ class FaunaPDFExporter:
         formatted_data = []
         for row in data:
             label = Paragraph(f"<b>{row[0]}</b>", self.normal_style)
-            value = Paragraph(str(row[1]) if row[1] else '', self.normal_style)
+            value = Paragraph(escape(str(row[1])) if row[1] else '', self.normal_style)
             formatted_data.append([label, value])
 
         # Crea la tabella
@@ -251,7 +307,7 @@ class FaunaPDFExporter:
 
     def export_multiple_records(self, records: list, filename: str = None) -> str:
         """
-        Esporta multipli record in un unico PDF
+        Esporta multipli record in un unico PDF (una scheda completa per pagina)
 
         Args:
             records: lista di dizionari con i dati dei record
@@ -269,31 +325,595 @@ class FaunaPDFExporter:
 
         pdf_path = os.path.join(self.output_dir, filename)
 
-        doc = SimpleDocTemplate(
-            pdf_path,
-            pagesize=A4,
-            rightMargin=20*mm,
-            leftMargin=20*mm,
-            topMargin=20*mm,
-            bottomMargin=20*mm
-        )
-
         story = []
 
         for i, record in enumerate(records):
             if i > 0:
                 story.append(PageBreak())
+            story.extend(self.record_story(record))
 
-            # Usa il metodo di esportazione singola ma aggiungi a story invece di creare nuovo doc
-            story.append(Paragraph(f"SCHEDA FR - Fauna (Record {i+1}/{len(records)})", self.title_style))
-            story.append(Spacer(1, 0.5*cm))
+        self._build(pdf_path, story)
+        return pdf_path
 
-            # ... (stesso contenuto del metodo export_record)
-            # Per brevità, qui viene omesso ma dovrebbe contenere lo stesso contenuto
 
-        doc.build(story)
+# Modulo ufficiale SCHEDA FR (FIGG. 2-4.pdf): celle di ogni pagina in punti,
+# con y misurata dal bordo superiore del foglio A4.
+# (x0, y0, x1, y1, etichetta, campo, valore): senza campo la cella è solo
+# grafica; con valore None il campo è scritto nella cella, altrimenti la cella
+# è un'opzione contrassegnata quando il campo vale `valore`.
+MODULO_CELLE = [
+    [
+        (56.6, 86.6, 537.8, 111.6, "", None, None),
+        (56.6, 111.6, 287.8, 140.2, "ENTE RESPONSABILE DELL'INTERVENTO", None, None),
+        (287.8, 111.6, 537.8, 140.2, "UFFICIO COMPETENTE PER LA TUTELA", None, None),
+        (56.6, 140.2, 537.8, 162.0, "RESPONSABILE SCIENTIFICO", None, None),
+        (56.6, 162.0, 537.8, 189.8, "REFERENTE SCIENTIFICO PER L'ARCHEOZOOLOGIA", None, None),
+        (56.6, 189.8, 105.1, 214.3, "SCAVO", None, None),
+        (105.1, 189.8, 116.2, 214.3, "", None, None),
+        (116.2, 189.8, 171.1, 214.3, "RECUPERO", None, None),
+        (171.1, 189.8, 184.1, 214.3, "", None, None),
+        (184.1, 189.8, 404.4, 214.3, "ESEGUITO DA", None, None),
+        (404.4, 189.8, 417.6, 245.0, "", None, None),
+        (417.6, 189.8, 537.8, 214.3, "DATA", None, None),
+        (56.6, 214.3, 404.4, 245.0, "COMPILATORE", 'responsabile_scheda', None),
+        (417.6, 214.3, 537.8, 245.0, "DATA", 'data_compilazione', None),
+
+        (55.7, 257.8, 538.1, 272.2, "LOCALITÀ", None, None),
+        (55.7, 272.2, 538.1, 285.8, "DENOMINAZIONE DEL SITO", 'sito', None),
+        (55.7, 285.8, 538.1, 301.7, "COORDINATE", None, None),
+        (55.7, 301.7, 289.9, 374.2, "IDENTIFICATIVO DEL SAGGIO STRATIGRAFICO/DELL'EDIFICIO/DELLA\n"
+                                    "STRUTTURA/ DELLA DEPOSIZIONE FUNERARIA DI RIFERIMENTO", None, None),
+        (289.9, 301.7, 395.8, 374.2, "ANNO", None, None),
+        (395.8, 301.7, 538.1, 338.9, "RIFERIMENTO SCHEDA US", 'id_us', None),
+        (395.8, 338.9, 538.1, 374.2, "RIFERIMENTO TABELLE MATERIALI", None, None),
+        (55.7, 374.2, 289.9, 403.7, "DOCUMENTAZIONE FOTOGRAFICA", 'documentazione_fotografica', None),
+        (289.9, 374.2, 538.1, 403.7, "DOCUMENTAZIONE GRAFICA", None, None),
+        (55.7, 403.7, 232.3, 447.1, "AREA/EDIFICIO/STRUTTURA", 'area', None),
+        (232.3, 403.7, 377.8, 447.1, "SAGGIO", 'saggio', None),
+        (377.8, 403.7, 538.1, 447.1, "US", 'us', None),
+        (55.7, 447.1, 232.3, 470.9, "CONTESTO", None, None),
+        (55.7, 470.9, 232.3, 482.6, "FUNERARIO", 'contesto', 'FUNERARIO'),
+        (55.7, 482.6, 232.3, 494.2, "ABITATIVO", 'contesto', 'ABITATIVO'),
+        (55.7, 494.2, 232.3, 506.9, "PRODUTTIVO", 'contesto', 'PRODUTTIVO'),
+        (55.7, 506.9, 232.3, 518.6, "IPOGEO", 'contesto', 'IPOGEO'),
+        (55.7, 518.6, 232.3, 532.8, "CULTUALE", 'contesto', 'CULTUALE'),
+        (55.7, 532.8, 232.3, 546.0, "ALTRO", 'contesto', 'ALTRO'),
+        (232.3, 447.1, 538.1, 546.0, "DESCRIZIONE DEL CONTESTO DI RINVENIMENTO", 'descrizione_contesto', None),
+        (55.7, 546.0, 232.3, 574.3, "DATAZIONE US", 'datazione_us', None),
+        (232.3, 546.0, 373.9, 574.3, "PERIODO", None, None),
+        (373.9, 546.0, 538.1, 574.3, "FASE", None, None),
+        (55.7, 574.3, 538.1, 600.7, "ELEMENTI DATANTI (US)", None, None),
+        (55.7, 600.7, 538.1, 617.3, "METODOLOGIA DI RECUPERO", None, None),
+        (55.7, 617.3, 230.4, 638.2, "A MANO", 'metodologia_recupero', 'A MANO'),
+        (230.4, 617.3, 373.9, 638.2, "SETACCIO", 'metodologia_recupero', 'SETACCIO'),
+        (373.9, 617.3, 538.1, 638.2, "FLOTTAZIONE", 'metodologia_recupero', 'FLOTTAZIONE'),
+
+        (56.9, 653.3, 233.5, 675.4, "RESTI IN CONNESSIONE ANATOMICA", None, None),
+        (56.9, 675.4, 94.3, 696.5, "SI", 'resti_connessione_anatomica', 'SI'),
+        (94.3, 675.4, 130.1, 696.5, "NO", 'resti_connessione_anatomica', 'NO'),
+        (130.1, 675.4, 233.5, 696.5, "PARZIALE", 'resti_connessione_anatomica', 'PARZIALE'),
+        (233.5, 653.3, 346.8, 696.5, "CONCENTRAZIONE LOCALIZZATA", 'tipologia_accumulo', 'CONCENTRAZIONE LOCALIZZATA'),
+        (346.8, 653.3, 439.0, 696.5, "RESTI SELEZIONATI", 'tipologia_accumulo', 'RESTI SELEZIONATI'),
+        (439.0, 653.3, 538.3, 696.5, "RESTI SPORADICI", 'tipologia_accumulo', 'RESTI SPORADICI'),
+        (56.9, 696.5, 233.5, 724.6, "DEPOSIZIONE SINGOLA", None, None),
+        (233.5, 696.5, 382.6, 724.6, "DEPOSIZIONE MULTIPLA", None, None),
+        (382.6, 696.5, 538.3, 724.6, "DEPOSIZIONE COLLETTIVA", None, None),
+        (56.9, 724.6, 233.5, 760.1, "DEPOSIZIONE PRIMARIA", 'deposizione', 'DEPOSIZIONE PRIMARIA'),
+        (233.5, 724.6, 382.6, 760.1, "DEPOSIZIONE SECONDARIA", 'deposizione', 'DEPOSIZIONE SECONDARIA'),
+        (382.6, 724.6, 538.3, 760.1, "RIMANEGGIATA", 'deposizione', 'RIMANEGGIATA'),
+    ],
+    [
+        (56.9, 86.6, 538.3, 241.2, "NUMERO STIMATO RESTI OSTEOLOGICI", None, None),
+        (69.8, 114.1, 82.7, 126.9, "", 'numero_stimato_resti', 'POCHI'),
+        (69.9, 137.1, 82.8, 149.9, "", 'numero_stimato_resti', 'DISCRETI'),
+        (70.2, 162.8, 83.0, 175.6, "", 'numero_stimato_resti', 'NUMEROSI'),
+        (70.6, 186.3, 83.5, 199.2, "", 'numero_stimato_resti', 'ABBONDANTI'),
+        (56.9, 241.2, 290.2, 285.1, "NMI (SOLO NEL CASO DI SEPOLTURE E RESTI IN CONNESSIONE)",
+         'numero_minimo_individui', None),
+        (290.2, 241.2, 538.3, 285.1, "SPECIE (NEL CASO DI SEPOLTURE E RESTI IN CONNESSIONE)", 'specie', None),
+        (56.9, 285.1, 538.3, 372.5, "PARTI SCHELETRICHE PRESENTI (NEL CASO DI SEPOLTURA O RESTI IN CONNESSIONE)",
+         'parti_scheletriche', None),
+        (56.9, 372.5, 538.3, 474.2, "MISURE DI OSSA DI CUI SI PREVEDE LA DISGREGAZIONE DOPO LA RIMOZIONE",
+         'misure_ossa', None),
+
+        (56.9, 489.4, 289.7, 503.3, "STATO DI FRAMMENTAZIONE", None, None),
+        (56.9, 503.3, 109.7, 530.9, "SI", 'stato_frammentazione', 'SI'),
+        (109.7, 503.3, 133.9, 530.9, "NO", 'stato_frammentazione', 'NO'),
+        (133.9, 503.3, 289.7, 530.9, "PARZIALE", 'stato_frammentazione', 'PARZIALE'),
+        (290.2, 489.4, 538.3, 503.3, "TRACCE DI COMBUSTIONE", None, None),
+        (290.2, 503.3, 325.7, 530.9, "SI", 'tracce_combustione', 'SI'),
+        (325.7, 503.3, 361.2, 530.9, "NO", 'tracce_combustione', 'NO'),
+        (361.2, 503.3, 446.2, 530.9, "SCARSE", 'tracce_combustione', 'SCARSE'),
+        (446.2, 503.3, 538.3, 530.9, "DIFFUSE", 'tracce_combustione', 'DIFFUSE'),
+        (56.9, 530.9, 289.7, 584.4, "COLORAZIONE", None, None),
+        (290.2, 530.9, 446.2, 557.0, "RISCONTRATE SU ALTRI MATERIALI DELLA US", None, None),
+        (446.2, 530.9, 538.3, 557.0, "ACCIDENTALE", 'tipo_combustione', 'ACCIDENTALE'),
+        (290.2, 557.0, 325.7, 584.4, "SI", 'combustione_altri_materiali_us', 'SI'),
+        (325.7, 557.0, 446.2, 584.4, "NO", 'combustione_altri_materiali_us', 'NO'),
+        (446.2, 557.0, 538.3, 584.4, "INTENZIONALE", 'tipo_combustione', 'INTENZIONALE'),
+        (56.9, 584.4, 289.7, 665.5, "AGENTI TAFONOMICI PARTICOLARI RISCONTRATI NEL DEPOSITO", None, None),
+        (290.2, 584.4, 538.3, 601.4, "SEGNI TAFONOMICI EVIDENTI", None, None),
+        (290.2, 601.4, 325.7, 623.8, "SI", 'segni_tafonomici_evidenti', 'SI'),
+        (325.7, 601.4, 361.2, 623.8, "NO", 'segni_tafonomici_evidenti', 'NO'),
+        (361.2, 601.4, 446.2, 623.8, "SCARSI", 'segni_tafonomici_evidenti', 'SCARSI'),
+        (446.2, 601.4, 538.3, 623.8, "DIFFUSI", 'segni_tafonomici_evidenti', 'DIFFUSI'),
+        (290.2, 623.8, 538.3, 637.7, "CARATTERIZZAZIONE", None, None),
+        (290.2, 637.7, 410.9, 665.5, "ANTROPICA", 'caratterizzazione_segni_tafonomici', 'ANTROPICA'),
+        (410.9, 637.7, 538.3, 665.5, "NATURALE", 'caratterizzazione_segni_tafonomici', 'NATURALE'),
+        (56.9, 665.5, 538.3, 681.4, "STATO DI CONSERVAZIONE", None, None),
+        (56.9, 681.4, 133.9, 700.1, "0", 'stato_conservazione', '0'),
+        (133.9, 681.4, 204.7, 700.1, "1", 'stato_conservazione', '1'),
+        (204.7, 681.4, 289.7, 700.1, "2", 'stato_conservazione', '2'),
+        (289.7, 681.4, 367.9, 700.1, "3", 'stato_conservazione', '3'),
+        (367.9, 681.4, 446.2, 700.1, "4", 'stato_conservazione', '4'),
+        (446.2, 681.4, 538.3, 700.1, "5", 'stato_conservazione', '5'),
+        (56.9, 700.1, 538.3, 743.0, "ALTERAZIONI MORFOLOGICHE O PATOLOGICHE", 'alterazioni_morfologiche', None),
+    ],
+    [
+        (56.9, 86.6, 538.3, 128.9, "NOTE SUL TERRENO DI GIACITURA", 'note_terreno_giacitura', None),
+        (56.9, 128.9, 538.3, 171.1, "CAMPIONATURE EFFETTUATE", 'campionature_effettuate', None),
+        (56.9, 171.1, 538.3, 213.1, "AFFIDABILITÀ STRATIGRAFICA", 'affidabilita_stratigrafica', None),
+        (56.9, 213.1, 538.3, 355.7, "CLASSI DI REPERTI IN ASSOCIAZIONE", 'classi_reperti_associazione', None),
+        (56.9, 355.7, 538.3, 560.9, "OSSERVAZIONI", 'osservazioni', None),
+        (56.9, 560.9, 538.3, 753.6, "INTERPRETAZIONE", 'interpretazione', None),
+    ],
+]
+
+# Diciture del modulo fuori dalle celle: (pagina, x, y, testo, grassetto)
+MODULO_DICITURE = [
+    (0, 62.2, 96.5, "SCHEDA FR", True),
+    (1, 88.0, 123.0, "POCHI (DA 1 A 10)", False),
+    (1, 88.0, 146.0, "DISCRETI (DA 10 A 30)", False),
+    (1, 88.0, 172.0, "NUMEROSI (DA 30 A 100)", False),
+    (1, 88.0, 195.5, "ABBONDANTI (PIÙ DI 100)", False),
+    (1, 60.2, 231.5, "EVENTUALE NUMERO TOTALE", False),
+]
+
+MODULO_FONT = 'Helvetica'
+MODULO_FONT_BOLD = 'Helvetica-Bold'
+MODULO_ETICHETTA = 6.5      # corpo delle etichette
+MODULO_VALORE = 8.5         # corpo dei valori
+MODULO_INTERLINEA = 10.0
+MODULO_MARGINE = 3.5        # rientro del testo dai bordi della cella
+MODULO_FONDO = 780.0        # limite inferiore del testo nelle pagine di continuazione
+
+
+class SchedaFRCanvas:
+    """
+    Esportazione delle schede sul modulo ufficiale SCHEDA FR
+
+    Disegna direttamente sul canvas con coordinate precalcolate
+    (MODULO_CELLE): la grafica fissa di ogni pagina è registrata una volta
+    per documento come form XObject e riusata da tutte le schede, senza
+    impaginazione platypus. I testi che non entrano nella cella proseguono
+    in pagine di continuazione in coda alla scheda.
+    Stessa interfaccia di FaunaPDFExporter (export_record,
+    export_multiple_records).
+    """
+
+    def __init__(self, output_dir: str = None):
+        """
+        Inizializza l'esportatore sul modulo
+
+        Args:
+            output_dir: directory di output. Se None, usa il Desktop
+        """
+        if not REPORTLAB_AVAILABLE:
+            raise ImportError(
+                "ReportLab non è installato. Installarlo con: pip install reportlab"
+            )
+
+        self.output_dir = output_dir or os.path.expanduser("~/Desktop")
+        self.page_height = A4[1]
+
+    def export_record(self, record: Dict, filename: str = None) -> str:
+        """Esporta un record sul modulo SCHEDA FR (vedi FaunaPDFExporter.export_record)"""
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"Scheda_FR_{timestamp}.pdf"
+        return self.export_multiple_records([record], filename)
+
+    def export_multiple_records(self, records: list, filename: str = None) -> str:
+        """
+        Esporta multipli record sul modulo SCHEDA FR in un unico PDF
+
+        Args:
+            records: lista di dizionari con i dati dei record
+            filename: nome del file PDF
+
+        Returns:
+            Percorso completo del file PDF creato
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"Schede_FR_Multiple_{timestamp}.pdf"
+
+        if not filename.endswith('.pdf'):
+            filename += '.pdf'
+
+        pdf_path = os.path.join(self.output_dir, filename)
+
+        c = canvas.Canvas(pdf_path, pagesize=A4)
+        c.setTitle("SCHEDA FR - Fauna")
+        c.setCreator("pyArchInit Fauna Manager")
+        for pagina in range(len(MODULO_CELLE)):
+            self._define_form(c, pagina)
+
+        for record in records:
+            self.draw_record(c, record)
+
+        c.save()
         return pdf_path
 
+    def _define_form(self, c, pagina: int):
+        """Registra la grafica fissa di una pagina del modulo come form XObject"""
+        c.beginForm(f"scheda_fr_{pagina}")
+        c.setLineWidth(0.5)
+        # Un solo oggetto testo per tutte le etichette della pagina
+        testo = c.beginText()
+        testo.setFont(MODULO_FONT, MODULO_ETICHETTA)
+        for x0, y0, x1, y1, etichetta, _, _ in MODULO_CELLE[pagina]:
+            c.rect(x0, self.page_height - y1, x1 - x0, y1 - y0)
+            for i, riga in enumerate(etichetta.splitlines()):
+                testo.setTextOrigin(x0 + MODULO_MARGINE, self.page_height - y0 - 8.5 - i * 8)
+                testo.textOut(riga)
+        for p, x, y, dicitura, grassetto in MODULO_DICITURE:
+            if p == pagina:
+                testo.setFont(MODULO_FONT_BOLD if grassetto else MODULO_FONT, 9 if grassetto else MODULO_ETICHETTA)
+                testo.setTextOrigin(x, self.page_height - y)
+                testo.textOut(dicitura)
+        c.drawText(testo)
+        c.endForm()
+
+    def draw_record(self, c, record: Dict):
+        """Disegna una scheda (tre pagine del modulo più eventuali continuazioni)"""
+        valori = self._values(record)
+        piede = " - ".join(
+            str(record.get(k)) for k in ('sito', 'area', 'us') if record.get(k)
+        ) + f" - ID {record.get('id_fauna', '')}"
+        eccedenze = []
+
+        for pagina, celle in enumerate(MODULO_CELLE):
+            c.doForm(f"scheda_fr_{pagina}")
+            # Un solo oggetto testo per tutti i valori della pagina
+            t = c.beginText()
+            for x0, y0, x1, y1, etichetta, campo, valore in celle:
+                if campo is None:
+                    continue
+                testo = valori.get(campo, '')
+                if valore is not None:
+                    if testo == valore:
+                        self._mark(t, x0, y0, x1, y1)
+                elif testo:
+                    resto = self._draw_text(t, testo, x0, y0, x1, y1, etichetta)
+                    if resto:
+                        eccedenze.append((etichetta, resto))
+            self._end_page(c, t, piede)
+
+        if eccedenze:
+            self._draw_overflow(c, eccedenze, piede)
+
+    def _values(self, record: Dict) -> Dict[str, str]:
+        """Testi da scrivere nel modulo, con le opzioni normalizzate"""
+        valori = {k: str(v).strip() for k, v in record.items() if v not in (None, '')}
+
+        for campo in ('contesto', 'metodologia_recupero', 'resti_connessione_anatomica', 'tipologia_accumulo',
+                      'deposizione', 'stato_frammentazione', 'tracce_combustione', 'tipo_combustione',
+                      'segni_tafonomici_evidenti', 'caratterizzazione_segni_tafonomici'):
+            if campo in valori:
+                valori[campo] = valori[campo].upper()
+        # 'Pochi (1-10)' -> 'POCHI'
+        if 'numero_stimato_resti' in valori:
+            valori['numero_stimato_resti'] = valori['numero_stimato_resti'].split('(')[0].strip().upper()
+        valori['combustione_altri_materiali_us'] = "SI" if record.get('combustione_altri_materiali_us') else "NO"
+
+        if not record.get('numero_minimo_individui'):
+            valori.pop('numero_minimo_individui', None)
+
+        pairs = extract_specie_psi_pairs(record)
+        specie = list(dict.fromkeys(s for s, _ in pairs if s))
+        valori['specie'] = "; ".join(specie)
+        valori['parti_scheletriche'] = "\n".join(
+            f"{s}: {psi}" if s else psi for s, psi in pairs if psi
+        )
+        valori['misure_ossa'] = "\n".join(
+            " - ".join(filter(None, [m['elemento'], m['specie']])) + ": " +
+            ", ".join(f"{tipo} {format(m[tipo], '.10g')}" for tipo in ('GL', 'GB', 'Bp', 'Bd') if m[tipo])
+            for m in extract_detailed_measurements(record)
+        )
+        return valori
+
+    def _line(self, t, x: float, y: float, testo: str):
+        """Scrive una riga nell'oggetto testo (y dal bordo superiore)"""
+        t.setTextOrigin(x, self.page_height - y)
+        t.textOut(testo)
+
+    def _mark(self, t, x0: float, y0: float, x1: float, y1: float):
+        """Contrassegna un'opzione con una X (centrata nelle caselle strette)"""
+        x = (x0 + x1) / 2 if x1 - x0 < 30 else x1 - 9
+        t.setFont(MODULO_FONT_BOLD, 10)
+        self._line(t, x - stringWidth("X", MODULO_FONT_BOLD, 10) / 2, (y0 + y1) / 2 + 3.5, "X")
+
+    def _draw_text(self, t, testo: str, x0: float, y0: float, x1: float, y1: float,
+                   etichetta: str) -> str:
+        """
+        Scrive un valore nella cella: a fianco dell'etichetta nelle celle di
+        una riga, sotto di essa nelle altre. Restituisce il testo che non
+        entra nella cella.
+        """
+        if y1 - y0 < 20:
+            x = x0 + MODULO_MARGINE + stringWidth(etichetta, MODULO_FONT, MODULO_ETICHETTA) + 6
+            baseline = y0 + 9.5
+        else:
+            x = x0 + MODULO_MARGINE
+            baseline = y0 + 9.5 + 8 * len(etichetta.splitlines())
+
+        righe = _wrap(testo, x1 - MODULO_MARGINE - x)
+        capienza = max(1, int((y1 - 3 - baseline) // MODULO_INTERLINEA) + 1)
+        resto = ''
+        if len(righe) > capienza:
+            # Il resto torna testo continuo, da reimpaginare a piena larghezza
+            resto = "".join(riga + ("\n" if fine else " ") for riga, fine in righe[capienza - 1:]).rstrip()
+            righe = righe[:capienza - 1] + [("(segue nella pagina di continuazione)", True)]
+
+        t.setFont(MODULO_FONT, MODULO_VALORE)
+        for i, (riga, _) in enumerate(righe):
+            self._line(t, x, baseline + i * MODULO_INTERLINEA, riga)
+        return resto
+
+    def _draw_overflow(self, c, eccedenze: List[tuple], piede: str):
+        """Pagine di continuazione per i testi lunghi"""
+        larghezza = A4[0] - 2 * 56.9
+        t = y = None
+
+        for etichetta, resto in eccedenze:
+            for i, (riga, _) in enumerate(_wrap(resto, larghezza)):
+                if y is None or y + MODULO_INTERLINEA > MODULO_FONDO:
+                    if t is not None:
+                        self._end_page(c, t, piede)
+                    t = c.beginText()
+                    t.setFont(MODULO_FONT_BOLD, 9)
+                    self._line(t, 56.9, 96.5, "SCHEDA FR - CONTINUAZIONE")
+                    y = 120.0
+                if i == 0:
+                    t.setFont(MODULO_FONT_BOLD, MODULO_ETICHETTA)
+                    self._line(t, 56.9, y, etichetta.replace('\n', ' '))
+                    y += MODULO_INTERLINEA
+                t.setFont(MODULO_FONT, MODULO_VALORE)
+                self._line(t, 56.9, y, riga)
+                y += MODULO_INTERLINEA
+            y += MODULO_INTERLINEA / 2
+
+        self._end_page(c, t, piede)
+
+    def _end_page(self, c, t, piede: str):
+        """Aggiunge il piè di pagina, disegna l'oggetto testo e chiude la pagina"""
+        t.setFont(MODULO_FONT, 6.5)
+        t.setFillColor(colors.gray)
+        self._line(t, 538.3 - stringWidth(piede, MODULO_FONT, 6.5), A4[1] - 30, piede)
+        c.drawText(t)
+        c.showPage()
+
+
+def _wrap(testo: str, larghezza: float) -> List[tuple]:
+    """
+    Divide il testo in righe che stanno nella larghezza data, rispettando gli
+    a capo: (riga, True se la riga chiude un paragrafo)
+    """
+    righe = []
+    for paragrafo in testo.split('\n'):
+        parti = simpleSplit(paragrafo, MODULO_FONT, MODULO_VALORE, larghezza) or ['']
+        righe.extend((riga, i == len(parti) - 1) for i, riga in enumerate(parti))
+    return righe
+
+
+def record_filename(record: Dict) -> str:
+    """Nome file univoco di una scheda: Scheda_FR_<sito>_<area>_US<us>_<id>.pdf"""
+    parti = [record.get('sito'), record.get('area'), f"US{record.get('us') or ''}", record.get('id_fauna')]
+    nome = "_".join(str(p) for p in parti if p not in (None, ''))
+    return "Scheda_FR_" + re.sub(r'[^\w.-]+', '-', nome) + ".pdf"
+
+
+# Esportatori del processo worker (gli stili sono creati una volta per processo)
+_worker_exporters = {}
+
+
+def _render_chunk(task: tuple) -> int:
+    """
+    Worker: impagina un blocco di schede
+
+    Con per_record scrive un PDF per scheda nella cartella indicata,
+    altrimenti un unico PDF con tutte le schede del blocco. Con modulo usa
+    SchedaFRCanvas invece di FaunaPDFExporter.
+    """
+    records, output, per_record, modulo = task
+    exporter = _worker_exporters.get(modulo)
+    if exporter is None:
+        exporter = _worker_exporters[modulo] = _exporter_class(modulo)(tempfile.gettempdir())
+
+    if per_record:
+        for record in records:
+            exporter.export_record(record, os.path.join(output, record_filename(record)))
+    else:
+        exporter.export_multiple_records(records, output)
+    return len(records)
+
+
+def _exporter_class(modulo: bool):
+    """Classe di esportazione: modulo ufficiale su canvas o scheda platypus"""
+    return SchedaFRCanvas if modulo else FaunaPDFExporter
+
+
+def _split_chunks(records: List[Dict], max_workers: Optional[int]) -> List[List[Dict]]:
+    """Divide le schede in blocchi (almeno 4 per worker, al massimo CATALOGO_BLOCCO schede)"""
+    workers = max_workers or os.cpu_count() or 1
+    blocco = max(1, min(CATALOGO_BLOCCO, math.ceil(len(records) / (workers * 4))))
+    return [records[i:i + blocco] for i in range(0, len(records), blocco)]
+
+
+def _render_tasks(tasks: List[tuple], max_workers: Optional[int],
+                  progress: Callable[[int, int], None] = None):
+    """Esegue _render_chunk sui task riportando l'avanzamento in schede"""
+    totale = sum(len(task[0]) for task in tasks)
+    fatti = [0]
+
+    def on_progress(completati: int):
+        # 0: il pool si è interrotto e l'impaginazione riparte in seriale
+        fatti[0] = fatti[0] + len(tasks[completati - 1][0]) if completati else 0
+        if progress:
+            progress(fatti[0], totale)
+
+    run_parallel(_render_chunk, tasks, max_workers, on_progress)
+
+
+def record_hash(record: Dict, modulo: bool = False) -> str:
+    """Impronta del contenuto di una scheda, della versione e del tipo di impaginazione"""
+    # row_version è un metadato: escluderlo lascia valide le impronte calcolate prima della sua introduzione
+    dati = {k: v for k, v in record.items() if k != 'row_version'}
+    dati = json.dumps(dati, sort_keys=True, default=str, ensure_ascii=False)
+    impaginazione = 'modulo' if modulo else 'scheda'
+    return hashlib.sha256(f"{VERSIONE_SCHEDA}:{impaginazione}\n{dati}".encode('utf-8')).hexdigest()
+
+
+def _load_manifest(manifest_path: str) -> Dict[str, Dict]:
+    """Legge il manifest della cartella (vuoto se assente o illeggibile)"""
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f).get('schede', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def sync_pdf_directory(db, output_dir: str, filters: Dict = None, modulo: bool = False,
+                       max_workers: Optional[int] = None,
+                       progress: Callable[[int, int], None] = None) -> Dict[str, int]:
+    """
+    Allinea una cartella di PDF (uno per scheda) al contenuto del database
+
+    Il manifest della cartella (MANIFEST) associa a ogni id_fauna l'impronta
+    del record (record_hash) e il nome del file: vengono impaginate solo le
+    schede nuove o modificate, mentre i PDF di schede eliminate (o rinominate)
+    sono cancellati. La cartella rispecchia le schede selezionate da filters.
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        output_dir: cartella dei PDF (creata se non esiste)
+        filters: filtri sui record (come get_all_fauna_records)
+        modulo: usa il modulo ufficiale SCHEDA FR (SchedaFRCanvas)
+        max_workers: processi da usare (None = numero di CPU, 1 = seriale)
+        progress: funzione chiamata con (schede impaginate, schede da impaginare)
+
+    Returns:
+        Dizionario con i conteggi 'generate', 'invariate' ed 'eliminate'
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise ImportError("ReportLab non è installato. Installarlo con: pip install reportlab")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    precedenti = _load_manifest(manifest_path)
+
+    schede = {}
+    da_generare = []
+    for batch in db.iter_fauna_records(filters, order_by=ORDINAMENTI['id']):
+        for record in batch:
+            voce = {'hash': record_hash(record, modulo), 'file': record_filename(record)}
+            chiave = str(record['id_fauna'])
+            schede[chiave] = voce
+            if precedenti.get(chiave) != voce or not os.path.exists(os.path.join(output_dir, voce['file'])):
+                da_generare.append(record)
+
+    if da_generare:
+        tasks = [(b, output_dir, True, modulo) for b in _split_chunks(da_generare, max_workers)]
+        _render_tasks(tasks, max_workers, progress)
+
+    attivi = {voce['file'] for voce in schede.values()}
+    eliminate = 0
+    for voce in precedenti.values():
+        path = os.path.join(output_dir, voce.get('file', ''))
+        if voce.get('file') and voce['file'] not in attivi and os.path.isfile(path):
+            os.remove(path)
+            eliminate += 1
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'versione': VERSIONE_SCHEDA, 'schede': schede}, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+    return {'generate': len(da_generare), 'invariate': len(schede) - len(da_generare), 'eliminate': eliminate}
+
+
+def export_catalogue(db, file_path: str, filters: Dict = None, ordine: str = 'sito',
+                     modulo: bool = False, max_workers: Optional[int] = None,
+                     progress: Callable[[int, int], None] = None) -> int:
+    """
+    Esporta il catalogo completo delle schede in un PDF unico o in un archivio ZIP
+
+    Le schede sono suddivise in blocchi impaginati in parallelo da processi
+    worker. Per il PDF unico i blocchi vengono poi uniti con pypdf; senza
+    pypdf il catalogo è impaginato in un solo processo. Con estensione .zip
+    si ottiene un PDF per scheda (vedi record_filename).
+
+    Args:
+        db: istanza FaunaDB o FaunaDBPostgres
+        file_path: file .pdf o .zip di destinazione
+        filters: filtri sui record (come get_all_fauna_records)
+        ordine: chiave di ORDINAMENTI
+        modulo: usa il modulo ufficiale SCHEDA FR (SchedaFRCanvas)
+        max_workers: processi da usare (None = numero di CPU, 1 = seriale)
+        progress: funzione chiamata con (schede impaginate, schede totali)
+
+    Returns:
+        Numero di schede esportate
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise ImportError("ReportLab non è installato. Installarlo con: pip install reportlab")
+    if ordine not in ORDINAMENTI:
+        raise ValueError(f"Ordinamento non valido: {ordine} (validi: {', '.join(ORDINAMENTI)})")
+
+    records = [r for batch in db.iter_fauna_records(filters, order_by=ORDINAMENTI[ordine]) for r in batch]
+    totale = len(records)
+    per_record = file_path.lower().endswith('.zip')
+
+    if not per_record and not PYPDF_AVAILABLE:
+        # Senza pypdf i blocchi non si possono unire: un solo documento
+        _exporter_class(modulo)(tempfile.gettempdir()).export_multiple_records(records, os.path.abspath(file_path))
+        if progress:
+            progress(totale, totale)
+        return totale
+
+    blocchi = _split_chunks(records, max_workers)
+
+    tmp_dir = tempfile.mkdtemp(prefix='fauna_catalogo_')
+    try:
+        if per_record:
+            tasks = [(b, tmp_dir, True, modulo) for b in blocchi]
+        else:
+            tasks = [(b, os.path.join(tmp_dir, f"parte_{i:05d}.pdf"), False, modulo)
+                     for i, b in enumerate(blocchi)]
+
+        _render_tasks(tasks, max_workers, progress)
+
+        tmp_path = file_path + '.tmp'
+        if per_record:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for record in records:
+                    nome = record_filename(record)
+                    archive.write(os.path.join(tmp_dir, nome), nome)
+        else:
+            writer = PdfWriter()
+            for _, parte, _, _ in tasks:
+                writer.append(parte)
+            with open(tmp_path, 'wb') as f:
+                writer.write(f)
+        os.replace(tmp_path, file_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if os.path.exists(file_path + '.tmp'):
+            os.remove(file_path + '.tmp')
+
+    return totale
+
 
 def test_export():
     """Funzione di test per l'esportazione PDF"""
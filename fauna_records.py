@@ -0,0 +1,210 @@
+"""
+Record fauna compatti e funzioni di estrazione dati dai record
+Le funzioni interpretano i campi JSON (specie_psi, misure_ossa) con fallback sui
+campi singoli. Non dipendono da Qt e possono essere usate anche da script e
+processi worker.
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Dict, List, Sequence, Tuple
+
+
+class FaunaRow(Mapping):
+    """
+    Record fauna in sola lettura: la tupla dei valori letta dal cursore più un
+    indice {colonna: posizione} condiviso da tutte le righe della stessa query.
+
+    Si usa come un dizionario (record['specie'], record.get('sito'), 'us' in record,
+    dict(record), {**record}) ma occupa una frazione della memoria, perché i nomi
+    delle colonne non sono ripetuti in ogni riga. Per modificarlo: dict(record).
+    """
+
+    __slots__ = ('_indice', '_valori')
+
+    def __init__(self, indice: Dict[str, int], valori: Sequence):
+        self._indice = indice
+        self._valori = valori
+
+    def __getitem__(self, campo: str):
+        return self._valori[self._indice[campo]]
+
+    def get(self, campo: str, default=None):
+        posizione = self._indice.get(campo)
+        return default if posizione is None else self._valori[posizione]
+
+    def __contains__(self, campo) -> bool:
+        return campo in self._indice
+
+    def __iter__(self):
+        return iter(self._indice)
+
+    def __len__(self) -> int:
+        return len(self._indice)
+
+    def __repr__(self) -> str:
+        return f"FaunaRow({dict(self)!r})"
+
+    def __reduce__(self):
+        # Le righe serializzate insieme (es. verso i processi worker) condividono l'indice
+        return FaunaRow, (self._indice, self._valori)
+
+
+def column_index(description) -> Dict[str, int]:
+    """Indice {colonna: posizione} da cursor.description (sqlite3 o psycopg2)"""
+    return {col[0]: i for i, col in enumerate(description)}
+
+
+def fauna_rows(description, rows: List[Sequence]) -> List[FaunaRow]:
+    """Converte le tuple lette da un cursore in FaunaRow con un unico indice condiviso"""
+    indice = column_index(description)
+    return [FaunaRow(indice, row) for row in rows]
+
+
+def safe_float(value) -> float:
+    """Converte un valore in float in modo sicuro"""
+    try:
+        return float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def extract_species(record: Dict) -> List[str]:
+    """Estrae tutte le specie da un record (supporta sia JSON che campo singolo)"""
+    species = []
+
+    # Prova prima con il nuovo formato JSON
+    specie_psi_json = record.get('specie_psi', '')
+    if specie_psi_json and specie_psi_json.strip():
+        try:
+            specie_psi_data = json.loads(specie_psi_json)
+            for row in specie_psi_data:
+                if len(row) > 0 and row[0]:
+                    species.append(row[0])
+        except:
+            pass
+
+    # Fallback: usa il campo specie vecchio
+    if not species:
+        sp = record.get('specie', '')
+        if sp:
+            species.append(sp)
+
+    return species
+
+
+def extract_measurements(record: Dict) -> List[float]:
+    """Estrae tutte le misure da un record (supporta sia JSON che campo singolo)"""
+    measurements = []
+
+    # Prova prima con il nuovo formato JSON
+    misure_json = record.get('misure_ossa', '')
+    if misure_json and misure_json.strip():
+        try:
+            misure_data = json.loads(misure_json)
+            for row in misure_data:
+                # Row format: [Elemento Anatomico, Specie, GL, GB, Bp, Bd]
+                if len(row) >= 6:
+                    # Estrai GL, GB, Bp, Bd (colonne 2-5)
+                    for i in range(2, 6):
+                        try:
+                            val = float(row[i]) if row[i] else 0
+                            if val > 0:
+                                measurements.append(val)
+                        except (ValueError, TypeError):
+                            pass
+        except:
+            pass
+
+    # Fallback: usa il campo misure_ossa vecchio (numerico)
+    if not measurements:
+        try:
+            val = float(record.get('misure_ossa', 0))
+            if val > 0:
+                measurements.append(val)
+        except (ValueError, TypeError):
+            pass
+
+    return measurements
+
+
+def extract_psi(record: Dict) -> List[str]:
+    """Estrae tutte le parti scheletriche (PSI) da un record"""
+    psi_list = []
+
+    # Prova prima con il nuovo formato JSON
+    specie_psi_json = record.get('specie_psi', '')
+    if specie_psi_json and specie_psi_json.strip():
+        try:
+            specie_psi_data = json.loads(specie_psi_json)
+            for row in specie_psi_data:
+                if len(row) > 1 and row[1]:
+                    psi_list.append(row[1])
+        except:
+            pass
+
+    # Fallback: usa il campo parti_scheletriche vecchio
+    if not psi_list:
+        psi = record.get('parti_scheletriche', '')
+        if psi:
+            psi_list.append(psi)
+
+    return psi_list
+
+
+def extract_specie_psi_pairs(record: Dict) -> List[Tuple[str, str]]:
+    """Estrae coppie (specie, psi) da un record"""
+    pairs = []
+
+    specie_psi_json = record.get('specie_psi', '')
+    if specie_psi_json and specie_psi_json.strip():
+        try:
+            specie_psi_data = json.loads(specie_psi_json)
+            for row in specie_psi_data:
+                if len(row) >= 2:
+                    specie = row[0] if row[0] else ''
+                    psi = row[1] if row[1] else ''
+                    if specie or psi:
+                        pairs.append((specie, psi))
+        except:
+            pass
+
+    # Fallback
+    if not pairs:
+        specie = record.get('specie', '')
+        psi = record.get('parti_scheletriche', '')
+        if specie or psi:
+            pairs.append((specie, psi))
+
+    return pairs
+
+
+def extract_detailed_measurements(record: Dict) -> List[Dict]:
+    """Estrae misure dettagliate da un record: [{elemento, specie, GL, GB, Bp, Bd}, ...]"""
+    detailed = []
+
+    misure_json = record.get('misure_ossa', '')
+    if misure_json and misure_json.strip():
+        try:
+            misure_data = json.loads(misure_json)
+            for row in misure_data:
+                if len(row) >= 6:
+                    elemento = row[0] if row[0] else ''
+                    specie = row[1] if row[1] else ''
+                    gl = safe_float(row[2])
+                    gb = safe_float(row[3])
+                    bp = safe_float(row[4])
+                    bd = safe_float(row[5])
+                    if elemento or specie or gl or gb or bp or bd:
+                        detailed.append({
+                            'elemento': elemento,
+                            'specie': specie,
+                            'GL': gl,
+                            'GB': gb,
+                            'Bp': bp,
+                            'Bd': bd
+                        })
+        except:
+            pass
+
+    return detailed
@@ -0,0 +1,386 @@
+"""
+Report PDF delle statistiche fauna con grafici vettoriali
+Costruisce il documento da un StatisticsResult (anche quello in cache, senza
+ricalcolare nulla): grafici a barre di specie e parti scheletriche, box plot
+delle misure per elemento e sezioni per sito, con indice e segnalibri.
+I grafici vengono impaginati in un pool di processi e restituiti come
+disegni vettoriali già espansi in forme elementari.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, KeepTogether
+    )
+    from reportlab.platypus.tableofcontents import TableOfContents
+    from reportlab.graphics.shapes import Drawing, Group, UserNode, String, Rect, Line, Circle
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.charts.axes import XValueAxis
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+from fauna_analytics import run_parallel
+from fauna_statistics import CAMPI_CATEGORIE, TIPI_MISURA, StatisticsResult
+
+
+# Larghezza utile dei grafici (A4 con margini di 1.5 cm)
+LARGHEZZA_GRAFICO = 510
+
+# Barre massime per grafico e specie per grafico di sito
+BARRE_MAX = 20
+BARRE_SITO = 10
+
+# Elementi anatomici massimi per box plot (i più misurati)
+BOX_MAX_ELEMENTI = 15
+
+# Sotto questo numero di grafici l'impaginazione resta nel processo principale
+GRAFICI_PARALLELO_MIN = 12
+
+COLORE_BARRE = '#3498db'
+COLORE_BOX = '#aed6f1'
+COLORE_TITOLI = '#2c3e50'
+
+
+def _require_reportlab():
+    if not REPORTLAB_AVAILABLE:
+        raise ImportError("ReportLab non è installato. Installarlo con: pip install reportlab")
+
+
+def _label(testo: str, lunghezza: int = 32) -> str:
+    """Etichetta di categoria accorciata per gli assi"""
+    testo = str(testo) if testo not in (None, '') else '(non specificato)'
+    return testo if len(testo) <= lunghezza else testo[:lunghezza - 1] + '…'
+
+
+def _quantile(valori: List[float], q: float) -> float:
+    """Quantile con interpolazione lineare di una lista già ordinata"""
+    pos = (len(valori) - 1) * q
+    basso = int(pos)
+    alto = min(basso + 1, len(valori) - 1)
+    return valori[basso] + (valori[alto] - valori[basso]) * (pos - basso)
+
+
+def _fmt(valore: float) -> str:
+    return f"{valore:.2f}"
+
+
+# ========== GRAFICI (eseguiti nei processi worker) ==========
+
+def _bar_drawing(titolo: str, voci: List[Tuple[str, int]]) -> 'Drawing':
+    """Grafico a barre orizzontali dei conteggi (prima voce in alto)"""
+    altezza_barre = 14 * len(voci)
+    d = Drawing(LARGHEZZA_GRAFICO, altezza_barre + 50)
+    d.add(String(0, altezza_barre + 38, titolo, fontName='Helvetica-Bold', fontSize=10))
+
+    chart = HorizontalBarChart()
+    chart.x = 160
+    chart.y = 20
+    chart.width = LARGHEZZA_GRAFICO - 190
+    chart.height = altezza_barre
+    # L'asse delle categorie parte dal basso: si invertono le voci
+    chart.data = [[n for _, n in reversed(voci)]]
+    chart.categoryAxis.categoryNames = [_label(v) for v, _ in reversed(voci)]
+    chart.categoryAxis.labels.fontName = 'Helvetica'
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.boxAnchor = 'e'
+    chart.categoryAxis.labels.dx = -4
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontName = 'Helvetica'
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = colors.HexColor('#dddddd')
+    chart.bars[0].fillColor = colors.HexColor(COLORE_BARRE)
+    chart.bars[0].strokeColor = None
+    chart.barLabelFormat = '%d'
+    chart.barLabels.fontName = 'Helvetica'
+    chart.barLabels.fontSize = 6
+    chart.barLabels.boxAnchor = 'w'
+    chart.barLabels.dx = 3
+    d.add(chart)
+    return d
+
+
+def _box_drawing(gruppi: List[Tuple[str, List[float]]]) -> Tuple['Drawing', List[list]]:
+    """
+    Box plot orizzontali (uno per elemento) con baffi a 1,5 IQR e valori
+    anomali come cerchi; restituisce anche le righe della tabella riassuntiva
+    """
+    altezza_righe = 18 * len(gruppi)
+    d = Drawing(LARGHEZZA_GRAFICO, altezza_righe + 40)
+
+    minimo = min(min(v) for _, v in gruppi)
+    massimo = max(max(v) for _, v in gruppi)
+    if massimo == minimo:
+        massimo = minimo + 1
+
+    asse = XValueAxis()
+    asse.setPosition(160, 25, LARGHEZZA_GRAFICO - 190)
+    asse.valueMin = minimo
+    asse.valueMax = massimo
+    asse.labels.fontName = 'Helvetica'
+    asse.labels.fontSize = 7
+    asse.configure([[minimo, massimo]])
+    d.add(asse)
+
+    righe = []
+    for i, (elemento, valori) in enumerate(gruppi):
+        valori = sorted(valori)
+        q1, mediana, q3 = (_quantile(valori, q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        basso = min(v for v in valori if v >= q1 - 1.5 * iqr)
+        alto = max(v for v in valori if v <= q3 + 1.5 * iqr)
+        righe.append([elemento, len(valori), _fmt(valori[0]), _fmt(q1), _fmt(mediana),
+                      _fmt(q3), _fmt(valori[-1])])
+
+        # Dall'alto verso il basso, nell'ordine dei gruppi
+        y = 25 + altezza_righe - 18 * i - 9
+        d.add(String(154, y - 2.5, _label(elemento), fontName='Helvetica', fontSize=7, textAnchor='end'))
+        d.add(Line(asse.scale(basso), y, asse.scale(q1), y, strokeWidth=0.6))
+        d.add(Line(asse.scale(q3), y, asse.scale(alto), y, strokeWidth=0.6))
+        for baffo in (basso, alto):
+            d.add(Line(asse.scale(baffo), y - 4, asse.scale(baffo), y + 4, strokeWidth=0.6))
+        d.add(Rect(asse.scale(q1), y - 6, max(asse.scale(q3) - asse.scale(q1), 0.5), 12,
+                   fillColor=colors.HexColor(COLORE_BOX), strokeColor=colors.black, strokeWidth=0.6))
+        d.add(Line(asse.scale(mediana), y - 6, asse.scale(mediana), y + 6, strokeWidth=1.4))
+        for v in valori:
+            if v < basso or v > alto:
+                d.add(Circle(asse.scale(v), y, 1.8, fillColor=None, strokeColor=colors.black, strokeWidth=0.5))
+
+    d.add(String(160 + (LARGHEZZA_GRAFICO - 190) / 2, 2, "mm", fontName='Helvetica', fontSize=7,
+                 textAnchor='middle'))
+    return d, righe
+
+
+def _expand(node):
+    """Sostituisce ricorsivamente i widget con le forme elementari che disegnano"""
+    while isinstance(node, UserNode):
+        node = node.provideNode()
+    if isinstance(node, Group):
+        node.contents = [_expand(child) for child in node.contents]
+    return node
+
+
+def _render_chart(task: tuple):
+    """
+    Worker: impagina un grafico e lo espande in forme elementari
+    (serializzabili e veloci da scrivere nel documento)
+
+    Args:
+        task: ('barre', titolo, voci) oppure ('box', gruppi)
+    """
+    if task[0] == 'barre':
+        return _expand(_bar_drawing(task[1], task[2])), None
+    drawing, righe = _box_drawing(task[1])
+    return _expand(drawing), righe
+
+
+def _box_groups(result: StatisticsResult, indice: int) -> List[Tuple[str, List[float]]]:
+    """Valori di una misura raggruppati per elemento (i più misurati per primi)"""
+    gruppi = {}
+    for misura in result.misure_dettagliate:
+        valore = misura[indice]
+        if valore > 0:
+            gruppi.setdefault(misura[0] or '(non specificato)', []).append(valore)
+    ordinati = sorted(gruppi.items(), key=lambda x: (-len(x[1]), x[0]))
+    return ordinati[:BOX_MAX_ELEMENTI]
+
+
+# ========== DOCUMENTO ==========
+
+def _register_heading(doc, flowable):
+    """Registra titoli e sottotitoli nell'indice e nei segnalibri del documento"""
+    if isinstance(flowable, Paragraph) and flowable.style.name in ('ReportH1', 'ReportH2'):
+        livello = 0 if flowable.style.name == 'ReportH1' else 1
+        testo = flowable.getPlainText()
+        chiave = f"sezione_{id(flowable)}"
+        doc.canv.bookmarkPage(chiave)
+        doc.canv.addOutlineEntry(testo, chiave, livello)
+        doc.notify('TOCEntry', (livello, testo, doc.page, chiave))
+
+
+def _styles() -> Dict[str, 'ParagraphStyle']:
+    base = getSampleStyleSheet()
+    return {
+        'titolo': ParagraphStyle('ReportTitle', parent=base['Heading1'], fontSize=18,
+                                 textColor=colors.HexColor(COLORE_TITOLI), alignment=1, spaceAfter=12),
+        'data': ParagraphStyle('ReportDate', parent=base['Normal'], fontSize=9,
+                               textColor=colors.grey, alignment=1, spaceAfter=18),
+        'h1': ParagraphStyle('ReportH1', parent=base['Heading1'], fontSize=14,
+                             textColor=colors.HexColor(COLORE_TITOLI), spaceBefore=6, spaceAfter=10),
+        'h2': ParagraphStyle('ReportH2', parent=base['Heading2'], fontSize=11,
+                             textColor=colors.HexColor('#34495e'), spaceBefore=10, spaceAfter=6),
+        'indice': ParagraphStyle('ReportIndex', parent=base['Heading2'], fontSize=11,
+                                 textColor=colors.HexColor('#34495e'), spaceAfter=6),
+        'normale': ParagraphStyle('ReportNormal', parent=base['Normal'], fontSize=9, leading=12),
+        'nota': ParagraphStyle('ReportNote', parent=base['Normal'], fontSize=8, textColor=colors.grey),
+    }
+
+
+def _table(righe: List[list], intestazione: List[str] = None, larghezze: List[float] = None) -> 'Table':
+    """Tabella compatta con intestazione opzionale"""
+    dati = ([intestazione] if intestazione else []) + [[str(c) for c in r] for r in righe]
+    table = Table(dati, colWidths=larghezze, hAlign='LEFT', repeatRows=1 if intestazione else 0)
+    stile = [
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#bdc3c7')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]
+    if intestazione:
+        stile += [('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                  ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ecf0f1'))]
+    table.setStyle(TableStyle(stile))
+    return table
+
+
+def _summary_rows(result: StatisticsResult) -> List[list]:
+    righe = [
+        ["Schede totali", result.totale],
+        ["Siti", len(result.siti)],
+        ["Aree", result.n_aree],
+        ["Saggi", result.n_saggi],
+        ["US", result.n_us],
+        ["Combinazioni sito/area/saggio/US", result.n_combinazioni],
+        ["Specie distinte", len(result.specie)],
+        ["Parti scheletriche distinte", len(result.psi)],
+    ]
+    if result.nmi:
+        righe.append(["NMI totale (media per scheda)", f"{result.nmi.somma:g} ({result.nmi.media:.2f})"])
+    if result.misure:
+        righe.append(["Misure registrate", result.misure.n])
+    return righe
+
+
+def _pct_rows(conteggi: List[Tuple[str, int]], totale: int) -> List[list]:
+    return [[v or '(non specificato)', n, f"{n / totale * 100:.1f}%" if totale else ''] for v, n in conteggi]
+
+
+def export_report(result: StatisticsResult, file_path: str, max_workers: Optional[int] = None):
+    """
+    Esporta il report PDF delle statistiche con grafici e indice
+
+    Args:
+        result: risultato di compute_statistics (o di StatisticsCache.get)
+        file_path: percorso del file PDF
+        max_workers: processi per i grafici (None = automatico, 1 = seriale)
+
+    Raises:
+        ImportError: se ReportLab non è installato
+    """
+    _require_reportlab()
+    stili = _styles()
+
+    # Grafici da impaginare: (chiave, task)
+    grafici = []
+    if result.specie:
+        grafici.append(('specie', ('barre', f"Specie (prime {min(BARRE_MAX, len(result.specie))})",
+                                   result.specie[:BARRE_MAX])))
+    if result.psi:
+        grafici.append(('psi', ('barre', f"Parti scheletriche (prime {min(BARRE_MAX, len(result.psi))})",
+                                result.psi[:BARRE_MAX])))
+    for indice, (tipo, _) in enumerate(TIPI_MISURA, start=2):
+        gruppi = _box_groups(result, indice)
+        if gruppi:
+            grafici.append((f"box_{tipo}", ('box', gruppi)))
+    for s in result.siti_sezioni:
+        if s.specie:
+            grafici.append((f"sito_{s.sito}", ('barre', f"Specie - {_label(s.sito, 60)}", s.specie[:BARRE_SITO])))
+
+    if max_workers is None and len(grafici) < GRAFICI_PARALLELO_MIN:
+        max_workers = 1
+    disegni = dict(zip((k for k, _ in grafici), run_parallel(_render_chart, [t for _, t in grafici], max_workers)))
+
+    story = [
+        Paragraph("STATISTICHE RIEPILOGATIVE - SCHEDE FAUNA", stili['titolo']),
+        Paragraph(f"Report generato il {result.generato_il.strftime('%d/%m/%Y %H:%M')}", stili['data']),
+    ]
+    indice = TableOfContents()
+    indice.levelStyles = [
+        ParagraphStyle('TOC1', fontName='Helvetica-Bold', fontSize=10, leftIndent=10, firstLineIndent=-10,
+                       spaceBefore=4, leading=12),
+        ParagraphStyle('TOC2', fontName='Helvetica', fontSize=9, leftIndent=24, firstLineIndent=-10, leading=11),
+    ]
+    story += [Paragraph("Indice", stili['indice']), indice, PageBreak()]
+
+    # Riepilogo
+    story.append(Paragraph("Riepilogo", stili['h1']))
+    story.append(_table(_summary_rows(result), larghezze=[220, 120]))
+    if result.sito_dominante:
+        sito, n = result.sito_dominante
+        story.append(Spacer(1, 0.3 * cm))
+        story.append(Paragraph(f"Sito con più schede: <b>{escape(sito)}</b> ({n})", stili['normale']))
+
+    # Specie e parti scheletriche
+    for chiave, titolo, conteggi in (('specie', "Specie", result.specie),
+                                     ('psi', "Parti scheletriche", result.psi)):
+        if not conteggi:
+            continue
+        story.append(PageBreak())
+        story.append(Paragraph(titolo, stili['h1']))
+        story.append(disegni[chiave][0])
+        totale = sum(n for _, n in conteggi)
+        story.append(Spacer(1, 0.4 * cm))
+        story.append(_table(_pct_rows(conteggi, totale), [titolo, "Occorrenze", "%"], [260, 70, 60]))
+
+    # Misure per elemento
+    box = [(tipo, etichetta) for tipo, etichetta in TIPI_MISURA if f"box_{tipo}" in disegni]
+    if box:
+        story.append(PageBreak())
+        story.append(Paragraph("Misure per elemento", stili['h1']))
+        story.append(Paragraph(
+            f"Distribuzione delle misure (mm) per gli elementi più misurati (massimo {BOX_MAX_ELEMENTI}): "
+            "scatola tra primo e terzo quartile, linea sulla mediana, baffi fino a 1,5 volte lo "
+            "scarto interquartile, cerchi per i valori anomali.", stili['nota']))
+        for tipo, etichetta in box:
+            disegno, righe = disegni[f"box_{tipo}"]
+            story.append(KeepTogether([Paragraph(escape(etichetta), stili['h2']), disegno]))
+            story.append(_table(righe, ["Elemento", "N", "Min", "Q1", "Mediana", "Q3", "Max"],
+                                [160, 40, 55, 55, 55, 55, 55]))
+
+    # Distribuzioni per categoria
+    categorie = [(campo, etichetta) for campo, etichetta in CAMPI_CATEGORIE if result.categorie.get(campo)]
+    if categorie:
+        story.append(PageBreak())
+        story.append(Paragraph("Distribuzioni per categoria", stili['h1']))
+        for campo, etichetta in categorie:
+            story.append(KeepTogether([
+                Paragraph(escape(etichetta), stili['h2']),
+                _table(_pct_rows(result.categorie[campo], result.totale), ["Valore", "Schede", "%"], [260, 70, 60]),
+            ]))
+
+    # Sezioni per sito
+    if result.siti_sezioni:
+        story.append(PageBreak())
+        story.append(Paragraph("Siti", stili['h1']))
+        for s in result.siti_sezioni:
+            righe = [["Schede", s.n_record], ["Aree", s.n_aree], ["Saggi", s.n_saggi], ["US", s.n_us]]
+            if s.nmi:
+                righe.append(["NMI totale", f"{s.nmi.somma:g}"])
+            righe.append(["Misure", s.n_misure])
+            blocco = [Paragraph(escape(s.sito or '(senza sito)'), stili['h2']), _table(righe, larghezze=[120, 80]),
+                      Spacer(1, 0.2 * cm)]
+            if s.psi:
+                psi = ", ".join(f"{escape(str(v))} ({n})" for v, n in s.psi[:5])
+                blocco.append(Paragraph(f"<b>Parti scheletriche più frequenti:</b> {psi}", stili['normale']))
+            if f"sito_{s.sito}" in disegni:
+                blocco += [Spacer(1, 0.2 * cm), disegni[f"sito_{s.sito}"][0]]
+            story.append(KeepTogether(blocco))
+
+    def numero_pagina(canvas, doc):
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawRightString(A4[0] - 1.5 * cm, 1 * cm, f"Pagina {doc.page}")
+
+    doc = SimpleDocTemplate(file_path, pagesize=A4, title="Statistiche schede fauna",
+                            leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+    doc.afterFlowable = lambda flowable: _register_heading(doc, flowable)
+    doc.multiBuild(story, onFirstPage=numero_pagina, onLaterPages=numero_pagina)
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Versione dello schema e migrazioni di fauna_table e fauna_voc
+La tabella fauna_schema_version registra le migrazioni applicate: all'apertura del
+database basta leggerne la versione massima e, se è aggiornata, non si esegue altro.
+Ogni migrazione ha il proprio SQL per SQLite e PostgreSQL (nessuna conversione a
+runtime) ed è applicata in una transazione; le migrazioni dei dati procedono a
+blocchi di id, con un commit per blocco e l'avanzamento riportato a ogni blocco.
+
+Sostituisce gli script migrate_add_us_field.py e migrate_add_json_fields.py,
+rimasti come scorciatoie verso questo modulo.
+
+    python fauna_schema.py                       # database della configurazione salvata
+    python fauna_schema.py --db pyarchinit.sqlite
+    python fauna_schema.py --config fauna_db_config.json --stato
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+TABELLA_VERSIONE = 'fauna_schema_version'
+MIGRAZIONE_BATCH = 5000
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql')
+
+Progress = Optional[Callable[[int, int], None]]
+
+
+def read_sql_file(nome: str, dialetto: str) -> str:
+    """Script SQL da sql/ (SQLite) o sql/postgres/ (PostgreSQL)"""
+    cartella = SQL_DIR if dialetto == 'sqlite' else os.path.join(SQL_DIR, 'postgres')
+    with open(os.path.join(cartella, nome), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@dataclass
+class Migration:
+    """Una versione dello schema con l'SQL per ciascun dialetto"""
+    versione: int
+    descrizione: str
+    file_sql: Tuple[str, ...] = ()                # script in sql/ (SQLite) e sql/postgres/ (PostgreSQL)
+    sqlite: str = ''
+    postgres: str = ''
+    colonne: Tuple[Tuple[str, str], ...] = ()     # (colonna, tipo) di fauna_table, aggiunte se mancanti
+    dati: Optional[Callable[['SchemaConnection', int, Progress], int]] = None  # migrazione dei dati a blocchi
+
+    def script(self, dialetto: str) -> str:
+        """SQL completo della migrazione per 'sqlite' o 'postgres'"""
+        parti = [read_sql_file(nome, dialetto) for nome in self.file_sql]
+        parti.append(self.sqlite if dialetto == 'sqlite' else self.postgres)
+        return '\n'.join(p for p in parti if p.strip())
+
+
+class SchemaConnection:
+    """Accesso minimo e uniforme a una connessione SQLite o PostgreSQL (psycopg2)"""
+
+    def __init__(self, conn, dialetto: str):
+        self.conn = conn
+        self.dialetto = dialetto
+        self.ph = '?' if dialetto == 'sqlite' else '%s'
+        if dialetto == 'sqlite':
+            import sqlite3
+            self.errore = sqlite3.Error
+        else:
+            import psycopg2
+            self.errore = psycopg2.Error
+
+    def scalar(self, sql: str, params: tuple = ()):
+        """Primo valore della prima riga; la colonna va chiamata 'n'"""
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        return row['n'] if row else None
+
+    def has_table(self, nome: str) -> bool:
+        if self.dialetto == 'sqlite':
+            sql = "SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'table' AND name = ?"
+        else:
+            sql = ("SELECT COUNT(*) AS n FROM pg_catalog.pg_tables "
+                   "WHERE schemaname = current_schema() AND tablename = %s")
+        return self.scalar(sql, (nome,)) > 0
+
+    def columns(self, tabella: str) -> List[str]:
+        cursor = self.conn.cursor()
+        if self.dialetto == 'sqlite':
+            cursor.execute(f"PRAGMA table_info({tabella})")
+            return [row['name'] for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT column_name AS name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+        """, (tabella,))
+        return [row['name'] for row in cursor.fetchall()]
+
+    def begin(self):
+        if self.dialetto == 'postgres':
+            self.conn.autocommit = False
+        elif not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+    def run_script(self, sql: str):
+        """Esegue uno script di più istruzioni dentro la transazione corrente"""
+        if self.dialetto == 'sqlite':
+            # executescript farebbe un COMMIT implicito: le istruzioni vanno eseguite una per volta
+            import sqlite3
+            istruzione = ''
+            for riga in sql.splitlines(keepends=True):
+                istruzione += riga
+                if sqlite3.complete_statement(istruzione):
+                    self.conn.execute(istruzione)
+                    istruzione = ''
+            if istruzione.strip() and sqlite3.complete_statement(istruzione + ';'):
+                self.conn.execute(istruzione)
+        elif sql.strip():
+            self.conn.cursor().execute(sql)
+
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        """Esegue un'istruzione e restituisce le righe modificate"""
+        cursor = self.conn.cursor()
+        if params:
+            cursor.execute(sql.replace('?', self.ph), params)
+        else:
+            cursor.execute(sql)
+        return cursor.rowcount
+
+    def commit(self):
+        self.conn.commit()
+        if self.dialetto == 'postgres':
+            self.conn.autocommit = True
+
+    def rollback(self):
+        self.conn.rollback()
+        if self.dialetto == 'postgres':
+            self.conn.autocommit = True
+
+
+# ========== MIGRAZIONI DEI DATI ==========
+
+def _allinea_campi_us(schema: SchemaConnection, batch_size: int, progress: Progress) -> int:
+    from fauna_us_sync import backfill_us_fields
+    return backfill_us_fields(schema, batch_size, progress=progress).aggiornate
+
+
+# ========== REGISTRO ==========
+
+_VOC_ELEMENTO_ANATOMICO = """
+    INSERT {ignora}INTO fauna_voc (campo, valore, ordinamento) VALUES
+        ('elemento_anatomico', 'Astragalo', 1), ('elemento_anatomico', 'Calcagno', 2),
+        ('elemento_anatomico', 'Falange I', 3), ('elemento_anatomico', 'Falange II', 4),
+        ('elemento_anatomico', 'Falange III', 5), ('elemento_anatomico', 'Femore', 6),
+        ('elemento_anatomico', 'Metacarpo', 7), ('elemento_anatomico', 'Metatarso', 8),
+        ('elemento_anatomico', 'Omero', 9), ('elemento_anatomico', 'Radio', 10),
+        ('elemento_anatomico', 'Scapola', 11), ('elemento_anatomico', 'Tibia', 12),
+        ('elemento_anatomico', 'Ulna', 13), ('elemento_anatomico', 'Atlante', 14),
+        ('elemento_anatomico', 'Epistrofeo', 15), ('elemento_anatomico', 'Pelvi', 16),
+        ('elemento_anatomico', 'Mandibola', 17), ('elemento_anatomico', 'Altro', 99){conflitto};
+"""
+
+# row_version aumenta a ogni UPDATE di fauna_table. FaunaDB lo incrementa da sé;
+# il trigger copre gli altri scrittori (allineamento US, altri client) senza
+# incrementarlo una seconda volta
+_ROW_VERSION_SQLITE = """
+    CREATE TRIGGER IF NOT EXISTS fauna_row_version
+    AFTER UPDATE ON fauna_table
+    FOR EACH ROW
+    WHEN NEW.row_version IS OLD.row_version
+    BEGIN
+        UPDATE fauna_table SET row_version = OLD.row_version + 1 WHERE id_fauna = NEW.id_fauna;
+    END;
+"""
+
+_ROW_VERSION_POSTGRES = """
+    CREATE OR REPLACE FUNCTION fauna_row_version() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.row_version IS NOT DISTINCT FROM OLD.row_version THEN
+            NEW.row_version := OLD.row_version + 1;
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS fauna_row_version ON fauna_table;
+    CREATE TRIGGER fauna_row_version
+    BEFORE UPDATE ON fauna_table
+    FOR EACH ROW
+    EXECUTE PROCEDURE fauna_row_version();
+"""
+
+MIGRAZIONI: List[Migration] = [
+    Migration(1, "Tabelle fauna_table e fauna_voc con vocabolario standard",
+              file_sql=('create_fauna_voc.sql', 'create_fauna_table.sql')),
+    Migration(2, "Colonna us con indice, campi US copiati da us_table",
+              colonne=(('us', 'TEXT'),),
+              sqlite="CREATE INDEX IF NOT EXISTS idx_fauna_us ON fauna_table(us);",
+              postgres="CREATE INDEX IF NOT EXISTS idx_fauna_us ON fauna_table(us);",
+              dati=_allinea_campi_us),
+    Migration(3, "Campi JSON specie_psi e misure_ossa, vocabolario elemento_anatomico",
+              colonne=(('specie_psi', "TEXT DEFAULT ''"),),
+              sqlite=_VOC_ELEMENTO_ANATOMICO.format(ignora='OR IGNORE ', conflitto=''),
+              postgres="""
+                  ALTER TABLE fauna_table ALTER COLUMN misure_ossa TYPE TEXT USING misure_ossa::TEXT;
+                  ALTER TABLE fauna_table ALTER COLUMN misure_ossa SET DEFAULT '';
+              """ + _VOC_ELEMENTO_ANATOMICO.format(
+                  ignora='', conflitto='\n        ON CONFLICT (campo, valore) DO NOTHING')),
+    Migration(4, "Indice per l'ordinamento standard di elenchi e navigazione",
+              sqlite="CREATE INDEX IF NOT EXISTS idx_fauna_ordine ON fauna_table(sito, area, us, id_fauna);",
+              postgres="CREATE INDEX IF NOT EXISTS idx_fauna_ordine ON fauna_table(sito, area, us, id_fauna);"),
+    Migration(5, "Colonna row_version per il salvataggio concorrente da più utenti",
+              colonne=(('row_version', 'INTEGER NOT NULL DEFAULT 1'),),
+              sqlite=_ROW_VERSION_SQLITE,
+              postgres=_ROW_VERSION_POSTGRES),
+]
+
+ULTIMA_VERSIONE = MIGRAZIONI[-1].versione
+
+
+# ========== APPLICAZIONE ==========
+
+def print_progress(fatte: int, totale: int):
+    """Avanzamento delle migrazioni dei dati su una sola riga del terminale"""
+    print(f"  {fatte}/{totale}", end='\r' if fatte < totale else '\n', flush=True)
+
+
+def _create_version_table(schema: SchemaConnection):
+    schema.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABELLA_VERSIONE} (
+            versione INTEGER PRIMARY KEY,
+            descrizione TEXT NOT NULL,
+            applicata_il TEXT NOT NULL
+        )
+    """)
+
+
+def _stamp(schema: SchemaConnection, migrazione: Migration):
+    schema.execute(f"INSERT INTO {TABELLA_VERSIONE} (versione, descrizione, applicata_il) VALUES (?, ?, ?)",
+                   (migrazione.versione, migrazione.descrizione, datetime.now().isoformat(timespec='seconds')))
+
+
+def current_version(schema: SchemaConnection) -> Optional[int]:
+    """Versione registrata dello schema (0 se vuota), None se la tabella delle versioni manca"""
+    try:
+        versione = schema.scalar(f"SELECT MAX(versione) AS n FROM {TABELLA_VERSIONE}")
+    except schema.errore:
+        if schema.dialetto == 'sqlite' and schema.conn.in_transaction:
+            schema.conn.rollback()
+        return None
+    return versione or 0
+
+
+def apply_migration(schema: SchemaConnection, migrazione: Migration,
+                    batch_size: int = MIGRAZIONE_BATCH, progress: Progress = None):
+    """
+    Applica una migrazione: DDL e registrazione della versione in un'unica transazione,
+    preceduta dalla migrazione dei dati a blocchi se prevista
+    """
+    schema.begin()
+    try:
+        esistenti = set(schema.columns('fauna_table')) if migrazione.colonne else set()
+        for colonna, tipo in migrazione.colonne:
+            if colonna not in esistenti:
+                schema.execute(f"ALTER TABLE fauna_table ADD COLUMN {colonna} {tipo}")
+        schema.run_script(migrazione.script(schema.dialetto))
+        if not migrazione.dati:
+            _stamp(schema, migrazione)
+        schema.commit()
+    except Exception:
+        schema.rollback()
+        raise
+
+    if migrazione.dati:
+        # I blocchi dei dati hanno transazioni proprie; la versione è registrata solo
+        # alla fine, così una migrazione interrotta riparte (i blocchi sono idempotenti)
+        migrazione.dati(schema, batch_size, progress)
+        schema.begin()
+        _stamp(schema, migrazione)
+        schema.commit()
+
+
+def pending_migrations(schema: SchemaConnection) -> List[Migration]:
+    """Migrazioni non ancora applicate"""
+    versione = current_version(schema)
+    if versione is None:
+        versione = 1 if schema.has_table('fauna_table') else 0
+    return [m for m in MIGRAZIONI if m.versione > versione]
+
+
+def ensure_schema(conn, dialetto: str, batch_size: int = MIGRAZIONE_BATCH,
+                  progress: Progress = None) -> Dict:
+    """
+    Porta lo schema all'ultima versione
+
+    Nel caso comune (schema aggiornato) esegue una sola query. Un database senza
+    tabella delle versioni ma con fauna_table già presente (creato prima delle
+    migrazioni) viene registrato alla versione 1 senza rieseguirne lo script, così
+    il vocabolario modificato dagli utenti non viene ripopolato.
+
+    Args:
+        conn: connessione sqlite3 (con row_factory sqlite3.Row) o psycopg2 (RealDictCursor)
+        dialetto: 'sqlite' o 'postgres'
+        batch_size: righe per blocco nelle migrazioni dei dati
+        progress: funzione chiamata con (fatte, totale) durante le migrazioni dei dati
+
+    Returns:
+        Dizionario con 'da' (versione iniziale) e 'applicate' (versioni applicate)
+    """
+    schema = SchemaConnection(conn, dialetto)
+    versione = current_version(schema)
+    if versione == ULTIMA_VERSIONE:
+        return {'da': versione, 'applicate': []}
+
+    if versione is None:
+        schema.begin()
+        try:
+            _create_version_table(schema)
+            if schema.has_table('fauna_table'):
+                if not schema.has_table('fauna_voc'):
+                    schema.run_script(read_sql_file('create_fauna_voc.sql', dialetto))
+                _stamp(schema, MIGRAZIONI[0])
+                versione = 1
+            schema.commit()
+        except Exception:
+            schema.rollback()
+            raise
+    versione_iniziale = versione or 0
+
+    applicate = []
+    for migrazione in MIGRAZIONI:
+        if migrazione.versione <= versione_iniziale:
+            continue
+        print(f"📦 Migrazione schema fauna v{migrazione.versione}: {migrazione.descrizione}")
+        apply_migration(schema, migrazione, batch_size, progress)
+        applicate.append(migrazione.versione)
+    return {'da': versione_iniziale, 'applicate': applicate}
+
+
+# ========== RIGA DI COMANDO ==========
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migrazioni dello schema fauna")
+    parser.add_argument('--db', help="database SQLite (predefinito: ultima configurazione salvata)")
+    parser.add_argument('--config', help="file di configurazione JSON di DBConfigManager")
+    parser.add_argument('--stato', action='store_true', help="mostra versione e migrazioni in attesa senza applicarle")
+    parser.add_argument('--blocco', type=int, default=MIGRAZIONE_BATCH, help="righe per blocco nelle migrazioni dei dati")
+    args = parser.parse_args(argv)
+
+    from db_config_manager import DBConfigManager
+    if args.db:
+        config = {'type': 'sqlite', 'path': args.db}
+    else:
+        manager = DBConfigManager(args.config)
+        config = manager.load_config() or manager.get_default_config()
+
+    if config['type'] == 'sqlite':
+        import sqlite3
+        conn = sqlite3.connect(config['path'])
+        conn.row_factory = sqlite3.Row
+    else:
+        import psycopg2
+        from psycopg2.extras import RealDictCursor
+        conn = psycopg2.connect(host=config.get('host', 'localhost'), port=config.get('port', 5432),
+                                database=config.get('database', 'pyarchinit'),
+                                user=config.get('user', 'postgres'), password=config.get('password', ''),
+                                cursor_factory=RealDictCursor)
+        conn.autocommit = True
+
+    try:
+        schema = SchemaConnection(conn, config['type'])
+        if args.stato:
+            versione = current_version(schema)
+            print(f"Versione schema: {versione if versione is not None else 'non registrata'} "
+                  f"(ultima: {ULTIMA_VERSIONE})")
+            for m in pending_migrations(schema):
+                print(f"  in attesa: v{m.versione} {m.descrizione}")
+            return 0
+
+        esito = ensure_schema(conn, config['type'], args.blocco, print_progress)
+        if esito['applicate']:
+            print(f"✓ Schema aggiornato dalla v{esito['da']} alla v{ULTIMA_VERSIONE}")
+        else:
+            print(f"✓ Schema già alla v{ULTIMA_VERSIONE}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Sketch probabilistici per le statistiche approssimate delle schede fauna
+HyperLogLog (valori distinti), campione a serbatoio (quantili delle misure) e
+Count-Min (frequenze e specie/PSI più frequenti). Tutti gli sketch sono
+fondibili (merge) e serializzabili in JSON, quindi si possono calcolare per
+sito o per sessione e combinare in seguito.
+Non dipende da Qt.
+"""
+
+import base64
+import hashlib
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+
+# Parametri predefiniti
+HLL_PRECISIONE = 12          # 4096 registri, errore standard ~1.6%
+SERBATOIO_CAPACITA = 2048    # valori conservati per i quantili
+CMS_EPSILON = 0.001          # sovrastima massima: epsilon * totale
+CMS_DELTA = 0.01             # probabilità che la sovrastima superi il limite
+CMS_CANDIDATI = 64           # chiavi candidate conservate per i più frequenti
+CONFIDENZA = 0.95            # livello di confidenza degli intervalli riportati
+BUFFER_CHIAVI = 10000        # chiavi accumulate prima di aggiornare gli sketch
+
+# Quantile normale a due code per il livello di confidenza
+_Z_CONFIDENZA = 1.959964
+
+
+def derive_seed(radice: int, *chiavi) -> int:
+    """
+    Seed figlio indipendente, stabile tra sessioni e processi
+
+    Analogo agli spawn_key di numpy.random.SeedSequence: stessa radice e stesse
+    chiavi danno lo stesso seed, chiavi diverse danno sequenze non correlate.
+    """
+    digest = hashlib.blake2b(repr((radice,) + chiavi).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _hash128(value: str) -> Tuple[int, int]:
+    """Due hash indipendenti a 64 bit, stabili tra sessioni e processi"""
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')
+
+
+class HyperLogLog:
+    """Stima del numero di valori distinti (Flajolet et al., 2007)"""
+
+    def __init__(self, precisione: int = HLL_PRECISIONE):
+        self.precisione = precisione
+        self.m = 1 << precisione
+        self.registri = bytearray(self.m)
+        self._pending = set()
+
+    def add(self, value: str):
+        """Aggiunge un valore allo sketch (i duplicati ravvicinati sono calcolati una volta)"""
+        self._pending.add(value)
+        if len(self._pending) >= BUFFER_CHIAVI:
+            self._flush()
+
+    def _flush(self):
+        """Applica ai registri i valori in attesa"""
+        bits = 64 - self.precisione
+        mask = (1 << bits) - 1
+        registri = self.registri
+        for value in self._pending:
+            x, _ = _hash128(value)
+            idx = x >> bits
+            rho = bits - (x & mask).bit_length() + 1
+            if rho > registri[idx]:
+                registri[idx] = rho
+        self._pending.clear()
+
+    def merge(self, other: 'HyperLogLog'):
+        """Fonde un altro sketch con la stessa precisione"""
+        if other.precisione != self.precisione:
+            raise ValueError("Sketch HyperLogLog con precisioni diverse")
+        self._flush()
+        other._flush()
+        self.registri = bytearray(max(a, b) for a, b in zip(self.registri, other.registri))
+
+    def estimate(self) -> float:
+        """Numero stimato di valori distinti"""
+        self._flush()
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        stima = alpha * m * m / sum(2.0 ** -r for r in self.registri)
+        vuoti = self.registri.count(0)
+        if stima <= 2.5 * m and vuoti:
+            # Correzione per piccole cardinalità (linear counting)
+            stima = m * math.log(m / vuoti)
+        return stima
+
+    def relative_error(self) -> float:
+        """Errore relativo al livello di confidenza CONFIDENZA"""
+        return _Z_CONFIDENZA * 1.04 / math.sqrt(self.m)
+
+    def to_dict(self) -> Dict:
+        self._flush()
+        return {'precisione': self.precisione,
+                'registri': base64.b64encode(bytes(self.registri)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HyperLogLog':
+        sketch = cls(data['precisione'])
+        sketch.registri = bytearray(base64.b64decode(data['registri']))
+        return sketch
+
+
+class ReservoirSample:
+    """
+    Campione uniforme a capacità fissa per i quantili
+
+    Usa l'algoritmo L (Li, 1994), che calcola direttamente quanti valori
+    saltare invece di estrarre un numero casuale per ognuno. Conteggio,
+    somma, minimo e massimo sono esatti; i quantili hanno un errore di rango
+    limitato dalla disuguaglianza DKW.
+    """
+
+    def __init__(self, capacita: int = SERBATOIO_CAPACITA, seed: int = 0):
+        self.capacita = capacita
+        self.n = 0
+        self.somma = 0.0
+        self.minimo = None
+        self.massimo = None
+        self.valori = []
+        self._rng = random.Random(seed)
+        self._w = 1.0
+        # Indice (da 0) dell'ultimo valore inserito; i salti partono dall'ultimo posto riempito
+        self._prossimo = capacita - 1
+
+    def _salta(self):
+        """Calcola l'indice del prossimo valore da inserire nel campione"""
+        rng = self._rng
+        self._w *= math.exp(math.log(1.0 - rng.random()) / self.capacita)
+        self._prossimo += int(math.log(1.0 - rng.random()) / math.log(1.0 - self._w)) + 1
+
+    def _riprendi(self):
+        """Riallinea lo stato dei salti dopo merge o caricamento (soglia ~ capacità / n)"""
+        if len(self.valori) >= self.capacita:
+            self._w = self.capacita / self.n
+            self._prossimo = self.n - 1
+            self._salta()
+
+    def add(self, value: float):
+        """Aggiunge un valore allo sketch"""
+        self.n += 1
+        self.somma += value
+        if self.minimo is None or value < self.minimo:
+            self.minimo = value
+        if self.massimo is None or value > self.massimo:
+            self.massimo = value
+        if len(self.valori) < self.capacita:
+            self.valori.append(value)
+            if len(self.valori) == self.capacita:
+                self._salta()
+        elif self.n - 1 == self._prossimo:
+            self.valori[self._rng.randrange(self.capacita)] = value
+            self._salta()
+
+    def merge(self, other: 'ReservoirSample'):
+        """Fonde un altro campione, pesando ciascuno per il numero di valori visti"""
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.somma = other.n, other.somma
+            self.minimo, self.massimo = other.minimo, other.massimo
+            self.valori = list(other.valori)
+            self._riprendi()
+            return
+
+        totale = self.n + other.n
+        valori = self.valori + other.valori
+        if len(valori) > self.capacita:
+            # Quota dal primo campione proporzionale ai valori visti (deterministica)
+            rng = random.Random(self.n * 1000003 + other.n)
+            da_self = sum(1 for _ in range(self.capacita) if rng.random() < self.n / totale)
+            da_self = max(self.capacita - len(other.valori), min(len(self.valori), da_self))
+            valori = rng.sample(self.valori, da_self) + rng.sample(other.valori, self.capacita - da_self)
+
+        self.n = totale
+        self.somma += other.somma
+        self.minimo = min(self.minimo, other.minimo)
+        self.massimo = max(self.massimo, other.massimo)
+        self.valori = valori
+        self._riprendi()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile q (0-1) stimato dal campione (rango più vicino)"""
+        if not self.valori:
+            return None
+        ordinati = sorted(self.valori)
+        return ordinati[min(len(ordinati) - 1, max(0, math.ceil(q * len(ordinati)) - 1))]
+
+    def rank_error(self) -> float:
+        """Errore massimo sul rango (frazione) al livello CONFIDENZA; 0 se il campione è completo"""
+        if not self.valori or len(self.valori) >= self.n:
+            return 0.0
+        return math.sqrt(math.log(2 / (1 - CONFIDENZA)) / (2 * len(self.valori)))
+
+    def to_dict(self) -> Dict:
+        return {'capacita': self.capacita, 'n': self.n, 'somma': self.somma,
+                'minimo': self.minimo, 'massimo': self.massimo, 'valori': self.valori}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ReservoirSample':
+        sketch = cls(data['capacita'])
+        sketch.n, sketch.somma = data['n'], data['somma']
+        sketch.minimo, sketch.massimo = data['minimo'], data['massimo']
+        sketch.valori = list(data['valori'])
+        sketch._riprendi()
+        return sketch
+
+
+class CountMinSketch:
+    """
+    Frequenze approssimate (Cormode e Muthukrishnan, 2005) con elenco dei più frequenti
+
+    Le stime non sono mai inferiori al vero e lo superano al massimo di
+    epsilon * totale con probabilità 1 - delta. Le chiavi candidate ai primi
+    posti sono conservate a parte, perché lo sketch da solo non memorizza chiavi.
+    """
+
+    def __init__(self, epsilon: float = CMS_EPSILON, delta: float = CMS_DELTA,
+                 candidati: int = CMS_CANDIDATI):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.larghezza = math.ceil(math.e / epsilon)
+        self.profondita = math.ceil(math.log(1 / delta))
+        self.candidati = candidati
+        self.tabella = [[0] * self.larghezza for _ in range(self.profondita)]
+        self.totale = 0
+        self.chiavi = {}
+        self._pending = {}
+
+    def _colonne(self, key: str) -> List[int]:
+        h1, h2 = _hash128(key)
+        return [(h1 + i * h2) % self.larghezza for i in range(self.profondita)]
+
+    def add(self, key: str, count: int = 1):
+        """Aggiunge occorrenze di una chiave (accumulate e applicate a blocchi)"""
+        self._pending[key] = self._pending.get(key, 0) + count
+        self.totale += count
+        if len(self._pending) >= BUFFER_CHIAVI:
+            self._flush()
+
+    def _flush(self):
+        """Applica alla tabella le occorrenze in attesa"""
+        for key, count in self._pending.items():
+            colonne = self._colonne(key)
+            for riga, col in zip(self.tabella, colonne):
+                riga[col] += count
+            self.chiavi[key] = min(riga[col] for riga, col in zip(self.tabella, colonne))
+            if len(self.chiavi) > 2 * self.candidati:
+                self._pota()
+        self._pending.clear()
+
+    def _pota(self):
+        """Conserva solo i candidati con le stime più alte"""
+        migliori = sorted(self.chiavi.items(), key=lambda x: x[1], reverse=True)[:self.candidati]
+        self.chiavi = dict(migliori)
+
+    def estimate(self, key: str) -> int:
+        """Frequenza stimata di una chiave (mai inferiore al vero)"""
+        self._flush()
+        return min(riga[col] for riga, col in zip(self.tabella, self._colonne(key)))
+
+    def merge(self, other: 'CountMinSketch'):
+        """Fonde un altro sketch con gli stessi parametri"""
+        if (other.larghezza, other.profondita) != (self.larghezza, self.profondita):
+            raise ValueError("Sketch Count-Min con dimensioni diverse")
+        self._flush()
+        other._flush()
+        for riga, altra in zip(self.tabella, other.tabella):
+            for i, v in enumerate(altra):
+                if v:
+                    riga[i] += v
+        self.totale += other.totale
+        self.chiavi = {k: self.estimate(k) for k in set(self.chiavi) | set(other.chiavi)}
+        self._pota()
+
+    def error_bound(self) -> int:
+        """Sovrastima massima delle frequenze con probabilità 1 - delta"""
+        return math.ceil(self.epsilon * self.totale)
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Chiavi più frequenti con la loro stima (a parità, in ordine alfabetico)"""
+        self._flush()
+        stime = [(k, self.estimate(k)) for k in self.chiavi]
+        return sorted(stime, key=lambda x: (-x[1], x[0]))[:n]
+
+    def to_dict(self) -> Dict:
+        self._flush()
+        # Solo le celle non nulle: la tabella è per lo più vuota
+        celle = [[r, c, v] for r, riga in enumerate(self.tabella) for c, v in enumerate(riga) if v]
+        return {'epsilon': self.epsilon, 'delta': self.delta, 'candidati': self.candidati,
+                'totale': self.totale, 'celle': celle, 'chiavi': list(self.chiavi)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CountMinSketch':
+        sketch = cls(data['epsilon'], data['delta'], data['candidati'])
+        for r, c, v in data['celle']:
+            sketch.tabella[r][c] = v
+        sketch.totale = data['totale']
+        sketch.chiavi = {k: sketch.estimate(k) for k in data['chiavi']}
+        return sketch
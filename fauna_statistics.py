@@ -0,0 +1,1484 @@
+"""
+Motore delle statistiche riepilogative delle schede fauna
+Calcola una volta sola un risultato strutturato (aggregati, nessun record
+grezzo) da cui vengono generati il report testuale e gli export CSV, XLSX e PDF.
+Non dipende da Qt.
+"""
+
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import namedtuple
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fauna_analytics import run_parallel
+from fauna_records import (
+    extract_species, extract_measurements, extract_psi,
+    extract_specie_psi_pairs, extract_detailed_measurements
+)
+from fauna_sketches import HyperLogLog, ReservoirSample, CountMinSketch, CONFIDENZA, derive_seed
+
+
+# Campi riportati nella distribuzione per categorie (campo, etichetta)
+CAMPI_CATEGORIE = [
+    ('contesto', 'Contesto'),
+    ('metodologia_recupero', 'Metodologia di Recupero'),
+    ('stato_conservazione', 'Stato di Conservazione'),
+    ('resti_connessione_anatomica', 'Resti in Connessione Anatomica'),
+    ('tipologia_accumulo', 'Tipologia di Accumulo'),
+    ('tracce_combustione', 'Tracce di Combustione'),
+    ('stato_frammentazione', 'Stato di Frammentazione'),
+]
+
+# Campi conteggiati per il sommario descrittivo
+CAMPI_SOMMARIO = ['contesto', 'stato_conservazione', 'tracce_combustione', 'resti_connessione_anatomica']
+
+# Tipi di misura (chiave, etichetta)
+TIPI_MISURA = [
+    ('GL', 'GL (Greatest Length)'),
+    ('GB', 'GB (Greatest Breadth)'),
+    ('Bp', 'Bp (Proximal Breadth)'),
+    ('Bd', 'Bd (Distal Breadth)'),
+]
+
+Conteggi = List[Tuple[str, int]]
+
+
+@dataclass
+class NumericSummary:
+    """Riepilogo di una serie numerica (la media si ottiene da somma / n)"""
+    n: int
+    somma: float
+    minimo: float
+    massimo: float
+
+    @property
+    def media(self) -> float:
+        return self.somma / self.n
+
+
+@dataclass
+class GroupSection:
+    """Statistiche di un raggruppamento interno a un sito (area, saggio, US, combinazione)"""
+    chiave: object
+    n_record: int
+    specie: Conteggi
+    nmi: Optional[NumericSummary]
+    psi: Conteggi
+    n_misure: int
+
+
+@dataclass
+class SiteSection:
+    """Statistiche di un singolo sito"""
+    sito: str
+    n_record: int
+    n_aree: int
+    n_saggi: int
+    n_us: int
+    specie: Conteggi
+    nmi: Optional[NumericSummary]
+    psi: Conteggi
+    n_misure: int
+    elementi: Conteggi
+    aree: List[GroupSection] = field(default_factory=list)
+    saggi: List[GroupSection] = field(default_factory=list)
+    us: List[GroupSection] = field(default_factory=list)
+    combinazioni: List[GroupSection] = field(default_factory=list)
+
+
+@dataclass
+class StatisticsResult:
+    """
+    Risultato completo delle statistiche
+
+    I conteggi sono liste (valore, conteggio) già ordinate per frequenza
+    decrescente; 'conteggi_sommario' mantiene invece l'ordine di prima
+    occorrenza, come richiesto dal sommario descrittivo.
+    """
+    totale: int
+    siti: List[str]
+    n_aree: int
+    n_saggi: int
+    n_us: int
+    n_combinazioni: int
+    nmi: Optional[NumericSummary]
+    misure: Optional[NumericSummary]
+    misure_per_tipo: Dict[str, Optional[NumericSummary]]
+    specie: Conteggi
+    psi: Conteggi
+    specie_psi: Conteggi
+    elementi: Conteggi
+    categorie: Dict[str, Conteggi]
+    conteggi_sommario: Dict[str, Conteggi]
+    sito_dominante: Optional[Tuple[str, int]]
+    specie_dominante_sito: Optional[Tuple[str, int]]
+    misure_dettagliate: List[Tuple[str, str, float, float, float, float]]
+    siti_sezioni: List[SiteSection]
+    generato_il: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict:
+        """Converte il risultato in un dizionario serializzabile in JSON"""
+        data = asdict(self)
+        data['generato_il'] = self.generato_il.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StatisticsResult':
+        """Ricostruisce il risultato da un dizionario prodotto da to_dict"""
+        data = dict(data)
+        data['nmi'] = _summary_from_dict(data['nmi'])
+        data['misure'] = _summary_from_dict(data['misure'])
+        data['misure_per_tipo'] = {k: _summary_from_dict(v) for k, v in data['misure_per_tipo'].items()}
+        for key in ('specie', 'psi', 'specie_psi', 'elementi', 'misure_dettagliate'):
+            data[key] = _tuples(data[key])
+        data['categorie'] = {k: _tuples(v) for k, v in data['categorie'].items()}
+        data['conteggi_sommario'] = {k: _tuples(v) for k, v in data['conteggi_sommario'].items()}
+        for key in ('sito_dominante', 'specie_dominante_sito'):
+            if data[key] is not None:
+                data[key] = tuple(data[key])
+        data['siti_sezioni'] = [_site_from_dict(s) for s in data['siti_sezioni']]
+        data['generato_il'] = datetime.fromisoformat(data['generato_il'])
+        return cls(**data)
+
+
+def _tuples(items: list) -> list:
+    """Riconverte in tuple le coppie diventate liste nella serializzazione JSON"""
+    return [tuple(x) for x in items]
+
+
+def _summary_from_dict(data: Optional[Dict]) -> Optional[NumericSummary]:
+    return NumericSummary(**data) if data is not None else None
+
+
+def _group_from_dict(data: Dict) -> GroupSection:
+    data = dict(data)
+    if isinstance(data['chiave'], list):
+        data['chiave'] = tuple(data['chiave'])
+    data['specie'] = _tuples(data['specie'])
+    data['psi'] = _tuples(data['psi'])
+    data['nmi'] = _summary_from_dict(data['nmi'])
+    return GroupSection(**data)
+
+
+def _site_from_dict(data: Dict) -> SiteSection:
+    data = dict(data)
+    for key in ('specie', 'psi', 'elementi'):
+        data[key] = _tuples(data[key])
+    data['nmi'] = _summary_from_dict(data['nmi'])
+    for key in ('aree', 'saggi', 'us', 'combinazioni'):
+        data[key] = [_group_from_dict(g) for g in data[key]]
+    return SiteSection(**data)
+
+
+# Record già interpretato: i campi JSON vengono letti una sola volta
+_Parsed = namedtuple('_Parsed', 'sito area saggio us nmi specie psi misure dettagli')
+
+
+def _parse_record(r: Dict) -> _Parsed:
+    """Estrae da un record i soli dati necessari alle statistiche"""
+    nmi = int(r['numero_minimo_individui']) if r.get('numero_minimo_individui') not in (None, '', 0) else None
+    return _Parsed(
+        r.get('sito', ''), r.get('area', ''), r.get('saggio', ''), r.get('us', ''), nmi,
+        extract_species(r), extract_psi(r), extract_measurements(r), extract_detailed_measurements(r)
+    )
+
+
+def _count(values) -> Dict[str, int]:
+    """Conta le occorrenze dei valori non vuoti, in ordine di prima occorrenza"""
+    counts = {}
+    for v in values:
+        if v:
+            counts[v] = counts.get(v, 0) + 1
+    return counts
+
+
+def _top(counts: Dict[str, int], n: Optional[int] = None) -> Conteggi:
+    """Ordina per frequenza decrescente (stabile) e tronca ai primi n"""
+    items = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    return items[:n] if n is not None else items
+
+
+def _numeric_summary(values: list) -> Optional[NumericSummary]:
+    """Riepilogo di una lista di numeri, None se vuota"""
+    if not values:
+        return None
+    return NumericSummary(len(values), sum(values), min(values), max(values))
+
+
+def _group_section(chiave, parsed: List[_Parsed]) -> GroupSection:
+    """Statistiche di un raggruppamento (top 3 specie e PSI)"""
+    return GroupSection(
+        chiave=chiave,
+        n_record=len(parsed),
+        specie=_top(_count(sp for p in parsed for sp in p.specie), 3),
+        nmi=_numeric_summary([p.nmi for p in parsed if p.nmi is not None]),
+        psi=_top(_count(psi for p in parsed for psi in p.psi), 3),
+        n_misure=sum(len(p.dettagli) for p in parsed),
+    )
+
+
+def compute_site_section(sito: str, sito_parsed: List[_Parsed]) -> SiteSection:
+    """
+    Calcola la sezione di un sito a partire dai suoi record interpretati
+
+    Args:
+        sito: nome del sito
+        sito_parsed: record del sito nell'ordine originale
+
+    Returns:
+        SiteSection con statistiche del sito e dei raggruppamenti interni
+    """
+    sito_aree = set(p.area for p in sito_parsed if p.area)
+    sito_saggi = set(p.saggio for p in sito_parsed if p.saggio)
+    sito_us = set(p.us for p in sito_parsed if p.us)
+
+    section = SiteSection(
+        sito=sito,
+        n_record=len(sito_parsed),
+        n_aree=len(sito_aree),
+        n_saggi=len(sito_saggi),
+        n_us=len(sito_us),
+        specie=_top(_count(sp for p in sito_parsed for sp in p.specie), 5),
+        nmi=_numeric_summary([p.nmi for p in sito_parsed if p.nmi is not None]),
+        psi=_top(_count(psi for p in sito_parsed for psi in p.psi), 5),
+        n_misure=sum(len(p.dettagli) for p in sito_parsed),
+        elementi=_top(_count(m['elemento'] for p in sito_parsed for m in p.dettagli), 3),
+    )
+
+    for area in sorted(sito_aree):
+        section.aree.append(_group_section(area, [p for p in sito_parsed if p.area == area]))
+
+    for saggio in sorted(sito_saggi):
+        section.saggi.append(_group_section(saggio, [p for p in sito_parsed if p.saggio == saggio]))
+
+    # US: raggruppamento in ordine di prima occorrenza, poi le 10 più numerose
+    us_groups = {}
+    for p in sito_parsed:
+        if p.us:
+            us_groups.setdefault(p.us, []).append(p)
+    for us, group in sorted(us_groups.items(), key=lambda x: len(x[1]), reverse=True)[:10]:
+        section.us.append(_group_section(us, group))
+
+    # Combinazioni Area + Saggio + US
+    comb_groups = {}
+    for p in sito_parsed:
+        if p.area and p.saggio and p.us:
+            comb_groups.setdefault((p.area, p.saggio, p.us), []).append(p)
+    for key, group in sorted(comb_groups.items(), key=lambda x: len(x[1]), reverse=True):
+        section.combinazioni.append(_group_section(key, group))
+
+    return section
+
+
+# Campi dei record usati dal calcolo (gli altri non vengono inviati ai worker)
+CAMPI_STATISTICHE = tuple(dict.fromkeys(
+    ['sito', 'area', 'saggio', 'us', 'numero_minimo_individui', 'specie', 'parti_scheletriche',
+     'specie_psi', 'misure_ossa'] + [c for c, _ in CAMPI_CATEGORIE] + CAMPI_SOMMARIO
+))
+
+# Sotto questa soglia di record il calcolo parallelo costa più di quanto fa risparmiare
+PARALLELO_MIN_RECORD = 5000
+
+
+def _add_count(counts: Dict, key, order: tuple):
+    """Incrementa un conteggio ricordando la posizione della prima occorrenza"""
+    entry = counts.get(key)
+    if entry is None:
+        counts[key] = [1, order]
+    else:
+        entry[0] += 1
+
+
+def _compute_partition(task: Tuple[str, List[Tuple[int, Dict]]]) -> Tuple[Optional[SiteSection], Dict]:
+    """
+    Worker: calcola la sezione di un sito e i suoi aggregati parziali
+
+    Ogni conteggio porta con sé la posizione globale della prima occorrenza
+    (indice del record, progressivo): la fusione ricostruisce così lo stesso
+    ordine di inserimento del calcolo su tutti i record, da cui dipende
+    l'ordine dei valori a pari frequenza.
+
+    Args:
+        task: (sito, [(indice globale, record), ...]) con i record in ordine
+
+    Returns:
+        (SiteSection o None per i record senza sito, aggregati parziali)
+    """
+    sito, indexed = task
+    parsed = []
+    counts = {k: {} for k in ('specie', 'psi', 'specie_psi', 'elementi')}
+    categorie = {campo: {} for campo, _ in CAMPI_CATEGORIE}
+    sommario = {campo: {} for campo in CAMPI_SOMMARIO}
+    partial = {
+        'primo': indexed[0][0],
+        'aree': set(), 'saggi': set(), 'us': set(), 'combinazioni': set(),
+        'nmi': [], 'misure': [], 'dettagli': [],
+        'conteggi': counts, 'categorie': categorie, 'sommario': sommario,
+    }
+    seq = 0
+
+    for idx, r in indexed:
+        p = _parse_record(r)
+        parsed.append(p)
+
+        if p.area:
+            partial['aree'].add(p.area)
+        if p.saggio:
+            partial['saggi'].add(p.saggio)
+        if p.us:
+            partial['us'].add(p.us)
+        if p.sito and p.area and p.saggio and p.us:
+            partial['combinazioni'].add((p.sito, p.area, p.saggio, p.us))
+
+        if p.nmi is not None:
+            partial['nmi'].append((idx, p.nmi))
+        if p.misure:
+            partial['misure'].append((idx, p.misure))
+        if p.dettagli:
+            partial['dettagli'].append((idx, [(m['elemento'], m['specie'], m['GL'], m['GB'], m['Bp'], m['Bd'])
+                                              for m in p.dettagli]))
+
+        items = [('specie', sp) for sp in p.specie if sp]
+        items += [('psi', psi) for psi in p.psi if psi]
+        items += [('specie_psi', f"{specie} → {psi}") for specie, psi in extract_specie_psi_pairs(r)
+                  if specie and psi]
+        items += [('elementi', m['elemento']) for m in p.dettagli if m['elemento']]
+        for kind, key in items:
+            _add_count(counts[kind], key, (idx, seq))
+            seq += 1
+
+        for campo in categorie:
+            val = r.get(campo, '')
+            if val and val.strip():
+                _add_count(categorie[campo], val, (idx, seq))
+                seq += 1
+        for campo in sommario:
+            val = r.get(campo, '')
+            if val:
+                _add_count(sommario[campo], val, (idx, seq))
+                seq += 1
+
+    section = compute_site_section(sito, parsed) if sito else None
+    return section, partial
+
+
+def _merge_counts(parts: List[Dict]) -> Dict[str, int]:
+    """Somma conteggi parziali mantenendo l'ordine globale di prima occorrenza"""
+    merged = {}
+    for counts in parts:
+        for key, (n, order) in counts.items():
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [n, order]
+            else:
+                entry[0] += n
+                entry[1] = min(entry[1], order)
+    return {key: n for key, (n, _) in sorted(merged.items(), key=lambda x: x[1][1])}
+
+
+def _merge_ordered(parts: List[list]) -> list:
+    """Concatena liste (indice globale, valori) nell'ordine originale dei record"""
+    return [values for _, values in heapq.merge(*parts, key=lambda x: x[0])]
+
+
+def compute_statistics(records: List[Dict], max_workers: Optional[int] = None) -> Optional[StatisticsResult]:
+    """
+    Calcola tutte le statistiche riepilogative
+
+    I record vengono suddivisi per sito; ogni partizione è calcolata
+    separatamente (in un pool di processi se i record sono molti) e gli
+    aggregati parziali vengono fusi. Il risultato è identico per qualsiasi
+    numero di processi e contiene solo aggregati: i record possono essere
+    rilasciati subito dopo la chiamata.
+
+    Args:
+        records: lista di record fauna
+        max_workers: processi da usare (None = automatico, 1 = seriale)
+
+    Returns:
+        StatisticsResult, o None se non ci sono record
+    """
+    if not records:
+        return None
+
+    # Partizioni per sito, nell'ordine di prima occorrenza (record senza sito in una propria)
+    partitions = {}
+    for idx, r in enumerate(records):
+        projected = {k: r[k] for k in CAMPI_STATISTICHE if k in r}
+        partitions.setdefault(r.get('sito') or '', []).append((idx, projected))
+
+    if max_workers is None and len(records) < PARALLELO_MIN_RECORD:
+        max_workers = 1
+
+    # Le partizioni più grandi per prime, per bilanciare il carico dei processi
+    tasks = sorted(partitions.items(), key=lambda x: len(x[1]), reverse=True)
+    outputs = run_parallel(_compute_partition, tasks, max_workers)
+
+    partials = [partial for _, partial in outputs]
+    sections = {s.sito: s for s, _ in outputs if s is not None}
+
+    dettagli = _merge_ordered([p['dettagli'] for p in partials])
+    dettagli = [m for record_dettagli in dettagli for m in record_dettagli]
+    misure_values = [v for values in _merge_ordered([p['misure'] for p in partials]) for v in values]
+    nmi_values = _merge_ordered([p['nmi'] for p in partials])
+
+    def merged(kind):
+        return _merge_counts([p['conteggi'][kind] for p in partials])
+
+    # Sito dominante: il più numeroso, a parità il primo incontrato
+    sito_dominante = None
+    specie_dominante_sito = None
+    if sections:
+        primo = {s.sito: p['primo'] for s, p in outputs if s is not None}
+        top = min(sections.values(), key=lambda s: (-s.n_record, primo[s.sito]))
+        sito_dominante = (top.sito, top.n_record)
+        if top.specie:
+            specie_dominante_sito = top.specie[0]
+
+    tipi = {'GL': 2, 'GB': 3, 'Bp': 4, 'Bd': 5}
+
+    return StatisticsResult(
+        totale=len(records),
+        siti=sorted(sections),
+        n_aree=len(set().union(*[p['aree'] for p in partials])),
+        n_saggi=len(set().union(*[p['saggi'] for p in partials])),
+        n_us=len(set().union(*[p['us'] for p in partials])),
+        n_combinazioni=len(set().union(*[p['combinazioni'] for p in partials])),
+        nmi=_numeric_summary(nmi_values),
+        misure=_numeric_summary(misure_values),
+        misure_per_tipo={
+            tipo: _numeric_summary([m[tipi[tipo]] for m in dettagli if m[tipi[tipo]] > 0])
+            for tipo, _ in TIPI_MISURA
+        } if dettagli else {},
+        specie=_top(merged('specie')),
+        psi=_top(merged('psi')),
+        specie_psi=_top(merged('specie_psi')),
+        elementi=_top(merged('elementi')),
+        categorie={campo: _top(_merge_counts([p['categorie'][campo] for p in partials]))
+                   for campo, _ in CAMPI_CATEGORIE},
+        conteggi_sommario={campo: list(_merge_counts([p['sommario'][campo] for p in partials]).items())
+                           for campo in CAMPI_SOMMARIO},
+        sito_dominante=sito_dominante,
+        specie_dominante_sito=specie_dominante_sito,
+        misure_dettagliate=dettagli,
+        siti_sezioni=[sections[sito] for sito in sorted(sections)],
+    )
+
+
+# ========== CACHE ==========
+
+# Versione del formato dei file di cache (da incrementare se cambia StatisticsResult)
+CACHE_VERSION = 1
+
+
+def database_key(db) -> str:
+    """Identifica il database a cui si riferisce una voce di cache"""
+    if getattr(db, 'db_path', None):
+        return 'sqlite:' + os.path.abspath(db.db_path)
+    config = getattr(db, 'db_config', None) or {}
+    return "postgres:{}:{}/{}".format(config.get('host', 'localhost'), config.get('port', 5432),
+                                      config.get('database', 'pyarchinit'))
+
+
+class StatisticsCache:
+    """
+    Cache dei risultati statistici, in memoria e su disco
+
+    Ogni database ha una sola voce, valida finché l'impronta restituita da
+    db.get_data_version() non cambia.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Args:
+            cache_dir: cartella dei file di cache (default ~/.pyarchinit/fauna_stats_cache)
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".pyarchinit", "fauna_stats_cache")
+        self.cache_dir = cache_dir
+        self._memory = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _fingerprint(self, db) -> Optional[str]:
+        try:
+            return db.get_data_version()
+        except Exception as e:
+            print(f"⚠ Impronta del database non disponibile, cache disattivata: {e}")
+            return None
+
+    def _load(self, key: str, fingerprint: str) -> Optional[StatisticsResult]:
+        """Legge la voce su disco se corrisponde all'impronta"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get('versione') != CACHE_VERSION or data.get('database') != key
+                    or data.get('impronta') != fingerprint):
+                return None
+            return StatisticsResult.from_dict(data['risultato'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save(self, key: str, fingerprint: str, result: StatisticsResult):
+        """Scrive la voce su disco in modo atomico"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'versione': CACHE_VERSION, 'database': key, 'impronta': fingerprint,
+                           'risultato': result.to_dict()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠ Impossibile salvare la cache delle statistiche: {e}")
+
+    def get(self, db, compute: bool = True, force: bool = False,
+            max_workers: Optional[int] = None) -> Optional[StatisticsResult]:
+        """
+        Restituisce le statistiche del database, ricalcolandole solo se i dati sono cambiati
+
+        Args:
+            db: istanza FaunaDB o FaunaDBPostgres
+            compute: se False restituisce solo un risultato già in cache (o None)
+            force: ignora la cache e ricalcola
+            max_workers: processi per il calcolo (vedi compute_statistics)
+
+        Returns:
+            StatisticsResult, o None se non ci sono record (o non in cache con compute=False)
+        """
+        key = database_key(db)
+        fingerprint = self._fingerprint(db)
+
+        if fingerprint is not None and not force:
+            cached = self._memory.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+            result = self._load(key, fingerprint)
+            if result is not None:
+                self._memory[key] = (fingerprint, result)
+                return result
+
+        if not compute:
+            return None
+
+        records = db.get_all_fauna_records()
+        result = compute_statistics(records, max_workers)
+        del records
+
+        if result is not None and fingerprint is not None:
+            self._memory[key] = (fingerprint, result)
+            self._save(key, fingerprint, result)
+
+        return result
+
+    def invalidate(self, db):
+        """Elimina la voce del database (da chiamare dopo modifiche ai dati)"""
+        key = database_key(db)
+        self._memory.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+# ========== REPORT TESTUALE ==========
+
+def _fmt_counts(items: Conteggi) -> str:
+    """Formatta una lista di conteggi come 'a (1), b (2)'"""
+    return ', '.join([f'{k} ({c})' for k, c in items])
+
+
+def _render_group(lines: List[str], g: GroupSection, sito_record: int, totale: int, label: str, specie_label: str):
+    """Aggiunge le righe di un raggruppamento interno al sito"""
+    pct_sito = (g.n_record / sito_record) * 100
+    pct_totale = (g.n_record / totale) * 100
+
+    if label is None:
+        area, saggio, us = g.chiave
+        lines.append(f"\n  Area {area} - Saggio {saggio} - US {us}: {g.n_record} record")
+        lines.append(f"    {pct_sito:.1f}% del sito | {pct_totale:.1f}% del totale generale")
+    else:
+        lines.append(f"\n  {label}: {g.chiave}")
+        lines.append(f"    Record: {g.n_record} ({pct_sito:.1f}% del sito, {pct_totale:.1f}% del totale)")
+
+    if g.specie:
+        lines.append(f"    {specie_label}: {_fmt_counts(g.specie)}")
+    if g.nmi:
+        lines.append(f"    NMI totale: {g.nmi.somma}, Media: {g.nmi.media:.1f}")
+    if g.psi:
+        lines.append(f"    PSI: {_fmt_counts(g.psi)}")
+    if g.n_misure:
+        lines.append(f"    Misure: {g.n_misure} totali")
+
+
+def render_site_section(s: SiteSection, totale: int) -> List[str]:
+    """
+    Genera le righe del report per un singolo sito
+
+    Args:
+        s: sezione del sito
+        totale: numero totale di record (per le percentuali)
+
+    Returns:
+        Lista di righe di testo
+    """
+    lines = []
+    sito_pct = (s.n_record / totale) * 100
+
+    lines.append(f"\n{'#' * 100}")
+    lines.append(f"SITO: {s.sito}")
+    lines.append(f"{'#' * 100}")
+    lines.append(f"Totale record: {s.n_record} ({sito_pct:.1f}% del totale generale)")
+
+    lines.append(f"Numero aree: {s.n_aree}")
+    lines.append(f"Numero saggi: {s.n_saggi}")
+    lines.append(f"Numero US: {s.n_us}")
+
+    if s.specie:
+        lines.append(f"\nSpecie principali:")
+        for sp, cnt in s.specie:
+            sp_pct = (cnt / s.n_record) * 100
+            lines.append(f"  - {sp}: {cnt} record ({sp_pct:.1f}%)")
+
+    if s.nmi:
+        lines.append(f"\nNMI totale sito: {s.nmi.somma}")
+        lines.append(f"NMI medio: {s.nmi.media:.1f}")
+        lines.append(f"NMI min: {s.nmi.minimo}, max: {s.nmi.massimo}")
+
+    if s.psi:
+        lines.append(f"\nParti scheletriche principali:")
+        for psi, cnt in s.psi:
+            lines.append(f"  - {psi}: {cnt}")
+
+    if s.n_misure:
+        lines.append(f"\nMisure ossee: {s.n_misure} totali")
+        if s.elementi:
+            lines.append(f"  Elementi misurati: {_fmt_counts(s.elementi)}")
+
+    if s.aree:
+        lines.append(f"\n{'-' * 100}")
+        lines.append(f"📍 STATISTICHE PER AREA (Sito: {s.sito})")
+        lines.append(f"{'-' * 100}")
+        for g in s.aree:
+            _render_group(lines, g, s.n_record, totale, 'Area', 'Specie principali')
+
+    if s.saggi:
+        lines.append(f"\n{'-' * 100}")
+        lines.append(f"🔬 STATISTICHE PER SAGGIO (Sito: {s.sito})")
+        lines.append(f"{'-' * 100}")
+        for g in s.saggi:
+            _render_group(lines, g, s.n_record, totale, 'Saggio', 'Specie principali')
+
+    if s.us:
+        lines.append(f"\n{'-' * 100}")
+        lines.append(f"🏛 STATISTICHE PER US (Sito: {s.sito}, Top 10)")
+        lines.append(f"{'-' * 100}")
+        for g in s.us:
+            _render_group(lines, g, s.n_record, totale, 'US', 'Specie principali')
+
+    lines.append(f"\n{'-' * 100}")
+    lines.append(f"🔍 COMBINAZIONI AREA + SAGGIO + US (Sito: {s.sito})")
+    lines.append(f"{'-' * 100}")
+    for g in s.combinazioni:
+        _render_group(lines, g, s.n_record, totale, None, 'Specie')
+
+    return lines
+
+
+def render_text(result: StatisticsResult) -> List[str]:
+    """
+    Genera le righe del report testuale delle statistiche
+
+    Args:
+        result: risultato di compute_statistics
+
+    Returns:
+        Lista di righe di testo
+    """
+    stats_text = []
+    stats_text.append("=" * 100)
+    stats_text.append("STATISTICHE RIEPILOGATIVE - SCHEDE FAUNA")
+    stats_text.append("=" * 100)
+    stats_text.append("")
+
+    # === STATISTICHE GENERALI ===
+    stats_text.append("📋 STATISTICHE GENERALI")
+    stats_text.append("-" * 100)
+    stats_text.append(f"Numero totale record: {result.totale}")
+
+    stats_text.append(f"Numero siti univoci: {len(result.siti)}")
+    if result.siti:
+        stats_text.append(f"  Siti: {', '.join(result.siti)}")
+    stats_text.append(f"Numero aree univoche: {result.n_aree}")
+    stats_text.append(f"Numero saggi univoci: {result.n_saggi}")
+    stats_text.append(f"Numero US univoche: {result.n_us}")
+    stats_text.append(f"Numero combinazioni Sito+Area+Saggio+US univoche: {result.n_combinazioni}")
+    stats_text.append("")
+
+    # === STATISTICHE NUMERICHE GENERALI ===
+    stats_text.append("🔢 STATISTICHE NUMERICHE - RIEPILOGO GENERALE")
+    stats_text.append("-" * 100)
+
+    if result.nmi:
+        stats_text.append(f"Numero Minimo Individui (NMI):")
+        stats_text.append(f"  Totale record con NMI: {result.nmi.n}")
+        stats_text.append(f"  Media: {result.nmi.media:.1f}")
+        stats_text.append(f"  Minimo: {result.nmi.minimo}")
+        stats_text.append(f"  Massimo: {result.nmi.massimo}")
+        stats_text.append(f"  Somma totale: {result.nmi.somma}")
+
+    if result.psi:
+        totale_psi = sum(c for _, c in result.psi)
+        stats_text.append(f"\nParti Scheletriche (PSI) - Distribuzione:")
+        stats_text.append(f"  Totale parti identificate: {totale_psi}")
+        stats_text.append(f"  Tipi di parti univoche: {len(result.psi)}")
+        for psi, cnt in result.psi[:10]:
+            pct = (cnt / totale_psi) * 100
+            stats_text.append(f"  - {psi}: {cnt} ({pct:.1f}%)")
+
+    if result.specie_psi:
+        stats_text.append(f"\nAssociazioni Specie-PSI più frequenti:")
+        for assoc, cnt in result.specie_psi[:10]:
+            stats_text.append(f"  - {assoc}: {cnt}")
+
+    if result.misure:
+        stats_text.append(f"\nMisure Ossa (mm) - Riepilogo:")
+        stats_text.append(f"  Totale misurazioni: {result.misure.n}")
+        stats_text.append(f"  Media: {result.misure.media:.2f} mm")
+        stats_text.append(f"  Minimo: {result.misure.minimo:.2f} mm")
+        stats_text.append(f"  Massimo: {result.misure.massimo:.2f} mm")
+
+    if result.misure_per_tipo:
+        stats_text.append(f"\nMisure dettagliate per tipo:")
+        for tipo, label in TIPI_MISURA:
+            m = result.misure_per_tipo.get(tipo)
+            if m:
+                stats_text.append(f"  {label}: n={m.n}, media={m.media:.2f}, min={m.minimo:.2f}, max={m.massimo:.2f}")
+
+        if result.elementi:
+            stats_text.append(f"\nMisure per Elemento Anatomico:")
+            for el, cnt in result.elementi:
+                stats_text.append(f"  - {el}: {cnt} misurazioni")
+
+    stats_text.append("")
+
+    # === STATISTICHE PER SITO ===
+    if result.siti:
+        stats_text.append("🏛 STATISTICHE PER SITO")
+        stats_text.append("=" * 100)
+
+        for section in result.siti_sezioni:
+            stats_text.extend(render_site_section(section, result.totale))
+
+        stats_text.append(f"\n{'=' * 100}\n")
+
+    # === DISTRIBUZIONE PER CATEGORIE ===
+    stats_text.append("📊 DISTRIBUZIONE PER CATEGORIE - RIEPILOGO GENERALE")
+    stats_text.append("-" * 100)
+
+    specie = [(sp, c) for sp, c in result.specie if sp.strip()]
+    if specie:
+        stats_text.append(f"\nSpecie (Top 10):")
+        for val, count in specie[:10]:
+            percentage = (count / result.totale) * 100
+            stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
+    else:
+        stats_text.append(f"\nSpecie (Top 10): Nessun dato")
+
+    psi_cat = [(psi, c) for psi, c in result.psi if psi.strip()]
+    if psi_cat:
+        totale_psi_cat = sum(c for _, c in psi_cat)
+        stats_text.append(f"\nParti Scheletriche - PSI (Top 10):")
+        for val, count in psi_cat[:10]:
+            percentage = (count / totale_psi_cat) * 100
+            stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
+    else:
+        stats_text.append(f"\nParti Scheletriche - PSI (Top 10): Nessun dato")
+
+    if result.elementi:
+        totale_elementi = sum(c for _, c in result.elementi)
+        stats_text.append(f"\nElementi Anatomici Misurati:")
+        for val, count in result.elementi:
+            percentage = (count / totale_elementi) * 100
+            stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
+    else:
+        stats_text.append(f"\nElementi Anatomici Misurati: Nessun dato")
+
+    for campo, label in CAMPI_CATEGORIE:
+        values = result.categorie.get(campo)
+        if values:
+            stats_text.append(f"\n{label}:")
+            for val, count in values[:10]:
+                percentage = (count / result.totale) * 100
+                stats_text.append(f"  {val}: {count} ({percentage:.1f}%)")
+        else:
+            stats_text.append(f"\n{label}: Nessun dato")
+
+    stats_text.append("")
+
+    # === SOMMARIO DESCRITTIVO ===
+    stats_text.append("=" * 100)
+    stats_text.append("📝 SOMMARIO DESCRITTIVO")
+    stats_text.append("=" * 100)
+    stats_text.append("")
+
+    stats_text.extend(render_descriptive_summary(result))
+
+    stats_text.append("")
+    stats_text.append("=" * 100)
+    stats_text.append(f"Report generato il: {result.generato_il.strftime('%d/%m/%Y %H:%M:%S')}")
+    stats_text.append("=" * 100)
+
+    return stats_text
+
+
+def render_descriptive_summary(result: StatisticsResult) -> List[str]:
+    """Genera un sommario descrittivo discorsivo delle statistiche"""
+    summary = []
+    totale = result.totale
+
+    # Introduzione
+    summary.append(f"L'analisi del dataset faunistico comprende {totale} record archeologici ")
+    summary.append(f"distribuiti su {len(result.siti)} siti, {result.n_aree} aree, {result.n_saggi} saggi e {result.n_us} unità stratigrafiche.")
+    summary.append("")
+
+    # Analisi per sito
+    if result.siti and result.sito_dominante:
+        summary.append("DISTRIBUZIONE PER SITO:")
+        nome, n_record = result.sito_dominante
+        pct = (n_record / totale) * 100
+
+        summary.append(f"Il sito più rappresentato è '{nome}' con {n_record} record ({pct:.1f}% del totale). ")
+
+        if len(result.siti) > 1:
+            summary.append(f"Gli altri {len(result.siti) - 1} siti contribuiscono con il restante {100 - pct:.1f}% dei dati, ")
+            summary.append("permettendo un'analisi comparativa tra diverse località archeologiche. ")
+
+            if result.specie_dominante_sito:
+                top_sp = result.specie_dominante_sito
+                summary.append(f"Nel sito '{nome}', la specie predominante è {top_sp[0]} ")
+                summary.append(f"con {top_sp[1]} occorrenze.")
+
+        summary.append("")
+        summary.append("Le statistiche sono state organizzate gerarchicamente per sito, consentendo di analizzare ")
+        summary.append("la distribuzione spaziale dei resti faunistici a livello di aree, saggi e unità stratigrafiche ")
+        summary.append("all'interno di ciascun sito, oltre alle combinazioni specifiche Area+Saggio+US.")
+        summary.append("")
+
+    # Analisi specie
+    if result.specie:
+        summary.append("ANALISI DELLE SPECIE:")
+        summary.append(f"Sono state identificate {len(result.specie)} specie diverse. Le specie predominanti sono:")
+
+        for sp, count in result.specie[:3]:
+            pct = (count / totale) * 100
+            summary.append(f"  - {sp}: presente in {count} record ({pct:.1f}% del totale)")
+
+        summary.append("")
+
+    # Analisi NMI
+    if result.nmi:
+        summary.append("NUMERO MINIMO DI INDIVIDUI (NMI):")
+        summary.append(f"Il numero minimo totale di individui è {result.nmi.somma}, con una media di {result.nmi.media:.1f} individui ")
+        summary.append(f"per record. Il valore minimo registrato è {result.nmi.minimo}, mentre il massimo è {result.nmi.massimo}.")
+        summary.append("")
+
+    # Analisi contesti
+    context_count = dict(result.conteggi_sommario.get('contesto', []))
+    if context_count:
+        dominant_context = max(context_count.items(), key=lambda x: x[1])
+        pct = (dominant_context[1] / totale) * 100
+        summary.append("CONTESTI ARCHEOLOGICI:")
+        summary.append(f"Il contesto prevalente è '{dominant_context[0]}' con {dominant_context[1]} occorrenze ")
+        summary.append(f"({pct:.1f}% del totale). ")
+
+        if len(context_count) > 1:
+            summary.append(f"Sono stati identificati {len(context_count)} diversi tipi di contesto, indicando ")
+            summary.append("una varietà di situazioni deposizionali.")
+
+        summary.append("")
+
+    # Analisi stato di conservazione
+    conservation_count = dict(result.conteggi_sommario.get('stato_conservazione', []))
+    if conservation_count:
+        summary.append("STATO DI CONSERVAZIONE:")
+
+        # Calcola media stato conservazione (considerando valori 0-5)
+        try:
+            numeric_conservation = [int(k) for k in conservation_count.keys() if k.isdigit()]
+            if numeric_conservation:
+                weighted_sum = sum(int(k) * conservation_count[k] for k in conservation_count.keys() if k.isdigit())
+                total_with_conservation = sum(conservation_count[k] for k in conservation_count.keys() if k.isdigit())
+                avg_conservation = weighted_sum / total_with_conservation if total_with_conservation > 0 else 0
+
+                if avg_conservation < 2:
+                    quality_desc = "generalmente scarso"
+                elif avg_conservation < 3.5:
+                    quality_desc = "mediocre"
+                else:
+                    quality_desc = "buono"
+
+                summary.append(f"Lo stato di conservazione dei reperti è {quality_desc}, con un valore medio di {avg_conservation:.1f} ")
+                summary.append("sulla scala 0-5 (dove 0=pessimo, 5=ottimo).")
+        except:
+            pass
+
+        summary.append("")
+
+    # Analisi tafonomica
+    combustion_count = dict(result.conteggi_sommario.get('tracce_combustione', []))
+    if combustion_count:
+        records_with_combustion = sum(v for k, v in combustion_count.items() if k.lower() not in ['assente', 'no'])
+        pct_combustion = (records_with_combustion / totale) * 100
+
+        summary.append("ANALISI TAFONOMICA:")
+        summary.append(f"Tracce di combustione sono presenti in {records_with_combustion} record ({pct_combustion:.1f}% del totale), ")
+
+        if pct_combustion > 50:
+            summary.append("suggerendo una significativa esposizione al fuoco dei resti faunistici.")
+        elif pct_combustion > 20:
+            summary.append("indicando una presenza moderata di fenomeni di combustione.")
+        else:
+            summary.append("indicando un'esposizione limitata al fuoco.")
+
+        summary.append("")
+
+    # Connessione anatomica
+    connection_count = dict(result.conteggi_sommario.get('resti_connessione_anatomica', []))
+    if connection_count:
+        connected = connection_count.get('Si', 0) + connection_count.get('Parziale', 0)
+        pct_connected = (connected / totale) * 100
+
+        summary.append("CONNESSIONE ANATOMICA:")
+        summary.append(f"Resti in connessione anatomica (totale o parziale) sono stati riscontrati in {connected} record ")
+        summary.append(f"({pct_connected:.1f}% del totale), ")
+
+        if pct_connected > 40:
+            summary.append("suggerendo deposizioni primarie o una buona preservazione del contesto originale.")
+        elif pct_connected > 15:
+            summary.append("indicando una preservazione moderata del contesto deposizionale.")
+        else:
+            summary.append("suggerendo prevalentemente deposizioni secondarie o rimaneggiate.")
+
+        summary.append("")
+
+    # Conclusione
+    summary.append("CONCLUSIONI:")
+    summary.append("Il dataset rappresenta un campione significativo per l'analisi archeozoologica del sito. ")
+    summary.append("I dati raccolti permettono di ricostruire aspetti legati all'economia, all'alimentazione e ")
+    summary.append("alle pratiche cultuali delle popolazioni antiche che hanno abitato l'area.")
+
+    return summary
+
+
+# ========== EXPORT ==========
+
+def export_csv(result: StatisticsResult, file_path: str, text_lines: List[str] = None):
+    """
+    Esporta le statistiche in CSV (apribile con Excel)
+
+    Args:
+        result: risultato di compute_statistics
+        file_path: percorso del file CSV
+        text_lines: righe del report testuale (se None vengono generate)
+    """
+    if text_lines is None:
+        text_lines = render_text(result)
+
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+
+        # Intestazione
+        writer.writerow(['STATISTICHE FAUNA - EXPORT'])
+        writer.writerow(['Data generazione', result.generato_il.strftime('%d/%m/%Y %H:%M:%S')])
+        writer.writerow([])
+
+        # Statistiche generali
+        writer.writerow(['STATISTICHE GENERALI'])
+        writer.writerow(['Totale record', result.totale])
+        writer.writerow(['Numero siti', len(result.siti)])
+        writer.writerow(['Numero aree', result.n_aree])
+        writer.writerow(['Numero saggi', result.n_saggi])
+        writer.writerow(['Numero US', result.n_us])
+        writer.writerow([])
+
+        # NMI
+        if result.nmi:
+            writer.writerow(['NUMERO MINIMO INDIVIDUI (NMI)'])
+            writer.writerow(['Totale record con NMI', result.nmi.n])
+            writer.writerow(['Media', f"{result.nmi.media:.1f}"])
+            writer.writerow(['Minimo', result.nmi.minimo])
+            writer.writerow(['Massimo', result.nmi.massimo])
+            writer.writerow(['Somma totale', result.nmi.somma])
+            writer.writerow([])
+
+        # Misure
+        if result.misure:
+            writer.writerow(['MISURE OSSA (mm)'])
+            writer.writerow(['Totale misurazioni', result.misure.n])
+            writer.writerow(['Media', f"{result.misure.media:.2f}"])
+            writer.writerow(['Minimo', f"{result.misure.minimo:.2f}"])
+            writer.writerow(['Massimo', f"{result.misure.massimo:.2f}"])
+            writer.writerow([])
+
+        # Distribuzione specie
+        if result.specie:
+            writer.writerow(['DISTRIBUZIONE SPECIE'])
+            writer.writerow(['Specie', 'Conteggio', 'Percentuale'])
+            for sp, count in result.specie:
+                pct = (count / result.totale) * 100
+                writer.writerow([sp, count, f"{pct:.1f}%"])
+            writer.writerow([])
+
+        # Distribuzione PSI
+        if result.psi:
+            totale_psi = sum(c for _, c in result.psi)
+            writer.writerow(['DISTRIBUZIONE PARTI SCHELETRICHE (PSI)'])
+            writer.writerow(['Parte Scheletrica', 'Conteggio', 'Percentuale'])
+            for psi, count in result.psi:
+                pct = (count / totale_psi) * 100
+                writer.writerow([psi, count, f"{pct:.1f}%"])
+            writer.writerow([])
+
+        # Distribuzione Elementi Anatomici misurati
+        if result.elementi:
+            totale_elementi = sum(c for _, c in result.elementi)
+            writer.writerow(['ELEMENTI ANATOMICI MISURATI'])
+            writer.writerow(['Elemento', 'Conteggio', 'Percentuale'])
+            for el, count in result.elementi:
+                pct = (count / totale_elementi) * 100
+                writer.writerow([el, count, f"{pct:.1f}%"])
+            writer.writerow([])
+
+        # Misure dettagliate
+        if result.misure_dettagliate:
+            writer.writerow(['MISURE DETTAGLIATE'])
+            writer.writerow(['Elemento', 'Specie', 'GL (mm)', 'GB (mm)', 'Bp (mm)', 'Bd (mm)'])
+            for elemento, specie, gl, gb, bp, bd in result.misure_dettagliate:
+                writer.writerow([elemento, specie] + [f"{v:.2f}" if v > 0 else '' for v in (gl, gb, bp, bd)])
+            writer.writerow([])
+
+        # Report testuale completo
+        writer.writerow(['REPORT COMPLETO'])
+        for line in text_lines:
+            writer.writerow([line])
+
+
+def export_pdf(result: StatisticsResult, file_path: str, text_lines: List[str] = None):
+    """
+    Esporta il report testuale delle statistiche in PDF
+
+    Args:
+        result: risultato di compute_statistics
+        file_path: percorso del file PDF
+        text_lines: righe del report testuale (se None vengono generate)
+
+    Raises:
+        ImportError: se ReportLab non è installato
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import cm
+
+    if text_lines is None:
+        text_lines = render_text(result)
+
+    doc = SimpleDocTemplate(file_path, pagesize=A4,
+                            leftMargin=1.5*cm, rightMargin=1.5*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Titolo
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+
+    story.append(Paragraph("STATISTICHE RIEPILOGATIVE - SCHEDE FAUNA", title_style))
+    story.append(Spacer(1, 0.5*cm))
+
+    # Data generazione
+    date_style = ParagraphStyle(
+        'DateStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.grey,
+        alignment=1
+    )
+    story.append(Paragraph(f"Report generato il: {result.generato_il.strftime('%d/%m/%Y %H:%M:%S')}", date_style))
+    story.append(Spacer(1, 1*cm))
+
+    # Contenuto
+    mono_style = ParagraphStyle(
+        'MonoStyle',
+        parent=styles['Normal'],
+        fontSize=8,
+        fontName='Courier',
+        leading=10
+    )
+
+    for line in text_lines:
+        if line.strip():
+            # Converti caratteri speciali
+            line_clean = line.replace('📋', '[*]').replace('🔢', '[#]').replace('📊', '[%]')
+            line_clean = line_clean.replace('📍', '[A]').replace('🔬', '[S]').replace('🏛', '[U]')
+            line_clean = line_clean.replace('📝', '[T]')
+
+            story.append(Paragraph(line_clean, mono_style))
+        else:
+            story.append(Spacer(1, 0.2*cm))
+
+    doc.build(story)
+
+
+def add_xlsx_sheets(workbook, result: StatisticsResult):
+    """
+    Aggiunge a una cartella openpyxl un foglio per ogni sezione delle statistiche
+
+    Conteggi, medie e percentuali sono scritti come celle numeriche (le
+    percentuali come frazioni con formato '0.0%'), così restano utilizzabili
+    in formule e grafici. Funziona anche con cartelle in modalità write-only.
+
+    Args:
+        workbook: openpyxl.Workbook (anche write_only=True)
+        result: risultato di compute_statistics
+
+    Raises:
+        ImportError: se openpyxl non è installato
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    def sheet(title: str, header: List[str]):
+        ws = workbook.create_sheet(title)
+        cells = []
+        for text in header:
+            cell = WriteOnlyCell(ws, value=text)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        ws.append(cells)
+        return ws
+
+    def pct(ws, count: int, total: int):
+        cell = WriteOnlyCell(ws, value=count / total if total else None)
+        cell.number_format = '0.0%'
+        return cell
+
+    def media(summary: Optional[NumericSummary]):
+        return round(summary.media, 2) if summary else None
+
+    # Riepilogo generale
+    ws = sheet('Riepilogo', ['Voce', 'Valore'])
+    ws.append(['Data generazione', result.generato_il.replace(microsecond=0)])
+    ws.append(['Totale record', result.totale])
+    ws.append(['Numero siti', len(result.siti)])
+    ws.append(['Numero aree', result.n_aree])
+    ws.append(['Numero saggi', result.n_saggi])
+    ws.append(['Numero US', result.n_us])
+    ws.append(['Combinazioni Area + Saggio + US', result.n_combinazioni])
+    if result.nmi:
+        ws.append(['Record con NMI', result.nmi.n])
+        ws.append(['NMI totale', result.nmi.somma])
+        ws.append(['NMI medio', media(result.nmi)])
+        ws.append(['NMI minimo', result.nmi.minimo])
+        ws.append(['NMI massimo', result.nmi.massimo])
+    if result.sito_dominante:
+        ws.append(['Sito con più record', result.sito_dominante[0]])
+        ws.append(['Record del sito dominante', result.sito_dominante[1]])
+    if result.specie_dominante_sito:
+        ws.append(['Specie prevalente nel sito dominante', result.specie_dominante_sito[0]])
+        ws.append(['Record della specie prevalente', result.specie_dominante_sito[1]])
+
+    # Misure per tipo (mm)
+    ws = sheet('Riepilogo misure', ['Misura', 'N', 'Media (mm)', 'Minimo (mm)', 'Massimo (mm)'])
+    for label, summary in [('Tutte', result.misure)] + [
+            (etichetta, result.misure_per_tipo.get(chiave)) for chiave, etichetta in TIPI_MISURA]:
+        if summary:
+            ws.append([label, summary.n, media(summary), summary.minimo, summary.massimo])
+
+    # Distribuzioni: specie sul totale dei record, le altre sul totale delle occorrenze
+    distribuzioni = [
+        ('Specie', 'Specie', result.specie, result.totale),
+        ('PSI', 'Parte Scheletrica', result.psi, sum(c for _, c in result.psi)),
+        ('Specie-PSI', 'Specie - PSI', result.specie_psi, sum(c for _, c in result.specie_psi)),
+        ('Elementi misurati', 'Elemento', result.elementi, sum(c for _, c in result.elementi)),
+    ]
+    for title, label, counts, total in distribuzioni:
+        ws = sheet(title, [label, 'Conteggio', 'Percentuale'])
+        for key, count in counts:
+            ws.append([key, count, pct(ws, count, total)])
+
+    ws = sheet('Categorie', ['Campo', 'Valore', 'Conteggio', 'Percentuale'])
+    for campo, label in CAMPI_CATEGORIE:
+        for value, count in result.categorie.get(campo, []):
+            ws.append([label, value, count, pct(ws, count, result.totale)])
+
+    # Sezioni per sito
+    ws = sheet('Siti', ['Sito', 'Record', 'Percentuale', 'Aree', 'Saggi', 'US',
+                        'NMI totale', 'NMI medio', 'Misure'])
+    for s in result.siti_sezioni:
+        ws.append([s.sito, s.n_record, pct(ws, s.n_record, result.totale), s.n_aree, s.n_saggi, s.n_us,
+                   s.nmi.somma if s.nmi else None, media(s.nmi), s.n_misure])
+
+    ws = sheet('Siti - Specie', ['Sito', 'Tipo', 'Valore', 'Conteggio'])
+    for s in result.siti_sezioni:
+        for tipo, counts in (('Specie', s.specie), ('PSI', s.psi), ('Elemento misurato', s.elementi)):
+            for key, count in counts:
+                ws.append([s.sito, tipo, key, count])
+
+    ws = sheet('Raggruppamenti', ['Sito', 'Livello', 'Area', 'Saggio', 'US', 'Record', '% del sito',
+                                  'NMI totale', 'NMI medio', 'Misure', 'Specie principali', 'PSI principali'])
+    for s in result.siti_sezioni:
+        livelli = [('Area', s.aree), ('Saggio', s.saggi), ('US', s.us), ('Area + Saggio + US', s.combinazioni)]
+        for livello, groups in livelli:
+            for g in groups:
+                if livello == 'Area + Saggio + US':
+                    area, saggio, us = g.chiave
+                else:
+                    area, saggio, us = [g.chiave if livello == l else None for l in ('Area', 'Saggio', 'US')]
+                ws.append([s.sito, livello, area, saggio, us, g.n_record, pct(ws, g.n_record, s.n_record),
+                           g.nmi.somma if g.nmi else None, media(g.nmi), g.n_misure,
+                           _fmt_counts(g.specie), _fmt_counts(g.psi)])
+
+    ws = sheet('Misure dettagliate', ['Elemento', 'Specie', 'GL (mm)', 'GB (mm)', 'Bp (mm)', 'Bd (mm)'])
+    for elemento, specie, gl, gb, bp, bd in result.misure_dettagliate:
+        ws.append([elemento, specie] + [v if v > 0 else None for v in (gl, gb, bp, bd)])
+
+
+# ========== MODALITÀ APPROSSIMATA ==========
+
+# Campi di cui si stimano i valori distinti (campo, etichetta)
+CAMPI_DISTINTI = [
+    ('sito', 'Siti univoci'),
+    ('area', 'Aree univoche'),
+    ('saggio', 'Saggi univoci'),
+    ('us', 'US univoche'),
+    ('specie', 'Specie distinte'),
+]
+
+# Versione del formato dei file di sketch
+SKETCH_VERSION = 1
+
+# Seed radice dei campioni a serbatoio (un seed derivato per partizione e campo)
+SERBATOIO_SEED = 20251124
+
+# Quantili riportati per le misure (quota, etichetta)
+QUANTILI = [(0.25, 'Q1'), (0.5, 'Mediana'), (0.75, 'Q3'), (0.9, 'P90')]
+
+
+class StatisticsSketch:
+    """
+    Sketch fondibili per le statistiche approssimate
+
+    Il numero di record e i totali/minimi/massimi sono esatti; valori
+    distinti, quantili e frequenze sono stime con errore dichiarato. Sketch
+    calcolati su siti, database o sessioni diverse si combinano con merge()
+    (fondere due volte gli stessi dati ne raddoppia i conteggi).
+    """
+
+    def __init__(self, partizione: int = 0):
+        """
+        Args:
+            partizione: indice della partizione di record; i campioni di partizioni
+                e campi diversi usano seed derivati distinti, quindi indipendenti
+        """
+        self.totale = 0
+        self.distinti = {campo: HyperLogLog() for campo, _ in CAMPI_DISTINTI}
+        self.nmi = ReservoirSample(seed=derive_seed(SERBATOIO_SEED, partizione, 'nmi'))
+        self.misure = ReservoirSample(seed=derive_seed(SERBATOIO_SEED, partizione, 'misure'))
+        self.specie = CountMinSketch()
+        self.psi = CountMinSketch()
+        self.generato_il = datetime.now()
+
+    def add_record(self, r: Dict):
+        """Aggiunge un record fauna agli sketch"""
+        self.totale += 1
+        for campo in ('sito', 'area', 'saggio', 'us'):
+            val = r.get(campo)
+            if val:
+                self.distinti[campo].add(str(val))
+
+        for sp in extract_species(r):
+            if sp:
+                self.distinti['specie'].add(sp)
+                self.specie.add(sp)
+        for psi in extract_psi(r):
+            if psi:
+                self.psi.add(psi)
+
+        if r.get('numero_minimo_individui') not in (None, '', 0):
+            self.nmi.add(int(r['numero_minimo_individui']))
+        for v in extract_measurements(r):
+            self.misure.add(v)
+
+    def merge(self, other: 'StatisticsSketch'):
+        """Fonde un altro sketch in questo"""
+        self.totale += other.totale
+        for campo, hll in self.distinti.items():
+            hll.merge(other.distinti[campo])
+        self.nmi.merge(other.nmi)
+        self.misure.merge(other.misure)
+        self.specie.merge(other.specie)
+        self.psi.merge(other.psi)
+        self.generato_il = max(self.generato_il, other.generato_il)
+
+    def to_dict(self) -> Dict:
+        return {
+            'versione': SKETCH_VERSION,
+            'totale': self.totale,
+            'distinti': {campo: hll.to_dict() for campo, hll in self.distinti.items()},
+            'nmi': self.nmi.to_dict(),
+            'misure': self.misure.to_dict(),
+            'specie': self.specie.to_dict(),
+            'psi': self.psi.to_dict(),
+            'generato_il': self.generato_il.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StatisticsSketch':
+        if data.get('versione') != SKETCH_VERSION:
+            raise ValueError(f"Versione dello sketch non supportata: {data.get('versione')}")
+        sketch = cls()
+        sketch.totale = data['totale']
+        sketch.distinti = {campo: HyperLogLog.from_dict(d) for campo, d in data['distinti'].items()}
+        sketch.nmi = ReservoirSample.from_dict(data['nmi'])
+        sketch.misure = ReservoirSample.from_dict(data['misure'])
+        sketch.specie = CountMinSketch.from_dict(data['specie'])
+        sketch.psi = CountMinSketch.from_dict(data['psi'])
+        sketch.generato_il = datetime.fromisoformat(data['generato_il'])
+        return sketch
+
+    def save(self, file_path: str):
+        """Salva lo sketch in JSON per fonderlo in una sessione successiva"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'StatisticsSketch':
+        """Carica uno sketch salvato con save()"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def _sketch_partition(task: tuple) -> StatisticsSketch:
+    """
+    Worker: sketch di una partizione di record
+
+    Args:
+        task: (indice partizione, record)
+    """
+    partizione, records = task
+    sketch = StatisticsSketch(partizione)
+    for r in records:
+        sketch.add_record(r)
+    return sketch
+
+
+def compute_approximate_statistics(records, max_workers: Optional[int] = None) -> StatisticsSketch:
+    """
+    Calcola le statistiche approssimate
+
+    In modalità seriale i record sono consumati in streaming (basta un
+    iterabile); in parallelo vengono suddivisi per sito e gli sketch dei
+    siti fusi al termine.
+
+    Args:
+        records: iterabile di record fauna
+        max_workers: processi da usare (None = automatico, 1 = seriale)
+
+    Returns:
+        StatisticsSketch
+    """
+    if max_workers is None:
+        records = list(records)
+        if len(records) < PARALLELO_MIN_RECORD:
+            max_workers = 1
+
+    if max_workers == 1:
+        return _sketch_partition((0, records))
+
+    partitions = {}
+    for r in records:
+        partitions.setdefault(r.get('sito') or '', []).append(
+            {k: r[k] for k in CAMPI_STATISTICHE if k in r})
+    tasks = list(enumerate(sorted(partitions.values(), key=len, reverse=True)))
+
+    sketch = StatisticsSketch(len(tasks))
+    for partial in run_parallel(_sketch_partition, tasks, max_workers):
+        sketch.merge(partial)
+    return sketch
+
+
+def render_approximate_text(sketch: StatisticsSketch) -> List[str]:
+    """
+    Genera il report testuale delle statistiche approssimate
+
+    Ogni stima è accompagnata dal suo margine di errore al 95%.
+    """
+    lines = []
+    lines.append("=" * 100)
+    lines.append("STATISTICHE APPROSSIMATE - SCHEDE FAUNA")
+    lines.append("=" * 100)
+    lines.append("Stime da sketch probabilistici; margini di errore al "
+                 f"{CONFIDENZA * 100:.0f}% di confidenza.")
+    lines.append("")
+
+    lines.append("📋 VALORI DISTINTI (HyperLogLog)")
+    lines.append("-" * 100)
+    lines.append(f"Numero totale record: {sketch.totale} (esatto)")
+    for campo, label in CAMPI_DISTINTI:
+        hll = sketch.distinti[campo]
+        stima = hll.estimate()
+        margine = math.ceil(stima * hll.relative_error())
+        lines.append(f"{label}: ~{round(stima)} (±{margine}, ±{hll.relative_error() * 100:.1f}%)")
+    lines.append("")
+
+    lines.append("🔢 STATISTICHE NUMERICHE (campione a serbatoio)")
+    lines.append("-" * 100)
+    for sample, label, unita in ((sketch.nmi, "Numero Minimo Individui (NMI)", ""),
+                                 (sketch.misure, "Misure Ossa", " mm")):
+        if not sample.n:
+            lines.append(f"{label}: Nessun dato")
+            continue
+        lines.append(f"{label}:")
+        lines.append(f"  Valori: {sample.n}, Media: {sample.somma / sample.n:.2f}{unita}, "
+                     f"Minimo: {sample.minimo}{unita}, Massimo: {sample.massimo}{unita} (esatti)")
+        errore = sample.rank_error()
+        nota = f"rango ±{errore * 100:.1f} punti percentuali" if errore else "esatti, campione completo"
+        quantili = ', '.join(f"{label_q} {sample.quantile(q):.2f}" for q, label_q in QUANTILI)
+        lines.append(f"  Quantili: {quantili} ({nota})")
+    lines.append("")
+
+    for cms, label in ((sketch.specie, "Specie"), (sketch.psi, "Parti Scheletriche - PSI")):
+        lines.append(f"📊 {label.upper()} PIÙ FREQUENTI (Count-Min, Top 10)")
+        lines.append("-" * 100)
+        top = cms.top(10)
+        if not top:
+            lines.append("Nessun dato")
+        else:
+            lines.append(f"Occorrenze totali: {cms.totale}; ogni stima può eccedere il vero di al massimo "
+                         f"{cms.error_bound()} (probabilità {(1 - cms.delta) * 100:.0f}%)")
+            for key, stima in top:
+                lines.append(f"  {key}: ~{stima} (tra {max(0, stima - cms.error_bound())} e {stima})")
+        lines.append("")
+
+    lines.append("=" * 100)
+    lines.append(f"Report generato il: {sketch.generato_il.strftime('%d/%m/%Y %H:%M:%S')}")
+    lines.append("=" * 100)
+    return lines
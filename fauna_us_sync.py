@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Allineamento dei campi US copiati in fauna_table da us_table di pyarchinit
+(sito, area, saggio, us, datazione_us). L'allineamento è un UPDATE insiemistico
+per blocchi di id_fauna, ognuno nella propria breve transazione: le schede già
+allineate non vengono riscritte, quindi rilanciarlo dopo un'interruzione (o con
+--da-id) riprende da dove era arrivato senza ripetere il lavoro fatto, e tra un
+blocco e l'altro chi sta modificando le schede non resta bloccato.
+
+In alternativa ai passaggi completi, i trigger opzionali su us_table propagano
+ogni modifica di una US alle sole schede collegate (tramite idx_fauna_id_us), e
+la verifica conta le schede disallineate senza riscrivere nulla.
+
+    python fauna_us_sync.py                      # database della configurazione salvata
+    python fauna_us_sync.py --db pyarchinit.sqlite --blocco 10000 --pausa 0.05
+    python fauna_us_sync.py --config fauna_db_config.json --da-id 250000
+    python fauna_us_sync.py --verifica
+    python fauna_us_sync.py --trigger attiva
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from fauna_schema import MIGRAZIONE_BATCH, Progress, SchemaConnection
+
+
+# (campo di fauna_table, campo di us_table)
+CAMPI_US = [
+    ('sito', 'sito'),
+    ('area', 'area'),
+    ('saggio', 'saggio'),
+    ('us', 'us'),
+    ('datazione_us', 'datazione'),
+]
+
+# Le schede salvano '' per i campi vuoti: NULL e '' sono considerati uguali.
+# I campi di us_table sono convertiti in testo come quelli di fauna_table: in molti
+# database pyarchinit us_table.us è INTEGER, e 101 non sarebbe mai uguale a '101'
+_DIVERSI_SQLITE = ' OR '.join(
+    f"COALESCE(fauna_table.{f}, '') <> COALESCE(CAST(u.{u} AS TEXT), '')" for f, u in CAMPI_US)
+
+_ALLINEA_SQLITE = f"""
+    UPDATE fauna_table
+    SET ({', '.join(f for f, _ in CAMPI_US)}) = (
+        SELECT {', '.join(f"COALESCE(CAST(u.{u} AS TEXT), '')" for _, u in CAMPI_US)}
+        FROM us_table u WHERE u.id_us = fauna_table.id_us
+    )
+    WHERE id_fauna >= ? AND id_fauna < ?
+      AND EXISTS (SELECT 1 FROM us_table u
+                  WHERE u.id_us = fauna_table.id_us AND ({_DIVERSI_SQLITE}))
+"""
+
+_ALLINEA_POSTGRES = f"""
+    UPDATE fauna_table f
+    SET {', '.join(f"{f} = COALESCE(u.{u}::TEXT, '')" for f, u in CAMPI_US)}
+    FROM us_table u
+    WHERE f.id_us = u.id_us
+      AND f.id_fauna >= %s AND f.id_fauna < %s
+      AND ({' OR '.join(f"COALESCE(f.{f}, '') <> COALESCE(u.{u}::TEXT, '')" for f, u in CAMPI_US)})
+"""
+
+
+# Trigger su us_table: a ogni modifica dei campi copiati aggiorna le schede della US
+TRIGGER = 'fauna_us_sync'
+
+_TRIGGER_SQLITE = f"""
+    CREATE TRIGGER IF NOT EXISTS {TRIGGER}
+    AFTER UPDATE OF {', '.join(u for _, u in CAMPI_US)} ON us_table
+    FOR EACH ROW
+    WHEN {' OR '.join(f"OLD.{u} IS NOT NEW.{u}" for _, u in CAMPI_US)}
+    BEGIN
+        UPDATE fauna_table
+        SET {', '.join(f"{f} = COALESCE(CAST(NEW.{u} AS TEXT), '')" for f, u in CAMPI_US)}
+        WHERE id_us = NEW.id_us
+          AND ({' OR '.join(f"COALESCE({f}, '') <> COALESCE(CAST(NEW.{u} AS TEXT), '')" for f, u in CAMPI_US)});
+    END;
+"""
+
+_TRIGGER_POSTGRES = f"""
+    CREATE OR REPLACE FUNCTION {TRIGGER}() RETURNS trigger AS $$
+    BEGIN
+        UPDATE fauna_table
+        SET {', '.join(f"{f} = COALESCE(NEW.{u}::TEXT, '')" for f, u in CAMPI_US)}
+        WHERE id_us = NEW.id_us
+          AND ({' OR '.join(f"COALESCE({f}, '') <> COALESCE(NEW.{u}::TEXT, '')" for f, u in CAMPI_US)});
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS {TRIGGER} ON us_table;
+    CREATE TRIGGER {TRIGGER}
+    AFTER UPDATE OF {', '.join(u for _, u in CAMPI_US)} ON us_table
+    FOR EACH ROW
+    WHEN ({' OR '.join(f"OLD.{u} IS DISTINCT FROM NEW.{u}" for _, u in CAMPI_US)})
+    EXECUTE PROCEDURE {TRIGGER}();
+"""
+
+_RIMUOVI_TRIGGER = {
+    'sqlite': f"DROP TRIGGER IF EXISTS {TRIGGER};",
+    'postgres': f"DROP TRIGGER IF EXISTS {TRIGGER} ON us_table; DROP FUNCTION IF EXISTS {TRIGGER}();",
+}
+
+_TRIGGER_PRESENTE = {
+    'sqlite': "SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+    'postgres': "SELECT COUNT(*) AS n FROM pg_trigger WHERE tgname = %s AND NOT tgisinternal",
+}
+
+
+def _diversi(dialetto: str, f: str, u: str) -> str:
+    testo = f"CAST(u.{u} AS TEXT)" if dialetto == 'sqlite' else f"u.{u}::TEXT"
+    return f"COALESCE(f.{f}, '') <> COALESCE({testo}, '')"
+
+
+@dataclass
+class BackfillReport:
+    """Esito di un allineamento dei campi US"""
+    da_id: int = 0
+    ultimo_id: int = 0         # ultimo id_fauna elaborato: punto di ripresa (--da-id ultimo_id + 1)
+    blocchi: int = 0
+    aggiornate: int = 0
+    secondi: float = 0.0
+
+
+@dataclass
+class DriftReport:
+    """Esito della verifica dei campi US (nessuna scrittura)"""
+    collegate: int = 0                                        # schede con id_us presente in us_table
+    disallineate: int = 0
+    per_campo: Dict[str, int] = field(default_factory=dict)
+    us: int = 0                                               # US con almeno una scheda disallineata
+    orfane: int = 0                                           # schede con id_us assente da us_table
+    esempi: List[int] = field(default_factory=list)           # alcuni id_fauna disallineati
+    trigger: bool = False
+    secondi: float = 0.0
+
+
+def _schema(db_or_conn, dialetto: str = None) -> SchemaConnection:
+    if isinstance(db_or_conn, SchemaConnection):
+        return db_or_conn
+    if dialetto is None:
+        dialetto = 'postgres' if hasattr(db_or_conn, 'psycopg2') else 'sqlite'
+    return SchemaConnection(getattr(db_or_conn, 'conn', db_or_conn), dialetto)
+
+
+def backfill_us_fields(db, batch_size: int = MIGRAZIONE_BATCH, da_id: int = None,
+                       pausa: float = 0.0, progress: Progress = None) -> BackfillReport:
+    """
+    Copia in fauna_table i campi US da us_table per le schede che ne differiscono
+
+    Args:
+        db: FaunaDB, FaunaDBPostgres o SchemaConnection
+        batch_size: ampiezza di ogni blocco di id_fauna (una transazione per blocco)
+        da_id: primo id_fauna da elaborare, per riprendere un allineamento interrotto
+        pausa: secondi di attesa tra un blocco e l'altro, per lasciare spazio alle scritture concorrenti
+        progress: funzione chiamata con (id elaborati, id totali) dopo ogni blocco
+
+    Returns:
+        BackfillReport con le schede aggiornate e l'ultimo id elaborato
+    """
+    schema = _schema(db)
+    inizio_t = time.perf_counter()
+    minimo = schema.scalar("SELECT MIN(id_fauna) AS n FROM fauna_table")
+    massimo = schema.scalar("SELECT MAX(id_fauna) AS n FROM fauna_table")
+    report = BackfillReport()
+    if minimo is None or not schema.has_table('us_table'):
+        return report
+
+    primo = max(minimo, da_id or minimo)
+    report.da_id = report.ultimo_id = primo
+    sql = _ALLINEA_SQLITE if schema.dialetto == 'sqlite' else _ALLINEA_POSTGRES
+    totale = max(massimo - primo + 1, 0)
+
+    for inizio in range(primo, massimo + 1, batch_size):
+        fine = min(inizio + batch_size, massimo + 1)
+        schema.begin()
+        try:
+            cursor = schema.conn.cursor()
+            cursor.execute(sql, (inizio, fine))
+            report.aggiornate += max(cursor.rowcount, 0)
+            schema.commit()
+        except Exception:
+            schema.rollback()
+            raise
+        report.blocchi += 1
+        report.ultimo_id = fine - 1
+        if progress:
+            progress(fine - primo, totale)
+        if pausa and fine <= massimo:
+            time.sleep(pausa)
+
+    report.secondi = round(time.perf_counter() - inizio_t, 3)
+    return report
+
+
+# ========== TRIGGER E VERIFICA ==========
+
+def us_triggers_installed(db) -> bool:
+    """True se il trigger di allineamento su us_table è installato"""
+    schema = _schema(db)
+    return schema.scalar(_TRIGGER_PRESENTE[schema.dialetto], (TRIGGER,)) > 0
+
+
+def install_us_triggers(db):
+    """
+    Installa il trigger su us_table che propaga le modifiche delle US a fauna_table
+
+    Aggiorna solo le schede della US modificata (tramite idx_fauna_id_us) e solo se
+    cambia uno dei campi copiati. Le schede già disallineate prima dell'installazione
+    vanno riallineate una volta con backfill_us_fields.
+    """
+    schema = _schema(db)
+    schema.begin()
+    try:
+        schema.execute("CREATE INDEX IF NOT EXISTS idx_fauna_id_us ON fauna_table(id_us)")
+        schema.run_script(_TRIGGER_SQLITE if schema.dialetto == 'sqlite' else _TRIGGER_POSTGRES)
+        schema.commit()
+    except Exception:
+        schema.rollback()
+        raise
+
+
+def remove_us_triggers(db):
+    """Rimuove il trigger di allineamento da us_table"""
+    schema = _schema(db)
+    schema.begin()
+    try:
+        schema.run_script(_RIMUOVI_TRIGGER[schema.dialetto])
+        schema.commit()
+    except Exception:
+        schema.rollback()
+        raise
+
+
+def check_us_drift(db, esempi: int = 10) -> DriftReport:
+    """
+    Conta le schede i cui campi US differiscono da us_table, senza modificarle
+
+    Una sola lettura di fauna_table unita a us_table sulla chiave primaria, più
+    il conteggio delle schede orfane; nessuna riga viene riscritta.
+
+    Args:
+        db: FaunaDB, FaunaDBPostgres o SchemaConnection
+        esempi: numero massimo di id_fauna disallineati da riportare
+
+    Returns:
+        DriftReport con i conteggi complessivi e per campo
+    """
+    schema = _schema(db)
+    inizio_t = time.perf_counter()
+    report = DriftReport()
+    if not schema.has_table('us_table'):
+        return report
+    report.trigger = us_triggers_installed(schema)
+
+    diverso = {f: _diversi(schema.dialetto, f, u) for f, u in CAMPI_US}
+    qualsiasi = ' OR '.join(diverso.values())
+    cursor = schema.conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(*) AS collegate,
+               SUM(CASE WHEN {qualsiasi} THEN 1 ELSE 0 END) AS disallineate,
+               COUNT(DISTINCT CASE WHEN {qualsiasi} THEN f.id_us END) AS n_us,
+               {', '.join(f"SUM(CASE WHEN {cond} THEN 1 ELSE 0 END) AS {f}" for f, cond in diverso.items())}
+        FROM fauna_table f JOIN us_table u ON u.id_us = f.id_us
+    """)
+    row = cursor.fetchone()
+    report.collegate = row['collegate']
+    report.disallineate = row['disallineate'] or 0
+    report.us = row['n_us'] or 0
+    report.per_campo = {f: row[f] or 0 for f, _ in CAMPI_US if row[f]}
+
+    if report.disallineate and esempi:
+        cursor.execute(f"""
+            SELECT f.id_fauna FROM fauna_table f JOIN us_table u ON u.id_us = f.id_us
+            WHERE {qualsiasi} ORDER BY f.id_fauna LIMIT {int(esempi)}
+        """)
+        report.esempi = [r['id_fauna'] for r in cursor.fetchall()]
+
+    report.orfane = schema.scalar("""
+        SELECT COUNT(*) AS n FROM fauna_table f
+        WHERE f.id_us IS NOT NULL AND NOT EXISTS (SELECT 1 FROM us_table u WHERE u.id_us = f.id_us)
+    """)
+    report.secondi = round(time.perf_counter() - inizio_t, 3)
+    return report
+
+
+# ========== RIGA DI COMANDO ==========
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Allinea i campi US di fauna_table a us_table")
+    parser.add_argument('--db', help="database SQLite (predefinito: ultima configurazione salvata)")
+    parser.add_argument('--config', help="file di configurazione JSON di DBConfigManager")
+    parser.add_argument('--blocco', type=int, default=MIGRAZIONE_BATCH, help="id_fauna per transazione")
+    parser.add_argument('--da-id', type=int, default=None, help="riprende dall'id_fauna indicato")
+    parser.add_argument('--pausa', type=float, default=0.0, help="secondi di pausa tra i blocchi")
+    parser.add_argument('--verifica', action='store_true', help="conta le schede disallineate senza modificarle")
+    parser.add_argument('--trigger', choices=['attiva', 'disattiva'], help="installa o rimuove il trigger su us_table")
+    args = parser.parse_args(argv)
+
+    from fauna_db_wrapper import open_saved_fauna_db
+    from fauna_schema import print_progress
+    db = open_saved_fauna_db(args.db, args.config)
+    try:
+        if args.verifica:
+            drift = check_us_drift(db)
+            print(f"{'✗' if drift.disallineate else '✓'} Schede disallineate: {drift.disallineate}/{drift.collegate} "
+                  f"in {drift.us} US, orfane: {drift.orfane}, trigger: {'sì' if drift.trigger else 'no'}")
+            for campo, n in drift.per_campo.items():
+                print(f"  {campo}: {n}")
+            if drift.esempi:
+                print(f"  esempi id_fauna: {', '.join(str(i) for i in drift.esempi)}")
+            return 1 if drift.disallineate else 0
+        if args.trigger == 'attiva':
+            install_us_triggers(db)
+            print("✓ Trigger installato su us_table")
+        elif args.trigger == 'disattiva':
+            remove_us_triggers(db)
+            print("✓ Trigger rimosso da us_table")
+            return 0
+        report = backfill_us_fields(db, args.blocco, args.da_id, args.pausa, print_progress)
+    except KeyboardInterrupt:
+        print("\n✗ Interrotto: i blocchi completati restano salvati, rilanciare per riprendere")
+        return 1
+    finally:
+        db.close()
+
+    print(f"✓ Schede aggiornate: {report.aggiornate} "
+          f"(id {report.da_id}-{report.ultimo_id}, {report.blocchi} blocchi, {report.secondi}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,10 @@ import os
 import sys
 import sqlite3
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fauna_schema import ULTIMA_VERSIONE, ensure_schema
+
 
 def install_fauna_tables(db_path=None):
     """
@@ -43,42 +47,15 @@ def install_fauna_tables(db_path=None):
             print("Eliminazione tabelle esistenti...")
             cursor.execute("DROP TABLE IF EXISTS fauna_table")
             cursor.execute("DROP TABLE IF EXISTS fauna_voc")
+            cursor.execute("DROP TABLE IF EXISTS fauna_schema_version")
             conn.commit()
 
-        # Percorso degli script SQL
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        sql_dir = os.path.join(script_dir, "sql")
-
-        # Esegui script per fauna_voc
-        print("Creazione tabella fauna_voc...")
-        voc_sql_path = os.path.join(sql_dir, "create_fauna_voc.sql")
-
-        if not os.path.exists(voc_sql_path):
-            print(f"ERRORE: File SQL non trovato: {voc_sql_path}")
-            return False
-
-        with open(voc_sql_path, 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-            cursor.executescript(sql_script)
-
-        print("✓ Tabella fauna_voc creata")
-
-        # Esegui script per fauna_table
-        print("Creazione tabella fauna_table...")
-        table_sql_path = os.path.join(sql_dir, "create_fauna_table.sql")
-
-        if not os.path.exists(table_sql_path):
-            print(f"ERRORE: File SQL non trovato: {table_sql_path}")
-            return False
-
-        with open(table_sql_path, 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-            cursor.executescript(sql_script)
-
-        print("✓ Tabella fauna_table creata")
-
-        # Commit delle modifiche
-        conn.commit()
+        # Crea le tabelle applicando tutte le migrazioni dello schema (vedi fauna_schema)
+        print("Creazione tabelle fauna_voc e fauna_table...")
+        conn.row_factory = sqlite3.Row
+        ensure_schema(conn, 'sqlite')
+        cursor = conn.cursor()
+        print(f"✓ Tabelle create (schema v{ULTIMA_VERSIONE})")
 
         # Verifica installazione
         cursor.execute("SELECT COUNT(*) FROM fauna_voc")
@@ -24,7 +24,6 @@ except ImportError:
     iface = None
 
 from fauna_manager import FaunaManager
-from database_selector import DatabaseSelectorDialog
 from db_config_manager import DBConfigManager
 
 # IMPORTANTE: Variabile globale per mantenere la finestra in memoria
@@ -46,13 +45,14 @@ class FaunaQGISIntegration:
         self.fauna_manager = None
         self.window = None
 
-    def open_fauna_manager(self, db_path=None, db_config=None):
+    def open_fauna_manager(self, db_path=None, db_config=None, profile=None):
         """
         Apre l'interfaccia Fauna Manager
 
         Args:
             db_path: percorso del database (opzionale)
             db_config: configurazione database (opzionale)
+            profile: StartupProfile per misurare le fasi di avvio (opzionale)
         """
         global _fauna_window
 
@@ -75,7 +75,7 @@ class FaunaQGISIntegration:
 
             # Tenta di creare il widget con retry in caso di errore
             try:
-                self.fauna_manager = FaunaManager(db_path=db_path, db_config=db_config)
+                self.fauna_manager = FaunaManager(db_path=db_path, db_config=db_config, profile=profile)
             except Exception as conn_error:
                 # Errore di connessione - mostra dialog per reinserire i dati
                 print(f"⚠ Errore connessione database: {conn_error}")
@@ -94,6 +94,8 @@ class FaunaQGISIntegration:
 
                 # Mostra il dialog per selezionare/reinserire i dati CON il messaggio
                 # NON salvare la config durante retry (verrà salvata dopo connessione riuscita)
+                from database_selector import DatabaseSelectorDialog
+
                 parent = self.iface.mainWindow() if (QGIS_AVAILABLE and self.iface) else None
                 dialog = DatabaseSelectorDialog(
                     parent,
@@ -127,7 +129,7 @@ class FaunaQGISIntegration:
                         print("⚠️ ATTENZIONE: Password ancora vuota!")
 
                     # Riprova con la nuova configurazione
-                    self.fauna_manager = FaunaManager(db_path=db_path, db_config=db_config)
+                    self.fauna_manager = FaunaManager(db_path=db_path, db_config=db_config, profile=profile)
 
                     # Se arriviamo qui, la connessione ha avuto successo!
                     # Salva la configurazione (senza password se SAVE_PASSWORD=False)
@@ -191,6 +193,8 @@ class FaunaQGISIntegration:
         Returns:
             Configurazione database o None se annullato
         """
+        from database_selector import DatabaseSelectorDialog
+
         parent = self.iface.mainWindow() if (QGIS_AVAILABLE and self.iface) else None
 
         dialog = DatabaseSelectorDialog(parent)
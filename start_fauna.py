@@ -2,8 +2,14 @@
 """
 Script semplice per avviare Fauna Manager
 Usa questo se hai già attivato il virtual environment
+
+    python start_fauna.py                     # avvio normale
+    python start_fauna.py --profile-startup   # stampa i tempi delle fasi di avvio
 """
 
+import time
+_avvio = time.perf_counter()
+
 import sys
 import os
 
@@ -47,6 +53,7 @@ if os.path.exists(qt_lib_path):
 # Ora importa PyQt5
 try:
     from PyQt5.QtWidgets import QApplication, QMessageBox
+    _import_qt = time.perf_counter()
 except ImportError:
     print("\n❌ Errore: PyQt5 non installato!")
     print("\n📦 Installa con:")
@@ -58,6 +65,13 @@ except ImportError:
 # Importa e avvia
 try:
     from qgis_integration import FaunaQGISIntegration
+    from fauna_manager import StartupProfile
+
+    profile = None
+    if '--profile-startup' in sys.argv:
+        profile = StartupProfile(inizio=_avvio)
+        profile.mark("import PyQt5", _import_qt)
+        profile.mark("import moduli fauna")
 
     print("\n" + "="*60)
     print("  Fauna Manager - pyArchInit")
@@ -68,12 +82,14 @@ try:
     app = QApplication.instance()
     if app is None:
         app = QApplication(sys.argv)
+    if profile:
+        profile.mark("QApplication")
 
     # Avvia Fauna Manager
     print("🚀 Avvio interfaccia...\n")
 
     integration = FaunaQGISIntegration(iface=None)
-    integration.open_fauna_manager()
+    integration.open_fauna_manager(profile=profile)
 
     # Esegui event loop
     sys.exit(app.exec_())